@@ -15,13 +15,67 @@ except ImportError as e:
     # Crear funciones básicas si no existe el módulo
     ov = None
 
-def procesar_datos_dmsp(archivo_cdf, directorio_salida="results"):
+def preprocesar_datos_dmsp(archivo_cdf, inicio=None, fin=None):
+    """
+    Carga el CDF y calcula los arrays que necesita la detección: espectros
+    filtrados, flujos integrados (lineales y log10), latitudes y eje temporal.
+
+    Returns:
+        dict: Arrays preprocesados, alineados en el eje temporal
+    """
+    # 1. Cargar datos
+    datos = ov.cargar_datos_cdf(archivo_cdf, inicio=inicio, fin=fin)
+    return ov.preprocesar_datos(datos)
+
+
+def cargar_preprocesado(archivo_cdf, inicio=None, fin=None, directorio_cache="cache"):
+    """
+    Devuelve los datos preprocesados de un CDF usando el cache en disco.
+
+    La clave depende del contenido del archivo y de la ventana temporal; si la
+    entrada existe se abre memory-mapped y no se vuelve a leer el CDF.
+    Con directorio_cache=None el cache se desactiva.
+    """
+    if directorio_cache is None:
+        return preprocesar_datos_dmsp(archivo_cdf, inicio=inicio, fin=fin)
+
+    clave = ov.clave_cache(archivo_cdf, inicio=inicio, fin=fin, low=30, high=30000)
+    pre = ov.cargar_cache(directorio_cache, clave)
+    if pre is None:
+        pre = preprocesar_datos_dmsp(archivo_cdf, inicio=inicio, fin=fin)
+        if len(pre['tiempo_final']) > 0:
+            pre = ov.guardar_cache(directorio_cache, clave, pre)
+    return pre
+
+
+def procesar_datos_dmsp(archivo_cdf, directorio_salida="results", inicio=None, fin=None,
+                        directorio_cache="cache", workers=1, render='inline', fronteras=None,
+                        pasadas=None, render_workers=None, render_timeout=None,
+                        nivel_graficos='quicklook', resumen_dia=False, hilos=1):
     """
     Función principal que procesa un archivo CDF DMSP
     
     Args:
         archivo_cdf (str): Ruta al archivo CDF
         directorio_salida (str): Directorio para guardar resultados
+        inicio (str): Tiempo de inicio ISO; solo se leen los registros desde este instante
+        fin (str): Tiempo final ISO (inclusive)
+        directorio_cache (str): Directorio del cache de datos preprocesados y del cache
+            incremental de fronteras y gráficos por ciclo (None lo desactiva)
+        workers (int): Procesos para procesar ciclos en paralelo (<= 0 usa todos los núcleos)
+        hilos (int): Hilos por proceso para los detectores independientes de cada segmento
+        render (str|bool): 'inline', 'deferred' (graficar después), 'background'
+            (graficar en segundo plano mientras se detectan los ciclos) o False (sin gráficos)
+        fronteras (list): Fronteras a calcular (None = todas); se añaden sus prerequisitos
+        pasadas (dict): Pasadas seleccionadas del índice de órbitas (consultar_pasadas).
+            Si se entrega, solo se leen los registros que las cubren y solo ellas
+            se procesan como ciclos (inicio/fin se ignoran)
+        render_workers (int): Procesos de render en segundo plano (None = núcleos - 1)
+        render_timeout (float): Segundos máximos para graficar un ciclo en segundo plano
+        nivel_graficos (str): 'quicklook' (vista rápida y miniatura; la resolución
+            completa se genera al pedirla con graficos_completos) o 'full'
+        resumen_dia (bool): Generar además resumen_dia.png con todos los ciclos del
+            archivo en una sola figura (independiente de 'render')
     
     Returns:
         dict: Información de los resultados
@@ -43,77 +97,47 @@ def procesar_datos_dmsp(archivo_cdf, directorio_salida="results"):
                 'timestamp': datetime.now().isoformat()
             }
         
-        # 1. Cargar datos
-        datos = ov.cargar_datos_cdf(archivo_cdf)
-        tiempo_final = datos["tiempo_final"]
-        ele_total_energy = datos["ELE_TOTAL_ENERGY_FLUX"]  
-        CHANNEL_ENERGIES = datos["CHANNEL_ENERGIES"]
-        tiempo_final_dict = {t: i for i, t in enumerate(tiempo_final)}
-        
-        # 2. Calcular energía promedio de electrones si no existe
-        if 'ELE_AVG_ENERGY' not in datos or datos['ELE_AVG_ENERGY'] is None:
-            ele_avg_energy = np.zeros(len(tiempo_final))
-            for i in range(len(datos['ELE_DIFF_ENERGY_FLUX'])):
-                flux = datos['ELE_DIFF_ENERGY_FLUX'][i]
-                valid_mask = flux > 0
-                if np.any(valid_mask):
-                    weighted_energy = np.sum(flux[valid_mask] * datos['CHANNEL_ENERGIES'][valid_mask])
-                    total_flux = np.sum(flux[valid_mask])
-                    ele_avg_energy[i] = weighted_energy / total_flux if total_flux > 0 else 0.0
-            datos['ELE_AVG_ENERGY'] = ele_avg_energy
+        if pasadas is not None:
+            if len(pasadas['t_inicio']) == 0:
+                return {
+                    'estado': 'error',
+                    'error': "Ninguna pasada del índice cumple la consulta",
+                    'timestamp': datetime.now().isoformat()
+                }
+            # Leer solo el rango de registros que cubre las pasadas seleccionadas
+            inicio = str(pasadas['t_inicio'].min())
+            fin = str(pasadas['t_fin'].max())
         
-        # 3. Filtrar canales (pero MANTENER ESPECTROS DIFERENCIALES)
-        CHANNEL_ENERGIES_f, ELE_DIFF_ESPECTROS, ION_DIFF_ESPECTROS, delta = ov.filtrar_canales(
-            datos['CHANNEL_ENERGIES'],
-            datos['ELE_DIFF_ENERGY_FLUX'],
-            datos['ION_DIFF_ENERGY_FLUX'],
-            low=30,
-            high=30000
-        )
-
-        # 4. Calcular flujos integrados ESPECÍFICOS
-        # Para b2i: iones 3-30 keV (canales 0-6 en orden descendente)
-        flujos_iones_b2i = ov.integrar_flujo_diferencial(
-            ION_DIFF_ESPECTROS,
-            delta,
-            canal1=0,   # 30000 eV (más energético)
-            canal2=7     # 3000 eV (límite inferior de 3 keV)
-        )
-
-        # Flujos totales para visualización y algunas fronteras
-        flujos_elec_totales = ov.integrar_flujo_diferencial(
-            ELE_DIFF_ESPECTROS,
-            delta,
-            canal1=0,   # 30000 eV
-            canal2=19    # 30 eV (todo el rango)
-        )
-
-        flujos_iones_totales = ov.integrar_flujo_diferencial(
-            ION_DIFF_ESPECTROS,
-            delta, 
-            canal1=0,
-            canal2=19    # 30 eV (todo el rango)
-        )
-
-        # Convertir a escala logarítmica solo para visualización
-        flujos_iones_log = np.log10(flujos_iones_totales + 1e-10)
-        flujos_elec_log = np.log10(flujos_elec_totales + 1e-10)
-        flujos_iones_b2i_log = np.log10(flujos_iones_b2i + 1e-10)
+        # 1-4. Cargar y preprocesar datos (desde el cache si ya existen)
+        pre = cargar_preprocesado(archivo_cdf, inicio=inicio, fin=fin,
+                                  directorio_cache=directorio_cache)
+        tiempo_final = pre["tiempo_final"]
+        if len(tiempo_final) == 0:
+            return {
+                'estado': 'error',
+                'error': f"No hay registros en el intervalo solicitado ({inicio} - {fin})",
+                'timestamp': datetime.now().isoformat()
+            }
+        ele_total_energy = pre["ELE_TOTAL_ENERGY_FLUX"]
+        CHANNEL_ENERGIES_f = pre["CHANNEL_ENERGIES_f"]
+        ELE_DIFF_ESPECTROS = pre["ELE_DIFF_ESPECTROS"]
+        ION_DIFF_ESPECTROS = pre["ION_DIFF_ESPECTROS"]
+        flujos_iones_log = pre["flujos_iones_log"]
+        flujos_elec_log = pre["flujos_elec_log"]
+        flujos_iones_b2i_log = pre["flujos_iones_b2i_log"]
 
-        # 5. Separar por latitud
-        adjust_SC_AACGM_LAT, adjust_tiempo_final, other_SC_AACGM_LAT, other_tiempo_final, transitions = ov.separar_por_latitud(
-            datos['SC_AACGM_LAT'],
-            tiempo_final
-        )
-        
-        # 6. Detectar extremos
-        extremos = ov.detectar_extremos_latitud(
-            adjust_SC_AACGM_LAT,
-            adjust_tiempo_final
-        )
-        
-        # 7. Agrupar extremos
-        pares_extremos = ov.agrupar_extremos(extremos)
+        # 5-7. Separar por latitud, detectar extremos y agruparlos en pares
+        # (índices enteros sobre tiempo_final)
+        if pasadas is not None:
+            # Pares directamente desde el índice, traducidos al intervalo leído
+            pares_extremos = ov.buscar_indices_tiempo(
+                tiempo_final, np.stack([pasadas['t_inicio'], pasadas['t_fin']], axis=1))
+            pares_extremos = pares_extremos[np.all(pares_extremos >= 0, axis=1)]
+            extremos = pares_extremos.ravel()
+        else:
+            orbita = ov.segmentar_orbita(pre['SC_AACGM_LAT'], tiempo_final)
+            extremos = orbita['extremos']
+            pares_extremos = orbita['pares']
         
         # 8. Crear carpeta principal usando el directorio de salida
         main_folder = ov.crear_carpetas(archivo_cdf, directorio_base=directorio_salida)
@@ -126,28 +150,44 @@ def procesar_datos_dmsp(archivo_cdf, directorio_salida="results"):
             len(flujos_elec_log) == len(flujos_iones_b2i_log) ==
             len(ELE_DIFF_ESPECTROS) == len(ION_DIFF_ESPECTROS)):
 
+            # Servicio de render en segundo plano (los JSON se escriben antes que los PNG)
+            servicio_render = None
+            if render == 'background':
+                servicio_render = ov.ServicioRender(
+                    workers=render_workers,
+                    timeout=ov.TIMEOUT_TRABAJO if render_timeout is None else render_timeout)
+
             # Ejecutar el procesamiento principal
-            resultados_procesamiento = ov.procesar_ciclos(
-                pares_extremos,
-                tiempo_final,
-                tiempo_final_dict,
-                datos['SC_AACGM_LAT'],
-                datos['SC_GEOCENTRIC_LAT'],
-                flujos_iones_log,
-                flujos_elec_log,
-                flujos_iones_b2i_log,
-                ele_total_energy,
-                ELE_DIFF_ESPECTROS,
-                datos['ELE_AVG_ENERGY'],
-                ION_DIFF_ESPECTROS,
-                CHANNEL_ENERGIES_f,
-                energy_edges,
-                main_folder,
-                fronteras=None  # Procesar todas las fronteras
-            )
+            try:
+                resultados_procesamiento = ov.procesar_ciclos(
+                    pares_extremos,
+                    tiempo_final,
+                    pre['SC_AACGM_LAT'],
+                    pre['SC_GEOCENTRIC_LAT'],
+                    flujos_iones_log,
+                    flujos_elec_log,
+                    flujos_iones_b2i_log,
+                    ele_total_energy,
+                    ELE_DIFF_ESPECTROS,
+                    pre['ELE_AVG_ENERGY'],
+                    ION_DIFF_ESPECTROS,
+                    CHANNEL_ENERGIES_f,
+                    energy_edges,
+                    main_folder,
+                    fronteras=fronteras,  # None procesa todas las fronteras
+                    workers=workers,
+                    render=render,
+                    directorio_cache=directorio_cache,  # Reutilizar fronteras y gráficos sin cambios
+                    servicio_render=servicio_render,
+                    nivel_graficos=nivel_graficos,
+                    hilos=hilos
+                )
+            finally:
+                # Esperar a que terminen los gráficos encolados
+                estadisticas_render = servicio_render.cerrar() if servicio_render is not None else None
             
             # Contar ciclos procesados
-            numero_ciclos = len(pares_extremos) if pares_extremos else 0
+            numero_ciclos = len(pares_extremos)
             
             # Estructura de retorno para la aplicación Streamlit
             resultados = {
@@ -174,9 +214,23 @@ def procesar_datos_dmsp(archivo_cdf, directorio_salida="results"):
                 }
             }
             
-            # Si tenemos resultados del procesamiento, actualizar los límites
+            # Si tenemos resultados del procesamiento, adjuntarlos por ciclo (en orden)
             if resultados_procesamiento:
-                resultados['limites_detectados'].update(resultados_procesamiento)
+                resultados['ciclos'] = resultados_procesamiento
+            if estadisticas_render is not None:
+                resultados['render'] = estadisticas_render
+
+            # Resumen del archivo completo con las fronteras de todos los ciclos
+            if resumen_dia:
+                try:
+                    resultados['resumen_dia'] = ov.graficar_resumen_dia(
+                        tiempo_final, ION_DIFF_ESPECTROS, ELE_DIFF_ESPECTROS,
+                        flujos_iones_log, flujos_elec_log, pre['SC_AACGM_LAT'],
+                        pares_extremos, resultados_procesamiento or [], energy_edges,
+                        main_folder, titulo=os.path.basename(archivo_cdf))
+                except Exception as e:
+                    print(f"Error generando el resumen del día: {e}")
+                    resultados['resumen_dia'] = None
 
             return resultados
             
@@ -199,19 +253,115 @@ def procesar_datos_dmsp(archivo_cdf, directorio_salida="results"):
         }
 
 
-def main(cdf_file, fronteras=None, inicio=None, fin=None):
+def barrer_umbrales_dmsp(archivo_cdf, conjuntos, directorio_salida="results", inicio=None, fin=None,
+                         directorio_cache="cache", fronteras=None, ruta_tabla=None):
+    """
+    Barrido de sensibilidad de PAPER_THRESHOLDS sobre todos los ciclos de un
+    archivo: carga, preprocesa y segmenta una sola vez y evalúa todos los
+    conjuntos de umbrales en una pasada por segmento.
+    
+    Args:
+        archivo_cdf (str): Ruta al archivo CDF
+        conjuntos (list): Conjuntos de umbrales ({'b2e.low_flux_thresh': 10.5, ...})
+        directorio_salida (str): Directorio para guardar la tabla
+        inicio, fin (str): Intervalo ISO a leer
+        directorio_cache (str): Directorio del cache (None lo desactiva)
+        fronteras (list): Fronteras a evaluar (None = todas)
+        ruta_tabla (str): Ruta del CSV (por defecto <salida>/barridos/<archivo>_barrido.csv)
+    
+    Returns:
+        dict: Estado, tabla (columnas) y ruta del CSV
+    """
+    try:
+        if not os.path.isfile(archivo_cdf):
+            return {
+                'estado': 'error',
+                'error': f"Archivo no encontrado: {archivo_cdf}",
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        pre = cargar_preprocesado(archivo_cdf, inicio=inicio, fin=fin,
+                                  directorio_cache=directorio_cache)
+        tiempo_final = pre["tiempo_final"]
+        if len(tiempo_final) == 0:
+            return {
+                'estado': 'error',
+                'error': f"No hay registros en el intervalo solicitado ({inicio} - {fin})",
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        pares_extremos = ov.segmentar_orbita(pre['SC_AACGM_LAT'], tiempo_final)['pares']
+        arrays = ov.arrays_globales(
+            tiempo_final, pre['SC_AACGM_LAT'], pre['SC_GEOCENTRIC_LAT'],
+            pre["flujos_iones_log"], pre["flujos_elec_log"], pre["flujos_iones_b2i_log"],
+            pre["ELE_DIFF_ESPECTROS"], pre['ELE_AVG_ENERGY'], pre["ION_DIFF_ESPECTROS"],
+            pre["CHANNEL_ENERGIES_f"], ov.compute_energy_edges(pre["CHANNEL_ENERGIES_f"])
+        )
+        tabla = ov.barrer_umbrales_ciclos(conjuntos, pares_extremos, arrays, fronteras=fronteras,
+                                          directorio_cache=directorio_cache)
+        
+        if ruta_tabla is None:
+            nombre = os.path.splitext(os.path.basename(archivo_cdf))[0]
+            ruta_tabla = os.path.join(directorio_salida, "barridos", f"{nombre}_barrido.csv")
+        ov.guardar_tabla_barrido(tabla, ruta_tabla)
+        
+        return {
+            'estado': 'completado',
+            'archivo_procesado': archivo_cdf,
+            'timestamp': datetime.now().isoformat(),
+            'ciclos_procesados': len(pares_extremos),
+            'conjuntos': len(conjuntos),
+            'tabla': tabla,
+            'ruta_tabla': ruta_tabla
+        }
+    
+    except Exception as e:
+        import traceback
+        return {
+            'estado': 'error',
+            'error': str(e),
+            'detalles_error': traceback.format_exc(),
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+def main(cdf_file, fronteras=None, inicio=None, fin=None, directorio_cache="cache", workers=1,
+         render='inline', hemisferio=None, horas_ut=None, render_workers=None, render_timeout=None,
+         nivel_graficos='quicklook', resumen_dia=False, hilos=1):
     """
     Función principal para ejecución por línea de comandos
     """
     try:
         print(f"Procesando archivo: {cdf_file}")
         
-        resultados = procesar_datos_dmsp(cdf_file)
+        # Selección de pasadas mediante el índice de órbitas del archivo
+        pasadas = None
+        if hemisferio is not None or horas_ut is not None:
+            indice = ov.cargar_indice_orbitas(cdf_file)
+            pasadas = ov.consultar_pasadas(indice, hemisferio=hemisferio, horas_ut=horas_ut,
+                                           inicio=inicio, fin=fin)
+            print(f"Pasadas seleccionadas: {len(pasadas['t_inicio'])} de {len(indice['t_inicio'])}")
+        
+        resultados = procesar_datos_dmsp(cdf_file, inicio=inicio, fin=fin,
+                                         directorio_cache=directorio_cache, workers=workers,
+                                         render=render, fronteras=fronteras, pasadas=pasadas,
+                                         render_workers=render_workers,
+                                         render_timeout=render_timeout,
+                                         nivel_graficos=nivel_graficos,
+                                         resumen_dia=resumen_dia, hilos=hilos)
         
         if resultados['estado'] == 'completado':
             print(f"Procesamiento completado exitosamente")
             print(f"Ciclos procesados: {resultados['ciclos_procesados']}")
             print(f"Resultados en: {resultados['directorio_resultados']}")
+            if 'render' in resultados:
+                r = resultados['render']
+                por_ciclo = r['segundos_render'] / max(1, r['renderizados'] + r['fallidos'])
+                print(f"Render en segundo plano: {r['renderizados']} ciclos en {r['segundos']:.1f} s "
+                      f"({r['ciclos_por_minuto']:.1f} ciclos/min, {por_ciclo:.1f} s por ciclo), "
+                      f"{r['fallidos']} fallidos")
+            if resultados.get('resumen_dia'):
+                print(f"Resumen del día: {resultados['resumen_dia']}")
         else:
             print(f"Error en el procesamiento: {resultados['error']}")
             
@@ -235,6 +385,37 @@ if __name__ == "__main__":
                         help='Lista de fronteras a calcular (b1e,b2e,b2i,b3a,b3b,b4s,b5e,b5i,b6) o "all" para todas')
     parser.add_argument('--inicio', help='Tiempo de inicio en formato ISO (ej: 2014-12-31T12:00:00)')
     parser.add_argument('--fin', help='Tiempo final en formato ISO (ej: 2014-12-31T12:30:00)')
+    parser.add_argument('--cache', default='cache',
+                        help='Directorio del cache de datos preprocesados, fronteras y gráficos (por defecto: cache)')
+    parser.add_argument('--sin-cache', action='store_true',
+                        help='No leer ni escribir el cache (recalcula todo)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Número de procesos para procesar ciclos en paralelo (0 = todos los núcleos)')
+    parser.add_argument('--hilos', type=int, default=1,
+                        help='Hilos por proceso para ejecutar en paralelo los detectores '
+                             'independientes de cada segmento (b1i, b2i, b3, b5i...)')
+    parser.add_argument('--render', choices=['inline', 'deferred', 'background', 'none'], default='inline',
+                        help='Gráficos: inline (por ciclo), deferred (guardar y graficar después), '
+                             'background (procesos de render en paralelo a la detección) o none')
+    parser.add_argument('--graficos', choices=['quicklook', 'full'], default='quicklook',
+                        help='Salida de los gráficos: quicklook (vista rápida y miniatura; la resolución '
+                             'completa se genera al pedirla) o full (resolución completa)')
+    parser.add_argument('--resumen-dia', action='store_true',
+                        help='Generar además un resumen de todo el archivo en una sola figura '
+                             '(resumen_dia.png); con --render none es la única salida gráfica')
+    parser.add_argument('--render-jobs', type=int, default=0,
+                        help='Procesos de render con --render background (0 = núcleos - 1)')
+    parser.add_argument('--render-timeout', type=float,
+                        help='Segundos máximos para graficar un ciclo con --render background (por defecto: 300)')
+    parser.add_argument('--hemisferio', choices=['N', 'S'],
+                        help='Procesar solo las pasadas de este hemisferio (usa el índice de órbitas)')
+    parser.add_argument('--horas-ut', nargs=2, type=float, metavar=('H0', 'H1'),
+                        help='Procesar solo las pasadas entre estas horas UT (ej: 3 5)')
+    parser.add_argument('--barrido', metavar='JSON',
+                        help='Barrido de umbrales: JSON con una rejilla {"b2e.low_flux_thresh": [10.5, 11]} '
+                             'o una lista de conjuntos; escribe una tabla CSV en lugar de procesar ciclos')
+    parser.add_argument('--salida-barrido', metavar='CSV',
+                        help='Ruta del CSV del barrido (por defecto: results/barridos/<archivo>_barrido.csv)')
     
     args = parser.parse_args()
     
@@ -248,5 +429,24 @@ if __name__ == "__main__":
     else:
         fronteras = args.fronteras
     
+    # Barrido de umbrales en lugar del procesamiento normal
+    if args.barrido:
+        resultados = barrer_umbrales_dmsp(args.cdf_file, ov.cargar_conjuntos(args.barrido),
+                                          inicio=args.inicio, fin=args.fin,
+                                          directorio_cache=None if args.sin_cache else args.cache,
+                                          fronteras=fronteras, ruta_tabla=args.salida_barrido)
+        if resultados['estado'] == 'completado':
+            print(f"Barrido de {resultados['conjuntos']} conjuntos sobre "
+                  f"{resultados['ciclos_procesados']} ciclos: {resultados['ruta_tabla']}")
+        else:
+            print(f"Error en el barrido: {resultados['error']}")
+            sys.exit(1)
+        sys.exit(0)
+    
     # Ejecutar procesamiento
-    main(args.cdf_file, fronteras=fronteras, inicio=args.inicio, fin=args.fin)
\ No newline at end of file
+    main(args.cdf_file, fronteras=fronteras, inicio=args.inicio, fin=args.fin,
+         directorio_cache=None if args.sin_cache else args.cache, workers=args.jobs,
+         render=False if args.render == 'none' else args.render,
+         hemisferio=args.hemisferio, horas_ut=args.horas_ut,
+         render_workers=args.render_jobs, render_timeout=args.render_timeout,
+         nivel_graficos=args.graficos, resumen_dia=args.resumen_dia, hilos=args.hilos)
\ No newline at end of file
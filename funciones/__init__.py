@@ -1,17 +1,23 @@
 # funciones/__init__.py
 
 # — Funciones de carga y filtrado —
-from .cargar_datos_cdf import cargar_datos_cdf
+from .cargar_datos_cdf import cargar_datos_cdf, rango_registros
 from .load_variable import load_variable
+from .cache_preprocesado import clave_cache, cargar_cache, guardar_cache, podar_cache
 
 # — Funciones de procesamiento de canales —
 from .filtrar_canales import filtrar_canales
-from .integrar_flujo_diferencial import integrar_flujo_diferencial
+from .integrar_flujo_diferencial import integrar_flujo_diferencial, integrar_bandas, calcular_flujos_integrados
+from .energia_promedio import calcular_energia_promedio
+from .preprocesar_datos import preprocesar_datos
 
 # — Funciones de latitud y segmentos —
 from .separar_por_latitud import separar_por_latitud
 from .detectar_extremos_latitud import detectar_extremos_latitud
 from .agrupar_extremos import agrupar_extremos
+from .segmentar_orbita import segmentar_orbita
+from .segment_utils import buscar_indices_tiempo
+from .indice_orbitas import cargar_indice_orbitas, construir_indice_orbitas, consultar_pasadas
 
 # — Funciones auxiliares —
 from .crear_carpetas import crear_carpetas
@@ -26,9 +32,18 @@ from .compute_energy_edges import compute_energy_edges
 
 
 # — Función principal que genera los ciclos (gráficas, JSON, etc.) —
-from .procesar_ciclos import procesar_ciclos
+from .procesar_ciclos import procesar_ciclos, arrays_globales
+from .deteccion_lotes import construir_lote, detectar_fronteras_lote
+from .cache_fronteras import huella_segmento, huella_codigo
+from .barrido_umbrales import (expandir_rejilla, cargar_conjuntos, barrer_segmento,
+                               barrer_umbrales_ciclos, guardar_tabla_barrido)
 
 
 from .io_utils import save_cycle_info
 from .plot_utils import plot_cycle
+from .plantillas_graficos import dibujar_ciclo, dibujar_ciclo_polar, rutas_graficos, NIVELES_GRAFICOS
+from .render_diferido import renderizar_ciclo, renderizar_pendientes, graficos_completos
+from .servicio_render import ServicioRender, TIMEOUT_TRABAJO
+from .resumen_dia import graficar_resumen_dia, fronteras_ciclos
+from .deteccion_streaming import DetectorStreaming, ejecutar_streaming, registros_cdf
 from .procesar_ciclos import procesar_ciclos
@@ -0,0 +1,318 @@
+# barrido_umbrales.py - barridos de sensibilidad de PAPER_THRESHOLDS
+import os
+import csv
+import json
+import itertools
+import numpy as np
+from .boundary_detection import (ORDEN_FRONTERAS, GRAFO_FRONTERAS, resolver_fronteras,
+                                 datos_requeridos, detect_all_boundaries)
+from .deteccion_lotes import construir_lote, segmento_lote, precalcular_lote
+from .cache_fronteras import huella_segmento
+from .procesar_ciclos import crear_contexto, segmentar_ciclo
+from .fronteras.detect_b1e import flujo_log_b1e, validate_segment_data
+from .fronteras.detect_b1i import flujo_log_b1i
+from .fronteras.detect_b2e import buscar_b2e
+from .fronteras.detect_b4s import buscar_b4s
+from .fronteras.funciones_auxiliares.salto_b1 import buscar_saltos_b1
+from .fronteras.funciones_auxiliares.correlaciones import correlacion_promedio
+from .fronteras.funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+
+# Nodos con búsqueda vectorizada sobre el eje de conjuntos de umbrales. El resto
+# de detectores no lee PAPER_THRESHOLDS (ni depende de estos nodos) y se
+# ejecuta una sola vez por segmento.
+NODOS_BARRIDO = ('b1e', 'b1i', 'b2e', 'b4s')
+
+
+def expandir_rejilla(rejilla):
+    """
+    Producto cartesiano de una rejilla de umbrales.
+
+    Args:
+        rejilla (dict): {'nodo.clave': [valores]} (p.ej. {'b2e.low_flux_thresh': [10.5, 11]})
+
+    Returns:
+        list: Conjuntos de umbrales {'nodo.clave': valor}
+    """
+    claves = list(rejilla)
+    valores = [v if isinstance(v, (list, tuple)) else [v] for v in rejilla.values()]
+    return [dict(zip(claves, combinacion)) for combinacion in itertools.product(*valores)]
+
+
+def cargar_conjuntos(ruta):
+    """
+    Lee los conjuntos de umbrales de un JSON: una rejilla {'nodo.clave': [valores]}
+    (se expande) o una lista explícita de conjuntos.
+    """
+    with open(ruta, 'r', encoding='utf-8') as f:
+        datos = json.load(f)
+    if isinstance(datos, dict):
+        return expandir_rejilla(datos)
+    return list(datos)
+
+
+def _aplanar(conjunto):
+    """Acepta {'b2e': {'low_flux_thresh': 10.5}} o {'b2e.low_flux_thresh': 10.5}"""
+    plano = {}
+    for clave, valor in conjunto.items():
+        if isinstance(valor, dict):
+            plano.update({f"{clave}.{k}": v for k, v in valor.items()})
+        else:
+            plano[clave] = valor
+    return plano
+
+
+def umbrales_conjuntos(conjuntos):
+    """
+    Valida los conjuntos y completa cada uno con los valores de PAPER_THRESHOLDS.
+
+    Returns:
+        tuple: (conjuntos planos {'nodo.clave': valor}, umbrales completos
+            {nodo: thresholds} por conjunto)
+    """
+    planos = [_aplanar(c) for c in conjuntos]
+    umbrales = []
+    for plano in planos:
+        completo = {nodo: dict(PAPER_THRESHOLDS[nodo]) for nodo in NODOS_BARRIDO}
+        for nombre, valor in plano.items():
+            nodo, _, clave = nombre.partition('.')
+            if nodo not in NODOS_BARRIDO or clave not in PAPER_THRESHOLDS[nodo]:
+                raise ValueError(f"Umbral no soportado en el barrido: {nombre!r} "
+                                 f"(nodos: {NODOS_BARRIDO}, claves de PAPER_THRESHOLDS)")
+            completo[nodo][clave] = valor
+        umbrales.append(completo)
+    return planos, umbrales
+
+
+def _barrer_b1e(segment, channel_energies, lista, indices, precalculos):
+    valid, _ = validate_segment_data(segment, ['ele_diff_flux', 'time', 'lat'])
+    if not valid:
+        return np.full(len(lista), -1, dtype=np.int64)
+    return buscar_saltos_b1(flujo_log_b1e(segment, channel_energies), lista, desfase_siguiente=0)
+
+
+def _barrer_b1i(segment, channel_energies, lista, indices, precalculos):
+    valid, _ = validate_segment_data(segment, ['ion_diff_flux', 'time', 'lat'])
+    if not valid:
+        return np.full(len(lista), -1, dtype=np.int64)
+    return buscar_saltos_b1(flujo_log_b1i(segment, channel_energies), lista, desfase_siguiente=1)
+
+
+def _barrer_b2e(segment, channel_energies, lista, indices, precalculos):
+    valid, _ = validate_segment_data(segment, ['ele_avg_energy', 'ele_energy_flux', 'time', 'lat'])
+    if not valid:
+        return np.full(len(lista), -1, dtype=np.int64)
+    return buscar_b2e(segment['ele_avg_energy'], segment['ele_energy_flux'], lista, indices['b1e'])
+
+
+def _barrer_b4s(segment, channel_energies, lista, indices, precalculos):
+    resultado = np.full(len(lista), -1, dtype=np.int64)
+    for key in ('ele_diff_flux', 'time', 'lat', 'ele_energy_flux'):
+        if key not in segment or len(segment[key]) == 0:
+            return resultado
+
+    # <r> una vez por (n_corr, subvisual_thresh); el de los umbrales del paper
+    # puede venir precalculado del lote
+    previos = np.maximum(indices['b2e'], indices['b2i'])
+    grupos = {}
+    for p, t in enumerate(lista):
+        grupos.setdefault((t['n_corr'], t['subvisual_thresh']), []).append(p)
+
+    paper = PAPER_THRESHOLDS['b4s']
+    for (n_corr, subvisual_thresh), conjuntos in grupos.items():
+        if ((n_corr, subvisual_thresh) == (paper['n_corr'], paper['subvisual_thresh']) and
+                'avg_correlations' in precalculos):
+            avg_correlations = precalculos['avg_correlations']
+        else:
+            avg_correlations = correlacion_promedio(segment['ele_diff_flux'], segment['ele_energy_flux'],
+                                                    n_corr, subvisual_thresh)
+        conjuntos = np.array(conjuntos)
+        resultado[conjuntos] = buscar_b4s(avg_correlations, [lista[p] for p in conjuntos],
+                                          previos[conjuntos])
+    return resultado
+
+
+BARRIDOS = {'b1e': _barrer_b1e, 'b1i': _barrer_b1i, 'b2e': _barrer_b2e, 'b4s': _barrer_b4s}
+
+
+def _barrer_por_conjunto(nodo, segment_data, channel_energies, lista, indices, precalculos):
+    """
+    Repite el barrido de un nodo conjunto a conjunto cuando la evaluación
+    conjunta falla, para que solo los conjuntos que fallan queden en -1 (y se
+    informen) en lugar de todos.
+    """
+    resultado = np.full(len(lista), -1, dtype=np.int64)
+    for p, umbral in enumerate(lista):
+        previos = {frontera: valores[p:p + 1] for frontera, valores in indices.items()}
+        try:
+            resultado[p] = BARRIDOS[nodo](segment_data, channel_energies, [umbral], previos,
+                                          precalculos)[0]
+        except Exception as e:
+            print(f"Error en el barrido de {nodo} con el conjunto {p} ({umbral}): "
+                  f"{type(e).__name__}: {e}")
+    return resultado
+
+
+def barrer_segmento(segment_data, channel_energies, umbrales, fronteras=None, precalculos=None):
+    """
+    Evalúa todos los conjuntos de umbrales sobre un segmento en una pasada:
+    los detectores de NODOS_BARRIDO calculan una vez sus intermedios (flujos
+    parciales, medias móviles, energía suavizada, correlaciones) y comparan
+    contra todos los conjuntos a la vez; los demás se ejecutan una vez.
+
+    Args:
+        umbrales (list): Umbrales completos por conjunto (umbrales_conjuntos)
+        precalculos (dict): Argumentos precalculados por nodo (precalcular_lote)
+
+    Returns:
+        dict: {frontera: índice por conjunto (-1 si no se detectó)}
+    """
+    if precalculos is None:
+        precalculos = {}
+    n_conjuntos = len(umbrales)
+    nodos, desconocidas = resolver_fronteras(fronteras)
+    indices = {}
+
+    fijos = [f for nodo in nodos if nodo not in NODOS_BARRIDO
+             for f in GRAFO_FRONTERAS[nodo]['produce']]
+    if fijos:
+        comunes = detect_all_boundaries(segment_data, channel_energies, fronteras=fijos,
+                                        precalculos=precalculos)
+        for frontera, resultado in comunes.items():
+            indice = -1 if resultado['index'] is None else resultado['index']
+            indices[frontera] = np.full(n_conjuntos, indice, dtype=np.int64)
+
+    for nodo in nodos:
+        if nodo not in NODOS_BARRIDO:
+            continue
+        lista = [u[nodo] for u in umbrales]
+        if not datos_requeridos(segment_data, nodo):
+            indices[nodo] = np.full(n_conjuntos, -1, dtype=np.int64)
+            continue
+        try:
+            indices[nodo] = BARRIDOS[nodo](segment_data, channel_energies, lista, indices,
+                                           precalculos.get(nodo, {}))
+        except Exception:
+            indices[nodo] = _barrer_por_conjunto(nodo, segment_data, channel_energies, lista,
+                                                 indices, precalculos.get(nodo, {}))
+
+    resultado = {f: indices[f] for f in ORDEN_FRONTERAS if f in indices}
+    for frontera in desconocidas:
+        resultado[frontera] = np.full(n_conjuntos, -1, dtype=np.int64)
+    return resultado
+
+
+def barrer_lote(lote, channel_energies, umbrales, fronteras=None, directorio_cache=None):
+    """
+    Barrido de umbrales sobre todos los segmentos de un lote. Los cálculos fila
+    a fila independientes de los umbrales se hacen una vez para el lote (y se
+    reutilizan del cache incremental si existe).
+
+    Returns:
+        list: Resultado de barrer_segmento por segmento ({} si está vacío)
+    """
+    n_segmentos = len(lote['offsets']) - 1
+    huellas = None
+    if directorio_cache is not None:
+        huellas = [huella_segmento(segmento_lote(lote, k)) for k in range(n_segmentos)]
+    precalculos = precalcular_lote(lote, channel_energies, fronteras, directorio_cache, huellas)
+
+    resultados = []
+    for k in range(n_segmentos):
+        segment_data = segmento_lote(lote, k)
+        if len(segment_data['time']) == 0:
+            resultados.append({})
+            continue
+        resultados.append(barrer_segmento(segment_data, channel_energies, umbrales,
+                                          fronteras, precalculos[k]))
+    return resultados
+
+
+def barrer_umbrales_ciclos(conjuntos, pares_extremos, arrays, fronteras=None, directorio_cache=None):
+    """
+    Barrido de umbrales sobre todos los ciclos de un archivo.
+
+    Args:
+        conjuntos (list): Conjuntos de umbrales ({'nodo.clave': valor} o anidados)
+        pares_extremos (array): Pares de extremos (ciclos)
+        arrays (dict): Arrays globales (procesar_ciclos.arrays_globales)
+
+    Returns:
+        dict: Tabla en formato largo, una columna por campo: 'ciclo',
+            'segmento', 'conjunto', una columna por umbral barrido, 'frontera',
+            'indice' (sobre el segmento de procesamiento, -1 si no se detectó),
+            'tiempo' (NaT) y 'lat' (NaN)
+    """
+    planos, umbrales = umbrales_conjuntos(conjuntos)
+    nombres = sorted({nombre for plano in planos for nombre in plano})
+    contexto = crear_contexto(arrays, None, fronteras, render=False)
+
+    etiquetas = []
+    segmentos = []
+    for idx, par in enumerate(pares_extremos):
+        try:
+            ciclo = segmentar_ciclo(par, contexto)
+        except Exception as e:
+            print(f"Error segmentando ciclo {idx}: {e}")
+            ciclo = None
+        if ciclo is None:
+            continue
+        for nombre in ('seg1', 'seg2'):
+            etiquetas.append((idx, nombre))
+            segmentos.append(ciclo['segments'][f'{nombre}_processing'])
+
+    lote = construir_lote(segmentos, contexto['tiempo_final'], contexto['sc_lat'],
+                          contexto['sc_geo'], contexto['global_data'])
+    resultados = barrer_lote(lote, contexto['channel_energies'], umbrales, fronteras, directorio_cache)
+
+    # Valor efectivo de cada umbral barrido en cada conjunto
+    valores = {nombre: np.array([u[nombre.split('.')[0]][nombre.split('.')[1]] for u in umbrales])
+               for nombre in nombres}
+    n_conjuntos = len(umbrales)
+
+    columnas = {c: [] for c in ('ciclo', 'segmento', 'conjunto', *nombres, 'frontera',
+                                'indice', 'tiempo', 'lat')}
+    for k, ((idx, nombre), indices) in enumerate(zip(etiquetas, resultados)):
+        if not indices:
+            continue
+        fronteras_seg = list(indices)
+        segment_data = segmento_lote(lote, k)
+        # Filas (conjunto, frontera)
+        indice = np.stack([indices[f] for f in fronteras_seg], axis=1).ravel()
+        conjunto = np.repeat(np.arange(n_conjuntos), len(fronteras_seg))
+        detectada = indice >= 0
+        seguro = np.where(detectada, indice, 0)
+
+        columnas['ciclo'].append(np.full(len(indice), idx))
+        columnas['segmento'].append(np.full(len(indice), nombre))
+        columnas['conjunto'].append(conjunto)
+        for umbral in nombres:
+            columnas[umbral].append(valores[umbral][conjunto])
+        columnas['frontera'].append(np.tile(fronteras_seg, n_conjuntos))
+        columnas['indice'].append(indice)
+        columnas['tiempo'].append(np.where(detectada,
+                                           segment_data['time'][seguro].astype('datetime64[ns]'),
+                                           np.datetime64('NaT', 'ns')))
+        columnas['lat'].append(np.where(detectada, segment_data['lat'][seguro], np.nan))
+
+    vacias = {'ciclo': np.int64, 'conjunto': np.int64, 'indice': np.int64,
+              'tiempo': 'datetime64[ns]', 'lat': float}
+    return {c: np.concatenate(partes) if partes else np.array([], dtype=vacias.get(c, object))
+            for c, partes in columnas.items()}
+
+
+def guardar_tabla_barrido(tabla, ruta):
+    """Escribe la tabla del barrido como CSV (celdas vacías para fronteras no detectadas)"""
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    columnas = list(tabla)
+    detectada = tabla['indice'] >= 0
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(columnas)
+        valores = [np.datetime_as_string(tabla[c]).tolist()
+                   if np.issubdtype(tabla[c].dtype, np.datetime64) else tabla[c].tolist()
+                   for c in columnas]
+        for fila, ok in zip(zip(*valores), detectada):
+            if not ok:
+                fila = ['' if c in ('indice', 'tiempo', 'lat') else v for c, v in zip(columnas, fila)]
+            escritor.writerow(fila)
+    return ruta
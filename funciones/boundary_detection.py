@@ -1,105 +1,216 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import os
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from scipy import signal
 from scipy.stats import pearsonr
 from . import fronteras as fb
+from .cache_fronteras import clave_nodo, serializar_frontera, restaurar_frontera
 
-def detect_all_boundaries(segment_data, channel_energies, fronteras=None, hemisphere=None):
+# Orden canónico de las fronteras en los resultados
+ORDEN_FRONTERAS = ['b1e', 'b1i', 'b2e', 'b2i', 'b3a', 'b3b', 'b4s', 'b5e', 'b5i', 'b6']
+
+# Pools de hilos de los detectores, uno por proceso y número de hilos
+_POOLS_HILOS = {}
+
+
+def pool_hilos(hilos):
     """
-    Detecta todas las fronteras de precipitación nocturna - CON MANEJO ROBUSTO DE ERRORES
+    Pool de hilos compartido por todos los segmentos del proceso (None si
+    hilos <= 1). Se crea la primera vez que se pide; la clave incluye el pid
+    para no reutilizar en un proceso hijo un pool heredado sin hilos.
     """
-    # Si no se especifican fronteras, detectar todas
-    if fronteras is None:
-        fronteras = ['b1e', 'b1i', 'b2e', 'b2i', 'b3a', 'b3b', 'b4s', 'b5e', 'b5i', 'b6']
-    
-    boundaries = {}
-    default_boundary = {'index': None, 'time': None, 'lat': None, 'deviation': 0}
-    
+    if hilos is None or hilos <= 1:
+        return None
+    clave = (os.getpid(), hilos)
+    executor = _POOLS_HILOS.get(clave)
+    if executor is None:
+        executor = _POOLS_HILOS[clave] = ThreadPoolExecutor(max_workers=hilos,
+                                                            thread_name_prefix='detectores')
+    return executor
 
-    required_keys = {
-        'b1e': ['ele_diff_flux'],
-        'b1i': ['ion_diff_flux'], 
-        'b2e': ['ele_avg_energy', 'ele_energy_flux'],
-        'b2i': ['ion_energy_flux_b2i'], 
-        'b3a': ['ele_diff_flux'],
-        'b3b': ['ele_diff_flux'],
-        'b4s': ['ele_diff_flux'],
-        'b5e': ['ele_energy_flux', 'flux_ele'],
-        'b5i': ['ion_energy_flux', 'flux_ion'],
-        'b6': ['ele_energy_flux', 'ion_energy_flux']
+
+def _indice(boundary_result):
+    """Extrae el índice de un resultado de frontera (None si no se detectó)"""
+    if boundary_result and boundary_result['index'] is not None:
+        return boundary_result['index']
+    return None
+
+
+# Grafo de dependencias entre detectores. Cada nodo declara las claves del
+# segmento que necesita, las fronteras previas que usa, las fronteras que
+# produce y la función que lo ejecuta a partir de (segmento, energías, previas).
+# 'funcion' es el detector que llama, usado para identificar su código en el
+# cache incremental (ver cache_fronteras).
+# Los argumentos con nombre adicionales son resultados intermedios precalculados
+# (ver detectar_fronteras_lote).
+GRAFO_FRONTERAS = {
+    'b1e': {
+        'funcion': fb.detect_b1e,
+        'claves': ['ele_diff_flux'], 'dependencias': [], 'produce': ['b1e'],
+        'detector': lambda seg, ce, prev, **kw: {'b1e': fb.detect_b1e(seg, ce, **kw)}
+    },
+    'b1i': {
+        'funcion': fb.detect_b1i,
+        'claves': ['ion_diff_flux'], 'dependencias': [], 'produce': ['b1i'],
+        'detector': lambda seg, ce, prev, **kw: {'b1i': fb.detect_b1i(seg, ce, **kw)}
+    },
+    'b2e': {
+        'funcion': fb.detect_b2e,
+        'claves': ['ele_avg_energy', 'ele_energy_flux'], 'dependencias': ['b1e'], 'produce': ['b2e'],
+        'detector': lambda seg, ce, prev, **kw: {'b2e': fb.detect_b2e(seg, _indice(prev['b1e']))}
+    },
+    'b2i': {
+        'funcion': fb.detect_b2i,
+        'claves': ['ion_energy_flux_b2i'], 'dependencias': [], 'produce': ['b2i'],
+        'detector': lambda seg, ce, prev, **kw: {'b2i': fb.detect_b2i(seg, ce, **kw)}
+    },
+    'b3': {
+        'funcion': fb.detect_b3,
+        'claves': ['ele_diff_flux'], 'dependencias': [], 'produce': ['b3a', 'b3b'],
+        'detector': lambda seg, ce, prev, **kw: fb.detect_b3(seg, ce, **kw)
+    },
+    'b4s': {
+        'funcion': fb.detect_b4s,
+        'claves': ['ele_diff_flux'], 'dependencias': ['b2e', 'b2i'], 'produce': ['b4s'],
+        'detector': lambda seg, ce, prev, **kw: {'b4s': fb.detect_b4s(seg, _indice(prev['b2e']),
+                                                                      _indice(prev['b2i']), **kw)}
+    },
+    'b5e': {
+        'funcion': fb.detect_b5,
+        'claves': ['ele_energy_flux', 'flux_ele'], 'dependencias': [], 'produce': ['b5e'],
+        'detector': lambda seg, ce, prev, **kw: {'b5e': fb.detect_b5(seg, particle_type='electron', **kw)}
+    },
+    'b5i': {
+        'funcion': fb.detect_b5,
+        'claves': ['ion_energy_flux', 'flux_ion'], 'dependencias': [], 'produce': ['b5i'],
+        'detector': lambda seg, ce, prev, **kw: {'b5i': fb.detect_b5(seg, particle_type='ion', **kw)}
+    },
+    'b6': {
+        'funcion': fb.detect_b6,
+        'claves': ['ele_energy_flux', 'ion_energy_flux'], 'dependencias': ['b5e'], 'produce': ['b6'],
+        'detector': lambda seg, ce, prev, **kw: {'b6': fb.detect_b6(seg, _indice(prev['b5e']))}
     }
+}
+
+# Nodo del grafo que produce cada frontera
+NODO_FRONTERA = {frontera: nodo for nodo, datos in GRAFO_FRONTERAS.items()
+                 for frontera in datos['produce']}
+
+
+def resolver_fronteras(fronteras=None):
+    """
+    Determina los nodos del grafo necesarios para las fronteras pedidas,
+    incluyendo sus prerequisitos, en un orden compatible con las dependencias.
+
+    Returns:
+        tuple: (lista de nodos en orden topológico, fronteras desconocidas)
+    """
+    if fronteras is None:
+        fronteras = ORDEN_FRONTERAS
+
+    desconocidas = [f for f in fronteras if f not in NODO_FRONTERA]
+    necesarios = set()
+    pendientes = [NODO_FRONTERA[f] for f in fronteras if f in NODO_FRONTERA]
+    while pendientes:
+        nodo = pendientes.pop()
+        if nodo not in necesarios:
+            necesarios.add(nodo)
+            pendientes.extend(GRAFO_FRONTERAS[nodo]['dependencias'])
+
+    # GRAFO_FRONTERAS está declarado en orden topológico
+    return [nodo for nodo in GRAFO_FRONTERAS if nodo in necesarios], desconocidas
+
+
+def datos_requeridos(segment_data, nodo):
+    """Verifica que el segmento tenga datos válidos en las claves que usa el nodo"""
+    for key in GRAFO_FRONTERAS[nodo]['claves']:
+        if key not in segment_data:
+            return False
+        data = segment_data[key]
+        if data is None or len(data) == 0 or np.all(np.isnan(data)):
+            return False
+    return True
+
+
+def detect_all_boundaries(segment_data, channel_energies, fronteras=None, hemisphere=None, hilos=1,
+                          precalculos=None, cache_resultados=None):
+    """
+    Detecta todas las fronteras de precipitación nocturna - CON MANEJO ROBUSTO DE ERRORES
+
+    Las fronteras pedidas se resuelven junto con sus prerequisitos (p.ej. b6
+    necesita b5e) y cada detector se ejecuta después de las fronteras de las que
+    depende. Con hilos > 1 los detectores independientes (b1i, b2i, b3, b5i...)
+    se ejecutan en paralelo en el pool de hilos del proceso (pool_hilos).
+
+    precalculos permite pasar, por nodo del grafo, argumentos ya calculados
+    para el detector (p.ej. {'b3': {'acceleration_mask': ...}}).
+
+    cache_resultados es el diccionario de resultados guardados del segmento
+    (ver cache_fronteras): un nodo cuya clave (código del detector, umbrales e
+    índices de sus fronteras previas) ya está se restaura sin ejecutarlo, y los
+    nodos ejecutados se añaden al diccionario.
+    """
+    default_boundary = {'index': None, 'time': None, 'lat': None, 'deviation': 0}
+    if precalculos is None:
+        precalculos = {}
     
-    # Función auxiliar para extraer índice de un resultado
-    def get_index(boundary_result):
-        if boundary_result and boundary_result['index'] is not None:
-            return boundary_result['index']
-        return None
+    nodos, desconocidas = resolver_fronteras(fronteras)
     
-    # Función para verificar datos requeridos
-    def check_required_data(frontera):
-        if frontera in required_keys:
-            for key in required_keys[frontera]:
-                if key not in segment_data:
-                    return False
-                data = segment_data[key]
-                if data is None or len(data) == 0 or np.all(np.isnan(data)):
-                    return False
-        return True
+    resultados = {}
     
-    # Detectar cada frontera solicitada 
-    for frontera in fronteras:
+    # Ejecutar un nodo del grafo con las fronteras ya calculadas
+    def detectar(nodo):
+        produce = GRAFO_FRONTERAS[nodo]['produce']
         try:
-            if frontera == 'b1e' and check_required_data('b1e'):
-                result = fb.detect_b1e(segment_data, channel_energies)
-                boundaries['b1e'] = result if result is not None else default_boundary
-            
-            elif frontera == 'b1i' and check_required_data('b1i'):
-                result = fb.detect_b1i(segment_data, channel_energies)
-                boundaries['b1i'] = result if result is not None else default_boundary
-            
-            elif frontera == 'b2e' and check_required_data('b2e'):
-                b1e_index = get_index(boundaries.get('b1e'))
-                result = fb.detect_b2e(segment_data, b1e_index)
-                boundaries['b2e'] = result if result is not None else default_boundary
-            
-            elif frontera == 'b2i' and check_required_data('b2i'):
-                result = fb.detect_b2i(segment_data, channel_energies)
-                boundaries['b2i'] = result if result is not None else default_boundary
-            
-            elif frontera in ['b3a', 'b3b'] and check_required_data('b3a'):
-                result = fb.detect_b3(segment_data, channel_energies)
-                if result is not None:
-                    boundaries['b3a'] = result.get('b3a', default_boundary)
-                    boundaries['b3b'] = result.get('b3b', default_boundary)
-                else:
-                    boundaries['b3a'] = default_boundary
-                    boundaries['b3b'] = default_boundary
-            
-            elif frontera == 'b4s' and check_required_data('b4s'):
-                b2e_index = get_index(boundaries.get('b2e'))
-                b2i_index = get_index(boundaries.get('b2i'))
-                result = fb.detect_b4s(segment_data, b2e_index, b2i_index)
-                boundaries['b4s'] = result if result is not None else default_boundary
-            
-            elif frontera == 'b5e' and check_required_data('b5e'):
-                result = fb.detect_b5(segment_data, particle_type='electron')
-                boundaries['b5e'] = result if result is not None else default_boundary
-            
-            elif frontera == 'b5i' and check_required_data('b5i'):
-                result = fb.detect_b5(segment_data, particle_type='ion')
-                boundaries['b5i'] = result if result is not None else default_boundary
-            
-            elif frontera == 'b6' and check_required_data('b6'):
-                b5e_index = get_index(boundaries.get('b5e'))
-                result = fb.detect_b6(segment_data, b5e_index)
-                boundaries['b6'] = result if result is not None else default_boundary
-            
-            else:
-                boundaries[frontera] = default_boundary
-                
+            if not datos_requeridos(segment_data, nodo):
+                return {frontera: default_boundary for frontera in produce}
+            result = GRAFO_FRONTERAS[nodo]['detector'](segment_data, channel_energies, resultados,
+                                                       **precalculos.get(nodo, {}))
+            if result is None:
+                result = {}
+            return {frontera: result.get(frontera) or default_boundary for frontera in produce}
         except Exception:
-            boundaries[frontera] = default_boundary
+            return {frontera: default_boundary for frontera in produce}
+    
+    # Igual que detectar, pero reutilizando el resultado guardado si no cambió nada
+    def ejecutar(nodo):
+        if cache_resultados is None:
+            return detectar(nodo)
+        nodo_grafo = GRAFO_FRONTERAS[nodo]
+        previas = {}
+        for dependencia in nodo_grafo['dependencias']:
+            for frontera in GRAFO_FRONTERAS[dependencia]['produce']:
+                indice = _indice(resultados[frontera])
+                previas[frontera] = None if indice is None else int(indice)
+        clave = clave_nodo(nodo, nodo_grafo['funcion'], nodo_grafo['produce'], previas)
+        guardado = cache_resultados.get(clave)
+        if guardado is not None:
+            return {frontera: restaurar_frontera(resultado, segment_data)
+                    for frontera, resultado in guardado.items()}
+        salida = detectar(nodo)
+        cache_resultados[clave] = {frontera: serializar_frontera(resultado)
+                                   for frontera, resultado in salida.items()}
+        return salida
+    
+    # Ejecutar por niveles: cada nivel contiene los nodos cuyas dependencias ya terminaron
+    restantes = list(nodos)
+    executor = pool_hilos(hilos)
+    while restantes:
+        terminados = {NODO_FRONTERA[f] for f in resultados}
+        listos = [n for n in restantes
+                  if all(d in terminados for d in GRAFO_FRONTERAS[n]['dependencias'])]
+        if executor is not None and len(listos) > 1:
+            parciales = list(executor.map(ejecutar, listos))
+        else:
+            parciales = [ejecutar(n) for n in listos]
+        for parcial in parciales:
+            resultados.update(parcial)
+        restantes = [n for n in restantes if n not in listos]
     
+    boundaries = {f: resultados[f] for f in ORDEN_FRONTERAS if f in resultados}
+    for frontera in desconocidas:
+        boundaries[frontera] = default_boundary
     
     return boundaries
\ No newline at end of file
@@ -0,0 +1,261 @@
+# cache_fronteras.py - cache incremental de fronteras, características y gráficos
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import tempfile
+from functools import lru_cache
+import numpy as np
+from .convert_to_serializable import convert_to_serializable
+from .fronteras.funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+
+# Incrementar cuando cambie el formato de las entradas para invalidar las antiguas
+VERSION_CACHE_FRONTERAS = 1
+
+# Subdirectorio del cache donde se guardan las entradas incrementales
+SUBDIRECTORIO = 'incremental'
+
+# Módulo que declara el grafo de fronteras (qué índice previo recibe cada detector)
+MODULO_GRAFO = __name__.rsplit('.', 1)[0] + '.boundary_detection'
+
+# Claves de un segmento de procesamiento que identifican su contenido
+CLAVES_HUELLA = ('time', 'lat', 'coords_aacgm', 'ele_diff_flux', 'ion_diff_flux', 'flux_ion',
+                 'flux_ele', 'ion_energy_flux_b2i', 'ele_energy_flux', 'ion_energy_flux',
+                 'ele_avg_energy')
+
+
+def huella_arrays(arrays):
+    """Hash del contenido (dtype, forma y bytes) de un diccionario de arrays"""
+    h = hashlib.sha256()
+    for clave in sorted(arrays):
+        valores = np.ascontiguousarray(arrays[clave])
+        h.update(f"{clave}|{valores.dtype.str}|{valores.shape}|".encode('utf-8'))
+        h.update(valores.tobytes())
+    return h.hexdigest()[:32]
+
+
+def huella_segmento(segment_data):
+    """Hash del contenido de un segmento de procesamiento"""
+    return huella_arrays({clave: segment_data[clave] for clave in CLAVES_HUELLA
+                          if clave in segment_data})
+
+
+def _modulos_usados(modulo, paquete, vistos):
+    """Recorre los módulos de 'paquete' de los que depende 'modulo' (nombres globales)"""
+    if modulo.__name__ in vistos:
+        return
+    vistos.add(modulo.__name__)
+    for valor in list(vars(modulo).values()):
+        nombre = valor.__name__ if inspect.ismodule(valor) else getattr(valor, '__module__', None)
+        if isinstance(nombre, str) and nombre.startswith(paquete) and nombre in sys.modules:
+            _modulos_usados(sys.modules[nombre], paquete, vistos)
+
+
+@lru_cache(maxsize=None)
+def huella_codigo(nombre_modulo, dependencias=True):
+    """
+    Hash del código fuente de un módulo y de los módulos de su mismo paquete
+    que usa (p.ej. un detector y sus funciones auxiliares). Con
+    dependencias=False solo se usa el código del propio módulo.
+    """
+    paquete = nombre_modulo.rsplit('.', 1)[0] + '.'
+    vistos = set()
+    if dependencias:
+        _modulos_usados(sys.modules[nombre_modulo], paquete, vistos)
+    else:
+        vistos.add(nombre_modulo)
+
+    h = hashlib.sha256()
+    for nombre in sorted(vistos):
+        h.update(nombre.encode('utf-8'))
+        ruta = inspect.getsourcefile(sys.modules[nombre])
+        if ruta and os.path.isfile(ruta):
+            with open(ruta, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def _clave(*partes):
+    texto = json.dumps([VERSION_CACHE_FRONTERAS, *partes], sort_keys=True,
+                       default=convert_to_serializable)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:24]
+
+
+def clave_nodo(nodo, funcion, produce, previas):
+    """
+    Clave del resultado de un nodo del grafo de fronteras: código del detector,
+    código del grafo (qué fronteras previas recibe cada detector), umbrales de
+    PAPER_THRESHOLDS que le corresponden e índices de las fronteras previas de
+    las que depende. Los umbrales se leen en cada llamada.
+    """
+    umbrales = {nombre: PAPER_THRESHOLDS.get(nombre) for nombre in [nodo, *produce]}
+    return _clave('nodo', nodo, funcion.__name__, huella_codigo(funcion.__module__),
+                  huella_codigo(MODULO_GRAFO, dependencias=False), umbrales, previas)
+
+
+def clave_caracteristica(nombre, funcion, parametros):
+    """Clave de una característica intermedia (código de la función + parámetros)"""
+    return _clave('caracteristica', nombre, funcion.__name__,
+                  huella_codigo(funcion.__module__), parametros)
+
+
+def clave_figuras(cycle_index, info, arrays, funciones, nivel='full'):
+    """Clave de los gráficos de un ciclo: fronteras, arrays graficados, código y nivel de salida"""
+    codigo = [huella_codigo(f.__module__) for f in funciones]
+    return _clave('figuras', cycle_index, info, huella_arrays(arrays), codigo, nivel)
+
+
+def serializar_frontera(resultado):
+    """
+    Convierte el resultado de un detector a JSON. 'time' y 'lat' se guardan
+    vacíos (se reconstruyen desde el segmento) y los arrays auxiliares se omiten.
+    """
+    resultado = {clave: (None if clave in ('time', 'lat') else valor)
+                 for clave, valor in resultado.items() if not isinstance(valor, np.ndarray)}
+    return json.loads(json.dumps(resultado, default=convert_to_serializable))
+
+
+def restaurar_frontera(guardado, segment_data):
+    """Reconstruye el resultado de un detector guardado con serializar_frontera"""
+    resultado = dict(guardado)
+    i = resultado.get('index')
+    if i is not None:
+        for clave in ('time', 'lat'):
+            if clave in resultado:
+                resultado[clave] = segment_data[clave][i]
+    return resultado
+
+
+def _ruta(directorio_cache, tipo, huella, sufijo):
+    return os.path.join(directorio_cache, SUBDIRECTORIO, tipo, huella[:2], f"{huella}{sufijo}")
+
+
+def _tocar(ruta):
+    """Marca el acceso a una entrada para la política LRU (podar_cache)"""
+    try:
+        os.utime(ruta, None)
+    except OSError:
+        pass
+
+
+def entradas_incrementales(directorio_cache, edad_max_temporal=None):
+    """
+    Archivos del cache incremental, para podarlos junto con el resto del cache.
+
+    Los archivos temporales (escrituras en curso de _escribir_atomico) no son
+    entradas; con edad_max_temporal se eliminan los que tienen más de esos
+    segundos (restos de un proceso terminado a la fuerza).
+
+    Returns:
+        list: (instante del último acceso, tamaño, ruta) por archivo
+    """
+    entradas = []
+    ahora = time.time()
+    for carpeta, _, archivos in os.walk(os.path.join(directorio_cache, SUBDIRECTORIO)):
+        for nombre in archivos:
+            ruta = os.path.join(carpeta, nombre)
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            if nombre.startswith('.'):
+                if edad_max_temporal is not None and ahora - estado.st_mtime > edad_max_temporal:
+                    try:
+                        os.remove(ruta)
+                    except OSError:
+                        pass
+                continue
+            entradas.append((estado.st_mtime, estado.st_size, ruta))
+    return entradas
+
+
+def _escribir_atomico(ruta, escribir, modo='w'):
+    """Escribe en un archivo temporal y lo publica con un rename atómico"""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.', dir=os.path.dirname(ruta))
+    try:
+        with os.fdopen(fd, modo) as f:
+            escribir(f)
+        os.replace(tmp, ruta)
+    except OSError as e:
+        print(f"No se pudo escribir el cache {ruta}: {e}")
+    finally:
+        # También si la escritura se interrumpe (p.ej. KeyboardInterrupt)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def cargar_resultados_segmento(directorio_cache, huella):
+    """
+    Resultados guardados de los detectores para un segmento.
+
+    Returns:
+        dict: {clave_nodo: {frontera: resultado serializado}} ({} si no hay)
+    """
+    ruta = _ruta(directorio_cache, 'fronteras', huella, '.json')
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            resultados = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    _tocar(ruta)
+    return resultados
+
+
+def guardar_resultados_segmento(directorio_cache, huella, resultados):
+    """Guarda los resultados de los detectores de un segmento"""
+    ruta = _ruta(directorio_cache, 'fronteras', huella, '.json')
+    _escribir_atomico(ruta, lambda f: json.dump(resultados, f))
+
+
+def cargar_caracteristica(directorio_cache, huella, clave):
+    """Característica intermedia de un segmento, o None si no está en el cache"""
+    ruta = _ruta(directorio_cache, 'caracteristicas', huella, f"_{clave}.npy")
+    try:
+        valores = np.load(ruta, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+    _tocar(ruta)
+    return valores
+
+
+def guardar_caracteristica(directorio_cache, huella, clave, valores):
+    """Guarda una característica intermedia de un segmento"""
+    ruta = _ruta(directorio_cache, 'caracteristicas', huella, f"_{clave}.npy")
+    _escribir_atomico(ruta, lambda f: np.save(f, np.asarray(valores), allow_pickle=False), 'wb')
+
+
+def restaurar_figuras(directorio_cache, clave, destinos):
+    """
+    Copia los gráficos guardados con 'clave' a sus rutas de destino.
+
+    Args:
+        destinos (dict): {nombre: ruta de destino} (p.ej. rutas_graficos del ciclo)
+
+    Returns:
+        bool: True si estaban todos en el cache y se copiaron
+    """
+    origenes = {nombre: _ruta(directorio_cache, 'figuras', clave, f"_{nombre}.png")
+                for nombre in destinos}
+    if not all(os.path.isfile(ruta) for ruta in origenes.values()):
+        return False
+    try:
+        for nombre, destino in destinos.items():
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.copyfile(origenes[nombre], destino)
+            _tocar(origenes[nombre])
+    except OSError:
+        return False
+    return True
+
+
+def guardar_figuras(directorio_cache, clave, rutas):
+    """Guarda en el cache los gráficos generados ({nombre: ruta})"""
+    for nombre, ruta in rutas.items():
+        if ruta and os.path.isfile(ruta):
+            destino = _ruta(directorio_cache, 'figuras', clave, f"_{nombre}.png")
+            with open(ruta, 'rb') as origen:
+                _escribir_atomico(destino, lambda f: shutil.copyfileobj(origen, f), 'wb')
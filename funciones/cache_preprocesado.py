@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+from .cache_fronteras import entradas_incrementales
+
+# Incrementar cuando cambie el preprocesamiento para invalidar entradas antiguas
+VERSION_CACHE = 4
+
+# Tamaño máximo por defecto del cache en disco (bytes)
+MAX_BYTES_CACHE = 2 * 1024 ** 3
+
+ARCHIVO_META = 'meta.json'
+
+# Una carpeta temporal más antigua que esto (segundos) quedó de un proceso interrumpido
+EDAD_MAX_TEMPORAL = 3600
+
+
+def hash_archivo(ruta, bloque=1 << 20):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo leyendo por bloques.
+    """
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for chunk in iter(lambda: f.read(bloque), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def clave_cache(ruta_cdf, **parametros):
+    """
+    Construye la clave del cache a partir del contenido del CDF, los parámetros
+    de preprocesamiento (ventana temporal, rango de canales, ...) y la versión.
+    """
+    contenido = hash_archivo(ruta_cdf)
+    params = json.dumps(parametros, sort_keys=True, default=str)
+    h = hashlib.sha256(f"{VERSION_CACHE}|{contenido}|{params}".encode('utf-8'))
+    return h.hexdigest()[:32]
+
+
+def cargar_cache(directorio_cache, clave):
+    """
+    Abre una entrada del cache con mmap_mode='r'.
+
+    Returns:
+        dict: Arrays memory-mapped (solo lectura) o None si la entrada no existe
+    """
+    carpeta = os.path.join(directorio_cache, clave)
+    ruta_meta = os.path.join(carpeta, ARCHIVO_META)
+    if not os.path.isfile(ruta_meta):
+        return None
+
+    try:
+        with open(ruta_meta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        datos = {nombre: np.load(os.path.join(carpeta, f"{nombre}.npy"), mmap_mode='r')
+                 for nombre in meta['arrays']}
+    except (OSError, ValueError, KeyError):
+        return None
+
+    # Marcar el acceso para la política LRU
+    os.utime(ruta_meta, None)
+    return datos
+
+
+def guardar_cache(directorio_cache, clave, arrays, max_bytes=MAX_BYTES_CACHE):
+    """
+    Guarda un diccionario de arrays como archivos .npy y los reabre memory-mapped.
+
+    La entrada se escribe en una carpeta temporal y se publica con un rename
+    atómico, de modo que procesos concurrentes nunca ven una entrada a medias.
+    Si la escritura se interrumpe la carpeta temporal se elimina (las que deja
+    un proceso terminado a la fuerza las elimina podar_cache). Tras guardar se
+    aplica la política de expulsión LRU.
+
+    Returns:
+        dict: Los mismos arrays abiertos con mmap_mode='r'
+    """
+    os.makedirs(directorio_cache, exist_ok=True)
+    carpeta = os.path.join(directorio_cache, clave)
+
+    if not os.path.isdir(carpeta):
+        tmp = tempfile.mkdtemp(prefix=f".{clave}_", dir=directorio_cache)
+        try:
+            for nombre, valores in arrays.items():
+                np.save(os.path.join(tmp, f"{nombre}.npy"), np.ascontiguousarray(valores),
+                        allow_pickle=False)
+            with open(os.path.join(tmp, ARCHIVO_META), 'w', encoding='utf-8') as f:
+                json.dump({'version': VERSION_CACHE, 'arrays': list(arrays)}, f)
+            os.replace(tmp, carpeta)
+        except OSError:
+            # Otro proceso publicó la misma entrada primero (o no hay espacio):
+            # se continúa con los arrays en memoria
+            pass
+        finally:
+            if os.path.isdir(tmp):
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    podar_cache(directorio_cache, max_bytes, conservar=clave)
+    datos = cargar_cache(directorio_cache, clave)
+    return datos if datos is not None else arrays
+
+
+def podar_cache(directorio_cache, max_bytes=MAX_BYTES_CACHE, conservar=None):
+    """
+    Expulsa las entradas usadas menos recientemente hasta que el cache ocupe
+    como máximo 'max_bytes'. La entrada 'conservar' nunca se elimina.
+
+    El límite incluye el cache incremental (fronteras, características y
+    gráficos por ciclo), donde cada archivo es una entrada de la política LRU.
+    Las carpetas y archivos temporales de más de EDAD_MAX_TEMPORAL segundos se
+    eliminan.
+    """
+    if not os.path.isdir(directorio_cache):
+        return
+
+    entradas = []
+    ahora = time.time()
+    for nombre in os.listdir(directorio_cache):
+        carpeta = os.path.join(directorio_cache, nombre)
+        ruta_meta = os.path.join(carpeta, ARCHIVO_META)
+        if nombre.startswith('.'):
+            if os.path.isdir(carpeta) and ahora - os.path.getmtime(carpeta) > EDAD_MAX_TEMPORAL:
+                shutil.rmtree(carpeta, ignore_errors=True)
+            continue
+        if not os.path.isfile(ruta_meta):
+            continue
+        tamano = sum(e.stat().st_size for e in os.scandir(carpeta) if e.is_file())
+        entradas.append((os.path.getmtime(ruta_meta), tamano, nombre, carpeta))
+    entradas += [(acceso, tamano, None, ruta)
+                 for acceso, tamano, ruta in entradas_incrementales(directorio_cache, EDAD_MAX_TEMPORAL)]
+
+    total = sum(e[1] for e in entradas)
+    for _, tamano, nombre, ruta in sorted(entradas, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        if nombre is not None and nombre == conservar:
+            continue
+        if nombre is None:
+            try:
+                os.remove(ruta)
+            except OSError:
+                continue
+        else:
+            shutil.rmtree(ruta, ignore_errors=True)
+        total -= tamano
@@ -1,33 +1,88 @@
 import cdflib
-from .load_variable import load_variable
+import numpy as np
+from .load_variable import load_variable, es_variable_por_registro, variables_disponibles
 
-def cargar_datos_cdf(cdf_file):
+# Epochs posteriores a esta fecha corresponden a valores de relleno del CDF
+FECHA_LIMITE_EPOCH = np.datetime64('2030-01-01', 'ns')
+
+# Variables que necesita el pipeline de detección (ION_TOTAL_ENERGY_FLUX no se usa)
+VARIABLES_PIPELINE = (
+    'CHANNEL_ENERGIES',
+    'ELE_DIFF_ENERGY_FLUX',
+    'ELE_TOTAL_ENERGY_FLUX',
+    'ION_DIFF_ENERGY_FLUX',
+    'SC_AACGM_LAT',
+    'SC_GEOCENTRIC_LAT',
+)
+
+# Variables que se usan si el archivo las trae (si no, quedan en None)
+VARIABLES_OPCIONALES = (
+    'ELE_AVG_ENERGY',
+)
+
+
+def rango_registros(tiempo, inicio=None, fin=None):
+    """
+    Traduce una ventana UT [inicio, fin] (inclusiva) a un rango de registros del CDF.
+
+    Args:
+        tiempo (array): Eje temporal completo del archivo (datetime64)
+        inicio, fin (str | datetime64 | None): Límites de la ventana en formato ISO
+
+    Returns:
+        tuple: (startrec, endrec) inclusivos, o None si no hay registros en la ventana
+    """
+    tiempo = np.asarray(tiempo, dtype='datetime64[ns]')
+    dentro = tiempo < FECHA_LIMITE_EPOCH
+    if inicio is not None:
+        dentro &= tiempo >= np.datetime64(inicio, 'ns')
+    if fin is not None:
+        dentro &= tiempo <= np.datetime64(fin, 'ns')
+
+    registros = np.flatnonzero(dentro)
+    if len(registros) == 0:
+        return None
+    return int(registros[0]), int(registros[-1])
+
+
+def cargar_datos_cdf(cdf_file, variables=VARIABLES_PIPELINE, inicio=None, fin=None,
+                     opcionales=VARIABLES_OPCIONALES):
     """
     Carga variables de un archivo CDF y retorna un diccionario con los datos necesarios.
+
+    Solo se leen las variables indicadas en 'variables'. Si se entrega una ventana
+    UT (inicio/fin) se traduce a un rango de registros usando 'Epoch' y únicamente
+    ese tramo se lee desde el archivo. Las variables de 'opcionales' se cargan
+    solo si existen en el CDF; en caso contrario su valor es None.
+
+    'tiempo_final' es un array contiguo datetime64[ns] obtenido con una única
+    conversión vectorizada de 'Epoch'. Los registros con epoch inválido se
+    descartan con una sola máscara booleana, aplicada también al resto de
+    variables que varían por registro para mantener las longitudes alineadas.
     """
     archivo = cdflib.CDF(cdf_file)
     tiempo = load_variable(archivo, 'Epoch')
-    tiempo_final = [t for t in cdflib.cdfepoch.to_datetime(tiempo)
-                    if t.astype('datetime64[Y]').astype(int) + 1970 < 2030]
-    tiempo_final_dict = {t: i for i, t in enumerate(tiempo_final)}
-
-    CHANNEL_ENERGIES      = load_variable(archivo, 'CHANNEL_ENERGIES')
-    ELE_DIFF_ENERGY_FLUX  = load_variable(archivo, 'ELE_DIFF_ENERGY_FLUX')
-    ELE_TOTAL_ENERGY_FLUX = load_variable(archivo, 'ELE_TOTAL_ENERGY_FLUX')
-    ION_DIFF_ENERGY_FLUX  = load_variable(archivo, 'ION_DIFF_ENERGY_FLUX')
-    ION_TOTAL_ENERGY_FLUX = load_variable(archivo, 'ION_TOTAL_ENERGY_FLUX')
-    SC_AACGM_LAT          = load_variable(archivo, 'SC_AACGM_LAT')
-    SC_GEOCENTRIC_LAT     = load_variable(archivo, 'SC_GEOCENTRIC_LAT')
-
-    return {
-        "tiempo_final": tiempo_final,
-        "tiempo_final_dict": tiempo_final_dict,
-        "CHANNEL_ENERGIES": CHANNEL_ENERGIES,
-        "ELE_DIFF_ENERGY_FLUX": ELE_DIFF_ENERGY_FLUX,
-        "ELE_TOTAL_ENERGY_FLUX": ELE_TOTAL_ENERGY_FLUX,
-        "ION_DIFF_ENERGY_FLUX": ION_DIFF_ENERGY_FLUX,
-        "ION_TOTAL_ENERGY_FLUX": ION_TOTAL_ENERGY_FLUX,
-        "SC_AACGM_LAT": SC_AACGM_LAT,
-        "SC_GEOCENTRIC_LAT": SC_GEOCENTRIC_LAT
-    }
-    
\ No newline at end of file
+    tiempo = np.asarray(cdflib.cdfepoch.to_datetime(tiempo), dtype='datetime64[ns]')
+
+    rango = rango_registros(tiempo, inicio, fin)
+    if rango is None:
+        # Ventana sin datos: leer un registro para conservar las dimensiones
+        startrec, endrec, n_registros = 0, 0, 0
+    else:
+        startrec, endrec = rango
+        n_registros = endrec - startrec + 1
+
+    tiempo = tiempo[startrec:startrec + n_registros]
+    mascara_tiempo = tiempo < FECHA_LIMITE_EPOCH
+
+    disponibles = variables_disponibles(archivo)
+    datos = {"tiempo_final": np.ascontiguousarray(tiempo[mascara_tiempo])}
+    for varname in opcionales:
+        datos[varname] = None
+    for varname in list(variables) + [v for v in opcionales if v in disponibles]:
+        valores = load_variable(archivo, varname, startrec, endrec)
+        if es_variable_por_registro(archivo, varname):
+            valores = np.asarray(valores)[:n_registros][mascara_tiempo]
+        datos[varname] = valores
+
+    return datos
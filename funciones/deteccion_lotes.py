@@ -0,0 +1,268 @@
+# deteccion_lotes.py - detección de fronteras sobre todos los segmentos a la vez
+import numpy as np
+from .boundary_detection import detect_all_boundaries, resolver_fronteras
+from .cache_fronteras import (huella_segmento, clave_caracteristica, cargar_caracteristica,
+                              guardar_caracteristica, cargar_resultados_segmento,
+                              guardar_resultados_segmento)
+from .fronteras.funciones_auxiliares.eventos_aceleracion import (eventos_aceleracion, PEAK_RATIO,
+                                                                 DROP_RATIO)
+from .fronteras.funciones_auxiliares.correlaciones import correlacion_promedio
+from .fronteras.funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+from .fronteras.funciones_auxiliares.salto_b1 import medias_salto_b1
+from .fronteras.funciones_auxiliares.ventanas import medias_ventana
+from .fronteras.detect_b1e import flujo_log_b1e
+from .fronteras.detect_b1i import flujo_log_b1i
+from .fronteras.detect_b2i import flujo_suavizado_b2i, maximos_siguientes_b2i
+from .fronteras.detect_b5_ei import VENTANA_B5, LOOKAHEAD_B5
+
+# Arrays globales que se reúnen en el lote (mismas claves que prepare_segment_data)
+CLAVES_LOTE = ('ele_diff_flux', 'ion_diff_flux', 'flux_ion', 'flux_ele', 'ion_energy_flux_b2i',
+               'ele_energy_flux', 'ion_energy_flux', 'ele_avg_energy')
+
+
+def construir_lote(segmentos, tiempo_final, sc_lat, sc_geo, global_data):
+    """
+    Reúne los segmentos de procesamiento en una estructura irregular: cada
+    array es la concatenación de todos los segmentos y 'offsets' marca dónde
+    empieza cada uno. La inversión de los segmentos polo-ecuador ya está en sus
+    'indices', así que cada array se construye con una sola indexación.
+
+    Args:
+        segmentos (list): Segmentos de procesamiento de split_cycle_segment
+        tiempo_final, sc_lat, sc_geo (array): Ejes globales
+        global_data (dict): Arrays globales de flujos
+
+    Returns:
+        dict: {'offsets', 'indices', 'datos', 'direcciones'}
+    """
+    longitudes = [len(s['indices']) for s in segmentos]
+    offsets = np.concatenate(([0], np.cumsum(longitudes, dtype=np.int64)))
+    if offsets[-1] > 0:
+        indices = np.concatenate([np.asarray(s['indices'], dtype=np.int64) for s in segmentos])
+    else:
+        indices = np.empty(0, dtype=np.int64)
+
+    idx_coords = np.clip(indices, 0, len(sc_lat) - 1)
+    datos = {
+        'time': np.asarray(tiempo_final)[indices],
+        'coords_aacgm': np.asarray(sc_lat)[idx_coords],
+        'lat': np.asarray(sc_geo, float)[idx_coords]
+    }
+    for clave in CLAVES_LOTE:
+        datos[clave] = global_data[clave][indices]
+
+    return {
+        'offsets': offsets,
+        'indices': indices,
+        'datos': datos,
+        'direcciones': [s.get('direccion_procesamiento', 'desconocida') for s in segmentos]
+    }
+
+
+def segmento_lote(lote, k, segment_type=None):
+    """
+    Datos del segmento k del lote como vistas de los arrays concatenados,
+    con la misma estructura que prepare_segment_data.
+    """
+    inicio, fin = lote['offsets'][k], lote['offsets'][k + 1]
+    segment_data = {clave: valores[inicio:fin] for clave, valores in lote['datos'].items()}
+    segment_data.update({
+        'indices': lote['indices'][inicio:fin],
+        'direccion': lote['direcciones'][k],
+        'segment_type': segment_type
+    })
+    return segment_data
+
+
+def repartir_lote(valores, offsets, recorte=0):
+    """
+    Parte un array calculado sobre el lote en vistas por segmento. Con recorte
+    se quitan las últimas posiciones de cada segmento (p.ej. las medias móviles
+    cuya ventana cruzaría al segmento siguiente).
+    """
+    return [valores[offsets[k]:max(offsets[k], offsets[k + 1] - recorte)]
+            for k in range(len(offsets) - 1)]
+
+
+def caracteristica_segmentos(lote, claves, calcular, clave=None, directorio_cache=None,
+                             huellas=None):
+    """
+    Calcula una característica fila a fila sobre el lote y la reparte por
+    segmento. Con directorio_cache, los segmentos ya guardados con 'clave' se
+    leen del cache y el cálculo se hace solo sobre los demás (concatenados).
+
+    Args:
+        claves (tuple): Arrays del lote que usa el cálculo
+        calcular (callable): (datos, offsets) -> lista de arrays por segmento
+
+    Returns:
+        list: Array de la característica por segmento
+    """
+    offsets = lote['offsets']
+    n_segmentos = len(offsets) - 1
+    usar_cache = directorio_cache is not None and huellas is not None and clave is not None
+    partes = [None] * n_segmentos
+    if usar_cache:
+        partes = [cargar_caracteristica(directorio_cache, huella, clave) for huella in huellas]
+
+    faltantes = [k for k in range(n_segmentos) if partes[k] is None]
+    if not faltantes:
+        return partes
+
+    if len(faltantes) == n_segmentos:
+        datos = {c: lote['datos'][c] for c in claves}
+        sub_offsets = offsets
+    else:
+        datos = {c: np.concatenate([lote['datos'][c][offsets[k]:offsets[k + 1]] for k in faltantes])
+                 for c in claves}
+        longitudes = [offsets[k + 1] - offsets[k] for k in faltantes]
+        sub_offsets = np.concatenate(([0], np.cumsum(longitudes, dtype=np.int64)))
+
+    for k, valores in zip(faltantes, calcular(datos, sub_offsets)):
+        partes[k] = valores
+        if usar_cache:
+            guardar_caracteristica(directorio_cache, huellas[k], clave, valores)
+    return partes
+
+
+def precalcular_lote(lote, channel_energies, fronteras=None, directorio_cache=None, huellas=None):
+    """
+    Ejecuta una sola vez, sobre los buffers concatenados, los cálculos fila a
+    fila de los detectores y los reparte por segmento según 'offsets':
+
+    - b1e/b1i: log10 del flujo parcial y medias móviles de 3 y 6 muestras
+    - b2i: flujo parcial 3-30 keV, suavizado de 2 s y máximos de los 10 s siguientes
+    - b3: clasificación de eventos de aceleración
+    - b4s: correlaciones promedio de los espectros
+    - b5e/b5i: log10 del flujo de energía y medias móviles de 12 s y del lookahead
+
+    A los detectores solo les quedan las búsquedas del primer índice que cumple
+    sus criterios. Las ventanas que cruzarían de un segmento al siguiente se
+    recortan o se calculan por segmento, así que el resultado es idéntico al de
+    cada segmento por separado. Con directorio_cache y las huellas de los
+    segmentos, b3 y b4s se reutilizan entre ejecuciones (ver cache_fronteras).
+
+    Returns:
+        list: Por segmento, argumentos precalculados para detect_all_boundaries
+    """
+    nodos, _ = resolver_fronteras(fronteras)
+    datos = lote['datos']
+    offsets = lote['offsets']
+    n_segmentos = len(offsets) - 1
+    precalculos = [{} for _ in range(n_segmentos)]
+    if len(datos['ele_diff_flux']) == 0:
+        return precalculos
+
+    for nodo, flujo_log, desfase in (('b1e', flujo_log_b1e, 0), ('b1i', flujo_log_b1i, 1)):
+        if nodo not in nodos:
+            continue
+        log_flux = flujo_log(datos, channel_energies, PAPER_THRESHOLDS[nodo], offsets)
+        medias_3, medias_6 = medias_salto_b1(log_flux, offsets)
+        partes = zip(repartir_lote(log_flux, offsets), repartir_lote(medias_3, offsets, 2),
+                     repartir_lote(medias_6, offsets))
+        for k, (log_k, medias_3_k, medias_6_k) in enumerate(partes):
+            precalculos[k][nodo] = {'log_flux': log_k, 'medias': (medias_3_k, medias_6_k)}
+
+    if 'b2i' in nodos:
+        partial_flux, smoothed_flux = flujo_suavizado_b2i(datos, channel_energies, offsets)
+        if partial_flux is not None:
+            maximos, con_nan = maximos_siguientes_b2i(smoothed_flux)
+            partes = zip(repartir_lote(partial_flux, offsets), repartir_lote(smoothed_flux, offsets),
+                         repartir_lote(maximos, offsets), repartir_lote(con_nan, offsets))
+            for k, (parcial_k, suavizado_k, maximos_k, con_nan_k) in enumerate(partes):
+                precalculos[k]['b2i'] = {'partial_flux': parcial_k, 'smoothed_flux': suavizado_k,
+                                         'maximos': maximos_k, 'con_nan': con_nan_k}
+
+    for nodo, particula, clave_flujo in (('b5e', 'electron', 'ele_energy_flux'),
+                                         ('b5i', 'ion', 'ion_energy_flux')):
+        if nodo not in nodos:
+            continue
+        lookahead = LOOKAHEAD_B5[particula]
+        log_flux = np.log10(np.maximum(datos[clave_flujo], 1e-10))
+        partes = zip(repartir_lote(log_flux, offsets),
+                     repartir_lote(medias_ventana(log_flux, VENTANA_B5), offsets, VENTANA_B5 - 1),
+                     repartir_lote(medias_ventana(log_flux, lookahead), offsets, lookahead - 1))
+        for k, (log_k, medias_12_k, futuras_k) in enumerate(partes):
+            precalculos[k][nodo] = {'log_flux': log_k, 'medias_12': medias_12_k,
+                                    'medias_futuras': futuras_k}
+
+    if 'b3' in nodos:
+        def calcular_mascara(datos, offsets):
+            mascara = eventos_aceleracion(datos['ele_diff_flux'])
+            return [mascara[offsets[k]:offsets[k + 1]] for k in range(len(offsets) - 1)]
+
+        clave = clave_caracteristica('acceleration_mask', eventos_aceleracion,
+                                     {'peak_ratio': PEAK_RATIO, 'drop_ratio': DROP_RATIO})
+        mascaras = caracteristica_segmentos(lote, ('ele_diff_flux',), calcular_mascara,
+                                            clave, directorio_cache, huellas)
+        for k in range(n_segmentos):
+            precalculos[k]['b3'] = {'acceleration_mask': mascaras[k]}
+
+    if 'b4s' in nodos:
+        thresholds = PAPER_THRESHOLDS['b4s']
+        n_corr = thresholds['n_corr']
+        subvisual_thresh = thresholds['subvisual_thresh']
+
+        def calcular_correlaciones(datos, offsets):
+            promedio = correlacion_promedio(datos['ele_diff_flux'], datos['ele_energy_flux'],
+                                            n_corr, subvisual_thresh)
+            partes = []
+            for k in range(len(offsets) - 1):
+                # Los primeros n_corr espectros de cada segmento no tienen espectros
+                # anteriores propios: sus correlaciones cruzarían el segmento previo
+                avg = promedio[offsets[k]:offsets[k + 1]].copy()
+                avg[:n_corr] = np.nan
+                partes.append(avg)
+            return partes
+
+        clave = clave_caracteristica('avg_correlations', correlacion_promedio,
+                                     {'n_corr': n_corr, 'subvisual_thresh': subvisual_thresh})
+        promedios = caracteristica_segmentos(lote, ('ele_diff_flux', 'ele_energy_flux'),
+                                             calcular_correlaciones, clave,
+                                             directorio_cache, huellas)
+        for k in range(n_segmentos):
+            precalculos[k]['b4s'] = {'avg_correlations': promedios[k]}
+
+    return precalculos
+
+
+def detectar_fronteras_lote(lote, channel_energies, fronteras=None, hilos=1, directorio_cache=None):
+    """
+    Detecta las fronteras de todos los segmentos de un lote. Los cálculos fila
+    a fila de todos los detectores se hacen una vez sobre el lote completo
+    (precalcular_lote); solo las búsquedas del primer índice de cada detector
+    se ejecutan por segmento, sobre vistas del lote.
+
+    Con directorio_cache cada segmento se identifica por el hash de su
+    contenido y solo se ejecutan los detectores cuyo código, umbrales o
+    fronteras previas cambiaron desde la última ejecución (ver cache_fronteras).
+
+    Returns:
+        list: Diccionario de fronteras por segmento ({} si está vacío o falla)
+    """
+    n_segmentos = len(lote['offsets']) - 1
+    huellas = None
+    if directorio_cache is not None:
+        huellas = [huella_segmento(segmento_lote(lote, k)) for k in range(n_segmentos)]
+
+    precalculos = precalcular_lote(lote, channel_energies, fronteras, directorio_cache, huellas)
+    resultados = []
+    for k in range(n_segmentos):
+        segment_data = segmento_lote(lote, k)
+        boundaries = {}
+        try:
+            if len(segment_data['time']) > 0:
+                guardados = None
+                if huellas is not None:
+                    guardados = cargar_resultados_segmento(directorio_cache, huellas[k])
+                    n_guardados = len(guardados)
+                boundaries = detect_all_boundaries(segment_data, channel_energies, fronteras=fronteras,
+                                                   hilos=hilos, precalculos=precalculos[k],
+                                                   cache_resultados=guardados)
+                if guardados is not None and len(guardados) > n_guardados:
+                    guardar_resultados_segmento(directorio_cache, huellas[k], guardados)
+        except Exception as e:
+            print(f"Error detectando fronteras en el segmento {k} del lote: {e}")
+            boundaries = {}
+        resultados.append(boundaries)
+    return resultados
@@ -0,0 +1,794 @@
+# deteccion_streaming.py - detección de fronteras en línea sobre un flujo de registros SSJ
+import sys
+import json
+import time
+import socket
+import argparse
+import numpy as np
+from .cargar_datos_cdf import cargar_datos_cdf
+from .preprocesar_datos import preprocesar_datos
+from .segmentar_orbita import LATITUD_AURORAL
+from .segment_utils import split_cycle_segment
+from .procesar_ciclos import prepare_segment_data
+from .convert_to_serializable import convert_to_serializable
+from .boundary_detection import (detect_all_boundaries, resolver_fronteras, GRAFO_FRONTERAS,
+                                 NODO_FRONTERA, ORDEN_FRONTERAS)
+from .fronteras.funciones_auxiliares.eventos_aceleracion import eventos_aceleracion
+from .fronteras.funciones_auxiliares.correlaciones import correlacion_promedio
+from .fronteras.funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+from .fronteras.funciones_auxiliares.ventanas import medias_ventana
+from .fronteras.funciones_auxiliares.salto_b1 import buscar_saltos_b1
+from .fronteras.detect_b1e import flujos_fila_b1e
+from .fronteras.detect_b1i import flujos_fila_b1i
+from .fronteras.detect_b2e import buscar_b2e
+from .fronteras.detect_b5_ei import detect_b5, VENTANA_B5, LOOKAHEAD_B5
+from .fronteras.detect_b6 import detect_b6
+
+# Muestras aurorales consecutivas necesarias para abrir una pasada (como limpiar_mascara)
+MIN_CONSECUTIVAS = 2
+
+# Capacidad de los buffers de una pasada: una pasada auroral dura ~10-20 min a 1 Hz
+MUESTRAS_MAX_PASADA = 3600
+
+# Un hueco mayor que este entre registros cierra la pasada en curso
+HUECO_MAXIMO = np.timedelta64(5, 'm')
+
+# Fronteras que dependen de toda la mitad de la pasada (b2i filtra la "nariz"
+# sobre el segmento completo, b3b es la última aceleración y b4s usa b2i):
+# se emiten al cerrar la pasada
+FRONTERAS_AL_CIERRE = ('b2i', 'b3b', 'b4s')
+
+# Detectores de b1e/b1i en línea: (flujos por fila, inicio de la ventana "siguiente")
+DETECTORES_B1 = {'b1e': (flujos_fila_b1e, 0), 'b1i': (flujos_fila_b1i, 1)}
+
+# Partícula y flujo de energía (clave de los buffers) de b5e/b5i
+PARTICULAS_B5 = {'b5e': ('electron', 'flux_ele'), 'b5i': ('ion', 'flux_ion')}
+
+# Variables de un registro (nombres del CDF); ELE_AVG_ENERGY y
+# ELE_TOTAL_ENERGY_FLUX pueden faltar (la energía promedio se calcula de los espectros)
+VARIABLES_REGISTRO = ('Epoch', 'SC_AACGM_LAT', 'SC_GEOCENTRIC_LAT', 'ELE_DIFF_ENERGY_FLUX',
+                      'ION_DIFF_ENERGY_FLUX', 'ELE_TOTAL_ENERGY_FLUX', 'ELE_AVG_ENERGY')
+
+def anticipacion_fronteras():
+    """
+    Muestras que necesita cada frontera a partir de su índice (inclusive) para
+    que su detección sobre la parte ya recibida de la pasada no cambie al
+    llegar más datos. Se leen los umbrales vigentes en cada llamada.
+    """
+    b2e = PAPER_THRESHOLDS['b2e']
+    return {
+        'b1e': 6, 'b1i': 6,  # media de las 3 siguientes y media futura de 6 muestras
+        'b2e': max(b2e['lookahead'] + 3, b2e['verification_window']),
+        'b3a': 1,
+        'b5e': 12 + 35 + 1,  # ventana de 12 s y 35 s por debajo del umbral
+        'b5i': 12 + 30 + 1,
+        'b6': 1
+    }
+
+
+def dividir_pasada(datos, indice_max):
+    """
+    Divide una pasada que entró desde el ecuador en sus segmentos de
+    procesamiento, con la misma estructura que split_cycle_segment: seg1 =
+    [0, indice_max) en orden de llegada y seg2 = [indice_max, n) invertido.
+    A diferencia de split_cycle_segment, la dirección no se deduce de las
+    latitudes de los extremos: se conoce por la entrada a la pasada.
+    """
+    n = len(datos['time'])
+
+    def build(segmento, indices, direccion):
+        return {
+            'flux': datos['flux_ion'][segmento],
+            'time': datos['time'][segmento],
+            'coords_aacgm': datos['coords_aacgm'][segmento],
+            'coords_geo': datos['lat'][segmento],
+            'indices': indices,
+            'slice': segmento,
+            'direccion_original': 'ecuador-polo',
+            'direccion_procesamiento': direccion
+        }
+
+    seg1 = build(slice(0, indice_max, 1), np.arange(indice_max, dtype=np.int32), 'ecuador-polo')
+    seg2_original = build(slice(indice_max, n, 1), np.arange(indice_max, n, dtype=np.int32),
+                          'polo-ecuador')
+    seg2 = build(slice(n - 1, indice_max - 1 if indice_max > 0 else None, -1),
+                 np.arange(indice_max, n, dtype=np.int32)[::-1], 'ecuador-polo')
+    return {
+        'seg1_original': seg1,
+        'seg2_original': seg2_original,
+        'seg1_processing': seg1,
+        'seg2_processing': seg2,
+        'direccion_original': 'ecuador-polo'
+    }
+
+
+class BufferCircular:
+    """Buffer circular de capacidad fija: conserva las últimas 'capacidad' filas"""
+
+    def __init__(self, capacidad, forma=(), dtype=np.float64):
+        self.capacidad = int(capacidad)
+        self._datos = np.empty((self.capacidad, *forma), dtype=dtype)
+        self._inicio = 0
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def lleno(self):
+        return self._n == self.capacidad
+
+    def agregar(self, fila):
+        """Añade una fila; si el buffer está lleno descarta la más antigua"""
+        self._datos[(self._inicio + self._n) % self.capacidad] = fila
+        if self._n < self.capacidad:
+            self._n += 1
+        else:
+            self._inicio = (self._inicio + 1) % self.capacidad
+
+    def vaciar(self):
+        self._inicio = 0
+        self._n = 0
+
+    def contenido(self):
+        """Filas en orden de llegada (vista si el buffer no ha dado la vuelta)"""
+        fin = self._inicio + self._n
+        if fin <= self.capacidad:
+            return self._datos[self._inicio:fin]
+        return np.concatenate((self._datos[self._inicio:], self._datos[:fin - self.capacidad]))
+
+
+class MediaMovil:
+    """
+    Medias móviles de ancho fijo (medias[k] = media de x[k:k+ancho]) de una
+    serie que crece. Cada actualización calcula solo las ventanas completadas
+    desde la anterior, con medias_ventana sobre las muestras nuevas y las
+    ancho-1 previas, así que coinciden con las del segmento completo.
+    """
+
+    def __init__(self, ancho, capacidad):
+        self.ancho = int(ancho)
+        self.medias = BufferCircular(capacidad)
+
+    def actualizar(self, serie):
+        """Extiende las medias hasta el final de 'serie' y las devuelve"""
+        for media in medias_ventana(serie[len(self.medias):], self.ancho):
+            self.medias.agregar(media)
+        return self.medias.contenido()
+
+
+class SuavizadoIncremental:
+    """
+    Suavizado de 3 muestras de b2e (uniform_filter1d(x, size=3)) calculado
+    muestra a muestra con la misma suma móvil que scipy, de modo que los
+    valores coinciden con los del segmento completo. El valor k queda
+    definido al llegar la muestra k+1.
+    """
+
+    def __init__(self, capacidad):
+        self.valores = BufferCircular(capacidad)
+        # x[k-3] ... x[k]: la suma móvil suma x[k] y resta x[k-3] (x[0] al inicio)
+        self.ventana = BufferCircular(4)
+        self._suma = 0.0
+
+    def agregar(self, valor):
+        self.ventana.agregar(valor)
+        n = len(self.ventana)
+        if n < 2:
+            return
+        if n == 2:
+            # Borde 'reflect': la ventana de la muestra 0 es (x[0], x[0], x[1])
+            x0, x1 = self.ventana.contenido()
+            self._suma = (x0 + x0) + x1
+        else:
+            self._suma += valor - self.ventana.contenido()[0]
+        self.valores.agregar(self._suma / 3)
+
+    def contenido(self):
+        return self.valores.contenido()
+
+
+class DetectorStreaming:
+    """
+    Detector de fronteras en línea. Recibe registros del SSJ de a uno (o en
+    pequeños bloques), abre una pasada al entrar en latitudes aurorales y la
+    cierra al salir de ellas, al cambiar de hemisferio o tras un hueco.
+
+    La mitad ecuador-polo de la pasada (hasta el máximo de |latitud
+    geocéntrica|, como split_cycle_segment) se procesa en el orden de llegada:
+    cada frontera local se emite en cuanto su ventana de anticipación está
+    completa (ver anticipacion_fronteras). Las características de cada
+    registro (flujos de b1e/b1i, energía suavizada de b2e, log10 del flujo de
+    b5e/b5i, aceleración y <r>) se calculan al llegar, las medias de 3, 6, 12
+    y 30/35 s se extienden en cada evaluación solo con las ventanas nuevas
+    (MediaMovil) y se revisan únicamente los índices que completaron su
+    anticipación desde la anterior, así que el costo por registro no depende
+    de la longitud de la pasada. La única excepción es b1e/b1i: si un registro
+    nuevo cambia los canales de todo el segmento (fotoelectrones o carga), se
+    vuelven a revisar desde el inicio, una vez por pasada.
+
+    Limitación conocida: las fronteras que dependen del segmento completo no
+    se pueden emitir en línea. La mitad polo-ecuador se procesa invertida, así
+    que sus fronteras, y las de FRONTERAS_AL_CIERRE en ambas mitades, se
+    detectan al cerrar la pasada, con una latencia de hasta la duración de la
+    pasada. Para eso la pasada completa se conserva en buffers de
+    MUESTRAS_MAX_PASADA registros (una pasada que los llena se cierra). Al
+    cierre se detecta todo como en el procesamiento por lotes y, si una
+    frontera emitida en línea cambió, se emite una 'correccion'.
+    """
+
+    def __init__(self, channel_energies=None, fronteras=None, capacidad=MUESTRAS_MAX_PASADA,
+                 intervalo_evaluacion=1):
+        if intervalo_evaluacion < 1:
+            raise ValueError("intervalo_evaluacion debe ser >= 1")
+        nodos, desconocidas = resolver_fronteras(fronteras)
+        if desconocidas:
+            raise ValueError(f"Fronteras desconocidas: {desconocidas}")
+
+        self.fronteras = [f for f in ORDEN_FRONTERAS
+                          if any(f in GRAFO_FRONTERAS[n]['produce'] for n in nodos)]
+        self.fronteras_linea = [f for f in self.fronteras if f not in FRONTERAS_AL_CIERRE]
+        self.capacidad = int(capacidad)
+        self.intervalo_evaluacion = int(intervalo_evaluacion)
+        self.channel_energies_crudas = (None if channel_energies is None
+                                        else np.asarray(channel_energies, dtype=float))
+        self.channel_energies = None
+        self.n_corr = PAPER_THRESHOLDS['b4s']['n_corr']
+        self.subvisual_thresh = PAPER_THRESHOLDS['b4s']['subvisual_thresh']
+
+        self.buffers = None
+        self.previas = BufferCircular(MIN_CONSECUTIVAS, dtype=object)
+        self.num_pasada = -1
+        self.en_pasada = False
+        self.entrada_ecuatorial = False
+        self.ultimo_tiempo = None
+        self.ultima_lat = None
+        self.estadisticas = {'registros': 0, 'pasadas': 0, 'eventos': 0, 'correcciones': 0,
+                             'evaluaciones': 0, 'indices_evaluados': 0}
+
+    # — Entrada de registros —
+
+    def procesar(self, registros):
+        """
+        Procesa uno o varios registros (diccionarios con los nombres de las
+        variables del CDF; el primero debe traer CHANNEL_ENERGIES si no se
+        entregaron al crear el detector).
+
+        Returns:
+            list: Eventos emitidos (diccionarios serializables a JSON)
+        """
+        if isinstance(registros, dict):
+            registros = [registros]
+        if not registros:
+            return []
+
+        datos = self._preprocesar(registros)
+        if datos is None:
+            return []
+
+        eventos = []
+        for k in range(len(datos['time'])):
+            muestra = {clave: valores[k] for clave, valores in datos.items()}
+            eventos.extend(self._agregar_muestra(muestra))
+        self.estadisticas['registros'] += len(registros)
+        return eventos
+
+    def cerrar(self):
+        """Cierra la pasada en curso (fin del flujo) y devuelve sus últimos eventos"""
+        return self._cerrar_pasada() if self.en_pasada else []
+
+    def _preprocesar(self, registros):
+        """Preprocesa un bloque de registros con preprocesar_datos (cálculos fila a fila)"""
+        if self.channel_energies_crudas is None:
+            energias = registros[0].get('CHANNEL_ENERGIES')
+            if energias is None:
+                print("Registro sin CHANNEL_ENERGIES: no se pueden procesar los espectros")
+                return None
+            self.channel_energies_crudas = np.asarray(energias, dtype=float)
+
+        n = len(registros)
+        n_canales = len(self.channel_energies_crudas)
+
+        def columna(nombre, forma=()):
+            valores = np.full((n, *forma), np.nan)
+            for k, registro in enumerate(registros):
+                valor = registro.get(nombre)
+                if valor is not None:
+                    valores[k] = np.asarray(valor, dtype=float)
+            return valores
+
+        try:
+            datos = {
+                'tiempo_final': np.array([np.datetime64(r['Epoch'], 'ns') for r in registros]),
+                'SC_AACGM_LAT': columna('SC_AACGM_LAT'),
+                'SC_GEOCENTRIC_LAT': columna('SC_GEOCENTRIC_LAT'),
+                'ELE_DIFF_ENERGY_FLUX': columna('ELE_DIFF_ENERGY_FLUX', (n_canales,)),
+                'ION_DIFF_ENERGY_FLUX': columna('ION_DIFF_ENERGY_FLUX', (n_canales,)),
+                'ELE_TOTAL_ENERGY_FLUX': columna('ELE_TOTAL_ENERGY_FLUX'),
+                'ELE_AVG_ENERGY': columna('ELE_AVG_ENERGY'),
+                'CHANNEL_ENERGIES': self.channel_energies_crudas
+            }
+            # No se sabe si los registros siguientes traerán ELE_AVG_ENERGY válido:
+            # la energía promedio se calcula siempre, para no mezclar definiciones
+            pre = preprocesar_datos(datos, avisar=False, energia_cdf=False)
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"Registro inválido, se descarta el bloque: {e}")
+            return None
+
+        if self.channel_energies is None:
+            self.channel_energies = pre['CHANNEL_ENERGIES_f']
+
+        datos = {
+            'time': pre['tiempo_final'],
+            'coords_aacgm': pre['SC_AACGM_LAT'],
+            'lat': pre['SC_GEOCENTRIC_LAT'],
+            'ele_diff_flux': pre['ELE_DIFF_ESPECTROS'],
+            'ion_diff_flux': pre['ION_DIFF_ESPECTROS'],
+            'flux_ion': pre['flujos_iones_log'],
+            'flux_ele': pre['flujos_elec_log'],
+            'ion_energy_flux_b2i': pre['flujos_iones_b2i_log'],
+            'ele_avg_energy': pre['ELE_AVG_ENERGY']
+        }
+
+        # Características por registro de los detectores en línea
+        datos['acceleration'] = eventos_aceleracion(datos['ele_diff_flux'])
+        for frontera, (flujos_fila, _) in DETECTORES_B1.items():
+            if frontera in self.fronteras_linea:
+                log_bajo, log_limpio, marcas = flujos_fila(datos, self.channel_energies)
+                datos[f'{frontera}_bajo'] = log_bajo
+                if log_limpio is not None:
+                    datos[f'{frontera}_limpio'] = log_limpio
+                    datos[f'{frontera}_marca'] = marcas
+        for frontera, (_, clave) in PARTICULAS_B5.items():
+            if frontera in self.fronteras_linea:
+                datos[f'{frontera}_log'] = np.log10(np.maximum(datos[clave], 1e-10))
+        return datos
+
+    # — Pasadas —
+
+    def _agregar_muestra(self, muestra):
+        eventos = []
+        lat_min, lat_max = LATITUD_AURORAL
+        aacgm = float(muestra['coords_aacgm'])
+        if np.isnan(aacgm):
+            # Sin posición: la muestra no abre ni cierra pasadas
+            hemisferio = self.hemisferio if self.en_pasada else None
+        else:
+            hemisferio = 'N' if aacgm >= 0 else 'S'
+        auroral = lat_min < abs(aacgm) < lat_max
+        hueco = (self.ultimo_tiempo is not None and
+                 muestra['time'] - self.ultimo_tiempo > HUECO_MAXIMO)
+
+        if self.en_pasada and (hueco or hemisferio != self.hemisferio or abs(aacgm) <= lat_min
+                               or len(self.buffers['time']) >= self.capacidad):
+            eventos.extend(self._cerrar_pasada())
+
+        if self.en_pasada:
+            self._agregar_a_pasada(muestra)
+            eventos.extend(self._evaluar(muestra['time']))
+        else:
+            # Racha de muestras aurorales del mismo hemisferio antes de abrir la pasada
+            if hueco or not auroral or (len(self.previas) > 0 and
+                                        self.previas.contenido()[0]['hemisferio'] != hemisferio):
+                self.previas.vaciar()
+            if auroral:
+                if len(self.previas) == 0:
+                    # Solo una entrada desde el ecuador garantiza el orden ecuador-polo
+                    self.entrada_ecuatorial = (not hueco and self.ultima_lat is not None and
+                                               abs(self.ultima_lat) <= lat_min)
+                self.previas.agregar(dict(muestra, hemisferio=hemisferio))
+                if len(self.previas) >= MIN_CONSECUTIVAS:
+                    eventos.extend(self._abrir_pasada(hemisferio))
+
+        self.ultimo_tiempo = muestra['time']
+        if not np.isnan(aacgm):
+            self.ultima_lat = aacgm
+        return eventos
+
+    def _abrir_pasada(self, hemisferio):
+        self.num_pasada += 1
+        self.en_pasada = True
+        self.hemisferio = hemisferio
+        self.emitidas = {}
+        self.max_geo = -np.inf
+        self.indice_max = 0
+        self.prefijo_evaluado = 0
+        self.estadisticas['pasadas'] += 1
+
+        canales = len(self.channel_energies)
+        self.buffers = {clave: BufferCircular(self.capacidad, dtype='datetime64[ns]')
+                        for clave in ('time',)}
+        for clave in ('coords_aacgm', 'lat', 'flux_ion', 'flux_ele', 'ion_energy_flux_b2i',
+                      'ele_avg_energy', 'avg_correlation'):
+            self.buffers[clave] = BufferCircular(self.capacidad)
+        for clave in ('ele_diff_flux', 'ion_diff_flux'):
+            self.buffers[clave] = BufferCircular(self.capacidad, (canales,))
+        self.buffers['acceleration'] = BufferCircular(self.capacidad, dtype=bool)
+        # Ventana de correlación: el espectro actual y los n_corr anteriores
+        self.ventana_corr = BufferCircular(self.n_corr + 1, (canales,))
+        self.ventana_flujo = BufferCircular(self.n_corr + 1)
+        self._crear_estado_linea()
+
+        previas = list(self.previas.contenido())
+        self.previas.vaciar()
+        evento = self._evento('inicio_pasada', previas[0]['time'], previas[0]['lat'],
+                              previas[0]['time'])
+        evento['hemisferio'] = hemisferio
+        evento['en_linea'] = bool(self.entrada_ecuatorial)
+        eventos = [evento]
+        for muestra in previas:
+            self._agregar_a_pasada(muestra)
+        eventos.extend(self._evaluar(previas[-1]['time']))
+        return eventos
+
+    def _crear_estado_linea(self):
+        """Estado incremental de las fronteras en línea de la pasada"""
+        capacidad = self.capacidad
+        # Primer índice de cada frontera que aún no se revisó
+        self.siguiente = {f: 0 for f in self.fronteras_linea}
+
+        # b1e/b1i: log10 del flujo y medias de 3 y 6 muestras con los canales
+        # bajos y con los limpios; el segmento usa los limpios desde el primer
+        # registro con fotoelectrones (b1e) o carga (b1i). Las medias se
+        # extienden al evaluar, solo las de los canales en uso
+        self.estado_b1 = {}
+        for frontera in DETECTORES_B1:
+            if frontera in self.fronteras_linea:
+                self.estado_b1[frontera] = {
+                    'variantes': {variante: {'log': BufferCircular(capacidad),
+                                             'medias_3': MediaMovil(3, capacidad),
+                                             'medias_6': MediaMovil(6, capacidad)}
+                                  for variante in ('bajo', 'limpio')},
+                    'primera_marca': None,
+                    'limpio': False
+                }
+
+        self.suavizado_b2e = SuavizadoIncremental(capacidad) if 'b2e' in self.fronteras_linea else None
+
+        # b5e/b5i: log10 del flujo de energía y medias de 12 s y del lookahead
+        self.estado_b5 = {}
+        for frontera, (particula, _) in PARTICULAS_B5.items():
+            if frontera in self.fronteras_linea:
+                self.estado_b5[frontera] = {
+                    'log': BufferCircular(capacidad),
+                    'medias_12': MediaMovil(VENTANA_B5, capacidad),
+                    'medias_futuras': MediaMovil(LOOKAHEAD_B5[particula], capacidad)
+                }
+
+    def _agregar_estado_linea(self, muestra, k):
+        """Actualiza el estado incremental de las fronteras en línea con la muestra k"""
+        for frontera, estado in self.estado_b1.items():
+            for variante in ('bajo', 'limpio'):
+                if f'{frontera}_{variante}' in muestra:
+                    estado['variantes'][variante]['log'].agregar(muestra[f'{frontera}_{variante}'])
+            if muestra.get(f'{frontera}_marca', False) and estado['primera_marca'] is None:
+                estado['primera_marca'] = k
+
+        if self.suavizado_b2e is not None:
+            self.suavizado_b2e.agregar(muestra['ele_avg_energy'])
+
+        for frontera, estado in self.estado_b5.items():
+            estado['log'].agregar(muestra[f'{frontera}_log'])
+
+    def _agregar_a_pasada(self, muestra):
+        """Añade una muestra a los buffers de la pasada con sus características por registro"""
+        espectro = muestra['ele_diff_flux']
+        self.ventana_corr.agregar(espectro)
+        self.ventana_flujo.agregar(muestra['flux_ele'])
+        if len(self.ventana_corr) > self.n_corr:
+            avg = correlacion_promedio(self.ventana_corr.contenido(), self.ventana_flujo.contenido(),
+                                       self.n_corr, self.subvisual_thresh)[-1]
+        else:
+            avg = np.nan
+
+        k = len(self.buffers['time'])
+        for clave in ('time', 'coords_aacgm', 'lat', 'ele_diff_flux', 'ion_diff_flux', 'flux_ion',
+                      'flux_ele', 'ion_energy_flux_b2i', 'ele_avg_energy'):
+            self.buffers[clave].agregar(muestra[clave])
+        self.buffers['acceleration'].agregar(muestra['acceleration'])
+        self.buffers['avg_correlation'].agregar(avg)
+        self._agregar_estado_linea(muestra, k)
+
+        if abs(muestra['lat']) > self.max_geo:
+            self.max_geo = abs(muestra['lat'])
+            self.indice_max = k
+
+    def _datos_pasada(self):
+        """Arrays de la pasada con las claves de global_data (vistas de los buffers)"""
+        datos = {clave: buffer.contenido() for clave, buffer in self.buffers.items()}
+        datos['ele_energy_flux'] = datos['flux_ele']
+        datos['ion_energy_flux'] = datos['flux_ion']
+        return datos
+
+    def _precalculos(self, datos, fin):
+        """Características por registro de las primeras 'fin' muestras (ver precalcular_lote)"""
+        return {'b3': {'acceleration_mask': datos['acceleration'][:fin]},
+                'b4s': {'avg_correlations': datos['avg_correlation'][:fin]}}
+
+    def _evaluar(self, t_actual):
+        """Emite las fronteras de la mitad ecuador-polo cuya anticipación ya se cumple"""
+        if not self.entrada_ecuatorial:
+            return []
+        pendientes = [f for f in self.fronteras_linea if f not in self.emitidas]
+        m = self.indice_max
+        if (not pendientes or m <= self.prefijo_evaluado or
+                (m - self.prefijo_evaluado) < self.intervalo_evaluacion):
+            return []
+        self.prefijo_evaluado = m
+        self.estadisticas['evaluaciones'] += 1
+
+        # Prefijo [0, m): parte de la mitad ecuador-polo que ya no puede cambiar.
+        # Cada frontera revisa solo los índices que completaron su anticipación
+        anticipacion = anticipacion_fronteras()
+        datos = self._datos_pasada()
+        eventos = []
+        for frontera in pendientes:
+            previas = [f for nodo in GRAFO_FRONTERAS[NODO_FRONTERA[frontera]]['dependencias']
+                       for f in GRAFO_FRONTERAS[nodo]['produce']]
+            if not all(f in self.emitidas for f in previas):
+                continue
+            indice = self._buscar_en_linea(frontera, datos, m, m - anticipacion[frontera] + 1)
+            if indice is None:
+                continue
+            self.emitidas[frontera] = int(indice)
+            evento = self._evento('frontera', datos['time'][indice], datos['lat'][indice], t_actual)
+            evento.update({'segmento': 'seg1', 'frontera': frontera, 'index': int(indice),
+                           'indice_pasada': int(indice)})
+            eventos.append(evento)
+        return eventos
+
+    def _buscar_en_linea(self, frontera, datos, m, hasta):
+        """
+        Revisa los índices [siguiente, hasta) de una frontera sobre el prefijo
+        [0, m) de la pasada, con el estado incremental de sus ventanas.
+
+        Returns:
+            int: Índice de la frontera, o None si aún no se detectó
+        """
+        desde = self.siguiente[frontera]
+        prefijo = {clave: valores[:m] for clave, valores in datos.items()}
+
+        if frontera in DETECTORES_B1:
+            thresholds = PAPER_THRESHOLDS[frontera]
+            if m < thresholds['background_window'] + 6:
+                # El fondo y la longitud mínima del segmento aún no se conocen
+                return None
+            estado = self.estado_b1[frontera]
+            limpio = estado['primera_marca'] is not None and estado['primera_marca'] < m
+            if limpio != estado['limpio']:
+                # Los canales de todo el segmento cambiaron: se revisa desde el inicio
+                estado['limpio'] = limpio
+                desde = 0
+            variante = estado['variantes']['limpio' if limpio else 'bajo']
+            log_flux = variante['log'].contenido()
+            _, desfase = DETECTORES_B1[frontera]
+            indice = buscar_saltos_b1(log_flux[:m], [thresholds], desfase,
+                                      medias=(variante['medias_3'].actualizar(log_flux),
+                                              variante['medias_6'].actualizar(log_flux)),
+                                      desde=desde, hasta=hasta)[0]
+            indice = None if indice < 0 else int(indice)
+
+        elif frontera == 'b2e':
+            b1e = self.emitidas['b1e']
+            thresholds = PAPER_THRESHOLDS['b2e']
+            if b1e + thresholds['lookahead'] + 3 >= m:
+                # El recorrido de b2e tiene su propia anticipación desde b1e
+                return None
+            desde = max(desde, b1e + 3)
+            indice = buscar_b2e(prefijo['ele_avg_energy'], prefijo['flux_ele'], [thresholds], [b1e],
+                                suavizada=self.suavizado_b2e.contenido()[:m],
+                                desde=desde, hasta=hasta)[0]
+            indice = None if indice < 0 else int(indice)
+
+        elif frontera == 'b3a':
+            aceleracion = np.flatnonzero(prefijo['acceleration'][desde:hasta])
+            indice = int(desde + aceleracion[0]) if len(aceleracion) > 0 else None
+
+        elif frontera in PARTICULAS_B5:
+            particula, _ = PARTICULAS_B5[frontera]
+            if m < 2 * VENTANA_B5 + LOOKAHEAD_B5[particula]:
+                return None
+            estado = self.estado_b5[frontera]
+            log_flux = estado['log'].contenido()
+            indice = detect_b5(prefijo, particula, log_flux=log_flux[:m],
+                               medias_12=estado['medias_12'].actualizar(log_flux),
+                               medias_futuras=estado['medias_futuras'].actualizar(log_flux),
+                               desde=desde, hasta=hasta)['index']
+
+        elif frontera == 'b6':
+            desde = max(desde, self.emitidas['b5e'] + 1)
+            indice = detect_b6(prefijo, self.emitidas['b5e'],
+                               desde=desde, hasta=hasta)['index']
+
+        else:
+            return None
+
+        self.estadisticas['indices_evaluados'] += max(hasta - desde, 0)
+        self.siguiente[frontera] = max(desde, hasta)
+        return indice
+
+    def _cerrar_pasada(self):
+        """Detecta las dos mitades como en el procesamiento por lotes y cierra la pasada"""
+        self.en_pasada = False
+        datos = self._datos_pasada()
+        n = len(datos['time'])
+        t_cierre = datos['time'][-1]
+        eventos = []
+
+        if self.entrada_ecuatorial:
+            segments = dividir_pasada(datos, self.indice_max)
+        else:
+            # Sin la entrada desde el ecuador la dirección se deduce de los extremos
+            segments = split_cycle_segment((0, n - 1), datos['time'], datos['flux_ion'],
+                                           datos['coords_aacgm'], datos['lat'])
+        resumen = {}
+        for nombre in ('seg1', 'seg2'):
+            segmento = segments[f'{nombre}_processing']
+            segment_data = prepare_segment_data(segmento, nombre, datos, None)
+            if len(segment_data['time']) == 0:
+                resumen[nombre] = {}
+                continue
+
+            precalculos = None
+            corte = segmento['slice']
+            if corte.start == 0 and corte.step == 1:
+                precalculos = self._precalculos(datos, corte.stop)
+            boundaries = detect_all_boundaries(segment_data, self.channel_energies,
+                                               fronteras=self.fronteras, precalculos=precalculos)
+            resumen[nombre] = {}
+            for frontera in self.fronteras:
+                indice = (boundaries.get(frontera) or {}).get('index')
+                resumen[nombre][frontera] = None if indice is None else int(indice)
+                emitido = self.emitidas.get(frontera) if nombre == 'seg1' else None
+                if emitido is None and indice is None:
+                    continue
+                if emitido is not None and emitido == indice:
+                    continue
+
+                if emitido is not None:
+                    tipo = 'correccion'
+                    self.estadisticas['correcciones'] += 1
+                else:
+                    tipo = 'frontera'
+                tiempo = segment_data['time'][indice] if indice is not None else None
+                lat = segment_data['lat'][indice] if indice is not None else None
+                evento = self._evento(tipo, tiempo, lat, t_cierre)
+                evento.update({'segmento': nombre, 'frontera': frontera,
+                               'index': None if indice is None else int(indice),
+                               'indice_pasada': (None if indice is None
+                                                 else int(segment_data['indices'][indice]))})
+                if emitido is not None:
+                    evento['index_anterior'] = emitido
+                eventos.append(evento)
+
+        evento = self._evento('fin_pasada', t_cierre, datos['lat'][-1], t_cierre)
+        evento.update({'muestras': n, 'direccion_original': segments['direccion_original'],
+                       'fronteras': resumen})
+        eventos.append(evento)
+        self.buffers = None
+        return eventos
+
+    def _evento(self, tipo, tiempo, lat, t_emision):
+        self.estadisticas['eventos'] += 1
+        latencia = None
+        if tiempo is not None:
+            latencia = float((t_emision - tiempo) / np.timedelta64(1, 's'))
+        return {
+            'evento': tipo,
+            'pasada': self.num_pasada,
+            'time': None if tiempo is None else str(np.datetime64(tiempo, 'ms')),
+            'lat': None if lat is None else float(lat),
+            'emitido': str(np.datetime64(t_emision, 'ms')),
+            'latencia_s': latencia
+        }
+
+
+# — Fuentes de registros —
+
+def seguir_archivo(ruta, seguir=False, intervalo=1.0):
+    """
+    Lee registros JSON (uno por línea) de un archivo. Con seguir=True espera
+    nuevas líneas al llegar al final, como 'tail -f'.
+    """
+    with open(ruta, 'r', encoding='utf-8') as f:
+        pendiente = ''
+        while True:
+            linea = f.readline()
+            if not linea or not linea.endswith('\n'):
+                pendiente += linea
+                if not seguir:
+                    if pendiente.strip():
+                        yield json.loads(pendiente)
+                    return
+                time.sleep(intervalo)
+                continue
+            linea, pendiente = pendiente + linea, ''
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def leer_socket(host, puerto):
+    """Lee registros JSON (uno por línea) de una conexión TCP hasta que se cierra"""
+    with socket.create_connection((host, int(puerto))) as conexion:
+        with conexion.makefile('r', encoding='utf-8') as f:
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+
+
+def registros_cdf(archivo_cdf, inicio=None, fin=None):
+    """Reproduce un archivo CDF registro a registro (sustituto de una fuente en vivo)"""
+    datos = cargar_datos_cdf(archivo_cdf, inicio=inicio, fin=fin)
+    tiempo = datos['tiempo_final']
+    for k in range(len(tiempo)):
+        registro = {'Epoch': tiempo[k]}
+        for nombre in VARIABLES_REGISTRO[1:]:
+            valores = datos.get(nombre)
+            if valores is not None:
+                registro[nombre] = valores[k]
+        if k == 0:
+            registro['CHANNEL_ENERGIES'] = datos['CHANNEL_ENERGIES']
+        yield registro
+
+
+def ejecutar_streaming(fuente, detector, salida=None, bloque=1):
+    """
+    Alimenta el detector con los registros de 'fuente' y escribe cada evento
+    como una línea JSON en 'salida' en cuanto se emite.
+
+    Args:
+        bloque (int): Registros que se preprocesan juntos (1 = latencia mínima)
+
+    Returns:
+        list: Todos los eventos emitidos
+    """
+    eventos = []
+
+    def emitir(nuevos):
+        for evento in nuevos:
+            eventos.append(evento)
+            if salida is not None:
+                salida.write(json.dumps(evento, default=convert_to_serializable) + '\n')
+                salida.flush()
+
+    pendientes = []
+    for registro in fuente:
+        pendientes.append(registro)
+        if len(pendientes) >= bloque:
+            emitir(detector.procesar(pendientes))
+            pendientes = []
+    emitir(detector.procesar(pendientes))
+    emitir(detector.cerrar())
+    return eventos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detección de fronteras en línea (eventos JSON por línea)")
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--archivo", help="Registros JSON por línea (con --seguir, como tail -f)")
+    origen.add_argument("--socket", metavar="HOST:PUERTO", help="Registros JSON por línea vía TCP")
+    origen.add_argument("--cdf", help="Reproduce un archivo CDF registro a registro")
+    parser.add_argument("--seguir", action="store_true", help="Esperar nuevas líneas del archivo")
+    parser.add_argument("--inicio", default=None, help="Inicio de la ventana UT (solo --cdf)")
+    parser.add_argument("--fin", default=None, help="Fin de la ventana UT (solo --cdf)")
+    parser.add_argument("--fronteras", nargs="+", default=None, help="Fronteras a detectar")
+    parser.add_argument("--bloque", type=int, default=1, help="Registros preprocesados juntos")
+    parser.add_argument("--intervalo", type=int, default=1,
+                        help="Muestras entre evaluaciones de las fronteras en línea")
+    args = parser.parse_args()
+
+    if args.archivo:
+        fuente = seguir_archivo(args.archivo, seguir=args.seguir)
+    elif args.socket:
+        host, _, puerto = args.socket.rpartition(':')
+        fuente = leer_socket(host or 'localhost', puerto)
+    else:
+        fuente = registros_cdf(args.cdf, args.inicio, args.fin)
+
+    detector = DetectorStreaming(fronteras=args.fronteras, intervalo_evaluacion=args.intervalo)
+    inicio_reloj = time.time()
+    ejecutar_streaming(fuente, detector, salida=sys.stdout, bloque=max(1, args.bloque))
+    est = detector.estadisticas
+    print(f"{est['registros']} registros, {est['pasadas']} pasadas, {est['eventos']} eventos "
+          f"({est['correcciones']} correcciones) en {time.time() - inicio_reloj:.1f} s",
+          file=sys.stderr)
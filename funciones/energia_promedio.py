@@ -0,0 +1,25 @@
+import numpy as np
+
+def calcular_energia_promedio(diff_flux, channel_energies):
+    """
+    Calcula la energía promedio de cada espectro como la media de las energías
+    de canal ponderada por el flujo diferencial, usando solo canales con flujo > 0.
+
+    Args:
+        diff_flux (array): Espectros diferenciales (n_tiempo, n_canales)
+        channel_energies (array): Energía de cada canal (eV)
+
+    Returns:
+        array: Energía promedio (eV) por registro; 0 si no hay flujo válido
+    """
+    diff_flux = np.asarray(diff_flux, dtype=float)
+    channel_energies = np.asarray(channel_energies, dtype=float)
+
+    # NaN y valores no positivos no aportan (NaN > 0 es False)
+    pesos = np.where(diff_flux > 0, diff_flux, 0.0)
+    total_flux = pesos.sum(axis=1)
+    weighted_energy = pesos @ channel_energies
+
+    energia_promedio = np.zeros(len(total_flux))
+    np.divide(weighted_energy, total_flux, out=energia_promedio, where=total_flux > 0)
+    return energia_promedio
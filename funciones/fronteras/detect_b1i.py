@@ -1,6 +1,8 @@
 import numpy as np
 from scipy.ndimage import uniform_filter1d
 from .funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+from .funciones_auxiliares.salto_b1 import buscar_salto_b1
+from .detect_b1e import por_segmento
 
 def validate_segment_data(segment, required_keys):
     """Valida que el segmento tenga los datos necesarios"""
@@ -18,9 +20,56 @@ def validate_segment_data(segment, required_keys):
     
     return True, "OK"
 
-def detect_b1i(segment, energy_channels):
+def flujos_fila_b1i(segment, energy_channels, thresholds=None):
+    """
+    Pasos 1-2 de b1i fila a fila, sin decidir aún los canales: log10 del
+    flujo parcial en los canales bajos y en los canales 47-68 eV, y las filas
+    con carga del spacecraft.
+
+    Returns:
+        tuple: (log_bajo, log_limpio, carga); los dos últimos son None si no
+            hay canales altos o limpios (siempre se usan los bajos)
+    """
+    if thresholds is None:
+        thresholds = PAPER_THRESHOLDS['b1i']
+    diff_flux = segment['ion_diff_flux']
+    
+    # 1. Determinar canales de energía usando umbrales del paper
+    low_mask = (energy_channels >= thresholds.get('low_energy_min', 32)) & (energy_channels <= thresholds.get('low_energy_max', 47))
+    partial_flux = np.sum(diff_flux[:, low_mask], axis=1)
+    log_bajo = np.log10(partial_flux + 1e-10)
+    
+    # Verificar spacecraft charging (cutoff en canal de 32 eV)
+    high_mask = energy_channels > thresholds.get('high_energy_thresh', 68)
+    clean_mask = (energy_channels > thresholds.get('clean_energy_minv ', 47)) & (energy_channels < thresholds.get('clean_energy_max', 68))
+    if not np.any(high_mask) or not np.any(clean_mask):
+        return log_bajo, None, None
+    high_flux = np.mean(diff_flux[:, high_mask], axis=1)
+    charging_mask = (high_flux < 0.1 * partial_flux) & (segment['lat'] < 60)
+    log_limpio = np.log10(np.sum(diff_flux[:, clean_mask], axis=1) + 1e-10)
+    return log_bajo, log_limpio, charging_mask
+
+def flujo_log_b1i(segment, energy_channels, thresholds=None, offsets=None):
+    """
+    log10 del flujo parcial de baja energía usado por b1i (pasos 1-2): los
+    canales 47-68 eV si algún espectro del segmento indica carga, si no los
+    canales bajos.
+
+    Con offsets, segment contiene varios segmentos concatenados (un lote) y
+    los canales se eligen por segmento, como si se procesaran por separado.
+    """
+    log_bajo, log_limpio, charging_mask = flujos_fila_b1i(segment, energy_channels, thresholds)
+    if log_limpio is None:
+        return log_bajo
+    if offsets is None:
+        offsets = np.array([0, len(log_bajo)])
+    return np.where(por_segmento(charging_mask, offsets), log_limpio, log_bajo)
+
+def detect_b1i(segment, energy_channels, log_flux=None, medias=None):
     """
     Boundary 1i (zero-energy ion boundary) - VERSIÓN CORREGIDA
+
+    log_flux y medias (medias_salto_b1) pueden venir precalculados del lote.
     """
     thresholds = PAPER_THRESHOLDS['b1i']
     
@@ -30,56 +79,16 @@ def detect_b1i(segment, energy_channels):
     if not valid:
         return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
     
-    # 1. Determinar canales de energía usando umbrales del paper
-    low_mask = (energy_channels >= thresholds.get('low_energy_min', 32)) & (energy_channels <= thresholds.get('low_energy_max', 47))
-    
-    # Verificar spacecraft charging (cutoff en canal de 32 eV)
-    high_mask = energy_channels > thresholds.get('high_energy_thresh', 68)
-    if np.any(high_mask):
-        high_flux = np.mean(segment['ion_diff_flux'][:, high_mask], axis=1)
-        charging_mask = (high_flux < 0.1 * np.sum(segment['ion_diff_flux'][:, low_mask], axis=1)) & (segment['lat'] < 60)
-        if np.any(charging_mask):
-            # Usar canales 47-68 eV
-            clean_mask = (energy_channels > thresholds.get('clean_energy_minv ', 47)) & (energy_channels < thresholds.get('clean_energy_max', 68))
-            if np.any(clean_mask):
-                low_mask = clean_mask
-    
-    # 2. Calcular flujo parcial
-    partial_flux = np.sum(segment['ion_diff_flux'][:, low_mask], axis=1)
-    log_flux = np.log10(partial_flux + 1e-10)
+    if log_flux is None:
+        log_flux = flujo_log_b1i(segment, energy_channels, thresholds)
     
     n = len(log_flux)
     if n < thresholds['background_window'] + 6:
         return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
     
-    # 3. Calcular fondo
-    background = np.mean(log_flux[:thresholds['background_window']])
-    
-    # 4. Algoritmo principal
-    for i in range(3, n - 3):
-        prev_avg = np.mean(log_flux[i-3:i])
-        next_avg = np.mean(log_flux[i+1:i+4])
-        
-        if prev_avg <= 0:
-            continue
-            
-        jump_ratio = next_avg / prev_avg
-        
-        # Criterio 1: Flujo muy alto
-        if log_flux[i] >= thresholds['very_high_flux']:
-            return {'index': i, 'time': segment['time'][i], 'lat': segment['lat'][i], 'deviation': 0}
-        
-        # Criterio 2: Salto significativo
-        required_jump = thresholds['min_jump']
-        if log_flux[i] >= thresholds['high_flux_thresh']:
-            required_jump = thresholds['high_flux_jump']
-        
-        if (jump_ratio >= required_jump and 
-            next_avg > background + 0.3 and
-            np.all(log_flux[i:i+3] > background)):
-            
-            future_avg = np.mean(log_flux[i:min(i+6, n)])
-            if future_avg > background + 0.2:
-                return {'index': i, 'time': segment['time'][i], 'lat': segment['lat'][i], 'deviation': 0}
+    # 3-4. Fondo y algoritmo principal (3 anteriores vs 3 siguientes), vectorizado
+    i = buscar_salto_b1(log_flux, thresholds, desfase_siguiente=1, medias=medias)
+    if i is not None:
+        return {'index': i, 'time': segment['time'][i], 'lat': segment['lat'][i], 'deviation': 0}
     
     return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
\ No newline at end of file
@@ -1,4 +1,5 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from scipy.ndimage import uniform_filter1d
 from .funciones_auxiliares.thresholds import PAPER_THRESHOLDS
 
@@ -28,6 +29,89 @@ def validate_segment_data(segment, required_keys):
     
     return True, "OK"
 
+def buscar_b2e(ele_avg_energy, energy_flux, lista_thresholds, b1e_indices, suavizada=None,
+               desde=0, hasta=None):
+    """
+    Búsqueda vectorizada de b2e para varios conjuntos de umbrales a la vez.
+
+    Un índice i (desde b1e + 3 hacia el polo) es b2e si la energía promedio
+    suavizada no aumenta en los próximos 'lookahead' segundos (dE/dλ ≤ 0) y,
+    cuando el flujo es bajo, ningún espectro de la ventana de verificación
+    tiene a la vez flujo y energía mayores. La energía suavizada, sus máximos
+    futuros y la verificación no dependen de los umbrales de flujo/energía y
+    se calculan una vez por (lookahead, verification_window).
+
+    Args:
+        ele_avg_energy (array): Energía promedio de electrones
+        energy_flux (array): Flujo de energía de electrones (log10)
+        lista_thresholds (list): Umbrales de PAPER_THRESHOLDS['b2e'], uno por conjunto
+        b1e_indices (array): Índice de b1e por conjunto (-1 si no se detectó)
+        suavizada (array): Energía promedio suavizada (uniform_filter1d de 3
+            muestras) si ya se calculó, p.ej. de forma incremental en línea
+        desde, hasta (int): Índices candidatos [desde, hasta), además del
+            inicio desde b1e y del final del segmento
+
+    Returns:
+        array: Índice de b2e por conjunto (-1 si no se detectó)
+    """
+    avg_energy = np.asarray(ele_avg_energy)
+    energy_flux = np.asarray(energy_flux)
+    b1e_indices = np.asarray(b1e_indices, dtype=np.int64)
+    resultado = np.full(len(lista_thresholds), -1, dtype=np.int64)
+
+    # Suavizar energía promedio
+    if suavizada is None:
+        smoothed_energy = uniform_filter1d(avg_energy, size=3)
+    else:
+        smoothed_energy = np.asarray(suavizada)
+    n = len(smoothed_energy)
+
+    grupos = {}
+    for p, t in enumerate(lista_thresholds):
+        grupos.setdefault((t['lookahead'], t['verification_window']), []).append(p)
+
+    for (lookahead, verification_window), conjuntos in grupos.items():
+        fin = n - lookahead - 2
+        if hasta is not None:
+            fin = min(fin, hasta)
+        if fin <= desde or lookahead <= 0:
+            continue
+        i = np.arange(desde, fin)
+
+        # Verificar que NO haya aumento en los próximos 'lookahead' segundos
+        future_max = sliding_window_view(smoothed_energy[1:], lookahead)[desde:fin].max(axis=1)
+        decreciente = smoothed_energy[desde:fin] >= future_max
+
+        # Doble verificación según paper: sin espectros con flujo y energía
+        # mayores en [i, i + verification_window)
+        verificado = np.full(len(i), verification_window > 0)
+        for d in range(1, verification_window):
+            k = i[i + d < n]
+            mayor = ((energy_flux[k + d] > energy_flux[k] + 0.3) &
+                     (avg_energy[k + d] > avg_energy[k]))
+            verificado[k - desde] &= ~mayor
+
+        conjuntos = np.array(conjuntos)
+        low_flux = np.array([lista_thresholds[p]['low_flux_thresh'] for p in conjuntos],
+                            dtype=np.float64)[:, None]
+        energy_thresh = np.array([lista_thresholds[p]['energy_thresh'] for p in conjuntos],
+                                 dtype=np.float64)[:, None]
+
+        # Verificación de flujo bajo; con flujo suficientemente alto se acepta directamente
+        flux = energy_flux[desde:fin]
+        bajo = (flux < low_flux) | ((flux < low_flux + 0.5) & (avg_energy[desde:fin] < energy_thresh))
+        acepta = decreciente & (~bajo | verificado)
+
+        # Buscar desde b1e + 3 (o desde 3 si no hay b1e o está demasiado cerca del final)
+        b1e = b1e_indices[conjuntos]
+        start_idx = np.where((b1e < 0) | (b1e >= n - lookahead - 3), 3, b1e + 3)
+        acepta &= i >= start_idx[:, None]
+
+        hay = np.any(acepta, axis=1)
+        resultado[conjuntos[hay]] = desde + np.argmax(acepta[hay], axis=1)
+
+    return resultado
+
 def detect_b2e(segment, b1e_idx):
     """
     Boundary 2e (start of plasma sheet) - VERSIÓN CORREGIDA
@@ -43,55 +127,9 @@ def detect_b2e(segment, b1e_idx):
     # Obtener b1e_idx de forma segura
     actual_b1e_idx = safe_get_index(b1e_idx)
     
-    if actual_b1e_idx is None:
-        start_idx = 3
-    else:
-        # Verificar que el índice esté dentro de los límites
-        if actual_b1e_idx >= len(segment['ele_avg_energy']) - thresholds['lookahead'] - 3:
-            start_idx = 3
-        else:
-            start_idx = actual_b1e_idx + 3
-    
-    # Suavizar energía promedio
-    smoothed_energy = uniform_filter1d(segment['ele_avg_energy'], size=3)
-    energy_flux = segment['ele_energy_flux']
-    
-    n = len(smoothed_energy)
-    
-    # Buscar desde start_idx hacia el polo
-    for i in range(start_idx, n - thresholds['lookahead'] - 2):
-        current_energy = smoothed_energy[i]
-        
-        # Verificar que NO haya aumento en los próximos 9 segundos
-        future_energies = smoothed_energy[i+1:i+1+thresholds['lookahead']]
-        if len(future_energies) == 0:
-            continue
-            
-        future_max = np.max(future_energies)
-        
-        if current_energy >= future_max:  # dE/dλ ≤ 0
-            flux = energy_flux[i]
-            
-            # Verificación de flujo bajo
-            if flux < thresholds['low_flux_thresh'] or (flux < thresholds['low_flux_thresh'] + 0.5 and 
-                                                       segment['ele_avg_energy'][i] < thresholds['energy_thresh']):
-                
-                # Doble verificación según paper
-                check_end = min(i + thresholds['verification_window'], len(energy_flux))
-                if check_end <= i:
-                    continue
-                    
-                next_fluxes = energy_flux[i:check_end]
-                next_energies = segment['ele_avg_energy'][i:check_end]
-                
-                higher_flux = next_fluxes > flux + 0.3
-                higher_energy = next_energies > segment['ele_avg_energy'][i]
-                
-                # Si NO hay espectros con flujo y energía mayores, aceptar
-                if not np.any(higher_flux & higher_energy):
-                    return {'index': i, 'time': segment['time'][i], 'lat': segment['lat'][i], 'deviation': 0}
-            else:
-                # Flujo suficientemente alto, aceptar directamente
-                return {'index': i, 'time': segment['time'][i], 'lat': segment['lat'][i], 'deviation': 0}
+    i = buscar_b2e(segment['ele_avg_energy'], segment['ele_energy_flux'], [thresholds],
+                   [-1 if actual_b1e_idx is None else actual_b1e_idx])[0]
+    if i >= 0:
+        return {'index': int(i), 'time': segment['time'][i], 'lat': segment['lat'][i], 'deviation': 0}
     
-    return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
\ No newline at end of file
+    return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
@@ -1,10 +1,54 @@
 # [file name]: detect_b2i.py
 import numpy as np
-from scipy.ndimage import uniform_filter1d
+from scipy.ndimage import uniform_filter1d, maximum_filter1d
 
-def detect_b2i(segment, energy_channels):
+def flujo_suavizado_b2i(segment, energy_channels, offsets=None):
+    """
+    Flujo parcial de iones 3-30 keV y su log10 suavizado a 2 s (paper p.5).
+
+    Con offsets, segment contiene varios segmentos concatenados (un lote): el
+    suavizado se aplica a una matriz con un segmento por fila, de modo que cada
+    segmento se filtra igual que por separado.
+
+    Returns:
+        tuple: (partial_flux, smoothed_flux), o (None, None) sin canales 3-30 keV
+    """
+    energy_mask = (energy_channels >= 3000) & (energy_channels <= 30000)
+    if not np.any(energy_mask):
+        return None, None
+    
+    partial_flux = np.sum(segment['ion_diff_flux'][:, energy_mask], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_flux = np.log10(partial_flux + 1e-10)
+    if offsets is None:
+        return partial_flux, uniform_filter1d(log_flux, size=2)
+    
+    longitudes = np.diff(offsets)
+    filas = np.repeat(np.arange(len(longitudes)), longitudes)
+    columnas = np.arange(offsets[-1]) - np.repeat(offsets[:-1], longitudes)
+    matriz = np.zeros((len(longitudes), max(int(longitudes.max(initial=0)), 1)))
+    matriz[filas, columnas] = log_flux
+    smoothed_flux = uniform_filter1d(matriz, size=2, axis=1)[filas, columnas]
+    return partial_flux, smoothed_flux
+
+def maximos_siguientes_b2i(smoothed_flux):
+    """
+    Máximo de la ventana [k, k+9] para cada k y si la ventana contiene NaN.
+    Los NaN se excluyen del máximo y se marcan aparte para descartar las
+    ventanas que los contienen (como np.max).
+    """
+    es_nan = np.isnan(smoothed_flux)
+    maximos = maximum_filter1d(np.where(es_nan, -np.inf, smoothed_flux), size=10, origin=-5)
+    con_nan = maximum_filter1d(es_nan.astype(np.uint8), size=10, origin=-5).astype(bool)
+    return maximos, con_nan
+
+def detect_b2i(segment, energy_channels, partial_flux=None, smoothed_flux=None, maximos=None,
+               con_nan=None):
     """
     Boundary 2i (ion isotropy boundary) - CORREGIDO SEGÚN PAPER p.5
+
+    partial_flux, smoothed_flux (flujo_suavizado_b2i) y maximos, con_nan
+    (maximos_siguientes_b2i) pueden venir precalculados del lote.
     """
     # Validación de datos
     required_keys = ['ion_diff_flux', 'time', 'lat']
@@ -12,56 +56,44 @@ def detect_b2i(segment, energy_channels):
         if key not in segment or len(segment[key]) == 0:
             return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
     
-    # Máscara para iones 3-30 keV (paper p.5)
-    energy_mask = (energy_channels >= 3000) & (energy_channels <= 30000)
-    if not np.any(energy_mask):
-        return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
-    
-    # Calcular flujo parcial
-    partial_flux = np.sum(segment['ion_diff_flux'][:, energy_mask], axis=1)
+    # Flujo parcial 3-30 keV (paper p.5) y suavizado de 2s exacto como paper
+    if partial_flux is None:
+        partial_flux, smoothed_flux = flujo_suavizado_b2i(segment, energy_channels)
+        if partial_flux is None:
+            return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
     
     if np.all(partial_flux <= 0) or np.all(np.isnan(partial_flux)):
         return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
     
-    log_flux = np.log10(partial_flux + 1e-10)
+    n = len(smoothed_flux)
     
-    # Suavizado de 2s exacto como paper
-    smoothed_flux = uniform_filter1d(log_flux, size=2)
+    if n < 13:
+        return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
     
-    n = len(smoothed_flux)
+    # Máximo de los próximos 10s para cada índice: la ventana [k, k+9] del
+    # filtro evaluada en k = i+1
+    if maximos is None:
+        maximos, con_nan = maximos_siguientes_b2i(smoothed_flux)
     
-    candidates = []
+    idx = np.arange(2, n - 10)  # paper: comparar con próximos 10s
+    current_val = smoothed_flux[idx]
     
-    for i in range(2, n - 10):  # paper: comparar con próximos 10s
-        current_val = smoothed_flux[i]
-        
-        # UMBRAL MÍNIMO: 10.5 (paper p.5)
-        if current_val < 10.5:
-            continue
-            
-        # Verificar que sea máximo comparando con próximos 10s
-        future_max = np.max(smoothed_flux[i+1:min(n, i+11)])
-        if current_val >= future_max:
-            candidates.append(i)
+    # UMBRAL MÍNIMO: 10.5 (paper p.5) y máximo respecto a los próximos 10s
+    es_candidato = ((current_val >= 10.5) &
+                    (current_val >= maximos[idx + 1]) & ~con_nan[idx + 1])
+    candidates = idx[es_candidato]
     
-    # Filtrar eventos "nose" (paper p.5)
-    valid_candidates = []
-    for i, candidate in enumerate(candidates):
-        is_nose_event = False
-        
-        # Buscar si hay un máximo global más poleward
-        for j in range(i+1, len(candidates)):
-            if (candidates[j] > candidate and 
-                smoothed_flux[candidates[j]] > smoothed_flux[candidate]):
-                is_nose_event = True
-                break
-                
-        if not is_nose_event:
-            valid_candidates.append(candidate)
+    # Filtrar eventos "nose" (paper p.5): se descarta un candidato si algún
+    # candidato posterior (más poleward) tiene un flujo mayor
+    valores = smoothed_flux[candidates]
+    maximo_posterior = np.full(len(candidates), -np.inf)
+    if len(candidates) > 1:
+        maximo_posterior[:-1] = np.maximum.accumulate(valores[::-1])[::-1][1:]
+    valid_candidates = candidates[~(maximo_posterior > valores)]
     
-    if valid_candidates:
+    if len(valid_candidates) > 0:
         # Tomar el candidato más ecuatorial (menor índice)
-        best_candidate = min(valid_candidates)
+        best_candidate = int(valid_candidates[0])
         return {
             'index': best_candidate, 
             'time': segment['time'][best_candidate], 
@@ -1,4 +1,5 @@
 import numpy as np
+from .funciones_auxiliares.eventos_aceleracion import eventos_aceleracion
 
 def validate_segment_data(segment, required_keys):
     """Función de validación consistente con otros scripts"""
@@ -15,9 +16,12 @@ def validate_segment_data(segment, required_keys):
     
     return True, "OK"
 
-def detect_b3(segment, energy_channels):
+def detect_b3(segment, energy_channels, acceleration_mask=None):
     """
     Boundaries 3a,b (electron acceleration events) - CORREGIDO SEGÚN PAPER p.5
+
+    acceleration_mask permite pasar la clasificación ya calculada para el
+    segmento (por ejemplo por la detección por lotes); si es None se calcula aquí.
     """
     # Validación de datos usando función consistente
     required_keys = ['ele_diff_flux', 'time', 'lat']
@@ -28,59 +32,24 @@ def detect_b3(segment, energy_channels):
             'b3b': {'index': None, 'time': None, 'lat': None, 'deviation': 0}
         }
     
-    spectra = segment['ele_diff_flux']
     times = segment['time']
     lats = segment['lat']
     
-    acceleration_indices = []
-    
-    # Umbrales exactos del paper Newell et al. 1996
-    PEAK_RATIO = 5.0    # "single channel with differential energy flux 5 times larger"
-    DROP_RATIO = 10.0   # "sharp drop by at least a factor of 10"
-    
-    for i, spectrum in enumerate(spectra):
-        # Validación más robusta del espectro
-        if spectrum is None or len(spectrum) == 0:
-            continue
-            
-        try:
-            # Limpiar NaN y asegurar valores positivos
-            clean_spectrum = np.nan_to_num(spectrum, nan=0.0, posinf=0.0, neginf=0.0)
-            clean_spectrum = np.maximum(clean_spectrum, 0.0)
-            
-            # Verificar que haya datos significativos
-            if np.max(clean_spectrum) <= 1e-10:
-                continue
-            
-            max_idx = np.argmax(clean_spectrum)
-            max_val = clean_spectrum[max_idx]
-            
-            # Criterio 1: Pico monoenergético (5x mayor que cualquier otro canal)
-            other_vals = np.delete(clean_spectrum, max_idx)
-            other_max = np.max(other_vals) if len(other_vals) > 0 else 0.0
-            
-            if other_max > 0 and max_val / other_max >= PEAK_RATIO:
-                acceleration_indices.append(i)
-                continue
-                
-            # Criterio 2: Caída brusca sobre el pico (factor 10)
-            if max_idx < len(clean_spectrum) - 1:
-                next_val = clean_spectrum[max_idx + 1]
-                if next_val > 0 and max_val / next_val >= DROP_RATIO:
-                    acceleration_indices.append(i)
-                    
-        except (ValueError, IndexError, RuntimeError):
-            continue
+    # Clasificación de todos los espectros a la vez
+    if acceleration_mask is None:
+        acceleration_mask = eventos_aceleracion(segment['ele_diff_flux'])
+    acceleration_indices = np.flatnonzero(acceleration_mask)
     
-    if not acceleration_indices:
+    if len(acceleration_indices) == 0:
         return {
             'b3a': {'index': None, 'time': None, 'lat': None, 'deviation': 0},
-            'b3b': {'index': None, 'time': None, 'lat': None, 'deviation': 0}
+            'b3b': {'index': None, 'time': None, 'lat': None, 'deviation': 0},
+            'acceleration_mask': acceleration_mask
         }
     
     # b3a: más ecuatorial, b3b: más polar
-    b3a_idx = min(acceleration_indices)
-    b3b_idx = max(acceleration_indices)
+    b3a_idx = int(acceleration_indices[0])
+    b3b_idx = int(acceleration_indices[-1])
     
     return {
         'b3a': {
@@ -94,5 +63,6 @@ def detect_b3(segment, energy_channels):
             'time': times[b3b_idx], 
             'lat': lats[b3b_idx], 
             'deviation': 0
-        }
+        },
+        'acceleration_mask': acceleration_mask
     }
\ No newline at end of file
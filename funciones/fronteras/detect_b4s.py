@@ -1,42 +1,72 @@
 # [file name]: detect_b4s.py
 import numpy as np
-from scipy.stats import pearsonr
-import warnings
-from scipy.stats import ConstantInputWarning
+from .funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+from .funciones_auxiliares.correlaciones import correlacion_promedio
+from .funciones_auxiliares.ventanas import sumas_ventana
 
-def safe_pearsonr(x, y):
+def buscar_b4s(avg_correlations, lista_thresholds, indices_previos):
     """
-    Calcula correlación de Pearson de forma segura, manejando arrays constantes
+    Búsqueda vectorizada de b4s sobre un mismo <r> para varios conjuntos de
+    umbrales (min_corr, sum_threshold, n_sum) a la vez.
+
+    Args:
+        avg_correlations (array): <r> por índice (correlacion_promedio)
+        lista_thresholds (list): Umbrales de PAPER_THRESHOLDS['b4s'], uno por conjunto
+        indices_previos (array): Por conjunto, el mayor índice entre b2e y b2i
+            (-1 si ninguno se detectó); la búsqueda empieza un punto después
+
+    Returns:
+        array: Índice de b4s por conjunto (-1 si no se detectó)
     """
-    # Filtrar NaN e infinitos
-    mask = ~(np.isnan(x) | np.isnan(y) | np.isinf(x) | np.isinf(y))
-    x_clean = x[mask]
-    y_clean = y[mask]
-    
-    # Verificar longitud mínima
-    if len(x_clean) < 2 or len(y_clean) < 2:
-        return 0.0
-        
-    # Verificar si los arrays son constantes (sin variabilidad)
-    x_std = np.std(x_clean)
-    y_std = np.std(y_clean)
-    
-    if x_std < 1e-10 or y_std < 1e-10:
-        return 0.0
-    
-    # Calcular correlación suprimiendo warnings de arrays constantes
-    try:
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=ConstantInputWarning)
-            r_value, _ = pearsonr(x_clean, y_clean)
-            return r_value if not np.isnan(r_value) else 0.0
-    except:
-        return 0.0
-
-def detect_b4s(segment, b2e_idx, b2i_idx):
+    avg_correlations = np.asarray(avg_correlations, dtype=np.float64)
+    n = len(avg_correlations)
+    resultado = np.full(len(lista_thresholds), -1, dtype=np.int64)
+    if n < 12:
+        return resultado
+
+    start_idx = np.maximum(np.asarray(indices_previos, dtype=np.int64), 0) + 1
+    posiciones = np.arange(n)
+
+    grupos = {}
+    for p, t in enumerate(lista_thresholds):
+        grupos.setdefault(t['n_sum'], []).append(p)
+
+    for n_sum, conjuntos in grupos.items():
+        conjuntos = np.array(conjuntos)
+
+        # sumas[i] = suma de avg_correlations[i-6:i+1]; NaN si la ventana tiene NaN
+        sumas = np.full(n, np.nan)
+        sumas[n_sum - 1:] = sumas_ventana(avg_correlations, n_sum)
+
+        min_corr = np.array([lista_thresholds[p]['min_corr'] for p in conjuntos],
+                            dtype=np.float64)[:, None]
+        sum_threshold = np.array([lista_thresholds[p]['sum_threshold'] for p in conjuntos],
+                                 dtype=np.float64)[:, None]
+
+        # Último índice <= i con <r> > 0.60 (el más poleward del grupo final)
+        sobre_min = np.where(avg_correlations > min_corr, posiciones, -1)
+        ultimo_sobre_min = np.maximum.accumulate(sobre_min, axis=1)
+
+        candidatos = ((sumas < sum_threshold) &
+                      (ultimo_sobre_min > posiciones - n_sum) &
+                      (posiciones >= start_idx[conjuntos][:, None] + n_sum - 1) &
+                      (posiciones < n - n_sum + 1))
+        # Necesitamos espacio para el algoritmo
+        candidatos &= (start_idx[conjuntos] < n - 12)[:, None]
+
+        hay = np.any(candidatos, axis=1)
+        filas = np.flatnonzero(hay)
+        resultado[conjuntos[hay]] = ultimo_sobre_min[filas, np.argmax(candidatos[hay], axis=1)]
+
+    return resultado
+
+def detect_b4s(segment, b2e_idx, b2i_idx, avg_correlations=None):
     """
     Boundary 4s (structured/unstructured transition) - CORREGIDO SEGÚN PAPER p.6
     VERSIÓN MEJORADA: Maneja arrays constantes y datos inválidos
+
+    avg_correlations permite pasar el <r> ya calculado para el segmento (por
+    ejemplo por la detección por lotes); si es None se calcula aquí.
     """
     # Validación de datos más robusta
     required_keys = ['ele_diff_flux', 'time', 'lat', 'ele_energy_flux']
@@ -66,55 +96,18 @@ def detect_b4s(segment, b2e_idx, b2i_idx):
     if start_idx >= n - 12:  # Necesitamos espacio para el algoritmo
         return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
     
+    thresholds = PAPER_THRESHOLDS['b4s']
+    n_corr = thresholds['n_corr']
+
     # 1. Calcular coeficientes de correlación (paper: 5 espectros anteriores)
-    avg_correlations = np.full(n, np.nan)  # Usar full en lugar de zeros para inicializar con NaN
-    
-    for i in range(5, n):  # Necesitamos al menos 5 puntos anteriores
-        current_spectrum = spectra[i]
-        correlations = []
-        
-        for j in range(1, 6):  # 5 espectros anteriores
-            if i - j >= 0:
-                prev_spectrum = spectra[i - j]
-                
-                # Usar la función segura de correlación
-                r_value = safe_pearsonr(current_spectrum, prev_spectrum)
-                
-                if r_value != 0.0:  # Solo agregar si es válido
-                    correlations.append(r_value)
-        
-        if correlations:
-            avg_corr = np.mean(correlations)
-            
-            # Suprimir para flujos subvisuales (paper p.6)
-            if energy_flux[i] < 10.7:  # 0.25 erg/cm² s
-                avg_corr *= 0.5
-                
-            avg_correlations[i] = avg_corr
-    
+    if avg_correlations is None:
+        avg_correlations = correlacion_promedio(spectra, energy_flux, n_corr,
+                                                thresholds['subvisual_thresh'])
+
     # 2. Buscar transición (paper: suma de 7 <r> consecutivos < 4.0)
-    b4s_index = None
-    
-    for i in range(start_idx + 6, n - 6):
-        # Calcular suma de 7 correlaciones consecutivas
-        window = avg_correlations[i-6:i+1]
-        
-        # Verificar que no hay NaN en la ventana
-        if np.any(np.isnan(window)):
-            continue
-            
-        sum_r = np.sum(window)
-        
-        if sum_r < 4.0:
-            # Encontrar el más poleward con <r> > 0.60 en el grupo final
-            for j in range(i, i-7, -1):
-                if j < n and not np.isnan(avg_correlations[j]) and avg_correlations[j] > 0.60:
-                    b4s_index = j
-                    break
-                    
-            if b4s_index is not None:
-                break
-    
+    i = buscar_b4s(avg_correlations, [thresholds], [start_idx - 1])[0]
+    b4s_index = None if i < 0 else int(i)
+
     if b4s_index is not None and b4s_index < n:
         return {
             'index': b4s_index,
@@ -1,17 +1,29 @@
 # [file name]: detect_b5_ei.py
 import numpy as np
+from .funciones_auxiliares.ventanas import medias_ventana
 
-def detect_b5(segment, particle_type='electron'):
+# Paper: "previous 12 s" vs "succeeding 12 s"
+VENTANA_B5 = 12
+
+# Paper: 35s para electrones, 30s para iones
+LOOKAHEAD_B5 = {'electron': 35, 'ion': 30}
+
+def detect_b5(segment, particle_type='electron', log_flux=None, medias_12=None,
+              medias_futuras=None, desde=None, hasta=None):
     """
     Boundaries 5e/5i - CORREGIDO SEGÚN PAPER p.6
+
+    log_flux y las medias móviles de VENTANA_B5 y del lookahead pueden venir
+    precalculados (del lote o de la detección en línea). desde/hasta limitan
+    los índices candidatos a [desde, hasta).
     """
     if particle_type == 'electron':
         name = 'b5e'
-        lookahead = 35  # Paper: 35s para electrones
+        lookahead = LOOKAHEAD_B5['electron']
         min_flux_threshold = 10.5  # Paper: "below about 9.7 for ions or 10.5 for electrons"
     else:
         name = 'b5i' 
-        lookahead = 30  # Paper: 30s para iones
+        lookahead = LOOKAHEAD_B5['ion']
         min_flux_threshold = 9.7
     
     # Buscar flujo disponible
@@ -24,10 +36,11 @@ def detect_b5(segment, particle_type='electron'):
     lats = segment['lat']
     
     # Convertir a log10
-    log_flux = np.log10(np.maximum(flux, 1e-10))
+    if log_flux is None:
+        log_flux = np.log10(np.maximum(flux, 1e-10))
     
     n = len(log_flux)
-    window = 12  # Paper: "previous 12 s" vs "succeeding 12 s"
+    window = VENTANA_B5
     
     if n < window * 2 + lookahead:
         return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
@@ -35,24 +48,30 @@ def detect_b5(segment, particle_type='electron'):
     # Buscar caída de factor 4 (en escala log: log10(4) ≈ 0.602)
     required_drop = np.log10(4.0)
     
-    for i in range(window, n - window - lookahead):
-        prev_avg = np.mean(log_flux[i-window:i])
-        next_avg = np.mean(log_flux[i:i+window])
-        
-        drop_magnitude = prev_avg - next_avg
-        
-        if drop_magnitude >= required_drop:
-            # Verificar que permanezca bajo (paper p.6)
-            future_fluxes = log_flux[i:min(n, i+lookahead)]
-            future_avg = np.mean(future_fluxes)
-            
-            if future_avg < min_flux_threshold:
-                return {
-                    'index': i, 
-                    'time': times[i], 
-                    'lat': lats[i], 
-                    'deviation': 0,
-                    'drop_magnitude': drop_magnitude
-                }
+    # Medias móviles de 12s: medias_12[k] = media de log_flux[k:k+12], de modo
+    # que el promedio previo de i es medias_12[i-12] y el siguiente medias_12[i]
+    if medias_12 is None:
+        medias_12 = medias_ventana(log_flux, window)
+    if medias_futuras is None:
+        medias_futuras = medias_ventana(log_flux, lookahead)
+    
+    idx = np.arange(window if desde is None else max(desde, window),
+                    n - window - lookahead if hasta is None else min(hasta, n - window - lookahead))
+    drop_magnitude = medias_12[idx - window] - medias_12[idx]
+    
+    # Caída de factor 4 y que permanezca bajo (paper p.6)
+    candidatos = ((drop_magnitude >= required_drop) &
+                  (medias_futuras[idx] < min_flux_threshold))
+    
+    if np.any(candidatos):
+        k = int(np.argmax(candidatos))
+        i = int(idx[k])
+        return {
+            'index': i, 
+            'time': times[i], 
+            'lat': lats[i], 
+            'deviation': 0,
+            'drop_magnitude': drop_magnitude[k]
+        }
     
     return {'index': None, 'time': None, 'lat': None, 'deviation': 0}
\ No newline at end of file
@@ -1,7 +1,10 @@
 # [file name]: detect_b6.py
-def detect_b6(segment, b5e_idx):
+def detect_b6(segment, b5e_idx, desde=None, hasta=None):
     """
     Boundary 6 (subvisual drizzle edge) - CORREGIDO SEGÚN PAPER p.7
+
+    desde/hasta limitan los índices revisados a [desde, hasta), p.ej. a las
+    muestras nuevas en la detección en línea.
     """
     # Validación de datos
     required_keys = ['ele_energy_flux', 'ion_energy_flux', 'time', 'lat']
@@ -21,9 +24,10 @@ def detect_b6(segment, b5e_idx):
     MIN_FLUX_I = 9.6   # jE drops below 9.6
     
     # Buscar desde b5e hacia el polo
-    start_idx = b5e_idx + 1
+    start_idx = b5e_idx + 1 if desde is None else max(desde, b5e_idx + 1)
+    end_idx = len(je) if hasta is None else min(hasta, len(je))
     
-    for i in range(start_idx, len(je)):
+    for i in range(start_idx, end_idx):
         current_je = je[i]
         current_ji = ji[i]
         
@@ -3,4 +3,8 @@
 # — Funciones de carga y filtrado —
 from .detect_b5 import detect_b5
 from .has_monoenergetic_peak import has_monoenergetic_peak
-from .is_polar_rain import is_polar_rain
\ No newline at end of file
+from .is_polar_rain import is_polar_rain
+from .ventanas import sumas_ventana, medias_ventana, medias_ventana_truncada
+from .salto_b1 import buscar_salto_b1, buscar_saltos_b1
+from .correlaciones import correlaciones_desfasadas, correlacion_promedio
+from .eventos_aceleracion import eventos_aceleracion
@@ -0,0 +1,110 @@
+# correlaciones.py - motor vectorizado de correlaciones entre espectros desfasados
+import numpy as np
+
+# Desviación estándar mínima para considerar que un espectro no es constante
+STD_MINIMA = 1e-10
+
+
+def _pearson_pares(X, Y):
+    """
+    Correlación de Pearson fila a fila entre X e Y (k, n_canales), usando solo
+    los canales finitos en ambos espectros. Devuelve 0 donde quedan menos de
+    2 canales o alguno de los espectros es constante.
+    """
+    M = np.isfinite(X) & np.isfinite(Y)
+    cnt = M.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        xm = np.where(M, X, 0.0).sum(axis=1) / cnt
+        ym = np.where(M, Y, 0.0).sum(axis=1) / cnt
+        dx = np.where(M, X - xm[:, None], 0.0)
+        dy = np.where(M, Y - ym[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        syy = (dy * dy).sum(axis=1)
+        r = (dx * dy).sum(axis=1) / np.sqrt(sxx * syy)
+        valido = ((cnt >= 2) &
+                  (np.sqrt(sxx / cnt) >= STD_MINIMA) &
+                  (np.sqrt(syy / cnt) >= STD_MINIMA))
+    r = np.clip(np.nan_to_num(r, nan=0.0), -1.0, 1.0)
+    return np.where(valido, r, 0.0)
+
+
+def correlaciones_desfasadas(spectra, n_lags=5):
+    """
+    Correlación de Pearson de cada espectro con los 'n_lags' anteriores.
+
+    La matriz se estandariza una sola vez (media cero, norma uno por fila) y
+    las correlaciones de cada desfase son productos punto por filas. Los pares
+    en los que algún espectro tiene canales NaN/inf se calculan aparte con una
+    máscara por par, igual que safe_pearsonr.
+
+    Args:
+        spectra (array): Espectros (n_tiempo, n_canales)
+        n_lags (int): Número de espectros anteriores
+
+    Returns:
+        array: (n_tiempo, n_lags), columna j-1 = r(spectra[i], spectra[i-j]);
+            0 donde la correlación no es válida o el desfase sale del segmento
+    """
+    spectra = np.asarray(spectra, dtype=np.float64)
+    n, n_canales = spectra.shape
+    R = np.zeros((n, n_lags))
+    if n_canales < 2:
+        return R
+
+    completas = np.all(np.isfinite(spectra), axis=1)
+
+    # Estandarizar una sola vez las filas sin valores inválidos
+    Xc = np.where(completas[:, None], spectra, 0.0)
+    Xc = Xc - Xc.mean(axis=1, keepdims=True)
+    ss = (Xc * Xc).sum(axis=1)
+    no_constante = completas & (np.sqrt(ss / n_canales) >= STD_MINIMA)
+    Z = np.zeros_like(Xc)
+    Z[no_constante] = Xc[no_constante] / np.sqrt(ss[no_constante])[:, None]
+
+    for j in range(1, n_lags + 1):
+        if j >= n:
+            break
+        r = np.clip((Z[j:] * Z[:-j]).sum(axis=1), -1.0, 1.0)
+        r = np.where(no_constante[j:] & no_constante[:-j], r, 0.0)
+
+        # Pares con algún espectro incompleto: correlación con máscara por par
+        incompletos = np.flatnonzero(~(completas[j:] & completas[:-j]))
+        if len(incompletos) > 0:
+            r[incompletos] = _pearson_pares(spectra[j:][incompletos], spectra[:-j][incompletos])
+
+        R[j:, j - 1] = r
+    return R
+
+
+def correlacion_promedio(spectra, energy_flux, n_lags=5, subvisual_thresh=10.7):
+    """
+    <r> de cada espectro con los 'n_lags' anteriores (ignorando correlaciones
+    nulas/no válidas), amortiguado por 0.5 donde el flujo es subvisual.
+
+    Returns:
+        array: <r> por índice; NaN donde no hay correlaciones válidas o i < n_lags
+    """
+    n = len(spectra)
+    promedio = np.full(n, np.nan)
+    if n <= n_lags:
+        return promedio
+
+    R = correlaciones_desfasadas(spectra, n_lags)[n_lags:]
+
+    # Suma en el mismo orden que np.mean sobre la lista de correlaciones válidas
+    suma = np.zeros(len(R))
+    cuenta = np.zeros(len(R), dtype=int)
+    for j in range(n_lags):
+        validas = R[:, j] != 0.0
+        suma = np.where(validas, suma + R[:, j], suma)
+        cuenta += validas
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = np.where(cuenta > 0, suma / cuenta, np.nan)
+
+    # Suprimir para flujos subvisuales (paper p.6)
+    subvisual = np.asarray(energy_flux)[n_lags:n] < subvisual_thresh
+    media = np.where(subvisual, media * 0.5, media)
+
+    promedio[n_lags:] = media
+    return promedio
@@ -0,0 +1,53 @@
+import numpy as np
+
+# Umbrales exactos del paper Newell et al. 1996
+PEAK_RATIO = 5.0    # "single channel with differential energy flux 5 times larger"
+DROP_RATIO = 10.0   # "sharp drop by at least a factor of 10"
+
+
+def eventos_aceleracion(spectra, peak_ratio=PEAK_RATIO, drop_ratio=DROP_RATIO):
+    """
+    Clasifica todos los espectros de electrones como eventos de aceleración
+    (pico monoenergético) o no, operando sobre la matriz completa.
+
+    Un espectro es evento si su canal máximo es 'peak_ratio' veces mayor que
+    cualquier otro canal, o si el canal siguiente al máximo cae en un factor
+    'drop_ratio'.
+
+    Args:
+        spectra (array): Flujo diferencial (n_tiempo, n_canales)
+
+    Returns:
+        array: Máscara booleana (n_tiempo,) de eventos de aceleración
+    """
+    spectra = np.asarray(spectra, dtype=np.float64)
+    if spectra.ndim != 2 or spectra.shape[1] == 0:
+        return np.zeros(len(spectra), dtype=bool)
+
+    n, n_canales = spectra.shape
+
+    # Limpiar NaN y asegurar valores positivos
+    clean = np.maximum(np.nan_to_num(spectra, nan=0.0, posinf=0.0, neginf=0.0), 0.0)
+
+    filas = np.arange(n)
+    max_idx = np.argmax(clean, axis=1)
+    max_val = clean[filas, max_idx]
+
+    # Verificar que haya datos significativos
+    significativo = max_val > 1e-10
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Criterio 1: Pico monoenergético (5x mayor que cualquier otro canal).
+        # El máximo de los demás canales es el segundo valor de cada fila.
+        if n_canales > 1:
+            other_max = np.partition(clean, n_canales - 2, axis=1)[:, n_canales - 2]
+        else:
+            other_max = np.zeros(n)
+        pico = (other_max > 0) & (max_val / other_max >= peak_ratio)
+
+        # Criterio 2: Caída brusca sobre el pico (factor 10)
+        tiene_siguiente = max_idx < n_canales - 1
+        next_val = clean[filas, np.minimum(max_idx + 1, n_canales - 1)]
+        caida = tiene_siguiente & (next_val > 0) & (max_val / next_val >= drop_ratio)
+
+    return significativo & (pico | caida)
@@ -0,0 +1,95 @@
+import numpy as np
+from .ventanas import medias_ventana, medias_ventana_truncada
+
+def medias_salto_b1(log_flux, offsets=None):
+    """
+    Medias móviles de b1e/b1i, independientes de los umbrales: ventanas de 3
+    muestras y ventanas de 6 truncadas al final del segmento. Con offsets
+    (lote), las medias de 6 se truncan al final de cada segmento y las de 3
+    que cruzan de un segmento al siguiente no se deben usar.
+    """
+    return medias_ventana(log_flux, 3), medias_ventana_truncada(log_flux, 6, offsets)
+
+def buscar_saltos_b1(log_flux, lista_thresholds, desfase_siguiente=0, medias=None, desde=3,
+                     hasta=None):
+    """
+    Búsqueda vectorizada del primer índice que cumple los criterios de b1e/b1i
+    (flujo muy alto, o salto sobre el fondo comparando 3 muestras anteriores
+    con 3 siguientes) para varios conjuntos de umbrales a la vez. Las medias
+    móviles se calculan una vez; las comparaciones se evalúan sobre una matriz
+    (conjunto, índice).
+
+    Args:
+        log_flux (array): log10 del flujo parcial en los canales de baja energía
+        lista_thresholds (list): Umbrales de PAPER_THRESHOLDS para la frontera,
+            uno por conjunto
+        desfase_siguiente (int): Inicio de la ventana "siguiente" relativo a i
+            (0 para b1e: [i, i+3); 1 para b1i: [i+1, i+4))
+        medias (tuple): Resultado de medias_salto_b1 si ya se calculó (p.ej. en un lote)
+        desde, hasta (int): Índices candidatos [desde, hasta), dentro de [3, n-3)
+            (p.ej. solo los que completaron su ventana en la detección en línea)
+
+    Returns:
+        array: Índice de la frontera por conjunto (-1 si ningún índice cumple)
+    """
+    log_flux = np.asarray(log_flux, dtype=np.float64)
+    n = len(log_flux)
+    resultado = np.full(len(lista_thresholds), -1, dtype=np.int64)
+    idx = np.arange(max(desde, 3), n - 3 if hasta is None else min(hasta, n - 3))
+    if n < 7 or len(lista_thresholds) == 0 or len(idx) == 0:
+        return resultado
+
+    def umbral(clave):
+        return np.array([t[clave] for t in lista_thresholds], dtype=np.float64)[:, None]
+
+    # Fondo (primeros segundos), una vez por ventana distinta
+    ventanas = [t['background_window'] for t in lista_thresholds]
+    fondos = {w: np.mean(log_flux[:w]) for w in set(ventanas)}
+    background = np.array([fondos[w] for w in ventanas])[:, None]
+
+    medias_3, medias_6 = medias_salto_b1(log_flux) if medias is None else medias
+    prev_avg = medias_3[idx - 3]
+    next_avg = medias_3[idx + desfase_siguiente]
+    future_avg = medias_6[idx]
+
+    # Muestras i, i+1 e i+2 sobre el fondo, solo en el tramo de los candidatos
+    sobre_fondo = log_flux[idx[0]:idx[-1] + 3] > background
+    j = idx - idx[0]
+    tres_sobre_fondo = sobre_fondo[:, j] & sobre_fondo[:, j + 1] & sobre_fondo[:, j + 2]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        jump_ratio = next_avg / prev_avg
+
+    flux_i = log_flux[idx]
+
+    # Criterio 1: Flujo muy alto (detección directa)
+    muy_alto = flux_i >= umbral('very_high_flux')
+
+    # Criterio 2: Salto significativo sobre fondo
+    required_jump = np.where(flux_i >= umbral('high_flux_thresh'),
+                             umbral('high_flux_jump'), umbral('min_jump'))
+    salto = ((jump_ratio >= required_jump) &
+             (next_avg > background + 0.3) &
+             tres_sobre_fondo &
+             (future_avg > background + 0.2))
+
+    # Los índices con promedio anterior <= 0 se descartan (división no válida)
+    candidatos = ~(prev_avg <= 0) & (muy_alto | salto)
+    # Segmentos demasiado cortos para la ventana de fondo del conjunto
+    candidatos &= (n >= np.array(ventanas) + 6)[:, None]
+
+    hay = np.any(candidatos, axis=1)
+    resultado[hay] = idx[np.argmax(candidatos[hay], axis=1)]
+    return resultado
+
+
+def buscar_salto_b1(log_flux, thresholds, desfase_siguiente=0, medias=None):
+    """
+    Primer índice que cumple los criterios de b1e/b1i para un conjunto de
+    umbrales (ver buscar_saltos_b1).
+
+    Returns:
+        int: Índice de la frontera o None si ningún índice cumple
+    """
+    i = buscar_saltos_b1(log_flux, [thresholds], desfase_siguiente, medias)[0]
+    return None if i < 0 else int(i)
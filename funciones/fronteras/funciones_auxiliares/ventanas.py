@@ -0,0 +1,71 @@
+# ventanas.py - medias móviles vectorizadas
+import numpy as np
+
+# Tamaño de bloque de la suma por pares de NumPy
+_BLOQUE_PAIRWISE = 128
+
+
+def sumas_ventana(x, ancho):
+    """
+    Suma de cada ventana x[k:k+ancho] para todos los k (longitud n-ancho+1).
+
+    Para ancho <= 128 las sumas se acumulan con slices desplazados en el mismo
+    orden que usa np.sum/np.mean sobre un slice contiguo (8 acumuladores y
+    reducción por pares), por lo que el resultado es idéntico bit a bit al de
+    np.mean(x[k:k+ancho]) * ancho. Para ventanas mayores se usan sumas
+    acumuladas, con diferencias de redondeo despreciables.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    m = len(x) - ancho + 1
+    if ancho <= 0 or m <= 0:
+        return np.empty(0)
+
+    def desplazado(j):
+        return x[j:j + m]
+
+    if ancho < 8:
+        suma = desplazado(0)
+        for j in range(1, ancho):
+            suma = suma + desplazado(j)
+        return suma
+
+    if ancho <= _BLOQUE_PAIRWISE:
+        r = [desplazado(j) for j in range(8)]
+        for i in range(8, ancho - ancho % 8, 8):
+            r = [r[j] + desplazado(i + j) for j in range(8)]
+        suma = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+        for i in range(ancho - ancho % 8, ancho):
+            suma = suma + desplazado(i)
+        return suma
+
+    acumulada = np.concatenate(([0.0], np.cumsum(x)))
+    return acumulada[ancho:] - acumulada[:-ancho]
+
+
+def medias_ventana(x, ancho):
+    """
+    Media de cada ventana x[k:k+ancho] para todos los k (longitud n-ancho+1).
+    Equivale a [np.mean(x[k:k+ancho]) for k in range(n-ancho+1)].
+    """
+    return sumas_ventana(x, ancho) / ancho
+
+
+def medias_ventana_truncada(x, ancho, offsets=None):
+    """
+    Media de x[k:min(k+ancho, n)] para todos los k (longitud n): al final del
+    array la ventana se acorta en lugar de desaparecer.
+
+    Con offsets, x contiene varios segmentos concatenados y las ventanas se
+    acortan al final de cada segmento en lugar de cruzar al siguiente.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    medias = np.empty(n)
+    completas = max(n - ancho + 1, 0)
+    medias[:completas] = medias_ventana(x, ancho)
+    if offsets is None:
+        offsets = (0, n)
+    for inicio, fin in zip(offsets[:-1], offsets[1:]):
+        for k in range(max(fin - ancho + 1, inicio), fin):
+            medias[k] = np.mean(x[k:fin])
+    return medias
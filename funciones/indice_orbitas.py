@@ -0,0 +1,135 @@
+# indice_orbitas.py - índice persistente de pasadas aurorales por archivo
+import os
+import tempfile
+import numpy as np
+from .cache_preprocesado import hash_archivo
+from .cargar_datos_cdf import cargar_datos_cdf
+from .segmentar_orbita import segmentar_orbita
+
+# Incrementar cuando cambie el contenido del índice para invalidar los antiguos
+VERSION_INDICE = 1
+
+# Variables necesarias para construir el índice (MLT solo si el archivo la trae)
+VARIABLES_INDICE = ('SC_AACGM_LAT', 'SC_GEOCENTRIC_LAT')
+VARIABLES_INDICE_OPCIONALES = ('SC_AACGM_LTIME',)
+
+
+def ruta_indice_orbitas(archivo_cdf, directorio_resultados="results"):
+    """Ruta del índice de un archivo, identificado por el hash de su contenido"""
+    clave = hash_archivo(archivo_cdf)[:32]
+    return os.path.join(directorio_resultados, "indices", f"orbitas_v{VERSION_INDICE}_{clave}.npz")
+
+
+def construir_indice_orbitas(tiempo, sc_aacgm_lat, sc_geo_lat, mlt=None):
+    """
+    Construye el índice de pasadas aurorales a partir de los ejes del archivo.
+
+    Por pasada guarda: registros de inicio y fin (sobre el eje temporal válido
+    del archivo), sus tiempos, hemisferio ('N'/'S'), si la pasada va del
+    ecuador al polo ('ascendente', |lat| final > |lat| inicial), el índice y
+    tiempo del máximo de |latitud geocéntrica| y el MLT al inicio y al final.
+
+    Returns:
+        dict: Arrays del índice, uno por campo
+    """
+    tiempo = np.asarray(tiempo, dtype='datetime64[ns]')
+    sc_aacgm_lat = np.asarray(sc_aacgm_lat, dtype=float)
+    sc_geo_lat = np.asarray(sc_geo_lat, dtype=float)
+
+    pares = segmentar_orbita(sc_aacgm_lat, tiempo)['pares']
+    inicio = np.minimum(pares[:, 0], pares[:, 1])
+    fin = np.maximum(pares[:, 0], pares[:, 1])
+
+    # Máximo de |latitud geocéntrica| de cada pasada (pocas pasadas por archivo)
+    indice_max = np.array([i0 + int(np.argmax(np.abs(sc_geo_lat[i0:i1 + 1])))
+                           for i0, i1 in zip(inicio, fin)], dtype=np.int64)
+
+    if mlt is None:
+        mlt_inicio = mlt_fin = np.full(len(pares), np.nan)
+    else:
+        mlt = np.asarray(mlt, dtype=float)
+        mlt_inicio, mlt_fin = mlt[inicio], mlt[fin]
+
+    return {
+        'registro_inicio': inicio,
+        'registro_fin': fin,
+        't_inicio': tiempo[inicio],
+        't_fin': tiempo[fin],
+        'indice_max': indice_max,
+        't_max': tiempo[indice_max],
+        'hemisferio': np.where(sc_aacgm_lat[indice_max] >= 0, 'N', 'S'),
+        'ascendente': np.abs(sc_geo_lat[fin]) > np.abs(sc_geo_lat[inicio]),
+        'mlt_inicio': mlt_inicio,
+        'mlt_fin': mlt_fin
+    }
+
+
+def guardar_indice_orbitas(ruta, indice):
+    """Guarda el índice con escritura atómica (archivo temporal + rename)"""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix='.npz', dir=os.path.dirname(ruta))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **indice)
+        os.replace(tmp, ruta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return ruta
+
+
+def cargar_indice_orbitas(archivo_cdf, directorio_resultados="results", reconstruir=False):
+    """
+    Devuelve el índice de pasadas de un archivo: lo lee si ya existe para su
+    hash y, si no, lo construye leyendo solo las variables de posición.
+
+    Returns:
+        dict: Arrays del índice
+    """
+    ruta = ruta_indice_orbitas(archivo_cdf, directorio_resultados)
+    if not reconstruir and os.path.isfile(ruta):
+        try:
+            with np.load(ruta, allow_pickle=False) as datos:
+                return {campo: datos[campo] for campo in datos.files}
+        except (OSError, ValueError):
+            pass
+
+    datos = cargar_datos_cdf(archivo_cdf, variables=VARIABLES_INDICE,
+                             opcionales=VARIABLES_INDICE_OPCIONALES)
+    indice = construir_indice_orbitas(datos['tiempo_final'], datos['SC_AACGM_LAT'],
+                                      datos['SC_GEOCENTRIC_LAT'], datos['SC_AACGM_LTIME'])
+    guardar_indice_orbitas(ruta, indice)
+    return indice
+
+
+def consultar_pasadas(indice, hemisferio=None, horas_ut=None, inicio=None, fin=None,
+                      ascendente=None):
+    """
+    Filtra las pasadas del índice.
+
+    Args:
+        indice (dict): Índice de cargar_indice_orbitas
+        hemisferio (str): 'N' o 'S'
+        horas_ut (tuple): (h0, h1) horas UT del día; la pasada debe empezar en
+            o después de h0 y terminar antes de h1 (h1 > 24 cruza la medianoche)
+        inicio, fin (str): Ventana absoluta ISO que debe contener la pasada
+        ascendente (bool): Solo pasadas ecuador-polo (True) o polo-ecuador (False)
+
+    Returns:
+        dict: Índice con solo las pasadas seleccionadas
+    """
+    seleccion = np.ones(len(indice['t_inicio']), dtype=bool)
+    if hemisferio is not None:
+        seleccion &= indice['hemisferio'] == hemisferio.upper()
+    if ascendente is not None:
+        seleccion &= indice['ascendente'] == bool(ascendente)
+    if inicio is not None:
+        seleccion &= indice['t_inicio'] >= np.datetime64(inicio, 'ns')
+    if fin is not None:
+        seleccion &= indice['t_fin'] <= np.datetime64(fin, 'ns')
+    if horas_ut is not None:
+        h0, h1 = (np.timedelta64(int(round(h * 3600)), 's') for h in horas_ut)
+        dia = indice['t_inicio'].astype('datetime64[D]')
+        seleccion &= (indice['t_inicio'] - dia >= h0) & (indice['t_fin'] - dia < h1)
+    return {campo: valores[seleccion] for campo, valores in indice.items()}
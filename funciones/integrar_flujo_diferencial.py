@@ -1,46 +1,94 @@
 import numpy as np
 
-def integrar_flujo_diferencial(diff_flux, delta, canal1=0, canal2=6):
+# Bandas de canales (orden DESCENDENTE de energía) usadas por el pipeline
+BANDA_IONES_B2I = (0, 7)    # 30000 eV - 3000 eV (iones 3-30 keV para b2i)
+BANDA_TOTAL = (0, 19)       # 30000 eV - 30 eV (todo el rango)
+
+
+def matriz_pesos_bandas(delta, bandas, n_canales):
     """
-    Integra el flujo diferencial sobre energía 
+    Construye la matriz (n_canales, n_bandas) con el ancho energético de cada
+    canal dentro de su banda y cero fuera de ella.
     """
-    flujos_integrados = []
+    delta = np.nan_to_num(np.asarray(delta, dtype=float), nan=0.0)
+    pesos = np.zeros((n_canales, len(bandas)))
+    for b, (canal1, canal2) in enumerate(bandas):
+        pesos[canal1:canal2, b] = delta[canal1:canal2]
+    return pesos
+
+
+def integrar_bandas(diff_flux, delta, bandas):
+    """
+    Integra el flujo diferencial sobre energía para varias bandas de canales
+    en una sola pasada (espectros recortados × matriz de pesos).
+
+    Args:
+        diff_flux (array): Espectros diferenciales (n_tiempo, n_canales)
+        delta (array): Ancho energético de cada canal
+        bandas (list): Pares (canal1, canal2) con semántica de slice
+
+    Returns:
+        tuple: (flujos (n_tiempo, n_bandas), número de valores negativos)
+    """
+    diff_flux = np.asarray(diff_flux, dtype=float)
+    n_tiempo = diff_flux.shape[0]
 
     # Verificar que diff_flux no sea todo NaN
     if np.all(np.isnan(diff_flux)):
-        return np.zeros(diff_flux.shape[0])
-    
-    # Contador de valores negativos
-    total_negativos = 0
-    
-    for i, elem in enumerate(diff_flux):
-        # PROTECCIÓN CONTRA VALORES NEGATIVOS Y NaN
-        elem_clean = np.nan_to_num(elem, nan=0.0)
-        
-        # Detectar y contar valores negativos
-        if np.any(elem_clean < 0):
-            neg_count = np.sum(elem_clean < 0)
-            total_negativos += neg_count
-        
-        # Forzar valores positivos para integración
-        elem_positivo = np.maximum(elem_clean, 0)
-        
-        # Seleccionar canales y multiplicar por delta
-        selected_flux = elem_positivo[canal1:canal2]
-        selected_delta = delta[canal1:canal2]
-        
-        # Verificar que no hay NaN en la selección
-        if np.any(np.isnan(selected_flux)) or np.any(np.isnan(selected_delta)):
-            selected_flux = np.nan_to_num(selected_flux, nan=0.0)
-            selected_delta = np.nan_to_num(selected_delta, nan=0.0)
-        
-        flux_value = np.sum(selected_flux * selected_delta)
-        flujos_integrados.append(flux_value)
-    
-    resultado = np.array(flujos_integrados)
-    
+        return np.zeros((n_tiempo, len(bandas))), 0
+
+    # PROTECCIÓN CONTRA VALORES NEGATIVOS Y NaN
+    espectros = np.nan_to_num(diff_flux, nan=0.0)
+    total_negativos = int(np.count_nonzero(espectros < 0))
+    np.maximum(espectros, 0, out=espectros)
+
+    pesos = matriz_pesos_bandas(delta, bandas, espectros.shape[1])
+    flujos = espectros @ pesos
+
     # Reemplazar cualquier NaN residual
-    resultado = np.nan_to_num(resultado, nan=1e-10)
-    resultado = np.maximum(resultado, 1e-10)
-    
-    return resultado
\ No newline at end of file
+    flujos = np.nan_to_num(flujos, nan=1e-10)
+    np.maximum(flujos, 1e-10, out=flujos)
+
+    return flujos, total_negativos
+
+
+def integrar_flujo_diferencial(diff_flux, delta, canal1=0, canal2=6):
+    """
+    Integra el flujo diferencial sobre energía 
+    """
+    flujos, _ = integrar_bandas(diff_flux, delta, [(canal1, canal2)])
+    return flujos[:, 0]
+
+
+def calcular_flujos_integrados(ele_diff_flux, ion_diff_flux, delta,
+                               banda_b2i=BANDA_IONES_B2I, banda_total=BANDA_TOTAL, avisar=True):
+    """
+    Calcula de una vez los flujos integrados que usa el pipeline: iones en la
+    banda de b2i, electrones e iones totales, y sus versiones log10.
+
+    Con avisar=False no se imprime el aviso de valores negativos (los conteos
+    siguen en el resultado).
+
+    Returns:
+        dict: Flujos lineales, logarítmicos y conteo de valores negativos por especie
+    """
+    flujos_ion, negativos_ion = integrar_bandas(ion_diff_flux, delta, [banda_b2i, banda_total])
+    flujos_ele, negativos_ele = integrar_bandas(ele_diff_flux, delta, [banda_total])
+
+    if avisar and (negativos_ele or negativos_ion):
+        print(f"   ⚠️ Valores negativos recortados a 0: electrones={negativos_ele}, iones={negativos_ion}")
+
+    flujos_iones_b2i = flujos_ion[:, 0]
+    flujos_iones_totales = flujos_ion[:, 1]
+    flujos_elec_totales = flujos_ele[:, 0]
+
+    return {
+        'flujos_iones_b2i': flujos_iones_b2i,
+        'flujos_elec_totales': flujos_elec_totales,
+        'flujos_iones_totales': flujos_iones_totales,
+        'flujos_iones_log': np.log10(flujos_iones_totales + 1e-10),
+        'flujos_elec_log': np.log10(flujos_elec_totales + 1e-10),
+        'flujos_iones_b2i_log': np.log10(flujos_iones_b2i + 1e-10),
+        'negativos_ele': negativos_ele,
+        'negativos_ion': negativos_ion
+    }
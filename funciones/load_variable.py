@@ -1,12 +1,35 @@
 import numpy as np
 
-def load_variable(cdf, varname):
+def es_variable_por_registro(cdf, varname):
+    """
+    Indica si una variable del CDF varía por registro (Rec_Vary).
+    """
+    info = cdf.varinq(varname)
+    rec_vary = info['Rec_Vary'] if isinstance(info, dict) else info.Rec_Vary
+    return bool(rec_vary)
+
+def variables_disponibles(cdf):
+    """
+    Devuelve el conjunto de nombres de variables (z y r) presentes en el CDF.
+    """
+    info = cdf.cdf_info()
+    if isinstance(info, dict):
+        return set(info.get('zVariables', [])) | set(info.get('rVariables', []))
+    return set(info.zVariables) | set(info.rVariables)
+
+def load_variable(cdf, varname, startrec=None, endrec=None):
     """
     Carga una variable de un archivo CDF y aplica un filtrado basado en los atributos
     'VALIDMIN' y 'VALIDMAX', en caso de que existan.
+
+    Si se indican 'startrec'/'endrec' (inclusivos) solo se leen esos registros;
+    las variables que no varían por registro se leen completas.
     """
     attrs = cdf.varattsget(varname)
-    raw = cdf.varget(varname)
+    if (startrec is None and endrec is None) or not es_variable_por_registro(cdf, varname):
+        raw = cdf.varget(varname)
+    else:
+        raw = cdf.varget(varname, startrec=startrec or 0, endrec=endrec)
     if 'VALIDMIN' in attrs and 'VALIDMAX' in attrs:
         valid_min = attrs['VALIDMIN']
         valid_max = attrs['VALIDMAX']
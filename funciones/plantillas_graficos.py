@@ -0,0 +1,409 @@
+# plantillas_graficos.py - figuras de ciclo reutilizables (una por proceso)
+import os
+import numpy as np
+import matplotlib.dates as mdates
+import matplotlib.image as mpimg
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.font_manager import FontProperties
+from .plot_utils import (plot_cycle, plot_polar_cycle, fechas_mpl, espectrograma_raster,
+                         COLORES_FRONTERAS, ajustar_fronteras_seg2, texto_resumen, etiquetas_tiempo)
+
+# Plantillas ya construidas en este proceso (una por tipo de figura)
+_PLANTILLAS = {}
+
+# Niveles de salida: 'quicklook' (vista rápida y miniatura; la resolución
+# completa se genera al pedirla) o 'full' (resolución completa)
+NIVELES_GRAFICOS = ('quicklook', 'full')
+
+# Resolución de la vista rápida y ancho (px) de las miniaturas
+DPI_QUICKLOOK = 60
+ANCHO_MINIATURA = 320
+
+
+def rutas_graficos(main_folder, cycle_index, nivel='full'):
+    """Rutas de los PNG de un ciclo para un nivel de salida: {nombre: ruta}"""
+    if nivel not in NIVELES_GRAFICOS:
+        raise ValueError(f"Nivel de gráficos no válido: {nivel!r} (opciones: {NIVELES_GRAFICOS})")
+    if nivel == 'full':
+        nombres = ('full', 'polar')
+    else:
+        nombres = ('full_quicklook', 'full_thumb', 'polar_quicklook', 'polar_thumb')
+    carpeta = os.path.join(main_folder, f'cycle_{cycle_index}')
+    return {nombre: os.path.join(carpeta, f'cycle{cycle_index}_{nombre}.png') for nombre in nombres}
+
+
+def reducir_png(origen, destino, ancho=ANCHO_MINIATURA):
+    """Reduce un PNG a ~'ancho' píxeles promediando bloques, sin volver a dibujar la figura"""
+    imagen = mpimg.imread(origen)
+    factor = max(1, int(np.ceil(imagen.shape[1] / ancho)))
+    alto = imagen.shape[0] // factor * factor
+    ancho_util = imagen.shape[1] // factor * factor
+    bloques = imagen[:alto, :ancho_util].reshape(alto // factor, factor, ancho_util // factor, factor, -1)
+    mpimg.imsave(destino, bloques.mean(axis=(1, 3)))
+    return destino
+
+
+def _ciclo_completo(seg1, seg2, specs):
+    """True si ambos segmentos y todos los espectrogramas tienen datos"""
+    for segmento in (seg1, seg2):
+        if segmento is None or len(segmento['time']) == 0:
+            return False
+        if any(clave not in segmento or len(segmento[clave]) == 0 for clave in ('flux_ion', 'flux_ele')):
+            return False
+    return all(spec.size > 0 and spec.ndim == 2 and spec.shape[1] > 0 for spec in specs)
+
+
+class _Marcadores:
+    """Líneas verticales (y etiquetas opcionales) de las fronteras de un panel"""
+
+    def __init__(self, ax, color_defecto, etiquetas=False):
+        self.ax = ax
+        self.color_defecto = color_defecto
+        self.etiquetas = etiquetas
+        self.lineas = {}
+        self.textos = {}
+
+    def actualizar(self, posiciones, y_etiqueta=None, leyendas=None):
+        """
+        Muestra una línea por frontera en 'posiciones' ({nombre: x}) y oculta
+        las demás. Devuelve las líneas visibles en el orden de 'posiciones'.
+        """
+        for nombre in self.lineas:
+            if nombre not in posiciones:
+                self.lineas[nombre].set_visible(False)
+                self.lineas[nombre].set_label('_nolegend_')
+                if nombre in self.textos:
+                    self.textos[nombre].set_visible(False)
+
+        visibles = []
+        for nombre, x in posiciones.items():
+            color = COLORES_FRONTERAS.get(nombre, self.color_defecto)
+            if nombre not in self.lineas:
+                self.lineas[nombre] = self.ax.axvline(x, color=color, linestyle='--',
+                                                      linewidth=2.0, alpha=0.8)
+                if self.etiquetas:
+                    self.textos[nombre] = self.ax.text(
+                        x, y_etiqueta, nombre, color=color, fontsize=8,
+                        bbox=dict(boxstyle="round,pad=0.3", facecolor='black', alpha=0.7))
+            linea = self.lineas[nombre]
+            linea.set_xdata([x, x])
+            linea.set_visible(True)
+            linea.set_label(leyendas[nombre] if leyendas else nombre)
+            if self.etiquetas:
+                self.textos[nombre].set_position((x, y_etiqueta))
+                self.textos[nombre].set_visible(True)
+            visibles.append(linea)
+        return visibles
+
+
+class _PanelEspectrograma:
+    """
+    Panel de espectrograma: la imagen se actualiza por ciclo (la malla polar
+    solo se reconstruye si cambia la forma del espectrograma o los bordes de
+    energía) y la barra de color se reutiliza
+    """
+
+    def __init__(self, fig, ax, polar=False):
+        self.ax = ax
+        self.polar = polar
+        self.malla = None
+        self.forma = None
+        self.bordes_r = None
+        self.imagen = None
+        marcador = ScalarMappable(norm=LogNorm(1, 10), cmap='viridis')
+        if polar:
+            self.cbar = fig.colorbar(marcador, ax=ax, shrink=0.8, pad=0.05, label='Flujo Diferencial')
+        else:
+            self.cbar = fig.colorbar(marcador, ax=ax, label='Flujo Diferencial (eV/cm²/sr/s/eV)')
+        self.marcadores = _Marcadores(ax, 'gray' if polar else 'white', etiquetas=not polar)
+
+    def actualizar(self, spec, title, segment, boundaries, energy_edges):
+        if self.polar:
+            n_energy, n_time = spec.shape
+            theta_edges = np.linspace(0, 2 * np.pi, n_time + 1, endpoint=True)
+            theta_centers = 0.5 * (theta_edges[:-1] + theta_edges[1:])
+            if len(energy_edges) == n_energy + 1:
+                r_edges = np.asarray(energy_edges)
+            else:
+                energies = np.asarray(energy_edges[:n_energy])
+                r_edges = np.concatenate(([energies[0] - (energies[1] - energies[0]) / 2],
+                                          (energies[:-1] + energies[1:]) / 2,
+                                          [energies[-1] + (energies[-1] - energies[-2]) / 2]))
+            if (self.malla is not None and self.forma == spec.shape and
+                    np.array_equal(self.bordes_r, r_edges)):
+                # Misma malla (n_energy, n_time): solo cambian los valores y la escala
+                self.malla.set_array(spec)
+                self.malla.norm = LogNorm()
+            else:
+                if self.malla is not None:
+                    self.malla.remove()
+                theta_grid, r_grid = np.meshgrid(theta_edges, r_edges)
+                self.malla = self.ax.pcolormesh(theta_grid, r_grid, spec, norm=LogNorm(),
+                                                shading='auto', cmap='viridis')
+                self.forma = spec.shape
+                self.bordes_r = r_edges
+            self.ax.set_ylim(r_edges.min(), r_edges.max())
+            self.ax.set_title(title, pad=20)
+            posiciones = {n: theta_centers[b['index']] for n, b in boundaries.items()
+                          if b is not None and b['index'] is not None and b['index'] < n_time}
+            self.marcadores.actualizar(posiciones)
+            self.malla.autoscale_None()
+            self.cbar.update_normal(self.malla)
+        else:
+            time_num = fechas_mpl(segment['time'])
+            n = min(spec.shape[1], len(time_num))
+            self.imagen, escala = espectrograma_raster(self.ax, spec[:, :n], time_num[:n],
+                                                       energy_edges, imagen=self.imagen)
+            self.ax.set_title(title, fontsize=10, pad=10)
+            posiciones = {n: time_num[b['index']] for n, b in boundaries.items()
+                          if b is not None and b['index'] is not None and b['index'] < len(time_num)}
+            self.marcadores.actualizar(posiciones, y_etiqueta=energy_edges[-2])
+            self.cbar.update_normal(escala)
+
+
+class _PanelFlujo:
+    """Panel de flujo integrado: la línea se actualiza con set_data"""
+
+    def __init__(self, ax, polar=False, leyenda=False):
+        self.ax = ax
+        self.polar = polar
+        self.leyenda = leyenda
+        self.relleno = None
+        if polar:
+            self.linea, = ax.plot([], [], 'b-', linewidth=2, label='Flujo')
+            ax.set_ylim(0, 1)
+        else:
+            self.linea, = ax.plot([], [], 'b-', linewidth=1.5, label='Flujo integrado', alpha=0.8)
+            ax.grid(True, alpha=0.3)
+            ax.set_ylabel('Log Flux')
+        self.marcadores = _Marcadores(ax, 'gray' if polar else 'red')
+
+    def actualizar(self, segment, boundaries, flux_key, title):
+        flux = segment[flux_key]
+        if self.polar:
+            n_time = len(segment['time'])
+            theta_edges = np.linspace(0, 2 * np.pi, n_time + 1, endpoint=True)
+            theta_centers = 0.5 * (theta_edges[:-1] + theta_edges[1:])
+
+            # Normalizar el flujo para el radio (0..1), como plot_polar_cycle
+            flux_clean = np.nan_to_num(flux, nan=-10)
+            flux_pos = np.maximum(flux_clean, -9)
+            if np.max(flux_pos) > np.min(flux_pos):
+                flux_normalized = 0.1 + 0.8 * (flux_pos - np.min(flux_pos)) / (np.max(flux_pos) - np.min(flux_pos))
+            else:
+                flux_normalized = np.ones_like(flux_pos) * 0.5
+
+            self.linea.set_data(theta_centers, flux_normalized)
+            if self.relleno is not None:
+                self.relleno.remove()
+            self.relleno = self.ax.fill_between(theta_centers, 0.1, flux_normalized,
+                                                alpha=0.3, color='blue')
+            self.ax.set_title(title, pad=20)
+            posiciones = {n: theta_centers[b['index']] for n, b in boundaries.items()
+                          if b is not None and b['index'] is not None and b['index'] < n_time}
+            self.marcadores.actualizar(posiciones)
+            return
+
+        time_num = fechas_mpl(segment['time'])
+        self.linea.set_data(time_num, flux)
+        self.ax.set_title(title, fontsize=10, pad=10)
+        self.ax.set_xlim(time_num[0], time_num[-1])
+
+        tick_indices, tick_labels = etiquetas_tiempo(segment, segment['time'])
+        self.ax.set_xticks([time_num[i] for i in tick_indices])
+        self.ax.set_xticklabels(tick_labels, rotation=0, ha='center', fontsize=8)
+
+        posiciones = {}
+        leyendas = {}
+        for n, b in boundaries.items():
+            if b is not None and b['index'] is not None and b['index'] < len(time_num):
+                posiciones[n] = time_num[b['index']]
+                leyendas[n] = f"{n} ({segment['coords_aacgm'][b['index']]:.1f}°)"
+        lineas = self.marcadores.actualizar(posiciones, leyendas=leyendas)
+
+        # Límites verticales según el flujo y las fronteras del ciclo actual
+        self.ax.relim(visible_only=True)
+        self.ax.autoscale_view(scalex=False)
+        if self.leyenda:
+            self.ax.legend(handles=[self.linea] + lineas, loc='upper right', fontsize=8, ncol=2)
+
+
+class PlantillaCiclo:
+    """
+    Figura de plot_cycle (5x2) construida una vez por proceso. Por ciclo solo
+    se actualizan mallas, líneas, fronteras, títulos y resumen; el diseño de
+    constrained_layout se calcula en el primer ciclo y luego se congela, igual
+    que el recorte del PNG.
+    """
+
+    # Archivo de salida y resolución (como plot_cycle)
+    SUFIJO = 'full'
+    DPI = 200
+    FACECOLOR = 'white'
+
+    def __init__(self):
+        self.fig = Figure(figsize=(24, 25), layout='constrained')
+        FigureCanvasAgg(self.fig)
+        axs = self.fig.subplots(5, 2)
+        axs[4, 1].axis('off')
+        self.espectrogramas = {}
+        self.flujos = {}
+        for col in range(2):
+            for fila in range(2):
+                ax = axs[fila, col]
+                ax.set_yscale('log')
+                ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+                self.espectrogramas[(fila, col)] = _PanelEspectrograma(self.fig, ax)
+            for fila in (2, 3):
+                self.flujos[(fila, col)] = _PanelFlujo(axs[fila, col], leyenda=(fila == 3))
+
+        ax_summary = axs[4, 0]
+        ax_summary.axis('off')
+        self.resumen = ax_summary.text(0.02, 0.98, '', fontproperties=FontProperties(family='monospace'),
+                                       verticalalignment='top', transform=ax_summary.transAxes,
+                                       fontsize=9, bbox=dict(facecolor='lightgray', alpha=0.8, pad=10))
+        self.bbox = None
+
+    def actualizar(self, seg1, seg2, boundaries1, boundaries2_adj,
+                   spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges, cycle_index):
+        for col, (segmento, fronteras, spec_ion, spec_ele, nombre) in enumerate((
+                (seg1, boundaries1, spec1_ion, spec1_ele, 'Norte'),
+                (seg2, boundaries2_adj, spec2_ion, spec2_ele, 'Sur'))):
+            self.espectrogramas[(0, col)].actualizar(
+                spec_ion, f'Espectrograma de Iones - Segmento {nombre}', segmento, fronteras, energy_edges)
+            self.espectrogramas[(1, col)].actualizar(
+                spec_ele, f'Espectrograma de Electrones - Segmento {nombre}', segmento, fronteras,
+                energy_edges)
+            self.flujos[(2, col)].actualizar(segmento, fronteras, 'flux_ion',
+                                             f'Flujo Integrado de Iones - {nombre}')
+            self.flujos[(3, col)].actualizar(segmento, fronteras, 'flux_ele',
+                                             f'Flujo Integrado de Electrones - {nombre}')
+        self.resumen.set_text(texto_resumen(cycle_index, seg1, seg2, boundaries1, boundaries2_adj))
+
+    def guardar(self, path, dpi=None):
+        dpi = dpi or self.DPI
+        if self.bbox is None:
+            # Primer ciclo: se resuelve el diseño y el recorte (en pulgadas), y se congelan
+            self.fig.savefig(path, dpi=dpi, bbox_inches='tight', facecolor=self.FACECOLOR)
+            self.fig.set_layout_engine('none')
+            renderer = self.fig.canvas.get_renderer()
+            self.bbox = self.fig.get_tightbbox(renderer).padded(0.1)
+        else:
+            self.fig.savefig(path, dpi=dpi, bbox_inches=self.bbox, facecolor=self.FACECOLOR)
+
+
+class PlantillaPolar(PlantillaCiclo):
+    """Figura de plot_polar_cycle (4x2 polar) construida una vez por proceso"""
+
+    SUFIJO = 'polar'
+    DPI = 150
+    FACECOLOR = None
+
+    def __init__(self):
+        self.fig = Figure(figsize=(20, 18), layout='constrained')
+        FigureCanvasAgg(self.fig)
+        axs = self.fig.subplots(4, 2, subplot_kw=dict(projection='polar'))
+        self.espectrogramas = {}
+        self.flujos = {}
+        for col in range(2):
+            for fila in range(2):
+                ax = axs[fila, col]
+                ax.set_yscale('log')
+                self.espectrogramas[(fila, col)] = _PanelEspectrograma(self.fig, ax, polar=True)
+            for fila in (2, 3):
+                self.flujos[(fila, col)] = _PanelFlujo(axs[fila, col], polar=True)
+            for ax in axs[:, col]:
+                ax.set_theta_zero_location("N")
+                ax.set_theta_direction(-1)
+                ax.grid(True, alpha=0.3)
+        self.bbox = None
+
+    def actualizar(self, seg1, seg2, boundaries1, boundaries2_adj,
+                   spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges, cycle_index):
+        for col, (segmento, fronteras, spec_ion, spec_ele, nombre) in enumerate((
+                (seg1, boundaries1, spec1_ion, spec1_ele, 'Seg1 (Norte)'),
+                (seg2, boundaries2_adj, spec2_ion, spec2_ele, 'Seg2 (Sur)'))):
+            self.espectrogramas[(0, col)].actualizar(
+                spec_ion, f'Espectrograma Iones - {nombre} - Polar', segmento, fronteras, energy_edges)
+            self.espectrogramas[(1, col)].actualizar(
+                spec_ele, f'Espectrograma Electrones - {nombre} - Polar', segmento, fronteras,
+                energy_edges)
+            self.flujos[(2, col)].actualizar(segmento, fronteras, 'flux_ion',
+                                             f'Flujo Iones - {nombre} - Polar')
+            self.flujos[(3, col)].actualizar(segmento, fronteras, 'flux_ele',
+                                             f'Flujo Electrones - {nombre} - Polar')
+
+
+def _respaldo(respaldo, argumentos, principal, miniatura):
+    """
+    Grafica con la función original. En 'quicklook' (con miniatura) la función
+    original guarda directamente la vista rápida (DPI_QUICKLOOK), sin dejar el
+    PNG a resolución completa, y la miniatura se reduce desde ella.
+    """
+    if miniatura is None:
+        return respaldo(*argumentos)
+    path = respaldo(*argumentos, path=principal, dpi=DPI_QUICKLOOK)
+    if path is not None:
+        reducir_png(path, miniatura)
+    return path
+
+
+def _dibujar(clase, respaldo, seg1, seg2, boundaries1, boundaries2,
+             spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges, main_folder, cycle_index,
+             nivel='full'):
+    """
+    Grafica un ciclo con la plantilla del proceso. Los ciclos con algún
+    segmento o espectrograma vacío (poco frecuentes) se grafican con la
+    función original, igual que si la plantilla falla (que se descarta).
+
+    En 'quicklook' se guarda la vista rápida (DPI_QUICKLOOK) y su miniatura,
+    reducida desde la vista rápida. Devuelve la ruta del PNG principal del nivel.
+    """
+    rutas = rutas_graficos(main_folder, cycle_index, nivel)
+    if nivel == 'full':
+        principal, miniatura = rutas[clase.SUFIJO], None
+    else:
+        principal, miniatura = rutas[f'{clase.SUFIJO}_quicklook'], rutas[f'{clase.SUFIJO}_thumb']
+    argumentos = (seg1, seg2, boundaries1, boundaries2, spec1_ion, spec2_ion, spec1_ele, spec2_ele,
+                  energy_edges, main_folder, cycle_index)
+    if not _ciclo_completo(seg1, seg2, (spec1_ion, spec2_ion, spec1_ele, spec2_ele)):
+        return _respaldo(respaldo, argumentos, principal, miniatura)
+
+    try:
+        plantilla = _PLANTILLAS.get(clase.__name__)
+        if plantilla is None:
+            plantilla = _PLANTILLAS[clase.__name__] = clase()
+        plantilla.actualizar(seg1, seg2, boundaries1, ajustar_fronteras_seg2(seg2, boundaries2),
+                             spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges, cycle_index)
+        os.makedirs(os.path.dirname(principal), exist_ok=True)
+        if miniatura is None:
+            plantilla.guardar(principal)
+        else:
+            plantilla.guardar(principal, dpi=DPI_QUICKLOOK)
+            reducir_png(principal, miniatura)
+        return principal
+    except Exception as e:
+        print(f"Plantilla {clase.__name__} descartada en el ciclo {cycle_index}: {e}")
+        _PLANTILLAS.pop(clase.__name__, None)
+        return _respaldo(respaldo, argumentos, principal, miniatura)
+
+
+def dibujar_ciclo(seg1, seg2, boundaries1, boundaries2,
+                  spec1_ion, spec2_ion, spec1_ele, spec2_ele,
+                  energy_edges, main_folder, cycle_index, nivel='full'):
+    """Igual que plot_cycle, reutilizando la figura del proceso (nivel: ver NIVELES_GRAFICOS)"""
+    return _dibujar(PlantillaCiclo, plot_cycle, seg1, seg2, boundaries1, boundaries2,
+                    spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges, main_folder, cycle_index,
+                    nivel)
+
+
+def dibujar_ciclo_polar(seg1, seg2, boundaries1, boundaries2,
+                        spec1_ion, spec2_ion, spec1_ele, spec2_ele,
+                        energy_edges, main_folder, cycle_index, nivel='full'):
+    """Igual que plot_polar_cycle, reutilizando la figura del proceso (nivel: ver NIVELES_GRAFICOS)"""
+    return _dibujar(PlantillaPolar, plot_polar_cycle, seg1, seg2, boundaries1, boundaries2,
+                    spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges, main_folder, cycle_index,
+                    nivel)
@@ -3,6 +3,7 @@ import numpy as np
 import os
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.cm import ScalarMappable
 from matplotlib.colors import LogNorm
 from matplotlib.font_manager import FontProperties
 from datetime import datetime
@@ -21,26 +22,112 @@ def convert_to_datetime(numpy_dt):
         except:
             return datetime.now()
 
-def plot_cycle(seg1, seg2, boundaries1, boundaries2, 
-               spec1_ion, spec2_ion, spec1_ele, spec2_ele,
-               energy_edges, main_folder, cycle_index):
-    """Grafica completa mostrando SEGMENTOS COMPLETOS con fronteras superpuestas"""
-    
-    # Verificar si los segmentos están vacíos
-    seg1_empty = len(seg1['time']) == 0 if seg1 is not None else True
+def fechas_mpl(tiempos):
+    """
+    Convierte un array de tiempos a números de fecha de matplotlib de una vez
+    (datetime64 a milisegundos, como convert_to_datetime). Otros tipos se
+    convierten elemento a elemento.
+    """
+    tiempos = np.asarray(tiempos)
+    if np.issubdtype(tiempos.dtype, np.datetime64):
+        return mdates.date2num(tiempos.astype('datetime64[ms]'))
+    return mdates.date2num([convert_to_datetime(t) for t in tiempos])
+
+# Filas de la imagen por el canal de energía más estrecho (resolución del remuestreo)
+FILAS_POR_CANAL = 16
+MAX_FILAS_ESPECTROGRAMA = 2048
+
+def colores_espectrograma(spec, cmap='viridis'):
+    """
+    Colores RGBA (bytes) de un espectrograma en escala logarítmica, equivalente
+    a pcolormesh(..., norm=LogNorm()) pero calculado una sola vez. Los valores
+    no positivos o inválidos quedan transparentes, como en LogNorm.
+
+    Returns:
+        tuple: (rgba, norma) con la norma LogNorm para la barra de color
+    """
+    spec = np.asarray(spec, dtype=float)
+    validos = np.isfinite(spec) & (spec > 0)
+    if not validos.any():
+        raise ValueError("El espectrograma no tiene valores positivos")
+
+    vmin, vmax = spec[validos].min(), spec[validos].max()
+    escala = np.zeros_like(spec)
+    if vmax > vmin:
+        log_min, log_max = np.log10(vmin), np.log10(vmax)
+        escala[validos] = (np.log10(spec[validos]) - log_min) / (log_max - log_min)
+
+    rgba = plt.get_cmap(cmap)(escala, bytes=True)
+    rgba[~validos] = 0
+    return rgba, LogNorm(vmin, vmax)
+
+def filas_log_uniformes(energy_edges):
+    """
+    Remuestrea los canales de energía a filas uniformes en log10(E) para
+    dibujarlos como imagen. Cada canal recibe al menos FILAS_POR_CANAL filas.
+
+    Returns:
+        tuple: (canal de cada fila, log10 del borde inferior, log10 del borde superior)
+    """
+    energy_edges = np.asarray(energy_edges, dtype=float)
+    if energy_edges.ndim != 1 or len(energy_edges) < 2 or np.any(energy_edges <= 0):
+        raise ValueError("Los bordes de energía deben ser positivos")
+
+    log_edges = np.log10(energy_edges)
+    ascendente = log_edges[-1] > log_edges[0]
+    orden = log_edges if ascendente else log_edges[::-1]
+    if np.any(np.diff(orden) <= 0):
+        raise ValueError("Los bordes de energía deben ser monótonos")
+
+    log_min, log_max = orden[0], orden[-1]
+    paso = np.diff(orden).min() / FILAS_POR_CANAL
+    n_filas = int(min(MAX_FILAS_ESPECTROGRAMA, np.ceil((log_max - log_min) / paso)))
+    centros = log_min + (np.arange(n_filas) + 0.5) * (log_max - log_min) / n_filas
+
+    canal = np.clip(np.searchsorted(orden, centros) - 1, 0, len(orden) - 2)
+    if not ascendente:
+        canal = len(orden) - 2 - canal
+    return canal, log_min, log_max
+
+def espectrograma_raster(ax, spec, time_num, energy_edges, imagen=None):
+    """
+    Dibuja un espectrograma (canales x muestras) como imagen sobre un eje Y
+    logarítmico: una columna por muestra y filas uniformes en log10(E), con
+    los colores precalculados. Sustituye a meshgrid + pcolormesh con el mismo
+    resultado visual. Si se pasa 'imagen' se actualiza en lugar de crear otra.
+
+    Returns:
+        tuple: (imagen, ScalarMappable para la barra de color)
+    """
+    canal, log_min, log_max = filas_log_uniformes(energy_edges)
+    rgba, norma = colores_espectrograma(spec)
+    rgba = rgba[canal]
+    extension = (time_num.min(), time_num.max(), log_min, log_max)
+
+    if imagen is None:
+        # Filas en log10(E): se colocan en el espacio ya escalado del eje (sin la
+        # escala logarítmica), donde la transformación a pantalla es afín
+        imagen = ax.imshow(rgba, extent=extension, origin='lower', aspect='auto',
+                           interpolation='nearest', transform=ax.transLimits + ax.transAxes)
+    else:
+        imagen.set_data(rgba)
+        imagen.set_extent(extension)
+
+    # Límites como los de pcolormesh (la extensión de la imagen está en log10)
+    ax.set_xlim(extension[0], extension[1])
+    ax.set_ylim(np.min(energy_edges), np.max(energy_edges))
+    return imagen, ScalarMappable(norm=norma, cmap='viridis')
+
+# Configuración de colores para fronteras
+COLORES_FRONTERAS = {
+    'b1e': 'cyan', 'b2e': 'magenta', 'b2i': 'yellow',
+    'b3a': 'lime', 'b3b': 'green', 'b4s': 'orange',
+    'b5e': 'red', 'b5i': 'pink', 'b6': 'brown'
+}
+
+def ajustar_fronteras_seg2(seg2, boundaries2):
+    """Traduce los índices del segmento 2 (procesado invertido) al orden original"""
     seg2_empty = len(seg2['time']) == 0 if seg2 is not None else True
-    
-    if seg1_empty and seg2_empty:
-        return None
-
-    # Configuración de colores para fronteras
-    boundary_colors = {
-        'b1e': 'cyan', 'b2e': 'magenta', 'b2i': 'yellow',
-        'b3a': 'lime', 'b3b': 'green', 'b4s': 'orange',
-        'b5e': 'red', 'b5i': 'pink', 'b6': 'brown'
-    }
-    
-    # Ajustar índices de fronteras para el segmento 2
     boundaries2_adj = {}
     if boundaries2 and seg2 is not None and not seg2_empty:
         for b_name, b_data in boundaries2.items():
@@ -57,6 +144,93 @@ def plot_cycle(seg1, seg2, boundaries1, boundaries2,
                 boundaries2_adj[b_name] = b_data
     else:
         boundaries2_adj = boundaries2
+    return boundaries2_adj
+
+def texto_resumen(cycle_index, seg1, seg2, boundaries1, boundaries2_adj):
+    """Texto del panel de resumen de plot_cycle"""
+    seg1_empty = len(seg1['time']) == 0 if seg1 is not None else True
+    seg2_empty = len(seg2['time']) == 0 if seg2 is not None else True
+
+    summary_text = f"RESUMEN CICLO {cycle_index}\n"
+    summary_text += "="*50 + "\n"
+    
+    if not seg1_empty:
+        summary_text += f"SEGMENTO NORTE: {len(seg1['time'])} puntos\n"
+        summary_text += f"Dirección: {seg1.get('direccion_original', 'N/A')}\n"
+        summary_text += "Fronteras detectadas:\n"
+        
+        for b_name, b in boundaries1.items():
+            if b is not None and b['index'] is not None and b['index'] < len(seg1['time']):
+                t = seg1['time'][b['index']]
+                t_datetime = convert_to_datetime(t)
+                t_str = t_datetime.strftime('%H:%M:%S')
+                lat = seg1['lat'][b['index']]
+                summary_text += f"  • {b_name}: {t_str}, lat={lat:.2f}°\n"
+            else:
+                summary_text += f"  • {b_name}: No detectada\n"
+    else:
+        summary_text += "SEGMENTO NORTE: Vacío\n"
+
+    if seg2 is not None and not seg2_empty:
+        summary_text += f"\nSEGMENTO SUR: {len(seg2['time'])} puntos\n"
+        summary_text += f"Dirección: {seg2.get('direccion_original', 'N/A')}\n"
+        summary_text += "Fronteras detectadas:\n"
+        
+        for b_name, b in boundaries2_adj.items():
+            if b is not None and b['index'] is not None and b['index'] < len(seg2['time']):
+                t = seg2['time'][b['index']]
+                t_datetime = convert_to_datetime(t)
+                t_str = t_datetime.strftime('%H:%M:%S')
+                lat = seg2['lat'][b['index']]
+                summary_text += f"  • {b_name}: {t_str}, lat={lat:.2f}°\n"
+            else:
+                summary_text += f"  • {b_name}: No detectada\n"
+    else:
+        summary_text += "\nSEGMENTO SUR: Vacío\n"
+
+    return summary_text
+
+def etiquetas_tiempo(segment, tiempos):
+    """Índices y etiquetas (UT, AACGM y GEO) de los ticks temporales de los paneles de flujo"""
+    if len(tiempos) > 6:
+        tick_indices = np.linspace(0, len(tiempos)-1, 6, dtype=int)
+    else:
+        tick_indices = range(len(tiempos))
+    
+    tick_labels = []
+    for i, idx in enumerate(tick_indices):
+        t = convert_to_datetime(tiempos[idx])
+        aacgm_val = segment['coords_aacgm'][idx]
+        geo_val = segment['coords_geo'][idx] if 'coords_geo' in segment else segment['lat'][idx]
+        
+        if i == 0:  # Primera etiqueta
+            label = t.strftime('UT: %H:%M:%S') + f"\nAACGM: {aacgm_val:.1f}°\nGEO: {geo_val:.1f}°"
+        else:
+            label = t.strftime('%H:%M:%S') + f"\n{aacgm_val:.1f}°\n{geo_val:.1f}°"
+        
+        tick_labels.append(label)
+    return tick_indices, tick_labels
+
+def plot_cycle(seg1, seg2, boundaries1, boundaries2, 
+               spec1_ion, spec2_ion, spec1_ele, spec2_ele,
+               energy_edges, main_folder, cycle_index, path=None, dpi=200):
+    """
+    Grafica completa mostrando SEGMENTOS COMPLETOS con fronteras superpuestas.
+    Por defecto se guarda en cycle_<n>/cycle<n>_full.png (path y dpi lo cambian).
+    """
+    
+    # Verificar si los segmentos están vacíos
+    seg1_empty = len(seg1['time']) == 0 if seg1 is not None else True
+    seg2_empty = len(seg2['time']) == 0 if seg2 is not None else True
+    
+    if seg1_empty and seg2_empty:
+        return None
+
+    # Configuración de colores para fronteras
+    boundary_colors = COLORES_FRONTERAS
+    
+    # Ajustar índices de fronteras para el segmento 2
+    boundaries2_adj = ajustar_fronteras_seg2(seg2, boundaries2)
 
     # Crear figura 5x2
     fig, axs = plt.subplots(5, 2, figsize=(24, 25), constrained_layout=True)
@@ -77,32 +251,26 @@ def plot_cycle(seg1, seg2, boundaries1, boundaries2,
             return
 
         try:
-            # Convertir tiempos a datetime de Python para matplotlib
-            time_python = [convert_to_datetime(t) for t in segment['time']]
-            time_num = mdates.date2num(time_python)
-            
-            # Usar TODOS los puntos del segmento
-            T = np.linspace(time_num.min(), time_num.max(), len(time_python) + 1)
-            X, Y = np.meshgrid(T, energy_edges)
+            # Convertir tiempos a números de fecha de matplotlib (vectorizado)
+            time_num = fechas_mpl(segment['time'])
+            n_time = len(time_num)
             
             # Ajustar dimensiones si es necesario
-            if spec.shape[1] != len(time_python):
-                min_len = min(spec.shape[1], len(time_python))
+            if spec.shape[1] != n_time:
+                min_len = min(spec.shape[1], n_time)
                 spec = spec[:, :min_len]
                 time_num = time_num[:min_len]
-                T = np.linspace(time_num.min(), time_num.max(), min_len + 1)
-                X, Y = np.meshgrid(T, energy_edges)
             
-            # Graficar ESPECTROGRAMA COMPLETO
-            im = ax.pcolormesh(X, Y, spec, norm=LogNorm(), shading='flat', cmap='viridis')
+            # Graficar ESPECTROGRAMA COMPLETO como imagen (una columna por muestra)
             ax.set_yscale('log')
+            _, im = espectrograma_raster(ax, spec, time_num, energy_edges)
             ax.set_title(title, fontsize=10, pad=10)
             ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
             
             # Añadir líneas verticales para las fronteras SOBRE el espectrograma completo
             for b_name, b_data in boundaries.items():
                 if (b_data is not None and b_data['index'] is not None and 
-                    b_data['index'] < len(time_python)):
+                    b_data['index'] < n_time):
                     b_time = time_num[b_data['index']]
                     ax.axvline(b_time, color=boundary_colors.get(b_name, 'white'), 
                             linestyle='--', linewidth=2.0, alpha=0.8)
@@ -131,49 +299,31 @@ def plot_cycle(seg1, seg2, boundaries1, boundaries2,
             return
 
         try:
-            # Convertir tiempos a datetime de Python
-            time_python = [convert_to_datetime(t) for t in segment['time']]
+            # Convertir tiempos a números de fecha de matplotlib (vectorizado)
+            time_num = fechas_mpl(segment['time'])
             flux_data = segment[flux_key]
             
             # Graficar FLUJO COMPLETO
-            ax.plot(time_python, flux_data, 'b-', linewidth=1.5, label='Flujo integrado', alpha=0.8)
+            ax.plot(time_num, flux_data, 'b-', linewidth=1.5, label='Flujo integrado', alpha=0.8)
             ax.set_title(title, fontsize=10, pad=10)
             ax.grid(True, alpha=0.3)
             ax.set_ylabel('Log Flux')
             
             # Configurar ticks temporales para mostrar todo el segmento
-            if len(time_python) > 0:
-                ax.set_xlim(time_python[0], time_python[-1])
+            if len(time_num) > 0:
+                ax.set_xlim(time_num[0], time_num[-1])
                 
                 # Seleccionar 4-6 puntos temporales para etiquetas
-                if len(time_python) > 6:
-                    tick_indices = np.linspace(0, len(time_python)-1, 6, dtype=int)
-                else:
-                    tick_indices = range(len(time_python))
-                
-                tick_times = [time_python[i] for i in tick_indices]
-                tick_labels = []
-                
-                for i, t in enumerate(tick_times):
-                    idx = tick_indices[i]
-                    aacgm_val = segment['coords_aacgm'][idx]
-                    geo_val = segment['coords_geo'][idx] if 'coords_geo' in segment else segment['lat'][idx]
-                    
-                    if i == 0:  # Primera etiqueta
-                        label = t.strftime('UT: %H:%M:%S') + f"\nAACGM: {aacgm_val:.1f}°\nGEO: {geo_val:.1f}°"
-                    else:
-                        label = t.strftime('%H:%M:%S') + f"\n{aacgm_val:.1f}°\n{geo_val:.1f}°"
-                    
-                    tick_labels.append(label)
-                
+                tick_indices, tick_labels = etiquetas_tiempo(segment, segment['time'])
+                tick_times = [time_num[i] for i in tick_indices]
                 ax.set_xticks(tick_times)
                 ax.set_xticklabels(tick_labels, rotation=0, ha='center', fontsize=8)
             
             # Añadir líneas verticales para las fronteras SOBRE el flujo completo
             for b_name, b_data in boundaries.items():
                 if (b_data is not None and b_data['index'] is not None and 
-                    b_data['index'] < len(time_python)):
-                    b_time = time_python[b_data['index']]
+                    b_data['index'] < len(time_num)):
+                    b_time = time_num[b_data['index']]
                     b_lat = segment['coords_aacgm'][b_data['index']]
                     
                     ax.axvline(b_time, color=boundary_colors.get(b_name, 'red'),
@@ -215,43 +365,7 @@ def plot_cycle(seg1, seg2, boundaries1, boundaries2,
     ax_summary = axs[4,0]
     ax_summary.axis('off')
 
-    # Crear texto de resumen con formato 
-    summary_text = f"RESUMEN CICLO {cycle_index}\n"
-    summary_text += "="*50 + "\n"
-    
-    if not seg1_empty:
-        summary_text += f"SEGMENTO NORTE: {len(seg1['time'])} puntos\n"
-        summary_text += f"Dirección: {seg1.get('direccion_original', 'N/A')}\n"
-        summary_text += "Fronteras detectadas:\n"
-        
-        for b_name, b in boundaries1.items():
-            if b is not None and b['index'] is not None and b['index'] < len(seg1['time']):
-                t = seg1['time'][b['index']]
-                t_datetime = convert_to_datetime(t)
-                t_str = t_datetime.strftime('%H:%M:%S')
-                lat = seg1['lat'][b['index']]
-                summary_text += f"  • {b_name}: {t_str}, lat={lat:.2f}°\n"
-            else:
-                summary_text += f"  • {b_name}: No detectada\n"
-    else:
-        summary_text += "SEGMENTO NORTE: Vacío\n"
-
-    if seg2 is not None and not seg2_empty:
-        summary_text += f"\nSEGMENTO SUR: {len(seg2['time'])} puntos\n"
-        summary_text += f"Dirección: {seg2.get('direccion_original', 'N/A')}\n"
-        summary_text += "Fronteras detectadas:\n"
-        
-        for b_name, b in boundaries2_adj.items():
-            if b is not None and b['index'] is not None and b['index'] < len(seg2['time']):
-                t = seg2['time'][b['index']]
-                t_datetime = convert_to_datetime(t)
-                t_str = t_datetime.strftime('%H:%M:%S')
-                lat = seg2['lat'][b['index']]
-                summary_text += f"  • {b_name}: {t_str}, lat={lat:.2f}°\n"
-            else:
-                summary_text += f"  • {b_name}: No detectada\n"
-    else:
-        summary_text += "\nSEGMENTO SUR: Vacío\n"
+    summary_text = texto_resumen(cycle_index, seg1, seg2, boundaries1, boundaries2_adj)
     
     # Usar texto monoespaciado
     ax_summary.text(0.02, 0.98, summary_text, fontproperties=mono_font, 
@@ -260,10 +374,10 @@ def plot_cycle(seg1, seg2, boundaries1, boundaries2,
 
     # Guardar con alta resolución
     try:
-        folder = os.path.join(main_folder, f'cycle_{cycle_index}')
-        os.makedirs(folder, exist_ok=True)
-        path = os.path.join(folder, f'cycle{cycle_index}_full.png')
-        plt.savefig(path, dpi=200, bbox_inches='tight', facecolor='white')
+        if path is None:
+            path = os.path.join(main_folder, f'cycle_{cycle_index}', f'cycle{cycle_index}_full.png')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        plt.savefig(path, dpi=dpi, bbox_inches='tight', facecolor='white')
         plt.close(fig)
         return path
     except Exception:
@@ -274,8 +388,11 @@ def plot_cycle(seg1, seg2, boundaries1, boundaries2,
 
 def plot_polar_cycle(seg1, seg2, boundaries1, boundaries2, 
                     spec1_ion, spec2_ion, spec1_ele, spec2_ele,
-                    energy_edges, main_folder, cycle_index, unidad=False):
-    """Grafica polar completa - VERSIÓN CORREGIDA DIMENSIONES"""
+                    energy_edges, main_folder, cycle_index, unidad=False, path=None, dpi=150):
+    """
+    Grafica polar completa - VERSIÓN CORREGIDA DIMENSIONES.
+    Por defecto se guarda en cycle_<n>/cycle<n>_polar.png (path y dpi lo cambian).
+    """
     
     # Verificar si los segmentos están vacíos
     seg1_empty = len(seg1['time']) == 0 if seg1 is not None else True
@@ -285,29 +402,10 @@ def plot_polar_cycle(seg1, seg2, boundaries1, boundaries2,
         return None
     
     # Configuración de colores para fronteras
-    boundary_colors = {
-        'b1e': 'cyan', 'b2e': 'magenta', 'b2i': 'yellow',
-        'b3a': 'lime', 'b3b': 'green', 'b4s': 'orange',
-        'b5e': 'red', 'b5i': 'pink', 'b6': 'brown'
-    }
+    boundary_colors = COLORES_FRONTERAS
     
     # Ajustar índices de fronteras para el segmento 2
-    boundaries2_adj = {}
-    if boundaries2 and seg2 is not None and not seg2_empty:
-        for b_name, b_data in boundaries2.items():
-            if b_data and b_data['index'] is not None:
-                original_idx = len(seg2['time']) - 1 - b_data['index']
-                boundaries2_adj[b_name] = {
-                    'index': original_idx,
-                    'time': seg2['time'][original_idx],
-                    'lat': seg2['lat'][original_idx],
-                    'deviation': b_data.get('deviation', 0),
-                    'params': b_data.get('params', {})
-                }
-            else:
-                boundaries2_adj[b_name] = b_data
-    else:
-        boundaries2_adj = boundaries2
+    boundaries2_adj = ajustar_fronteras_seg2(seg2, boundaries2)
 
     # Crear figura polar 4x2
     fig, axs = plt.subplots(4, 2, figsize=(20, 18), 
@@ -454,10 +552,10 @@ def plot_polar_cycle(seg1, seg2, boundaries1, boundaries2,
 
     # Guardar gráfico polar
     try:
-        folder = os.path.join(main_folder, f'cycle_{cycle_index}')
-        os.makedirs(folder, exist_ok=True)
-        path = os.path.join(folder, f'cycle{cycle_index}_polar.png')
-        plt.savefig(path, dpi=150, bbox_inches='tight')
+        if path is None:
+            path = os.path.join(main_folder, f'cycle_{cycle_index}', f'cycle{cycle_index}_polar.png')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        plt.savefig(path, dpi=dpi, bbox_inches='tight')
         plt.close(fig)
         return path
     except Exception:
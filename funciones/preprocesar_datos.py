@@ -0,0 +1,68 @@
+# preprocesar_datos.py - arrays de detección a partir de las variables del CDF
+import numpy as np
+from .filtrar_canales import filtrar_canales
+from .integrar_flujo_diferencial import calcular_flujos_integrados
+from .energia_promedio import calcular_energia_promedio
+
+
+def preprocesar_datos(datos, low=30, high=30000, avisar=True, energia_cdf=True):
+    """
+    Calcula los arrays que necesita la detección a partir de las variables del
+    CDF (cargar_datos_cdf): espectros filtrados, flujos integrados (lineales y
+    log10), energía promedio, latitudes y eje temporal. Todos los cálculos son
+    fila a fila, así que sirve igual para un archivo completo o para unos
+    pocos registros (ver deteccion_streaming).
+
+    ELE_AVG_ENERGY del CDF (flujo de energía total / flujo de número total) se
+    usa solo si es válido en todos los registros; si no, o con
+    energia_cdf=False, se calcula para todos como la media de las energías de
+    canal ponderada por el flujo. Así la serie nunca mezcla las dos
+    definiciones (b2e la suaviza entre registros vecinos).
+
+    Returns:
+        dict: Arrays preprocesados, alineados en el eje temporal
+    """
+    # 2. Energía promedio de electrones: la del CDF solo si todos sus registros son válidos
+    ele_avg_energy = datos.get('ELE_AVG_ENERGY') if energia_cdf else None
+    if ele_avg_energy is not None:
+        invalidos = int(np.count_nonzero(~np.isfinite(ele_avg_energy)))
+        if invalidos:
+            if avisar:
+                print(f"   ⚠️ ELE_AVG_ENERGY inválido en {invalidos} registros: "
+                      f"se calcula la energía promedio en todos")
+            ele_avg_energy = None
+    if ele_avg_energy is None:
+        ele_avg_energy = calcular_energia_promedio(datos['ELE_DIFF_ENERGY_FLUX'],
+                                                   datos['CHANNEL_ENERGIES'])
+    datos['ELE_AVG_ENERGY'] = ele_avg_energy
+    
+    # 3. Filtrar canales (pero MANTENER ESPECTROS DIFERENCIALES)
+    CHANNEL_ENERGIES_f, ELE_DIFF_ESPECTROS, ION_DIFF_ESPECTROS, delta = filtrar_canales(
+        datos['CHANNEL_ENERGIES'],
+        datos['ELE_DIFF_ENERGY_FLUX'],
+        datos['ION_DIFF_ENERGY_FLUX'],
+        low=low,
+        high=high
+    )
+
+    # 4. Calcular flujos integrados ESPECÍFICOS en una sola pasada
+    # b2i: iones 3-30 keV (canales 0-6); totales: 30 eV - 30 keV (canales 0-18)
+    flujos = calcular_flujos_integrados(ELE_DIFF_ESPECTROS, ION_DIFF_ESPECTROS, delta, avisar=avisar)
+
+    return {
+        'tiempo_final': datos['tiempo_final'],
+        'SC_AACGM_LAT': datos['SC_AACGM_LAT'],
+        'SC_GEOCENTRIC_LAT': datos['SC_GEOCENTRIC_LAT'],
+        'ELE_TOTAL_ENERGY_FLUX': datos['ELE_TOTAL_ENERGY_FLUX'],
+        'ELE_AVG_ENERGY': datos['ELE_AVG_ENERGY'],
+        'CHANNEL_ENERGIES_f': CHANNEL_ENERGIES_f,
+        'delta': delta,
+        'ELE_DIFF_ESPECTROS': ELE_DIFF_ESPECTROS,
+        'ION_DIFF_ESPECTROS': ION_DIFF_ESPECTROS,
+        'flujos_iones_b2i': flujos['flujos_iones_b2i'],
+        'flujos_elec_totales': flujos['flujos_elec_totales'],
+        'flujos_iones_totales': flujos['flujos_iones_totales'],
+        'flujos_iones_log': flujos['flujos_iones_log'],
+        'flujos_elec_log': flujos['flujos_elec_log'],
+        'flujos_iones_b2i_log': flujos['flujos_iones_b2i_log']
+    }
@@ -1,253 +1,521 @@
 # procesar_ciclos.py - VERSIÓN CORREGIDA
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from .segment_utils import split_cycle_segment
 from .io_utils import save_cycle_info
-from .plot_utils import plot_cycle, plot_polar_cycle
-from .boundary_detection import detect_all_boundaries
+from .plantillas_graficos import dibujar_ciclo, dibujar_ciclo_polar, rutas_graficos, NIVELES_GRAFICOS
+from .cache_preprocesado import guardar_cache, cargar_cache, podar_cache
+from .render_diferido import guardar_trabajo_render, crear_trabajo_render, CLAVES_SEGMENTO
+from .servicio_render import ServicioRender
+from .deteccion_lotes import construir_lote, segmento_lote, detectar_fronteras_lote
+from .cache_fronteras import clave_figuras, restaurar_figuras, guardar_figuras
 
-def procesar_ciclos(pares_extremos, tiempo_final, tiempo_final_dict, sc_lat, sc_geo,
+# Contexto (arrays globales memory-mapped) de cada proceso worker
+_CONTEXTO_WORKER = None
+
+# Modos de generación de gráficos: en línea, diferidos (cola en disco), en
+# segundo plano (ServicioRender) o ninguno
+MODOS_RENDER = ('inline', 'deferred', 'background', False)
+
+# Lotes de ciclos por worker cuando se procesa en paralelo
+LOTES_POR_WORKER = 4
+
+
+def procesar_ciclos(pares_extremos, tiempo_final, sc_lat, sc_geo,
                     flujos_iones_log, flujos_elec_log, flujos_iones_b2i_log,
-                    ele_total_energy, ele_diff_flux, ele_avg_energy, 
-                    ion_diff_filtrado, channel_energies, energy_edges, 
-                    main_folder, fronteras=None):
-    
-    # Convertir datos a arrays NumPy
-    flujos_iones_log = np.asarray(flujos_iones_log)
-    flujos_elec_log = np.asarray(flujos_elec_log)
-    flujos_iones_b2i_log = np.asarray(flujos_iones_b2i_log)
-    ion_diff_filtrado = np.asarray(ion_diff_filtrado)
-    ele_diff_flux = np.asarray(ele_diff_flux)
-    ele_avg_energy = np.asarray(ele_avg_energy)
+                    ele_total_energy, ele_diff_flux, ele_avg_energy,
+                    ion_diff_filtrado, channel_energies, energy_edges,
+                    main_folder, fronteras=None, workers=1, render='inline',
+                    directorio_cache=None, servicio_render=None, nivel_graficos='quicklook',
+                    hilos=1):
+    """
+    Procesa cada par de extremos (ciclo): segmentación, detección de fronteras,
+    JSON y gráficos.
+
+    Con workers > 1 los ciclos se reparten en un pool de procesos. Los arrays
+    globales se escriben una sola vez como archivos .npy y cada worker los abre
+    memory-mapped, en lugar de serializarlos en cada tarea. workers <= 0 usa
+    todos los núcleos disponibles.
+
+    Las fronteras de todos los segmentos de un grupo de ciclos se detectan en
+    un solo lote (todos los ciclos en serie, o un lote por tarea en paralelo).
+    Con hilos > 1, en cada proceso los detectores independientes de un
+    segmento se ejecutan en un pool de hilos compartido (pool_hilos).
+
+    render controla los gráficos: 'inline' los genera dentro de cada ciclo,
+    'deferred' solo guarda los arrays mínimos (render_<n>.npz) para que
+    renderizar_pendientes los genere después, 'background' envía cada ciclo a
+    un ServicioRender (servicio_render, o uno propio que se cierra al final)
+    sin esperar sus gráficos, y False no grafica nada. En 'background' el JSON
+    de cada ciclo se escribe antes de encolar sus gráficos.
+
+    nivel_graficos elige la salida: 'quicklook' guarda una vista rápida y una
+    miniatura por figura y conserva el trabajo de render del ciclo para generar
+    la resolución completa al pedirla (graficos_completos); 'full' genera
+    directamente los PNG a resolución completa.
+
+    Con directorio_cache la ejecución es incremental: los resultados de cada
+    detector, sus características intermedias y los gráficos se guardan por
+    contenido y solo se recalcula lo que cambió (datos, código o umbrales),
+    ver cache_fronteras.
+
+    Returns:
+        list: Información de cada ciclo, en orden (None si el ciclo se omitió)
+    """
+    if render is True:
+        render = 'inline'
+    elif render is None or render == 'none':
+        render = False
+    if render not in MODOS_RENDER:
+        raise ValueError(f"Modo de render no válido: {render!r} (opciones: {MODOS_RENDER})")
+    if nivel_graficos not in NIVELES_GRAFICOS:
+        raise ValueError(f"Nivel de gráficos no válido: {nivel_graficos!r} (opciones: {NIVELES_GRAFICOS})")
+
+    arrays = arrays_globales(tiempo_final, sc_lat, sc_geo, flujos_iones_log, flujos_elec_log,
+                             flujos_iones_b2i_log, ele_diff_flux, ele_avg_energy,
+                             ion_diff_filtrado, channel_energies, energy_edges)
+
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(pares_extremos))
 
+    servicio_propio = None
+    cola_render = None
+    if render == 'background':
+        if servicio_render is None:
+            servicio_propio = servicio_render = ServicioRender()
+        cola_render = servicio_render.cola_trabajos
+
+    try:
+        indices = list(range(len(pares_extremos)))
+        if workers <= 1:
+            contexto = crear_contexto(arrays, main_folder, fronteras, render, directorio_cache,
+                                      cola_render, nivel_graficos, hilos)
+            return procesar_lote_ciclos(indices, list(pares_extremos), contexto)
+
+        # Repartir los ciclos en lotes contiguos (varios por worker para equilibrar la carga)
+        tam_lote = -(-len(pares_extremos) // (workers * LOTES_POR_WORKER))
+        lotes = [(indices[i:i + tam_lote], list(pares_extremos[i:i + tam_lote]))
+                 for i in range(0, len(pares_extremos), tam_lote)]
+
+        with tempfile.TemporaryDirectory(prefix='ovation_ciclos_') as tmp:
+            guardar_cache(tmp, 'globales', arrays, max_bytes=float('inf'))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                                     initargs=(tmp, main_folder, fronteras, render,
+                                               directorio_cache, cola_render,
+                                               nivel_graficos, hilos)) as executor:
+                resultados = executor.map(_procesar_lote_worker, *zip(*lotes))
+                return [info for lote in resultados for info in lote]
+    finally:
+        if servicio_propio is not None:
+            servicio_propio.cerrar()
+        if directorio_cache is not None:
+            # El cache incremental comparte el límite de tamaño del cache
+            podar_cache(directorio_cache)
+
+
+def arrays_globales(tiempo_final, sc_lat, sc_geo, flujos_iones_log, flujos_elec_log,
+                    flujos_iones_b2i_log, ele_diff_flux, ele_avg_energy, ion_diff_filtrado,
+                    channel_energies, energy_edges):
+    """Reúne los arrays globales de los ciclos como arrays NumPy"""
+    return {
+        'tiempo_final': np.asarray(tiempo_final),
+        'sc_lat': np.asarray(sc_lat),
+        'sc_geo': np.asarray(sc_geo),
+        'flux_ion': np.asarray(flujos_iones_log),
+        'flux_ele': np.asarray(flujos_elec_log),
+        'ion_energy_flux_b2i': np.asarray(flujos_iones_b2i_log),
+        'ele_diff_flux': np.asarray(ele_diff_flux),
+        'ion_diff_flux': np.asarray(ion_diff_filtrado),
+        'ele_avg_energy': np.asarray(ele_avg_energy),
+        'channel_energies': np.asarray(channel_energies),
+        'energy_edges': np.asarray(energy_edges)
+    }
+
+
+def crear_contexto(arrays, main_folder, fronteras=None, render='inline', directorio_cache=None,
+                   cola_render=None, nivel_graficos='quicklook', hilos=1):
+    """Agrupa los arrays globales y parámetros que necesita cada ciclo"""
     # Crear diccionario con datos globales para pasar a las funciones
     global_data = {
-        'ele_diff_flux': ele_diff_flux,
-        'ion_diff_flux': ion_diff_filtrado,
-        'flux_ion': flujos_iones_log,
-        'flux_ele': flujos_elec_log,
-        'ion_energy_flux_b2i': flujos_iones_b2i_log,
-        'ele_energy_flux': flujos_elec_log,  # Usar mismo que flux_ele por ahora
-        'ion_energy_flux': flujos_iones_log,  # Usar mismo que flux_ion por ahora
-        'ele_avg_energy': ele_avg_energy
+        'ele_diff_flux': arrays['ele_diff_flux'],
+        'ion_diff_flux': arrays['ion_diff_flux'],
+        'flux_ion': arrays['flux_ion'],
+        'flux_ele': arrays['flux_ele'],
+        'ion_energy_flux_b2i': arrays['ion_energy_flux_b2i'],
+        'ele_energy_flux': arrays['flux_ele'],  # Usar mismo que flux_ele por ahora
+        'ion_energy_flux': arrays['flux_ion'],  # Usar mismo que flux_ion por ahora
+        'ele_avg_energy': arrays['ele_avg_energy']
+    }
+    return {
+        'tiempo_final': arrays['tiempo_final'],
+        'sc_lat': arrays['sc_lat'],
+        'sc_geo': arrays['sc_geo'],
+        'global_data': global_data,
+        'channel_energies': arrays['channel_energies'],
+        'energy_edges': arrays['energy_edges'],
+        'main_folder': main_folder,
+        'fronteras': fronteras,
+        'render': render,
+        'directorio_cache': directorio_cache,
+        'cola_render': cola_render,
+        'nivel_graficos': nivel_graficos,
+        'hilos': hilos
     }
-    
-    for idx, par in enumerate(pares_extremos):
-        try:
-            # 1) Segmentación 
-            segments = split_cycle_segment(
-                par, tiempo_final, tiempo_final_dict,
-                flujos_iones_log, sc_lat, sc_geo  
-            )
-            
-            seg1_orig_len = len(segments['seg1_original']['time'])
-            seg2_orig_len = len(segments['seg2_original']['time'])
-            direccion_original = segments.get('direccion_original', 'desconocida')
-            
-            # Verificar si hay datos para procesar
-            if seg1_orig_len == 0 and seg2_orig_len == 0:
-                continue
-
-            def prepare_segment_data(segment, segment_type, global_data):
-                """Prepara datos para un segmento - VERSIÓN COMPLETA CORREGIDA"""
-                indices = segment['indices']
-                
-                if len(indices) == 0:
-                    return create_empty_segment_data(segment_type)
-                
-                # Extraer datos del segmento usando los índices
-                segment_data = {
-                    'time': segment['time'],
-                    'coords_aacgm': segment['coords_aacgm'],
-                    'lat': segment['coords_geo'],
-                    'indices': indices,
-                    'direccion': segment.get('direccion_procesamiento', 'desconocida'),
-                    'segment_type': segment_type
-                }
-                
-                # Añadir datos de flujos desde los arrays globales
-                if len(indices) > 0:
-                    try:
-                        # Usar los índices para extraer datos correspondientes
-                        valid_indices = indices[indices < len(global_data['flux_ion'])]
-                        
-                        segment_data.update({
-                            'ele_diff_flux': global_data['ele_diff_flux'][valid_indices] if len(valid_indices) > 0 else np.array([]),
-                            'ion_diff_flux': global_data['ion_diff_flux'][valid_indices] if len(valid_indices) > 0 else np.array([]),
-                            'flux_ion': global_data['flux_ion'][valid_indices] if len(valid_indices) > 0 else np.array([]),
-                            'flux_ele': global_data['flux_ele'][valid_indices] if len(valid_indices) > 0 else np.array([]),
-                            'ion_energy_flux_b2i': global_data['ion_energy_flux_b2i'][valid_indices] if len(valid_indices) > 0 else np.array([]),
-                            'ele_energy_flux': global_data['ele_energy_flux'][valid_indices] if len(valid_indices) > 0 else np.array([]),
-                            'ion_energy_flux': global_data['ion_energy_flux'][valid_indices] if len(valid_indices) > 0 else np.array([]),
-                            'ele_avg_energy': global_data['ele_avg_energy'][valid_indices] if len(valid_indices) > 0 else np.array([])
-                        })
-                    except Exception as e:
-                        print(f"Error preparando datos del segmento {segment_type}: {e}")
-                        return create_empty_segment_data(segment_type)
-                
-                return segment_data
-
-            def create_empty_segment_data(segment_type):
-                """Crea estructura de datos vacía"""
-                return {
-                    'time': np.array([]),
-                    'coords_aacgm': np.array([]),
-                    'lat': np.array([]),
-                    'ele_diff_flux': np.array([]),
-                    'ion_diff_flux': np.array([]),
-                    'ion_energy_flux': np.array([]),
-                    'ion_energy_flux_b2i': np.array([]),  
-                    'flux_ion': np.array([]),
-                    'ele_energy_flux': np.array([]),
-                    'flux_ele': np.array([]),
-                    'ele_avg_energy': np.array([]),
-                    'energy_edges': energy_edges,
-                    'direccion': "desconocida",
-                    'segment_type': segment_type
-                }
 
-            # Preparar segmentos CON el parámetro global_data
-            seg1_processing_data = prepare_segment_data(segments['seg1_processing'], 'seg1', global_data)
-            seg2_processing_data = prepare_segment_data(segments['seg2_processing'], 'seg2', global_data)
-            seg1_original_data = prepare_segment_data(segments['seg1_original'], 'seg1', global_data)
-            seg2_original_data = prepare_segment_data(segments['seg2_original'], 'seg2', global_data)
 
-            # 3) Detectar fronteras 
-            boundaries_seg1 = {}
-            boundaries_seg2 = {}
-            
-            try:
-                if len(seg1_processing_data['time']) > 0:
-                    boundaries_seg1 = detect_all_boundaries(seg1_processing_data, channel_energies, fronteras=fronteras)
-            except Exception as e:
-                print(f"Error detectando fronteras en segmento 1 del ciclo {idx}: {e}")
-                boundaries_seg1 = {}
-                
+def _inicializar_worker(directorio_arrays, main_folder, fronteras, render, directorio_cache,
+                        cola_render=None, nivel_graficos='quicklook', hilos=1):
+    """Abre los arrays globales memory-mapped una vez por proceso"""
+    global _CONTEXTO_WORKER
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    arrays = cargar_cache(directorio_arrays, 'globales')
+    _CONTEXTO_WORKER = crear_contexto(arrays, main_folder, fronteras, render, directorio_cache,
+                                      cola_render, nivel_graficos, hilos)
+
+
+def _procesar_lote_worker(indices, pares):
+    return procesar_lote_ciclos(indices, pares, _CONTEXTO_WORKER)
+
+
+def create_empty_segment_data(segment_type, energy_edges):
+    """Crea estructura de datos vacía"""
+    return {
+        'time': np.array([]),
+        'coords_aacgm': np.array([]),
+        'lat': np.array([]),
+        'ele_diff_flux': np.array([]),
+        'ion_diff_flux': np.array([]),
+        'ion_energy_flux': np.array([]),
+        'ion_energy_flux_b2i': np.array([]),
+        'flux_ion': np.array([]),
+        'ele_energy_flux': np.array([]),
+        'flux_ele': np.array([]),
+        'ele_avg_energy': np.array([]),
+        'energy_edges': energy_edges,
+        'direccion': "desconocida",
+        'segment_type': segment_type
+    }
+
+
+def prepare_segment_data(segment, segment_type, global_data, energy_edges):
+    """Prepara datos para un segmento - VERSIÓN COMPLETA CORREGIDA"""
+    indices = segment['indices']
+
+    if len(indices) == 0:
+        return create_empty_segment_data(segment_type, energy_edges)
+
+    # Extraer datos del segmento usando los índices
+    segment_data = {
+        'time': segment['time'],
+        'coords_aacgm': segment['coords_aacgm'],
+        'lat': segment['coords_geo'],
+        'indices': indices,
+        'direccion': segment.get('direccion_procesamiento', 'desconocida'),
+        'segment_type': segment_type
+    }
+
+    # Añadir datos de flujos desde los arrays globales: con el slice del
+    # segmento son vistas (sin copia), también para segmentos invertidos
+    try:
+        segmento = segment.get('slice')
+        if segmento is None:
+            # Segmentos sin slice: usar los índices válidos
+            segmento = indices[indices < len(global_data['flux_ion'])]
+
+        segment_data.update({
+            clave: global_data[clave][segmento]
+            for clave in ('ele_diff_flux', 'ion_diff_flux', 'flux_ion', 'flux_ele',
+                          'ion_energy_flux_b2i', 'ele_energy_flux', 'ion_energy_flux',
+                          'ele_avg_energy')
+        })
+    except Exception as e:
+        print(f"Error preparando datos del segmento {segment_type}: {e}")
+        return create_empty_segment_data(segment_type, energy_edges)
+
+    return segment_data
+
+
+def safe_adjust_boundary(boundaries, processing_segment, original_segment):
+    """Ajusta índices de forma segura"""
+    adjusted = {}
+
+    if (len(processing_segment['time']) == 0 or
+        len(original_segment['time']) == 0):
+        return adjusted
+
+    for b_name, b_data in boundaries.items():
+        if b_data and b_data['index'] is not None:
             try:
-                if len(seg2_processing_data['time']) > 0:
-                    boundaries_seg2 = detect_all_boundaries(seg2_processing_data, channel_energies, fronteras=fronteras)
-            except Exception as e:
-                print(f"Error detectando fronteras en segmento 2 del ciclo {idx}: {e}")
-                boundaries_seg2 = {}
-
-            # 4) Ajustar índices de fronteras
-            def safe_adjust_boundary(boundaries, processing_segment, original_segment):
-                """Ajusta índices de forma segura"""
-                adjusted = {}
-                
-                if (len(processing_segment['time']) == 0 or 
-                    len(original_segment['time']) == 0):
-                    return adjusted
-                    
-                for b_name, b_data in boundaries.items():
-                    if b_data and b_data['index'] is not None:
-                        try:
-                            proc_len = len(processing_segment['time'])
-                            orig_len = len(original_segment['time'])
-                            
-                            if processing_segment['direccion'] != original_segment['direccion']:
-                                original_idx = proc_len - 1 - b_data['index']
-                            else:
-                                original_idx = b_data['index']
-                            
-                            original_idx = max(0, min(original_idx, orig_len - 1))
-                            
-                            adjusted[b_name] = {
-                                'index': original_idx,
-                                'time': original_segment['time'][original_idx],
-                                'lat': original_segment['lat'][original_idx],
-                                'deviation': b_data.get('deviation', 0),
-                                'params': b_data.get('params', {})
-                            }
-                        except Exception as e:
-                            print(f"Error ajustando índice para {b_name}: {e}")
-                            adjusted[b_name] = None
-                    else:
-                        adjusted[b_name] = b_data
-                return adjusted
-
-            boundaries_seg1_adj = safe_adjust_boundary(boundaries_seg1, seg1_processing_data, seg1_original_data)
-            boundaries_seg2_adj = safe_adjust_boundary(boundaries_seg2, seg2_processing_data, seg2_original_data)
-
-            # 5) Guardar información
-            info = {
-                'boundaries': {
-                    'primera_mitad': boundaries_seg1_adj,
-                    'segunda_mitad': boundaries_seg2_adj
-                },
-                'direccion_original': direccion_original,
-                'segment_info': {
-                    'seg1_processing_direction': seg1_processing_data.get('direccion', 'desconocida'),
-                    'seg2_processing_direction': seg2_processing_data.get('direccion', 'desconocida'),
-                    'seg1_original_direction': seg1_original_data.get('direccion', 'desconocida'),
-                    'seg2_original_direction': seg2_original_data.get('direccion', 'desconocida')
-                }
-            }
-            save_cycle_info(info, main_folder, idx)
-            
-            # 6) Preparar espectrogramas (usando datos originales para visualización)
-            def prepare_spectrograms(segment):
-                """Prepara espectrogramas asegurando dimensiones compatibles"""
-                if len(segment['indices']) > 0:
-                    try:
-                        # Obtener datos usando índices válidos
-                        valid_indices = segment['indices']
-                        valid_indices = valid_indices[valid_indices < ion_diff_filtrado.shape[0]]
-                        valid_indices = valid_indices[valid_indices < ele_diff_flux.shape[0]]
-                        
-                        if len(valid_indices) == 0:
-                            return np.array([]), np.array([])
-                            
-                        spec_ion = ion_diff_filtrado[valid_indices, :].T
-                        spec_ele = ele_diff_flux[valid_indices, :].T
-                        
-                        # Asegurar que no hay NaN
-                        spec_ion = np.nan_to_num(spec_ion, nan=1e-10)
-                        spec_ele = np.nan_to_num(spec_ele, nan=1e-10)
-                        
-                        return spec_ion, spec_ele
-                        
-                    except Exception as e:
-                        print(f"Error preparando espectrogramas: {e}")
-                        return np.array([]), np.array([])
+                proc_len = len(processing_segment['time'])
+                orig_len = len(original_segment['time'])
+
+                if processing_segment['direccion'] != original_segment['direccion']:
+                    original_idx = proc_len - 1 - b_data['index']
                 else:
-                    return np.array([]), np.array([])
-            
-            spec1_ion, spec1_ele = prepare_spectrograms(segments['seg1_original'])
-            spec2_ion, spec2_ele = prepare_spectrograms(segments['seg2_original'])
+                    original_idx = b_data['index']
 
-            # 7) Generar gráfico normal
-            try:
-                plot_cycle(
-                    seg1_original_data,
-                    seg2_original_data,
-                    boundaries_seg1_adj,
-                    boundaries_seg2_adj,
-                    spec1_ion, spec2_ion,
-                    spec1_ele, spec2_ele,
-                    energy_edges,
-                    main_folder,
-                    idx
-                )
+                original_idx = max(0, min(original_idx, orig_len - 1))
+
+                adjusted[b_name] = {
+                    'index': original_idx,
+                    'time': original_segment['time'][original_idx],
+                    'lat': original_segment['lat'][original_idx],
+                    'deviation': b_data.get('deviation', 0),
+                    'params': b_data.get('params', {})
+                }
             except Exception as e:
-                print(f"Error generando gráfico normal del ciclo {idx}: {e}")
+                print(f"Error ajustando índice para {b_name}: {e}")
+                adjusted[b_name] = None
+        else:
+            adjusted[b_name] = b_data
+    return adjusted
 
-            # GENERAR GRÁFICO POLAR
-            try:
-                plot_polar_cycle(
-                    seg1_original_data,
-                    seg2_original_data,
-                    boundaries_seg1_adj,
-                    boundaries_seg2_adj,
-                    spec1_ion, spec2_ion,
-                    spec1_ele, spec2_ele,
-                    energy_edges,
-                    main_folder,
-                    idx
-                )
 
-            except Exception as e:
-                print(f"Error generando gráfico POLAR del ciclo {idx}: {e}")
-            
+def prepare_spectrograms(segment, ion_diff_filtrado, ele_diff_flux):
+    """Prepara espectrogramas asegurando dimensiones compatibles"""
+    if len(segment['indices']) > 0:
+        try:
+            # Vista del segmento sobre los espectros globales (o índices válidos)
+            segmento = segment.get('slice')
+            if segmento is None:
+                segmento = segment['indices']
+                segmento = segmento[segmento < ion_diff_filtrado.shape[0]]
+                segmento = segmento[segmento < ele_diff_flux.shape[0]]
+
+            spec_ion = ion_diff_filtrado[segmento, :].T
+            spec_ele = ele_diff_flux[segmento, :].T
+
+            if spec_ion.shape[1] == 0 or spec_ele.shape[1] == 0:
+                return np.array([]), np.array([])
+
+            # Asegurar que no hay NaN
+            spec_ion = np.nan_to_num(spec_ion, nan=1e-10)
+            spec_ele = np.nan_to_num(spec_ele, nan=1e-10)
+
+            return spec_ion, spec_ele
+
+        except Exception as e:
+            print(f"Error preparando espectrogramas: {e}")
+            return np.array([]), np.array([])
+    else:
+        return np.array([]), np.array([])
+
+
+def procesar_ciclo(idx, par, contexto):
+    """
+    Procesa un ciclo: segmentación, detección, JSON y gráficos.
+
+    Returns:
+        dict: Información guardada del ciclo, o None si no hay datos o hubo un error
+    """
+    return procesar_lote_ciclos([idx], [par], contexto)[0]
+
+
+def procesar_lote_ciclos(indices, pares, contexto):
+    """
+    Procesa un grupo de ciclos detectando las fronteras de todos sus segmentos
+    en un solo lote (ver deteccion_lotes), y luego guarda y grafica cada ciclo.
+
+    Returns:
+        list: Información de cada ciclo, en orden (None si el ciclo se omitió)
+    """
+    # 1-2) Segmentación de todos los ciclos
+    ciclos = []
+    for idx, par in zip(indices, pares):
+        try:
+            ciclos.append(segmentar_ciclo(par, contexto))
+        except Exception as e:
+            print(f"Error procesando ciclo {idx}: {e}")
+            ciclos.append(None)
+
+    # 3) Detectar fronteras de todos los segmentos de procesamiento a la vez
+    validos = [ciclo for ciclo in ciclos if ciclo is not None]
+    segmentos = [ciclo['segments'][nombre] for ciclo in validos
+                 for nombre in ('seg1_processing', 'seg2_processing')]
+    lote = construir_lote(segmentos, contexto['tiempo_final'], contexto['sc_lat'],
+                          contexto['sc_geo'], contexto['global_data'])
+    fronteras_lote = detectar_fronteras_lote(lote, contexto['channel_energies'],
+                                             fronteras=contexto['fronteras'],
+                                             hilos=contexto.get('hilos', 1),
+                                             directorio_cache=contexto.get('directorio_cache'))
+
+    k = 0
+    for ciclo in validos:
+        for nombre, segment_type in (('seg1', 'seg1'), ('seg2', 'seg2')):
+            if lote['offsets'][k + 1] > lote['offsets'][k]:
+                ciclo[f'{nombre}_processing_data'] = segmento_lote(lote, k, segment_type)
+            else:
+                ciclo[f'{nombre}_processing_data'] = create_empty_segment_data(
+                    segment_type, contexto['energy_edges'])
+            ciclo[f'boundaries_{nombre}'] = fronteras_lote[k]
+            k += 1
+
+    # 4-7) Ajustar, guardar y graficar cada ciclo
+    resultados = []
+    for idx, ciclo in zip(indices, ciclos):
+        if ciclo is None:
+            resultados.append(None)
+            continue
+        try:
+            resultados.append(completar_ciclo(idx, ciclo, contexto))
         except Exception as e:
             print(f"Error procesando ciclo {idx}: {e}")
-            continue
\ No newline at end of file
+            resultados.append(None)
+    return resultados
+
+
+def segmentar_ciclo(par, contexto):
+    """
+    Segmenta un ciclo y prepara los datos de sus segmentos originales.
+
+    Returns:
+        dict: Segmentos del ciclo, o None si no hay datos
+    """
+    global_data = contexto['global_data']
+    energy_edges = contexto['energy_edges']
+
+    # 1) Segmentación
+    segments = split_cycle_segment(
+        par, contexto['tiempo_final'],
+        global_data['flux_ion'], contexto['sc_lat'], contexto['sc_geo']
+    )
+
+    seg1_orig_len = len(segments['seg1_original']['time'])
+    seg2_orig_len = len(segments['seg2_original']['time'])
+
+    # Verificar si hay datos para procesar
+    if seg1_orig_len == 0 and seg2_orig_len == 0:
+        return None
+
+    # 2) Preparar segmentos originales CON el parámetro global_data (los de
+    # procesamiento salen del lote de detección)
+    return {
+        'segments': segments,
+        'direccion_original': segments.get('direccion_original', 'desconocida'),
+        'seg1_original_data': prepare_segment_data(segments['seg1_original'], 'seg1', global_data, energy_edges),
+        'seg2_original_data': prepare_segment_data(segments['seg2_original'], 'seg2', global_data, energy_edges)
+    }
+
+
+def completar_ciclo(idx, ciclo, contexto):
+    """
+    Ajusta las fronteras detectadas de un ciclo a los segmentos originales,
+    guarda su JSON y genera (o encola) sus gráficos.
+
+    Returns:
+        dict: Información guardada del ciclo
+    """
+    global_data = contexto['global_data']
+    energy_edges = contexto['energy_edges']
+    main_folder = contexto['main_folder']
+    segments = ciclo['segments']
+    seg1_processing_data = ciclo['seg1_processing_data']
+    seg2_processing_data = ciclo['seg2_processing_data']
+    seg1_original_data = ciclo['seg1_original_data']
+    seg2_original_data = ciclo['seg2_original_data']
+    boundaries_seg1 = ciclo['boundaries_seg1']
+    boundaries_seg2 = ciclo['boundaries_seg2']
+    direccion_original = ciclo['direccion_original']
+
+    # 4) Ajustar índices de fronteras
+    boundaries_seg1_adj = safe_adjust_boundary(boundaries_seg1, seg1_processing_data, seg1_original_data)
+    boundaries_seg2_adj = safe_adjust_boundary(boundaries_seg2, seg2_processing_data, seg2_original_data)
+
+    # 5) Guardar información
+    info = {
+        'boundaries': {
+            'primera_mitad': boundaries_seg1_adj,
+            'segunda_mitad': boundaries_seg2_adj
+        },
+        'direccion_original': direccion_original,
+        'segment_info': {
+            'seg1_processing_direction': seg1_processing_data.get('direccion', 'desconocida'),
+            'seg2_processing_direction': seg2_processing_data.get('direccion', 'desconocida'),
+            'seg1_original_direction': seg1_original_data.get('direccion', 'desconocida'),
+            'seg2_original_direction': seg2_original_data.get('direccion', 'desconocida')
+        }
+    }
+    save_cycle_info(info, main_folder, idx)
+
+    if not contexto['render']:
+        return info
+
+    # 6) Preparar espectrogramas (usando datos originales para visualización)
+    spec1_ion, spec1_ele = prepare_spectrograms(segments['seg1_original'],
+                                                global_data['ion_diff_flux'], global_data['ele_diff_flux'])
+    spec2_ion, spec2_ele = prepare_spectrograms(segments['seg2_original'],
+                                                global_data['ion_diff_flux'], global_data['ele_diff_flux'])
+
+    # El trabajo de render se conserva en 'deferred' y en 'quicklook' (resolución completa al pedirla)
+    nivel = contexto.get('nivel_graficos', 'quicklook')
+    if contexto['render'] == 'deferred' or nivel == 'quicklook':
+        guardar_trabajo_render(main_folder, idx, seg1_original_data, seg2_original_data,
+                               spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges)
+    if contexto['render'] == 'deferred':
+        return info
+
+    # Reutilizar los gráficos si las fronteras y los datos graficados no cambiaron
+    directorio_cache = contexto.get('directorio_cache')
+    clave = None
+    if directorio_cache is not None:
+        arrays = {'spec1_ion': spec1_ion, 'spec2_ion': spec2_ion,
+                  'spec1_ele': spec1_ele, 'spec2_ele': spec2_ele, 'energy_edges': energy_edges}
+        for nombre, segmento in (('seg1', seg1_original_data), ('seg2', seg2_original_data)):
+            for c in CLAVES_SEGMENTO:
+                arrays[f"{nombre}_{c}"] = np.asarray(segmento.get(c, np.array([])))
+        clave = clave_figuras(idx, info, arrays, (dibujar_ciclo, dibujar_ciclo_polar), nivel)
+        if restaurar_figuras(directorio_cache, clave, rutas_graficos(main_folder, idx, nivel)):
+            return info
+
+    if contexto['render'] == 'background':
+        # Encolar los gráficos (bloquea mientras la cola del servicio esté llena)
+        contexto['cola_render'].put(crear_trabajo_render(
+            main_folder, idx, seg1_original_data, seg2_original_data,
+            boundaries_seg1_adj, boundaries_seg2_adj,
+            spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges,
+            cache=None if clave is None else (directorio_cache, clave), nivel=nivel))
+        return info
+
+    # 7) Generar gráfico normal
+    try:
+        dibujar_ciclo(
+            seg1_original_data,
+            seg2_original_data,
+            boundaries_seg1_adj,
+            boundaries_seg2_adj,
+            spec1_ion, spec2_ion,
+            spec1_ele, spec2_ele,
+            energy_edges,
+            main_folder,
+            idx,
+            nivel=nivel
+        )
+    except Exception as e:
+        print(f"Error generando gráfico normal del ciclo {idx}: {e}")
+
+    # GENERAR GRÁFICO POLAR
+    try:
+        dibujar_ciclo_polar(
+            seg1_original_data,
+            seg2_original_data,
+            boundaries_seg1_adj,
+            boundaries_seg2_adj,
+            spec1_ion, spec2_ion,
+            spec1_ele, spec2_ele,
+            energy_edges,
+            main_folder,
+            idx,
+            nivel=nivel
+        )
+
+    except Exception as e:
+        print(f"Error generando gráfico POLAR del ciclo {idx}: {e}")
+
+    if clave is not None:
+        guardar_figuras(directorio_cache, clave, rutas_graficos(main_folder, idx, nivel))
+
+    return info
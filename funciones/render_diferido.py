@@ -0,0 +1,174 @@
+import os
+import sys
+import glob
+import json
+import numpy as np
+from .plantillas_graficos import dibujar_ciclo, dibujar_ciclo_polar, rutas_graficos
+from .cache_fronteras import guardar_figuras
+
+# Claves de cada segmento que necesitan los gráficos
+CLAVES_SEGMENTO = ('time', 'lat', 'coords_aacgm', 'flux_ion', 'flux_ele')
+
+
+def ruta_trabajo_render(main_folder, cycle_index):
+    """Ruta del archivo con los arrays mínimos para graficar un ciclo"""
+    return os.path.join(main_folder, f"cycle_{cycle_index}", f"render_{cycle_index}.npz")
+
+
+def guardar_trabajo_render(main_folder, cycle_index, seg1, seg2,
+                           spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges):
+    """
+    Guarda los arrays mínimos de un ciclo para graficarlo más tarde, comprimidos
+    (sin pérdida). Las fronteras se leen después desde info_{cycle_index}.json.
+    """
+    arrays = {
+        'spec1_ion': spec1_ion, 'spec2_ion': spec2_ion,
+        'spec1_ele': spec1_ele, 'spec2_ele': spec2_ele,
+        'energy_edges': energy_edges
+    }
+    for nombre, segmento in (('seg1', seg1), ('seg2', seg2)):
+        for clave in CLAVES_SEGMENTO:
+            arrays[f"{nombre}_{clave}"] = np.asarray(segmento.get(clave, np.array([])))
+
+    ruta = ruta_trabajo_render(main_folder, cycle_index)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    np.savez_compressed(ruta, **arrays)
+    return ruta
+
+
+def crear_trabajo_render(main_folder, cycle_index, seg1, seg2, boundaries1, boundaries2,
+                         spec1_ion, spec2_ion, spec1_ele, spec2_ele, energy_edges, cache=None,
+                         nivel='full'):
+    """
+    Trabajo de render de un ciclo: solo los arrays que se grafican (copiados,
+    sin referencias a los arrays globales), las fronteras y la carpeta de
+    salida. Se puede serializar para graficarlo en otro proceso.
+
+    Args:
+        cache (tuple): (directorio_cache, clave_figuras) para guardar los gráficos generados
+        nivel (str): Nivel de salida de los gráficos (ver NIVELES_GRAFICOS)
+    """
+    trabajo = {
+        'main_folder': main_folder,
+        'cycle_index': cycle_index,
+        'nivel': nivel,
+        'boundaries1': boundaries1,
+        'boundaries2': boundaries2,
+        'energy_edges': np.asarray(energy_edges),
+        'cache': cache
+    }
+    for nombre, spec in (('spec1_ion', spec1_ion), ('spec2_ion', spec2_ion),
+                         ('spec1_ele', spec1_ele), ('spec2_ele', spec2_ele)):
+        trabajo[nombre] = np.asarray(spec)
+    for nombre, segmento in (('seg1', seg1), ('seg2', seg2)):
+        trabajo[nombre] = {clave: np.asarray(segmento.get(clave, np.array([])))
+                           for clave in CLAVES_SEGMENTO}
+    return trabajo
+
+
+def renderizar_trabajo(trabajo):
+    """
+    Genera los gráficos de un trabajo de render (crear_trabajo_render).
+
+    Returns:
+        tuple: (ruta gráfico normal, ruta gráfico polar) del nivel del trabajo
+    """
+    nivel = trabajo.get('nivel', 'full')
+    argumentos = (
+        trabajo['seg1'], trabajo['seg2'],
+        trabajo['boundaries1'], trabajo['boundaries2'],
+        trabajo['spec1_ion'], trabajo['spec2_ion'],
+        trabajo['spec1_ele'], trabajo['spec2_ele'],
+        trabajo['energy_edges'], trabajo['main_folder'], trabajo['cycle_index']
+    )
+    rutas = (dibujar_ciclo(*argumentos, nivel=nivel), dibujar_ciclo_polar(*argumentos, nivel=nivel))
+
+    if trabajo.get('cache') is not None:
+        directorio_cache, clave = trabajo['cache']
+        guardar_figuras(directorio_cache, clave,
+                        rutas_graficos(trabajo['main_folder'], trabajo['cycle_index'], nivel))
+    return rutas
+
+
+def renderizar_ciclo(main_folder, cycle_index, eliminar=True, nivel='quicklook'):
+    """
+    Genera los gráficos de un ciclo a partir de su trabajo de render pendiente.
+    En 'quicklook' el trabajo se conserva siempre, para poder generar la
+    resolución completa cuando se pida (graficos_completos).
+
+    Returns:
+        tuple: (ruta gráfico normal, ruta gráfico polar), o None si no hay trabajo
+    """
+    ruta = ruta_trabajo_render(main_folder, cycle_index)
+    if not os.path.isfile(ruta):
+        return None
+
+    info_path = os.path.join(main_folder, f"cycle_{cycle_index}", f"info_{cycle_index}.json")
+    with open(info_path, 'r', encoding='utf-8') as f:
+        boundaries = json.load(f)['boundaries']
+
+    with np.load(ruta) as datos:
+        segmentos = {
+            nombre: {clave: datos[f"{nombre}_{clave}"] for clave in CLAVES_SEGMENTO}
+            for nombre in ('seg1', 'seg2')
+        }
+        trabajo = crear_trabajo_render(
+            main_folder, cycle_index, segmentos['seg1'], segmentos['seg2'],
+            boundaries['primera_mitad'], boundaries['segunda_mitad'],
+            datos['spec1_ion'], datos['spec2_ion'],
+            datos['spec1_ele'], datos['spec2_ele'], datos['energy_edges'], nivel=nivel
+        )
+
+    rutas = renderizar_trabajo(trabajo)
+    if eliminar and nivel == 'full':
+        os.remove(ruta)
+    return rutas
+
+
+def graficos_completos(main_folder, cycle_index):
+    """
+    Gráficos a resolución completa de un ciclo. Si no existen se generan desde
+    su trabajo de render (la primera vez que se piden) y quedan en la carpeta
+    del ciclo para las siguientes.
+
+    Returns:
+        dict: {'full': ruta, 'polar': ruta}, o None si no existen ni hay trabajo guardado
+    """
+    rutas = rutas_graficos(main_folder, cycle_index, 'full')
+    if all(os.path.isfile(ruta) for ruta in rutas.values()):
+        return rutas
+    if renderizar_ciclo(main_folder, cycle_index, eliminar=False, nivel='full') is None:
+        return None
+    return rutas
+
+
+def renderizar_pendientes(main_folder, eliminar=True, nivel='quicklook'):
+    """
+    Drena la cola de trabajos de render pendientes de una carpeta de resultados.
+    Los ciclos que ya tienen los gráficos del nivel pedido se omiten.
+
+    Returns:
+        dict: Rutas generadas por índice de ciclo
+    """
+    patron = os.path.join(main_folder, "cycle_*", "render_*.npz")
+    indices = sorted(int(os.path.basename(p)[len("render_"):-len(".npz")]) for p in glob.glob(patron))
+
+    generados = {}
+    for cycle_index in indices:
+        if all(os.path.isfile(ruta) for ruta in rutas_graficos(main_folder, cycle_index, nivel).values()):
+            continue
+        try:
+            generados[cycle_index] = renderizar_ciclo(main_folder, cycle_index, eliminar=eliminar,
+                                                      nivel=nivel)
+        except Exception as e:
+            print(f"Error renderizando ciclo {cycle_index}: {e}")
+    return generados
+
+
+if __name__ == "__main__":
+    # Uso: python -m funciones.render_diferido [--full] <carpeta_resultados> [...]
+    argumentos = sys.argv[1:]
+    nivel = 'full' if '--full' in argumentos else 'quicklook'
+    for carpeta in (a for a in argumentos if a != '--full'):
+        hechos = renderizar_pendientes(carpeta, nivel=nivel)
+        print(f"{carpeta}: {len(hechos)} ciclos renderizados")
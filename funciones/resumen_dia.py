@@ -0,0 +1,209 @@
+# resumen_dia.py - gráfico resumen de un archivo completo (todos los ciclos en una figura)
+import os
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch
+from .plot_utils import fechas_mpl, espectrograma_raster, COLORES_FRONTERAS
+
+# Columnas (intervalos de tiempo) del resumen: del orden del ancho en píxeles de los ejes
+MAX_COLUMNAS = 2500
+
+# Tamaño y resolución de la figura
+FIGSIZE_RESUMEN = (30, 16)
+DPI_RESUMEN = 100
+
+# Sombreado de las pasadas según el hemisferio
+COLORES_HEMISFERIO = {'N': 'tab:blue', 'S': 'tab:red'}
+
+
+def intervalos_tiempo(tiempo_num, n_columnas):
+    """
+    Reparte las muestras (ordenadas en el tiempo) en n_columnas intervalos
+    uniformes entre la primera y la última.
+
+    Returns:
+        tuple: (bordes de los intervalos (n_columnas + 1), primera muestra de
+            cada intervalo no vacío, índice de esos intervalos)
+    """
+    t0, t1 = tiempo_num[0], tiempo_num[-1]
+    if t1 <= t0:
+        raise ValueError("El eje temporal debe ser creciente")
+    bordes = np.linspace(t0, t1, n_columnas + 1)
+    columna = np.clip(((tiempo_num - t0) / (t1 - t0) * n_columnas).astype(np.int64), 0, n_columnas - 1)
+    inicios = np.flatnonzero(np.r_[True, np.diff(columna) != 0])
+    return bordes, inicios, columna[inicios]
+
+
+def reducir_espectrograma(spec, inicios, columnas, n_columnas):
+    """
+    Media geométrica por intervalo de un espectrograma (muestras x canales),
+    usando solo los valores positivos. Devuelve canales x columnas, con NaN
+    en los intervalos sin datos.
+    """
+    spec = np.asarray(spec, dtype=float)
+    validos = np.isfinite(spec) & (spec > 0)
+    log_spec = np.log10(np.where(validos, spec, 1.0))
+    suma = np.add.reduceat(np.where(validos, log_spec, 0.0), inicios, axis=0)
+    cuenta = np.add.reduceat(validos, inicios, axis=0)
+
+    reducido = np.full((n_columnas, spec.shape[1]), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        reducido[columnas] = np.where(cuenta > 0, 10 ** (suma / cuenta), np.nan)
+    return reducido.T
+
+
+def reducir_min_max(valores, inicios, columnas, n_columnas):
+    """Mínimo y máximo por intervalo (ignorando NaN); NaN en los intervalos sin datos"""
+    valores = np.where(np.isfinite(valores), valores, np.nan)
+    minimo = np.full(n_columnas, np.nan)
+    maximo = np.full(n_columnas, np.nan)
+    minimo[columnas] = np.fmin.reduceat(valores, inicios)
+    maximo[columnas] = np.fmax.reduceat(valores, inicios)
+    return minimo, maximo
+
+
+def _envolvente(ax, bordes, minimo, maximo, **kwargs):
+    """Dibuja la envolvente mín/máx como una línea vertical por intervalo (cortada en los vacíos)"""
+    centros = 0.5 * (bordes[:-1] + bordes[1:])
+    ax.plot(np.repeat(centros, 2), np.column_stack((minimo, maximo)).ravel(), **kwargs)
+
+
+def fronteras_ciclos(ciclos):
+    """
+    Tiempos de todas las fronteras detectadas en los ciclos, por frontera.
+
+    Args:
+        ciclos (list): Información de cada ciclo (procesar_ciclos o info_<n>.json); None se omite
+    """
+    tiempos = {}
+    for info in ciclos:
+        if not info:
+            continue
+        for mitad in info.get('boundaries', {}).values():
+            for nombre, frontera in (mitad or {}).items():
+                if frontera and frontera.get('time') is not None:
+                    tiempos.setdefault(nombre, []).append(np.datetime64(frontera['time'], 'ms'))
+    return {nombre: np.array(valores) for nombre, valores in tiempos.items()}
+
+
+def graficar_resumen_dia(tiempo, ion_diff, ele_diff, flux_ion, flux_ele, lat_aacgm,
+                         pares_extremos, ciclos, energy_edges, main_folder, titulo=None,
+                         max_columnas=MAX_COLUMNAS):
+    """
+    Resumen de un archivo completo en una sola figura: espectrogramas de iones
+    y electrones, flujos integrados y latitud AACGM de todo el intervalo, con
+    las fronteras de todos los ciclos superpuestas y las pasadas sombreadas.
+
+    Los datos se reducen a max_columnas intervalos de tiempo antes de dibujar:
+    media geométrica por intervalo en los espectrogramas y envolvente mín/máx
+    en las curvas, de modo que el costo no depende de la duración del archivo.
+
+    Args:
+        tiempo (array): Eje temporal (datetime64) de todas las muestras
+        ion_diff, ele_diff (array): Espectros diferenciales (muestras x canales)
+        flux_ion, flux_ele (array): Flujos integrados (log10)
+        lat_aacgm (array): Latitud AACGM
+        pares_extremos (array): Pares de índices de inicio y fin de cada pasada (ciclo)
+        ciclos (list): Información de cada ciclo con sus fronteras
+        energy_edges (array): Bordes de los canales de energía
+        main_folder (str): Carpeta de resultados (se guarda resumen_dia.png)
+        titulo (str): Texto del título (p.ej. nombre del archivo)
+
+    Returns:
+        str: Ruta del PNG, o None si no hay datos
+    """
+    tiempo = np.asarray(tiempo)
+    if len(tiempo) < 2:
+        print("Resumen del día: no hay datos suficientes")
+        return None
+    if max_columnas <= 0:
+        raise ValueError(f"max_columnas debe ser positivo: {max_columnas}")
+
+    tiempo_num = fechas_mpl(tiempo)
+    n_columnas = int(min(max_columnas, len(tiempo)))
+    bordes, inicios, columnas = intervalos_tiempo(tiempo_num, n_columnas)
+
+    fig = Figure(figsize=FIGSIZE_RESUMEN, layout='constrained')
+    FigureCanvasAgg(fig)
+    axs = fig.subplots(5, 2, sharex='col',
+                       gridspec_kw=dict(width_ratios=[60, 1], height_ratios=[3, 3, 2, 2, 1.2]))
+    for ax in axs[2:, 1]:
+        ax.axis('off')
+    paneles = axs[:, 0]
+
+    # Espectrogramas reducidos, dibujados como imagen
+    for ax, cax, spec, nombre in ((paneles[0], axs[0, 1], ion_diff, 'Iones'),
+                                  (paneles[1], axs[1, 1], ele_diff, 'Electrones')):
+        ax.set_yscale('log')
+        reducido = reducir_espectrograma(spec, inicios, columnas, n_columnas)
+        ax.set_ylabel('Energía (eV)')
+        ax.set_title(f'Espectrograma de {nombre}', fontsize=10)
+        if not np.any(np.isfinite(reducido)):
+            # Sin valores positivos en todo el archivo: panel vacío
+            ax.set_ylim(np.min(energy_edges), np.max(energy_edges))
+            ax.text(0.5, 0.5, 'Sin datos', transform=ax.transAxes, ha='center', va='center')
+            cax.axis('off')
+            continue
+        # Bordes de los intervalos: la imagen cubre exactamente [t0, t1]
+        _, escala = espectrograma_raster(ax, reducido, bordes, energy_edges)
+        fig.colorbar(escala, cax=cax, label='Flujo Diferencial (eV/cm²/sr/s/eV)')
+
+    # Curvas como envolvente mín/máx por intervalo
+    for ax, valores, etiqueta in ((paneles[2], flux_ion, 'Log Flux Iones'),
+                                  (paneles[3], flux_ele, 'Log Flux Electrones'),
+                                  (paneles[4], lat_aacgm, 'Lat. AACGM (°)')):
+        minimo, maximo = reducir_min_max(np.asarray(valores, dtype=float), inicios, columnas, n_columnas)
+        _envolvente(ax, bordes, minimo, maximo, color='b', linewidth=0.8)
+        ax.set_ylabel(etiqueta)
+        ax.grid(True, alpha=0.3)
+
+    # Pasadas sombreadas según el hemisferio y numeradas como los ciclos
+    lat_aacgm = np.asarray(lat_aacgm, dtype=float)
+    pares_extremos = np.asarray(pares_extremos, dtype=np.int64).reshape(-1, 2)
+    for cycle_index, (i0, i1) in enumerate(np.sort(pares_extremos, axis=1)):
+        paneles[-1].text(0.5 * (tiempo_num[i0] + tiempo_num[i1]), 0.95, f'C{cycle_index}',
+                         transform=paneles[-1].get_xaxis_transform(), ha='center', va='top',
+                         fontsize=8)
+        lat_pasada = np.abs(lat_aacgm[i0:i1 + 1])
+        if not np.any(np.isfinite(lat_pasada)):
+            # Sin latitud válida no se conoce el hemisferio: la pasada no se sombrea
+            continue
+        i_max = i0 + int(np.nanargmax(lat_pasada))
+        color = COLORES_HEMISFERIO['N' if lat_aacgm[i_max] >= 0 else 'S']
+        for ax in paneles[2:]:
+            ax.axvspan(tiempo_num[i0], tiempo_num[i1], color=color, alpha=0.08, linewidth=0)
+
+    # Fronteras de todos los ciclos: una colección de líneas por frontera y panel
+    leyenda = []
+    for nombre, tiempos in sorted(fronteras_ciclos(ciclos).items()):
+        color = COLORES_FRONTERAS.get(nombre, 'gray')
+        x = fechas_mpl(tiempos)
+        for ax in paneles:
+            ax.vlines(x, 0, 1, transform=ax.get_xaxis_transform(), colors=color,
+                      linestyles='--', linewidth=0.8, alpha=0.9)
+        leyenda.append(Line2D([], [], color=color, linestyle='--', label=f'{nombre} ({len(x)})'))
+    leyenda += [Patch(color=color, alpha=0.3, label=f'Pasada {hemisferio}')
+                for hemisferio, color in COLORES_HEMISFERIO.items()]
+    paneles[2].legend(handles=leyenda, loc='upper right', fontsize=8, ncol=6)
+
+    localizador = mdates.AutoDateLocator()
+    paneles[-1].xaxis.set_major_locator(localizador)
+    paneles[-1].xaxis.set_major_formatter(mdates.ConciseDateFormatter(localizador))
+    paneles[-1].set_xlim(bordes[0], bordes[-1])
+    paneles[-1].set_xlabel('UT')
+
+    t0, t1 = tiempo[0].astype('datetime64[s]'), tiempo[-1].astype('datetime64[s]')
+    fig.suptitle(f"{titulo + ': ' if titulo else ''}{t0} - {t1} ({len(pares_extremos)} ciclos)",
+                 fontsize=12)
+
+    try:
+        os.makedirs(main_folder, exist_ok=True)
+        path = os.path.join(main_folder, 'resumen_dia.png')
+        fig.savefig(path, dpi=DPI_RESUMEN, facecolor='white')
+        return path
+    except Exception as e:
+        print(f"Error guardando el resumen del día: {e}")
+        return None
@@ -1,21 +1,47 @@
 import numpy as np
 
-def split_cycle_segment(par, tiempo_final, tiempo_final_dict, flujos, sc_lat, sc_geo):
+def buscar_indices_tiempo(tiempo_final, tiempos):
     """
-    Divide un ciclo (par de instantes) en segmentos - CON DIRECCIÓN CORREGIDA
+    Devuelve los índices de 'tiempos' dentro del eje temporal monótono
+    'tiempo_final' mediante búsqueda binaria vectorizada.
+    Los instantes que no están presentes exactamente se marcan con -1.
     """
+    tiempo_final = np.asarray(tiempo_final)
+    tiempos = np.asarray(tiempos, dtype=tiempo_final.dtype)
+    idx = np.searchsorted(tiempo_final, tiempos)
+    idx_clip = np.minimum(idx, len(tiempo_final) - 1)
+    encontrado = (idx < len(tiempo_final)) & (tiempo_final[idx_clip] == tiempos)
+    return np.where(encontrado, idx_clip, -1)
+
+def split_cycle_segment(par, tiempo_final, flujos, sc_lat, sc_geo):
+    """
+    Divide un ciclo en segmentos - CON DIRECCIÓN CORREGIDA
+
+    'par' puede ser un par de índices enteros sobre tiempo_final (segmentar_orbita)
+    o un par de instantes / tuplas (tiempo, latitud).
+    """
+    tiempo_final = np.asarray(tiempo_final)
+    if len(tiempo_final) == 0:
+        return create_empty_segments()
+
     # Manejo de pares incompletos
     if len(par) == 1:
-        par = (par[0], tiempo_final[-1])
+        if isinstance(par[0], (int, np.integer)):
+            par = (par[0], len(tiempo_final) - 1)
+        else:
+            par = (par[0], tiempo_final[-1])
 
-    # Obtener índices de forma segura
-    t0 = par[0][0] if isinstance(par[0], (tuple, list)) else par[0]
-    t1 = par[1][0] if isinstance(par[1], (tuple, list)) else par[1]
+    if all(isinstance(p, (int, np.integer)) for p in par):
+        # Par de índices: no hace falta buscar los instantes
+        i0, i1 = int(par[0]), int(par[1])
+    else:
+        # Obtener índices de forma segura
+        t0 = par[0][0] if isinstance(par[0], (tuple, list)) else par[0]
+        t1 = par[1][0] if isinstance(par[1], (tuple, list)) else par[1]
 
-    i0 = tiempo_final_dict.get(t0)
-    i1 = tiempo_final_dict.get(t1)
+        i0, i1 = (int(i) for i in buscar_indices_tiempo(tiempo_final, [t0, t1]))
     
-    if i0 is None or i1 is None:
+    if i0 < 0 or i1 < 0:
         return create_empty_segments()
 
     # Asegurar límites y orden
@@ -26,27 +52,17 @@ def split_cycle_segment(par, tiempo_final, tiempo_final_dict, flujos, sc_lat, sc
     if i1 <= i0:
         i0, i1 = i1, i0
 
-    # Extraer subarrays
-    flux = flujos[i0:i1+1]
-    times = tiempo_final[i0:i1+1]
-    sc_geo_arr = np.asarray(sc_geo, float)
+    if len(sc_lat) <= i1 or len(sc_geo) <= i1:
+        # Coordenadas más cortas que el eje temporal: se repite el último valor
+        idx_coords = np.clip(np.arange(N), 0, len(sc_lat) - 1)
+        sc_lat = np.asarray(sc_lat)[idx_coords]
+        sc_geo = np.asarray(sc_geo)[idx_coords]
+    sc_lat = np.asarray(sc_lat)
+    sc_geo = np.asarray(sc_geo, float)
 
-    # Construir coordenadas
-    coords_a = []
-    coords_g = []
-    tiempo_arr = np.array(tiempo_final)
-    
-    for t in times:
-        idx = tiempo_final_dict.get(t)
-        if idx is None:
-            diffs = np.abs(tiempo_arr - t)
-            idx = int(np.argmin(diffs))
-        idx = int(max(0, min(idx, len(sc_lat)-1)))
-        coords_a.append(sc_lat[idx])
-        coords_g.append(sc_geo_arr[idx])
-
-    coords_a = np.array(coords_a)
-    coords_g = np.array(coords_g)
+    # Coordenadas geocéntricas del ciclo por slicing directo (vista)
+    coords_g = sc_geo[i0:i1 + 1]
+    n_ciclo = i1 - i0 + 1
 
     if len(coords_g) == 0:
         return create_empty_segments()
@@ -61,77 +77,53 @@ def split_cycle_segment(par, tiempo_final, tiempo_final_dict, flujos, sc_lat, sc
     max_idx = int(np.argmax(np.abs(coords_g)))
 
     def build(start, end, reverse=False, direccion=""):
+        """
+        Segmento [i0+start, i0+end) descrito como un slice (start, stop, step)
+        sobre los arrays globales: todos sus arrays son vistas, también cuando
+        se invierte para procesamiento.
+        """
         start = int(start)
         end = int(end)
         
         if start >= end:
             return create_empty_segment()
-            
-        idxs = np.arange(i0 + start, i0 + end, dtype=np.int32)
-        sub_flux = flux[start:end]
-        sub_time = times[start:end]
-        sub_ca = coords_a[start:end]
-        sub_cg = coords_g[start:end]
         
-        return {
-            'flux': sub_flux,
-            'time': sub_time,
-            'coords_aacgm': sub_ca,
-            'coords_geo': sub_cg,
-            'indices': idxs,
-            'direccion_original': direccion_original,
-            'direccion_procesamiento': direccion
-        }
-
-    def build_for_processing(start, end, reverse=False, direccion=""):
-        """Versión para procesamiento que sí invierte cuando es necesario"""
-        start = int(start)
-        end = int(end)
-        
-        if start >= end:
-            return create_empty_segment()
-            
         idxs = np.arange(i0 + start, i0 + end, dtype=np.int32)
-        sub_flux = flux[start:end]
-        sub_time = times[start:end]
-        sub_ca = coords_a[start:end]
-        sub_cg = coords_g[start:end]
-        
         if reverse:
-            idxs = idxs[::-1].astype(np.int32)
-            sub_flux = sub_flux[::-1]
-            sub_time = sub_time[::-1]
-            sub_ca = sub_ca[::-1]
-            sub_cg = sub_cg[::-1]
-            
+            inicio = i0 + end - 1
+            fin = i0 + start - 1
+            segmento = slice(inicio, fin if fin >= 0 else None, -1)
+            idxs = idxs[::-1]
+        else:
+            segmento = slice(i0 + start, i0 + end, 1)
+        
         return {
-            'flux': sub_flux,
-            'time': sub_time,
-            'coords_aacgm': sub_ca,
-            'coords_geo': sub_cg,
+            'flux': flujos[segmento],
+            'time': tiempo_final[segmento],
+            'coords_aacgm': sc_lat[segmento],
+            'coords_geo': sc_geo[segmento],
             'indices': idxs,
+            'slice': segmento,
             'direccion_original': direccion_original,
             'direccion_procesamiento': direccion
         }
 
-
-    
     if direccion_original == "ecuador-polo":
         # Segmento ya está en dirección correcta
         seg1_original = build(0, max_idx, reverse=False, direccion="ecuador-polo")
-        seg2_original = build(max_idx, len(flux), reverse=False, direccion="polo-ecuador")
+        seg2_original = build(max_idx, n_ciclo, reverse=False, direccion="polo-ecuador")
         
         # Para procesamiento: seg1 ya está bien, seg2 necesita invertirse
-        seg1_processing = build_for_processing(0, max_idx, reverse=False, direccion="ecuador-polo")
-        seg2_processing = build_for_processing(max_idx, len(flux), reverse=True, direccion="ecuador-polo")
+        seg1_processing = build(0, max_idx, reverse=False, direccion="ecuador-polo")
+        seg2_processing = build(max_idx, n_ciclo, reverse=True, direccion="ecuador-polo")
     else:
         # Segmento está en dirección polo-ecuador
         seg1_original = build(0, max_idx, reverse=False, direccion="polo-ecuador")
-        seg2_original = build(max_idx, len(flux), reverse=False, direccion="ecuador-polo")
+        seg2_original = build(max_idx, n_ciclo, reverse=False, direccion="ecuador-polo")
         
         # Para procesamiento: ambos segmentos necesitan invertirse
-        seg1_processing = build_for_processing(0, max_idx, reverse=True, direccion="ecuador-polo")
-        seg2_processing = build_for_processing(max_idx, len(flux), reverse=False, direccion="ecuador-polo")
+        seg1_processing = build(0, max_idx, reverse=True, direccion="ecuador-polo")
+        seg2_processing = build(max_idx, n_ciclo, reverse=False, direccion="ecuador-polo")
 
     return {
         'seg1_original': seg1_original,
@@ -149,6 +141,7 @@ def create_empty_segment():
         'coords_aacgm': np.array([]),
         'coords_geo': np.array([]),
         'indices': np.array([], dtype=np.int32),
+        'slice': slice(0, 0, 1),
         'direccion_original': "desconocida",
         'direccion_procesamiento': "desconocida"
     }
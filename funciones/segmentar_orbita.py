@@ -0,0 +1,157 @@
+# segmentar_orbita.py - segmentación vectorizada de la órbita en ciclos
+import numpy as np
+
+# Rango de latitud AACGM considerado auroral (ambos hemisferios)
+LATITUD_AURORAL = (40, 80)
+
+# Cambio de latitud entre muestras que se trata como un extremo (saltos entre pasadas)
+SALTO_LATITUD = 5.0
+
+# Extremos más cercanos que esto (en tiempo y latitud) se consideran duplicados
+DIF_TIEMPO_EXTREMOS = np.timedelta64(2, 's')
+DIF_LATITUD_EXTREMOS = 1.0
+
+# Separación mínima entre los dos extremos de un ciclo
+DIF_TIEMPO_PAR = np.timedelta64(10, 's')
+
+
+def mascara_auroral(SC_AACGM_LAT):
+    """Máscara de las muestras en latitudes aurorales (40°-80° en valor absoluto)"""
+    lat = np.asarray(SC_AACGM_LAT)
+    lat_min, lat_max = LATITUD_AURORAL
+    return ((-lat_max < lat) & (lat < -lat_min)) | ((lat_min < lat) & (lat < lat_max))
+
+
+def limpiar_mascara(mask, min_consecutive=2):
+    """
+    Elimina las rachas de True más cortas que 'min_consecutive', usando la
+    codificación por rachas (run-length) de la máscara.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    bordes = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordes == 1)
+    fines = np.flatnonzero(bordes == -1)
+    cortas = (fines - inicios) < min_consecutive
+
+    # +1 al inicio y -1 al final de cada racha corta: la suma acumulada marca sus muestras
+    marcas = np.zeros(len(mask) + 1, dtype=np.int64)
+    marcas[inicios[cortas]] += 1
+    marcas[fines[cortas]] -= 1
+    return mask & (np.cumsum(marcas[:-1]) == 0)
+
+
+def indices_transiciones(mask):
+    """Índices donde la máscara cambia de valor (partiendo de False)"""
+    mask = np.asarray(mask, dtype=bool)
+    anterior = np.concatenate(([False], mask[:-1]))
+    return np.flatnonzero(mask != anterior)
+
+
+def indices_extremos(latitudes, tiempos):
+    """
+    Índices de los extremos de latitud: primer y último punto, cruces por
+    cero y saltos de más de 5°, quedándose en cada uno con la muestra de
+    menor latitud absoluta. Los extremos casi duplicados (< 2 s y < 1°) se
+    fusionan conservando el de mayor latitud absoluta.
+
+    Args:
+        latitudes (array): Latitudes de las muestras aurorales
+        tiempos (array): Tiempos de esas muestras
+
+    Returns:
+        array: Índices (enteros) de los extremos en 'latitudes'
+    """
+    lat = np.asarray(latitudes, dtype=float)
+    tiempos = np.asarray(tiempos)
+    n = len(lat)
+    if n < 2:
+        return np.empty(0, dtype=np.int64)
+
+    # Cualquier cruce por cero O cambio significativo
+    prev, curr = lat[:-1], lat[1:]
+    cruce = (prev * curr <= 0) | (np.abs(curr - prev) > SALTO_LATITUD)
+    i = np.flatnonzero(cruce) + 1
+    # Punto exacto del cruce: el de menor latitud absoluta
+    puntos = np.where(np.abs(lat[i]) < np.abs(lat[i - 1]), i, i - 1)
+    candidatos = np.concatenate(([0], puntos, [n - 1]))
+
+    # Solo eliminar duplicados exactos: compara con el último extremo conservado,
+    # por lo que se recorre la lista de candidatos (pocos, no las muestras)
+    filtrados = [int(candidatos[0])]
+    for j in candidatos[1:].tolist():
+        k = filtrados[-1]
+        if (tiempos[j] - tiempos[k] > DIF_TIEMPO_EXTREMOS or
+                abs(lat[j] - lat[k]) > DIF_LATITUD_EXTREMOS):
+            filtrados.append(j)
+        elif abs(lat[j]) > abs(lat[k]):
+            filtrados[-1] = j
+
+    return np.asarray(filtrados, dtype=np.int64)
+
+
+def agrupar_indices_extremos(extremos, tiempos):
+    """
+    Agrupa extremos consecutivos en pares (ciclos) separados al menos 10 s.
+    Si queda un extremo impar al final, extiende el último par hasta él.
+
+    Args:
+        extremos (array): Índices de los extremos
+        tiempos (array): Tiempos indexados por 'extremos'
+
+    Returns:
+        array: Pares de índices, forma (n_ciclos, 2)
+    """
+    extremos = np.asarray(extremos, dtype=np.int64)
+    k = len(extremos)
+    if k < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    # Ordenar por tiempo (estable, como sorted)
+    t = np.asarray(tiempos)[extremos]
+    orden = np.argsort(t, kind='stable')
+    extremos = extremos[orden]
+    separados = (t[orden][1:] - t[orden][:-1]) >= DIF_TIEMPO_PAR
+
+    # Emparejamiento voraz: un par avanza 2 posiciones, un salto avanza 1
+    pares = []
+    i = 0
+    while i < k - 1:
+        if separados[i]:
+            pares.append((extremos[i], extremos[i + 1]))
+            i += 2
+        else:
+            i += 1
+
+    # Si quedó un extremo sin pareja, extender el último par hasta él
+    if k % 2 == 1 and k > 2 and pares:
+        pares[-1] = (pares[-1][0], extremos[-1])
+
+    return np.asarray(pares, dtype=np.int64).reshape(-1, 2)
+
+
+def segmentar_orbita(SC_AACGM_LAT, tiempo_final, min_consecutive=2):
+    """
+    Segmenta la órbita en ciclos: máscara auroral limpia, extremos de latitud
+    y pares de extremos, todo como índices enteros sobre 'tiempo_final'.
+
+    Returns:
+        dict: {'mascara', 'transiciones', 'extremos', 'pares'}
+    """
+    lat = np.asarray(SC_AACGM_LAT)
+    tiempo_final = np.asarray(tiempo_final)
+    if len(lat) != len(tiempo_final):
+        raise ValueError("Las listas deben tener el mismo largo.")
+
+    mascara = limpiar_mascara(mascara_auroral(lat), min_consecutive)
+    posiciones = np.flatnonzero(mascara)
+
+    # Extremos sobre las muestras aurorales, traducidos a índices globales
+    extremos = posiciones[indices_extremos(lat[posiciones], tiempo_final[posiciones])]
+    pares = agrupar_indices_extremos(extremos, tiempo_final)
+
+    return {
+        'mascara': mascara,
+        'transiciones': indices_transiciones(mascara),
+        'extremos': extremos,
+        'pares': pares
+    }
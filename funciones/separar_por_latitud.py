@@ -1,23 +1,26 @@
 import numpy as np
+from .segmentar_orbita import mascara_auroral, limpiar_mascara, indices_transiciones
 
 def separar_por_latitud(SC_AACGM_LAT, tiempo_final):
     """Separa datos según latitud en rangos específicos - MÁS INCLUSIVO"""
+    SC_AACGM_LAT = np.asarray(SC_AACGM_LAT)
+    tiempo_final = np.asarray(tiempo_final)
     if len(SC_AACGM_LAT) != len(tiempo_final):
         raise ValueError("Las listas deben tener el mismo largo.")
     
     # Definir máscara para latitudes aurorales 
-    mask = ((-80 < SC_AACGM_LAT) & (SC_AACGM_LAT < -40)) | ((40 < SC_AACGM_LAT) & (SC_AACGM_LAT < 80))
+    mask = mascara_auroral(SC_AACGM_LAT)
     
     # Aplicar filtro menos restrictivo
     mask_clean = clean_latitude_mask(mask, min_consecutive=2)  # Solo 2 puntos consecutivos
     
     # Listas ajustadas
     adjust_SC_AACGM_LAT = SC_AACGM_LAT[mask_clean].tolist()
-    adjust_tiempo_final = [t for i, t in enumerate(tiempo_final) if mask_clean[i]]
+    adjust_tiempo_final = tiempo_final[mask_clean]
     
     # Listas otras latitudes
     other_SC_AACGM_LAT = SC_AACGM_LAT[~mask_clean].tolist()
-    other_tiempo_final = [t for i, t in enumerate(tiempo_final) if not mask_clean[i]]
+    other_tiempo_final = tiempo_final[~mask_clean]
 
     # Puntos de transición
     transitions = find_clean_transitions(mask_clean, SC_AACGM_LAT, tiempo_final)
@@ -26,36 +29,8 @@ def separar_por_latitud(SC_AACGM_LAT, tiempo_final):
 
 def clean_latitude_mask(mask, min_consecutive=2):
     """Limpia la máscara para requerir secuencias mínimas de puntos - MENOS ESTRICTO"""
-    cleaned_mask = mask.copy()
-    n = len(mask)
-    
-    i = 0
-    while i < n:
-        if mask[i]:
-            # Encontrar secuencia consecutiva
-            j = i
-            while j < n and mask[j]:
-                j += 1
-            sequence_length = j - i
-            
-            # Si la secuencia es muy corta, eliminarla
-            if sequence_length < min_consecutive:
-                cleaned_mask[i:j] = False
-            
-            i = j
-        else:
-            i += 1
-    
-    return cleaned_mask
+    return limpiar_mascara(mask, min_consecutive)
 
 def find_clean_transitions(mask, latitudes, times):
     """Encuentra transiciones limpias entre zonas"""
-    transitions = []
-    prev_mask = False
-    
-    for i, (lat, time, current_mask) in enumerate(zip(latitudes, times, mask)):
-        if current_mask != prev_mask:
-            transitions.append((lat, time))
-            prev_mask = current_mask
-    
-    return transitions
\ No newline at end of file
+    return [(latitudes[i], times[i]) for i in indices_transiciones(mask)]
\ No newline at end of file
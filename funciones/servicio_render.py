@@ -0,0 +1,259 @@
+# servicio_render.py - render de gráficos en segundo plano con una cola acotada
+import os
+import time
+import queue
+import threading
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from .render_diferido import renderizar_trabajo
+
+# Trabajos en espera por proceso de render antes de bloquear a quien encola
+TRABAJOS_POR_WORKER = 2
+
+# Tiempo máximo (s) para graficar un ciclo antes de terminar su proceso
+TIMEOUT_TRABAJO = 300
+
+# Cada cuánto (s) el monitor revisa timeouts y procesos caídos
+INTERVALO_MONITOR = 0.5
+
+
+def _worker_render(trabajos, conexion):
+    """
+    Bucle de un proceso de render: grafica los trabajos que recibe por su
+    propia conexión hasta recibir None y devuelve el resultado de cada uno.
+    El proceso no toca la cola compartida, así que terminarlo (timeout) no
+    deja bloqueado al resto.
+    """
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    while True:
+        try:
+            trabajo = trabajos.recv()
+        except EOFError:
+            trabajo = None
+        if trabajo is None:
+            conexion.close()
+            return
+        t0 = time.perf_counter()
+        try:
+            rutas = renderizar_trabajo(trabajo)
+            resultado = (True, rutas, time.perf_counter() - t0)
+        except Exception as e:
+            resultado = (False, f"{type(e).__name__}: {e}", time.perf_counter() - t0)
+        conexion.send((trabajo['cycle_index'], resultado))
+
+
+class ServicioRender:
+    """
+    Pool de procesos (backend Agg) que grafica ciclos en segundo plano a
+    partir de trabajos de render (crear_trabajo_render).
+
+    Los trabajos entran por una cola acotada (cola_trabajos): cuando está
+    llena, put() bloquea al productor hasta que un proceso se libera. La cola
+    se puede pasar a otros procesos (p.ej. los workers de procesar_ciclos).
+    Un hilo repartidor saca cada trabajo de la cola y lo envía a un proceso
+    libre por la conexión propia de ese proceso. Un monitor termina los
+    trabajos que superan 'timeout' y reemplaza los procesos caídos, de modo
+    que un ciclo problemático solo cuenta como fallido y no detiene el resto.
+
+    Uso:
+        with ServicioRender(workers=4) as servicio:
+            servicio.enviar(trabajo)
+        print(servicio.estadisticas)
+    """
+
+    def __init__(self, workers=None, max_pendientes=None, timeout=TIMEOUT_TRABAJO):
+        """
+        Args:
+            workers (int): Procesos de render (None o <= 0: núcleos disponibles menos uno)
+            max_pendientes (int): Trabajos en espera antes de bloquear (por defecto 2 por proceso)
+            timeout (float): Segundos máximos por trabajo (None sin límite)
+        """
+        if workers is None or workers <= 0:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+        if max_pendientes is None:
+            max_pendientes = workers * TRABAJOS_POR_WORKER
+        if max_pendientes <= 0:
+            raise ValueError(f"max_pendientes debe ser positivo: {max_pendientes}")
+        if timeout is not None and timeout <= 0:
+            raise ValueError(f"timeout debe ser positivo: {timeout}")
+
+        self.workers = workers
+        self.timeout = timeout
+        self.cola_trabajos = mp.Queue(maxsize=max_pendientes)
+        self._lock = threading.Lock()
+        self._procesos = {}           # pid -> (Process, conexión de resultados, conexión de trabajos)
+        self._activos = {}            # pid -> (ciclo, instante de envío)
+        self._libres = queue.Queue()  # pids sin trabajo asignado
+        self._cerrando = False
+        self._inicio = time.perf_counter()
+
+        self.rutas = {}
+        self.estadisticas = {
+            'renderizados': 0,
+            'fallidos': 0,
+            'errores': {},
+            'segundos': 0.0,
+            'segundos_render': 0.0,
+            'ciclos_por_minuto': 0.0
+        }
+
+        for _ in range(workers):
+            self._lanzar()
+        self._monitor = threading.Thread(target=self._vigilar, name='monitor_render', daemon=True)
+        self._monitor.start()
+        self._repartidor = threading.Thread(target=self._repartir, name='repartidor_render',
+                                            daemon=True)
+        self._repartidor.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+    def enviar(self, trabajo, timeout=None):
+        """Encola un trabajo; bloquea mientras la cola esté llena (queue.Full si vence 'timeout')"""
+        if self._cerrando:
+            raise ValueError("El servicio de render ya está cerrado")
+        self.cola_trabajos.put(trabajo, timeout=timeout)
+
+    def cerrar(self):
+        """
+        Espera a que se grafiquen todos los trabajos encolados y detiene los procesos.
+
+        Returns:
+            dict: Estadísticas del servicio (renderizados, fallidos, errores por
+                ciclo, tiempo total, tiempo de render acumulado y ciclos por minuto)
+        """
+        if not self._cerrando:
+            self._cerrando = True
+            self.cola_trabajos.put(None)
+            self._repartidor.join()
+            self._monitor.join()
+
+            segundos = time.perf_counter() - self._inicio
+            self.estadisticas['segundos'] = segundos
+            if segundos > 0:
+                self.estadisticas['ciclos_por_minuto'] = 60 * self.estadisticas['renderizados'] / segundos
+        return self.estadisticas
+
+    def _lanzar(self):
+        recepcion, envio = mp.Pipe(duplex=False)
+        lectura, escritura = mp.Pipe(duplex=False)
+        proceso = mp.Process(target=_worker_render, args=(recepcion, escritura), daemon=True)
+        proceso.start()
+        recepcion.close()
+        escritura.close()
+        with self._lock:
+            self._procesos[proceso.pid] = (proceso, lectura, envio)
+        self._libres.put(proceso.pid)
+
+    def _repartir(self):
+        """Envía cada trabajo de la cola a un proceso libre; con None detiene los procesos"""
+        while True:
+            trabajo = self.cola_trabajos.get()
+            if trabajo is None:
+                break
+            self._asignar(trabajo)
+        for _ in range(self.workers):
+            self._asignar(None)
+
+    def _asignar(self, trabajo):
+        """Espera un proceso libre y le envía el trabajo (None lo detiene)"""
+        while True:
+            pid = self._libres.get()
+            with self._lock:
+                entrada = self._procesos.get(pid)
+                if entrada is None:
+                    # Proceso ya reemplazado por el monitor
+                    continue
+                if trabajo is not None:
+                    self._activos[pid] = (trabajo['cycle_index'], time.perf_counter())
+            try:
+                entrada[2].send(trabajo)
+                return
+            except (OSError, ValueError):
+                # El proceso cayó sin trabajo: el monitor lo reemplaza y se prueba con otro
+                with self._lock:
+                    self._activos.pop(pid, None)
+
+    def _vigilar(self):
+        """Recoge resultados, aplica timeouts y reemplaza procesos hasta que todos terminan"""
+        while True:
+            with self._lock:
+                procesos = list(self._procesos.items())
+            if not procesos:
+                return
+            esperas = [objeto for _, (proceso, lectura, _) in procesos
+                       for objeto in (lectura, proceso.sentinel)]
+            wait(esperas, timeout=INTERVALO_MONITOR)
+            for pid, (_, lectura, _) in procesos:
+                self._leer(pid, lectura)
+            self._revisar_procesos()
+
+    def _leer(self, pid, lectura):
+        """Registra los resultados pendientes de un proceso"""
+        try:
+            while lectura.poll():
+                self._registrar(pid, *lectura.recv())
+        except (EOFError, OSError):
+            pass
+
+    def _registrar(self, pid, ciclo, resultado):
+        with self._lock:
+            self._activos.pop(pid, None)
+        exito, valor, segundos = resultado
+        self.estadisticas['segundos_render'] += segundos
+        if exito:
+            self.estadisticas['renderizados'] += 1
+            self.rutas[ciclo] = valor
+        else:
+            self._fallo(ciclo, valor)
+        self._libres.put(pid)
+
+    def _fallo(self, ciclo, error):
+        print(f"Error renderizando ciclo {ciclo}: {error}")
+        self.estadisticas['fallidos'] += 1
+        self.estadisticas['errores'][ciclo] = error
+
+    def _revisar_procesos(self):
+        ahora = time.perf_counter()
+        with self._lock:
+            procesos = list(self._procesos.items())
+        for pid, (proceso, lectura, envio) in procesos:
+            with self._lock:
+                activo = self._activos.get(pid)
+            if activo is not None and self.timeout is not None and ahora - activo[1] > self.timeout:
+                # Releer por si el resultado llegó después de la última lectura:
+                # solo se termina un proceso que sigue con el trabajo
+                self._leer(pid, lectura)
+                with self._lock:
+                    activo = self._activos.get(pid)
+                if activo is None:
+                    continue
+                proceso.terminate()
+                error = f"timeout ({self.timeout} s)"
+            elif proceso.is_alive():
+                continue
+            else:
+                error = f"proceso de render terminado (código {proceso.exitcode})"
+
+            proceso.join()
+            self._leer(pid, lectura)
+            lectura.close()
+            envio.close()
+            with self._lock:
+                del self._procesos[pid]
+                activo = self._activos.pop(pid, None)
+            if proceso.exitcode == 0:
+                # Salida normal tras recibir None
+                continue
+
+            # El proceso se pierde con su trabajo: registrar el fallo y reemplazarlo
+            if activo is not None:
+                self._fallo(activo[0], error)
+            else:
+                print(f"Proceso de render {pid}: {error}")
+            self._lanzar()
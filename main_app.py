@@ -16,6 +16,9 @@ except ImportError:
         st.error(f"No se pudo importar el módulo de procesamiento: {str(e)}")
         st.stop()
 
+# módulo de funciones (gráficos a resolución completa bajo demanda)
+ov = ovation.ov
+
 
 # configuración de la página
 st.set_page_config(
@@ -63,6 +66,8 @@ def procesar_archivo_cdf(archivo_cdf):
 def cargar_resultados(directorio="results"):
     """Busca recursivamente carpetas `cycle_*` bajo `directorio` y carga
     archivos de información (info_*.json o info.txt) y cualquier imagen .png.
+    Las vistas rápidas (*_quicklook.png) se prefieren para mostrar; la
+    resolución completa queda en '<tipo>_completa' y las miniaturas en 'miniaturas'.
     Devuelve una lista de ciclos con metadatos para la UI.
     """
     ciclos = []
@@ -108,14 +113,24 @@ def cargar_resultados(directorio="results"):
                 others = []
                 for p in png_files:
                     low = p.lower()
+                    ruta = os.path.join(root, p)
                     if 'polar' in low:
-                        imagenes['polar'] = os.path.join(root, p)
+                        tipo = 'polar'
                     elif 'full' in low:
-                        imagenes['full'] = os.path.join(root, p)
+                        tipo = 'full'
                     elif 'cycle' in low:
-                        imagenes['cycle'] = os.path.join(root, p)
+                        tipo = 'cycle'
+                    else:
+                        others.append(ruta)
+                        continue
+                    if low.endswith('_thumb.png'):
+                        imagenes.setdefault('miniaturas', {})[tipo] = ruta
+                    elif low.endswith('_quicklook.png'):
+                        imagenes[tipo] = ruta
                     else:
-                        others.append(os.path.join(root, p))
+                        # resolución completa: solo se muestra si no hay vista rápida
+                        imagenes[f'{tipo}_completa'] = ruta
+                        imagenes.setdefault(tipo, ruta)
                 if others:
                     imagenes['other'] = others
 
@@ -234,6 +249,14 @@ else:
         3. Ejecuta el procesamiento
         """)
     else:
+        # miniaturas de todos los ciclos para una vista general rápida
+        miniaturas = [(c['nombre'], c['imagenes'].get('miniaturas', {}).get('full')) for c in ciclos]
+        miniaturas = [(nombre, ruta) for nombre, ruta in miniaturas if ruta]
+        if miniaturas:
+            with st.expander("🖼️ Miniaturas de los ciclos"):
+                st.image([ruta for _, ruta in miniaturas], caption=[nombre for nombre, _ in miniaturas],
+                         width=160)
+
         # selector de ciclo
         nombres_ciclos = [ciclo['nombre'] for ciclo in ciclos]
         ciclo_seleccionado = st.selectbox(
@@ -315,6 +338,19 @@ else:
                             st.image(path, use_column_width=True, caption=f"{modo_img} - {ciclo['nombre']}")
                         else:
                             st.warning('No hay imagen disponible para la opción seleccionada')
+
+                    # resolución completa: se genera la primera vez que se pide y queda guardada
+                    if modo_img in ('Polar', 'Full', 'Ambas') and st.button("🔍 Ver resolución completa"):
+                        with st.spinner("Generando gráficos a resolución completa..."):
+                            completas = ov.graficos_completos(os.path.dirname(ciclo['ruta']),
+                                                              int(ciclo['nombre'].split('_')[-1]))
+                        if completas:
+                            tipos = ['polar', 'full'] if modo_img == 'Ambas' else [modo_img.lower()]
+                            for tipo in tipos:
+                                st.image(completas[tipo], use_column_width=True,
+                                         caption=f"{tipo} (resolución completa) - {ciclo['nombre']}")
+                        else:
+                            st.warning('No hay datos guardados para generar la resolución completa')
                 else:
                     st.warning("No se encontró la gráfica para este ciclo")
             
@@ -0,0 +1,118 @@
+# conftest.py - importa el paquete funciones desde la raíz del repositorio y define datos sintéticos comunes
+import os
+import sys
+import json
+import glob
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENERGIAS_SINTETICAS = np.array([30000, 20400, 13900, 9450, 6460, 4400, 3000, 2040, 1392, 949, 646,
+                                440, 300, 204, 139, 95, 65, 44, 30], float)
+
+
+def _segmento_sintetico(rng, n):
+    """Segmento de procesamiento con saltos de flujo, ruido y algunos NaN/ceros"""
+    nivel = np.cumsum(rng.normal(0, rng.choice([0.05, 0.3, 1.0]), n))
+    saltos = np.zeros(n)
+    for _ in range(rng.integers(0, 5)):
+        saltos[rng.integers(0, n):] += rng.normal(0, 3)
+    log_flujo = rng.choice([2, 5, 8, 10]) + 0.3 * nivel + saltos
+    forma = (rng.normal(0, 1, (n, 19)) * rng.choice([0.1, 1, 2])
+             - 0.3 * np.abs(np.log(ENERGIAS_SINTETICAS / rng.choice([100, 1000, 5000])))[None, :])
+    ele = 10 ** (log_flujo[:, None] + forma)
+    ion = 10 ** (log_flujo[:, None] - 1 + rng.normal(0, 1, (n, 19)) * 0.5)
+    if rng.random() < 0.3:
+        ele[rng.random(ele.shape) < 0.02] = np.nan
+    if rng.random() < 0.3:
+        ele[rng.integers(0, n), rng.integers(0, 19)] = 0
+    flux_ele = np.log10(np.nansum(ele, 1) + 1e-10) + rng.choice([0, 1.5, 3])
+    flux_ion = np.log10(np.nansum(ion, 1) + 1e-10) + rng.choice([0, 1.5, 3])
+    ele_limpio = np.nan_to_num(ele)
+    energia = (ele_limpio * ENERGIAS_SINTETICAS).sum(1) / np.maximum(ele_limpio.sum(1), 1e-30)
+    return {'time': np.arange(n).astype('datetime64[s]'), 'lat': np.linspace(50, 80, n),
+            'coords_aacgm': np.linspace(50, 80, n), 'ele_diff_flux': ele, 'ion_diff_flux': ion,
+            'flux_ele': flux_ele, 'flux_ion': flux_ion, 'ele_energy_flux': flux_ele,
+            'ion_energy_flux': flux_ion, 'ion_energy_flux_b2i': flux_ion, 'ele_avg_energy': energia}
+
+
+@pytest.fixture
+def energias():
+    """Energías de los 19 canales del SSJ (orden descendente, como en el CDF)"""
+    return ENERGIAS_SINTETICAS.copy()
+
+
+@pytest.fixture
+def segmento_sintetico():
+    """Generador de segmentos sintéticos: segmento_sintetico(rng, n)"""
+    return _segmento_sintetico
+
+
+@pytest.fixture
+def escribir_cdf(tmp_path):
+    """
+    Escribe un CDF sintético del SSJ (1 Hz desde 2014-12-31) y devuelve su
+    ruta: escribir_cdf(nombre, n, relleno=(), ele_avg_energy=None).
+    Los registros de 'relleno' tienen un Epoch inválido (año 2099, posterior a FECHA_LIMITE_EPOCH).
+    """
+    from cdflib import cdfepoch
+    from cdflib.cdfwrite import CDF
+
+    def escribir(nombre='sintetico.cdf', n=600, relleno=(), ele_avg_energy=None, semilla=0):
+        rng = np.random.default_rng(semilla)
+        epoch = cdfepoch.compute_epoch([2014, 12, 31, 0, 0, 0, 0]) + np.arange(n) * 1000.0
+        epoch[list(relleno)] = cdfepoch.compute_epoch([2099, 12, 31, 0, 0, 0, 0])
+        fase = 2 * np.pi * np.arange(n) / 6060.0
+        aacgm = 85 * np.sin(fase)
+        auroral = np.where((np.abs(aacgm) > 45) & (np.abs(aacgm) < 75), 1e3, 1.0)[:, None]
+        ruido = np.exp(rng.normal(0, 1, (n, 19)))
+        ele = 1e4 * auroral * ruido * np.exp(-np.abs(np.log(ENERGIAS_SINTETICAS / 1000)))[None, :]
+        ion = 1e3 * auroral * ruido * np.exp(-np.abs(np.log(ENERGIAS_SINTETICAS / 5000)))[None, :]
+        ele[rng.random((n, 19)) < 0.001] = -1e31
+
+        ruta = str(tmp_path / nombre)
+        cdf = CDF(ruta, cdf_spec={'Majority': 'row_major'}, delete=True)
+
+        def variable(nombre_var, datos, tipo, por_registro=True, dims=None, validos=False):
+            atributos = {'VALIDMIN': [0.0, 'CDF_DOUBLE'], 'VALIDMAX': [1e12, 'CDF_DOUBLE']} if validos else {}
+            cdf.write_var({'Variable': nombre_var, 'Data_Type': tipo, 'Num_Elements': 1,
+                           'Rec_Vary': por_registro, 'Dim_Sizes': dims or []},
+                          var_attrs=atributos, var_data=datos)
+
+        variable('Epoch', epoch, 31)
+        variable('CHANNEL_ENERGIES', ENERGIAS_SINTETICAS, 21, por_registro=False, dims=[19])
+        variable('ELE_DIFF_ENERGY_FLUX', ele, 21, dims=[19], validos=True)
+        variable('ION_DIFF_ENERGY_FLUX', ion, 21, dims=[19], validos=True)
+        variable('ELE_TOTAL_ENERGY_FLUX', ele.sum(1), 21)
+        variable('ION_TOTAL_ENERGY_FLUX', ion.sum(1), 21)
+        variable('SC_AACGM_LAT', aacgm, 21)
+        variable('SC_GEOCENTRIC_LAT', 80 * np.sin(fase + 0.05), 21)
+        if ele_avg_energy is not None:
+            variable('ELE_AVG_ENERGY', np.asarray(ele_avg_energy, float), 21, validos=True)
+        cdf.close()
+        return ruta
+
+    return escribir
+
+
+@pytest.fixture
+def ejecutar_pipeline(tmp_path):
+    """
+    Procesa un CDF con procesar_datos_dmsp en una carpeta nueva y devuelve
+    (resultado, {nombre del info_<n>.json: contenido}).
+    """
+    import OvationRebron23
+
+    def ejecutar(ruta_cdf, nombre='salida', **opciones):
+        salida = tmp_path / nombre
+        resultado = OvationRebron23.procesar_datos_dmsp(ruta_cdf, str(salida), **opciones)
+        assert resultado['estado'] == 'completado', resultado.get('error')
+        infos = {}
+        for ruta in glob.glob(str(salida / '*' / 'cycle_*' / 'info_*.json')):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                infos[os.path.basename(ruta)] = json.load(f)
+        return resultado, infos
+
+    return ejecutar
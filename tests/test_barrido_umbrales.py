@@ -0,0 +1,104 @@
+# test_barrido_umbrales.py - el barrido vectorizado reproduce detect_all_boundaries por conjunto
+import copy
+
+import numpy as np
+import pytest
+
+from funciones import barrido_umbrales
+from funciones.barrido_umbrales import umbrales_conjuntos, barrer_segmento, expandir_rejilla
+from funciones.boundary_detection import detect_all_boundaries
+from funciones.fronteras.funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+
+OPCIONES = {
+    'b1e.min_jump': [1.5, 2, 3], 'b1e.very_high_flux': [7, 8.25, 9], 'b1e.background_window': [5, 10, 20],
+    'b1i.high_flux_thresh': [5, 6.5, 8], 'b1i.min_jump': [1.2, 2],
+    'b2e.low_flux_thresh': [8, 11, 13], 'b2e.energy_thresh': [100, 1000, 5000],
+    'b2e.lookahead': [3, 9, 15], 'b2e.verification_window': [0, 10, 30],
+    'b4s.sum_threshold': [2, 4, 5.5], 'b4s.min_corr': [0.3, 0.6, 0.8], 'b4s.n_sum': [5, 7],
+    'b4s.n_corr': [3, 5], 'b4s.subvisual_thresh': [9, 10.7]
+}
+
+
+def conjuntos_aleatorios(rng, n):
+    claves = list(OPCIONES)
+    conjuntos = [{}]
+    for _ in range(n):
+        elegidas = rng.choice(claves, rng.integers(1, 6), replace=False)
+        conjuntos.append({c: OPCIONES[c][rng.integers(len(OPCIONES[c]))] for c in elegidas})
+    return conjuntos
+
+
+@pytest.fixture
+def restaurar_umbrales():
+    """Restaura PAPER_THRESHOLDS en su lugar (los detectores comparten el mismo dict)"""
+    original = copy.deepcopy(PAPER_THRESHOLDS)
+    yield
+    for nodo, valores in original.items():
+        PAPER_THRESHOLDS[nodo].clear()
+        PAPER_THRESHOLDS[nodo].update(valores)
+
+
+def _aplicar(umbrales):
+    for nodo, valores in umbrales.items():
+        PAPER_THRESHOLDS[nodo].clear()
+        PAPER_THRESHOLDS[nodo].update(valores)
+
+
+def _indice(resultado):
+    return -1 if resultado['index'] is None else resultado['index']
+
+
+@pytest.mark.parametrize('semilla', range(6))
+def test_barrido_igual_a_detect_all_boundaries(semilla, energias, segmento_sintetico, restaurar_umbrales):
+    rng = np.random.default_rng(semilla)
+    segmento = segmento_sintetico(rng, int(rng.choice([15, 40, 100, 300, 1000])))
+    planos, umbrales = umbrales_conjuntos(conjuntos_aleatorios(rng, 12))
+
+    barrido = barrer_segmento(segmento, energias, umbrales)
+    for p, umbral in enumerate(umbrales):
+        _aplicar(umbral)
+        referencia = detect_all_boundaries(segmento, energias)
+        assert set(referencia) == set(barrido)
+        for frontera, resultado in referencia.items():
+            assert barrido[frontera][p] == _indice(resultado), (frontera, planos[p])
+
+
+def test_barrido_con_subconjunto_de_fronteras(energias, segmento_sintetico, restaurar_umbrales):
+    rng = np.random.default_rng(42)
+    segmento = segmento_sintetico(rng, 300)
+    _, umbrales = umbrales_conjuntos(expandir_rejilla({'b2e.low_flux_thresh': [8, 11, 13]}))
+
+    barrido = barrer_segmento(segmento, energias, umbrales, fronteras=['b2e'])
+    assert set(barrido) == {'b1e', 'b2e'}
+    for p, umbral in enumerate(umbrales):
+        _aplicar(umbral)
+        referencia = detect_all_boundaries(segmento, energias, fronteras=['b2e'])
+        assert barrido['b2e'][p] == _indice(referencia['b2e'])
+
+
+def test_umbral_no_soportado():
+    with pytest.raises(ValueError):
+        umbrales_conjuntos([{'b6.inexistente': 1}])
+
+
+def test_fallo_de_un_conjunto_se_informa(energias, segmento_sintetico, monkeypatch, capsys,
+                                         restaurar_umbrales):
+    rng = np.random.default_rng(3)
+    segmento = segmento_sintetico(rng, 300)
+    _, umbrales = umbrales_conjuntos(expandir_rejilla({'b2e.low_flux_thresh': [8, 11, 13]}))
+    esperado = barrer_segmento(segmento, energias, umbrales)['b2e']
+
+    original = barrido_umbrales.BARRIDOS['b2e']
+
+    def fallar_con_11(segment, channel_energies, lista, indices, precalculos):
+        if any(u['low_flux_thresh'] == 11 for u in lista):
+            raise RuntimeError('fallo simulado')
+        return original(segment, channel_energies, lista, indices, precalculos)
+
+    monkeypatch.setitem(barrido_umbrales.BARRIDOS, 'b2e', fallar_con_11)
+    obtenido = barrer_segmento(segmento, energias, umbrales)['b2e']
+
+    assert obtenido[1] == -1
+    assert obtenido[0] == esperado[0] and obtenido[2] == esperado[2]
+    salida = capsys.readouterr().out
+    assert 'b2e' in salida and 'conjunto 1' in salida and 'fallo simulado' in salida
@@ -0,0 +1,90 @@
+# test_boundary_detection.py - planificación por grafo de dependencias frente al despacho secuencial original
+import numpy as np
+import pytest
+
+from funciones import fronteras as fb
+from funciones.boundary_detection import detect_all_boundaries, resolver_fronteras
+
+TODAS = ['b1e', 'b1i', 'b2e', 'b2i', 'b3a', 'b3b', 'b4s', 'b5e', 'b5i', 'b6']
+
+
+def _despacho_original(segment_data, channel_energies, fronteras=TODAS):
+    """detect_all_boundaries original: una frontera tras otra en el orden pedido"""
+    default_boundary = {'index': None, 'time': None, 'lat': None, 'deviation': 0}
+    required_keys = {'b1e': ['ele_diff_flux'], 'b1i': ['ion_diff_flux'],
+                     'b2e': ['ele_avg_energy', 'ele_energy_flux'], 'b2i': ['ion_energy_flux_b2i'],
+                     'b3a': ['ele_diff_flux'], 'b3b': ['ele_diff_flux'], 'b4s': ['ele_diff_flux'],
+                     'b5e': ['ele_energy_flux', 'flux_ele'], 'b5i': ['ion_energy_flux', 'flux_ion'],
+                     'b6': ['ele_energy_flux', 'ion_energy_flux']}
+
+    def get_index(resultado):
+        return resultado['index'] if resultado and resultado['index'] is not None else None
+
+    def datos(frontera):
+        return all(key in segment_data and segment_data[key] is not None and len(segment_data[key]) > 0
+                   and not np.all(np.isnan(segment_data[key])) for key in required_keys.get(frontera, []))
+
+    boundaries = {}
+    for frontera in fronteras:
+        try:
+            if frontera not in required_keys or not datos(frontera):
+                boundaries[frontera] = default_boundary
+            elif frontera == 'b1e':
+                boundaries['b1e'] = fb.detect_b1e(segment_data, channel_energies)
+            elif frontera == 'b1i':
+                boundaries['b1i'] = fb.detect_b1i(segment_data, channel_energies)
+            elif frontera == 'b2e':
+                boundaries['b2e'] = fb.detect_b2e(segment_data, get_index(boundaries.get('b1e')))
+            elif frontera == 'b2i':
+                boundaries['b2i'] = fb.detect_b2i(segment_data, channel_energies)
+            elif frontera in ('b3a', 'b3b'):
+                result = fb.detect_b3(segment_data, channel_energies)
+                boundaries['b3a'], boundaries['b3b'] = result['b3a'], result['b3b']
+            elif frontera == 'b4s':
+                boundaries['b4s'] = fb.detect_b4s(segment_data, get_index(boundaries.get('b2e')),
+                                                  get_index(boundaries.get('b2i')))
+            elif frontera in ('b5e', 'b5i'):
+                boundaries[frontera] = fb.detect_b5(segment_data, 'electron' if frontera == 'b5e' else 'ion')
+            elif frontera == 'b6':
+                boundaries['b6'] = fb.detect_b6(segment_data, get_index(boundaries.get('b5e')))
+        except Exception:
+            boundaries[frontera] = default_boundary
+    return boundaries
+
+
+def _indices(boundaries):
+    return {f: r['index'] for f, r in boundaries.items()}
+
+
+@pytest.mark.parametrize('hilos', [1, 4])
+@pytest.mark.parametrize('semilla', range(8))
+def test_grafo_igual_al_despacho_secuencial(semilla, hilos, energias, segmento_sintetico):
+    rng = np.random.default_rng(semilla)
+    segmento = segmento_sintetico(rng, int(rng.choice([15, 100, 400])))
+    if semilla % 2 == 0:
+        # Caída del flujo de energía: b5e/b5i y b6 a partir de b5e
+        n = len(segmento['time'])
+        for clave in ('ele_energy_flux', 'ion_energy_flux'):
+            segmento[clave] = 10 ** np.where(np.arange(n) < rng.integers(20, 80), 11.5, 9.0)
+    if semilla % 4 == 3:
+        segmento['ele_avg_energy'] = np.full(len(segmento['time']), np.nan)  # b2e sin datos
+    esperado = _despacho_original(segmento, energias)
+    obtenido = detect_all_boundaries(segmento, energias, hilos=hilos)
+    assert list(obtenido) == TODAS
+    assert _indices(obtenido) == _indices(esperado)
+
+
+@pytest.mark.parametrize('pedidas, nodos', [
+    (['b6'], ['b5e', 'b6']),
+    (['b4s'], ['b1e', 'b2e', 'b2i', 'b4s']),
+    (['b3b', 'b1i'], ['b1i', 'b3']),
+    (['b2e', 'b1e'], ['b1e', 'b2e']),
+])
+def test_subconjunto_con_prerequisitos(pedidas, nodos, energias, segmento_sintetico):
+    assert resolver_fronteras(pedidas) == (nodos, [])
+    segmento = segmento_sintetico(np.random.default_rng(3), 300)
+    completo = _indices(_despacho_original(segmento, energias))
+    obtenido = _indices(detect_all_boundaries(segmento, energias, fronteras=pedidas + ['bx']))
+    # Las fronteras pedidas usan los mismos índices previos que la detección completa
+    assert obtenido.pop('bx') is None
+    assert all(obtenido[f] == completo[f] for f in pedidas)
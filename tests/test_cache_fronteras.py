@@ -0,0 +1,213 @@
+# test_cache_fronteras.py - cache incremental: qué nodos se recalculan al cambiar umbrales, código o datos
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+from funciones import cache_fronteras
+from funciones.boundary_detection import GRAFO_FRONTERAS
+from funciones.cache_fronteras import (MODULO_GRAFO, entradas_incrementales, guardar_caracteristica,
+                                       guardar_figuras, guardar_resultados_segmento, huella_codigo)
+from funciones.cache_preprocesado import EDAD_MAX_TEMPORAL, guardar_cache, podar_cache
+from funciones.deteccion_lotes import detectar_fronteras_lote
+from funciones.fronteras.funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+
+
+def _lote(segmento_sintetico, semilla=0, n_segmentos=6):
+    rng = np.random.default_rng(semilla)
+    segmentos = [segmento_sintetico(rng, int(n)) for n in rng.integers(60, 400, n_segmentos)]
+    longitudes = [len(s['time']) for s in segmentos]
+    offsets = np.concatenate(([0], np.cumsum(longitudes)))
+    datos = {clave: np.concatenate([s[clave] for s in segmentos]) for clave in segmentos[0]}
+    return {'offsets': offsets, 'indices': np.arange(offsets[-1]), 'datos': datos,
+            'direcciones': ['ecuador-polo'] * n_segmentos}
+
+
+def _indices(resultados):
+    return [{f: r['index'] for f, r in fronteras.items()} for fronteras in resultados]
+
+
+@pytest.fixture
+def ejecutados(monkeypatch):
+    """Registra los nodos del grafo que se ejecutan (en lugar de restaurarse del cache)"""
+    registro = []
+    for nodo, datos in GRAFO_FRONTERAS.items():
+        def contar(seg, ce, prev, _nodo=nodo, _detector=datos['detector'], **kw):
+            registro.append(_nodo)
+            return _detector(seg, ce, prev, **kw)
+        monkeypatch.setitem(datos, 'detector', contar)
+    return registro
+
+
+def test_cambio_de_umbral_recalcula_el_nodo_y_sus_dependientes(energias, segmento_sintetico, tmp_path,
+                                                               monkeypatch, ejecutados):
+    lote = _lote(segmento_sintetico)
+    directorio = str(tmp_path)
+    frio = detectar_fronteras_lote(lote, energias, directorio_cache=directorio)
+    assert Counter(ejecutados) == {nodo: 6 for nodo in GRAFO_FRONTERAS}
+
+    # Sin cambios no se ejecuta ningún detector y el resultado es el mismo
+    ejecutados.clear()
+    caliente = detectar_fronteras_lote(lote, energias, directorio_cache=directorio)
+    assert ejecutados == []
+    assert _indices(caliente) == _indices(frio)
+    for a, b in zip(caliente, frio):
+        assert all(a[f]['time'] == b[f]['time'] and a[f]['lat'] == b[f]['lat'] for f in a)
+
+    # Un umbral de b1e: se recalcula b1e, y b2e/b4s solo donde cambió su frontera previa
+    monkeypatch.setitem(PAPER_THRESHOLDS['b1e'], 'min_jump', 1.05)
+    monkeypatch.setitem(PAPER_THRESHOLDS['b1e'], 'very_high_flux', 7.0)
+    ejecutados.clear()
+    nuevo = _indices(detectar_fronteras_lote(lote, energias, directorio_cache=directorio))
+    recalculados = Counter(ejecutados)
+    assert nuevo == _indices(detectar_fronteras_lote(lote, energias))
+
+    antes = _indices(frio)
+    esperados = Counter()
+    for a, d in zip(antes, nuevo):
+        esperados['b1e'] += 1
+        esperados['b2e'] += a['b1e'] != d['b1e']
+        esperados['b4s'] += a['b2e'] != d['b2e']
+    assert esperados['b2e'] > 0
+    assert recalculados == +esperados
+
+    # Un umbral de b4s no afecta a ningún otro nodo
+    monkeypatch.setitem(PAPER_THRESHOLDS['b4s'], 'sum_threshold', 5.0)
+    ejecutados.clear()
+    detectar_fronteras_lote(lote, energias, directorio_cache=directorio)
+    assert Counter(ejecutados) == {'b4s': 6}
+
+
+def test_cambio_de_codigo_invalida_sus_entradas(energias, segmento_sintetico, tmp_path, monkeypatch,
+                                                ejecutados):
+    lote = _lote(segmento_sintetico, semilla=1)
+    directorio = str(tmp_path)
+    frio = _indices(detectar_fronteras_lote(lote, energias, directorio_cache=directorio))
+
+    def codigo_cambiado(modulo):
+        def huella(nombre, dependencias=True):
+            return huella_codigo(nombre, dependencias) + ('*' if nombre == modulo else '')
+        return huella
+
+    # El módulo de b5e/b5i: solo esos dos nodos (b6 recibe el mismo índice de b5e)
+    monkeypatch.setattr(cache_fronteras, 'huella_codigo', codigo_cambiado('funciones.fronteras.detect_b5_ei'))
+    ejecutados.clear()
+    assert _indices(detectar_fronteras_lote(lote, energias, directorio_cache=directorio)) == frio
+    assert Counter(ejecutados) == {'b5e': 6, 'b5i': 6}
+
+    # El grafo (boundary_detection.py): todos los nodos
+    monkeypatch.setattr(cache_fronteras, 'huella_codigo', codigo_cambiado(MODULO_GRAFO))
+    ejecutados.clear()
+    assert _indices(detectar_fronteras_lote(lote, energias, directorio_cache=directorio)) == frio
+    assert Counter(ejecutados) == {nodo: 6 for nodo in GRAFO_FRONTERAS}
+
+
+def test_huella_codigo_sigue_los_modulos_usados(tmp_path, monkeypatch):
+    paquete = tmp_path / 'paquete_huella'
+    paquete.mkdir()
+    (paquete / '__init__.py').write_text('')
+    (paquete / 'auxiliar.py').write_text('def f():\n    return 1\n')
+    (paquete / 'otro.py').write_text('X = 1\n')
+    (paquete / 'detector.py').write_text('from .auxiliar import f\n\ndef detectar():\n    return f()\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import paquete_huella.detector  # noqa: F401
+    import paquete_huella.otro  # noqa: F401
+    try:
+        def huellas():
+            huella_codigo.cache_clear()
+            return (huella_codigo('paquete_huella.detector'),
+                    huella_codigo('paquete_huella.detector', dependencias=False))
+
+        base, solo_modulo = huellas()
+        (paquete / 'otro.py').write_text('X = 2\n')
+        assert huellas() == (base, solo_modulo)
+        (paquete / 'auxiliar.py').write_text('def f():\n    return 2\n')
+        cambiada, solo_modulo_2 = huellas()
+        assert cambiada != base and solo_modulo_2 == solo_modulo
+        (paquete / 'detector.py').write_text('from .auxiliar import f\n\ndef detectar():\n    return -f()\n')
+        assert huellas()[1] != solo_modulo
+    finally:
+        huella_codigo.cache_clear()
+        for nombre in [m for m in sys.modules if m.startswith('paquete_huella')]:
+            del sys.modules[nombre]
+
+
+def test_reejecucion_igual_a_ejecucion_en_frio(escribir_cdf, ejecutar_pipeline, tmp_path, monkeypatch,
+                                               ejecutados):
+    ruta = escribir_cdf(n=3 * 3600)
+    cache = str(tmp_path / 'cache')
+    frio, infos = ejecutar_pipeline(ruta, 'frio', directorio_cache=cache)
+    assert len(infos) >= 2 and ejecutados
+
+    # La segunda ejecución no ejecuta detectores ni dibuja: copia los gráficos del cache
+    guardados = []
+    monkeypatch.setattr(Figure, 'savefig', lambda self, *args, **kwargs: guardados.append(args))
+    ejecutados.clear()
+    caliente, infos_caliente = ejecutar_pipeline(ruta, 'caliente', directorio_cache=cache)
+    assert ejecutados == [] and guardados == []
+    assert infos_caliente == infos
+
+    def archivos(resultado):
+        carpeta = resultado['directorio_resultados']
+        rutas = sorted(glob.glob(os.path.join(carpeta, '*', '*')))
+        return {os.path.relpath(r, carpeta): open(r, 'rb').read() for r in rutas}
+    assert archivos(caliente) == archivos(frio)
+
+    monkeypatch.undo()
+    _, infos_sin_cache = ejecutar_pipeline(ruta, 'sin_cache', directorio_cache=None, render=False)
+    assert infos_sin_cache == infos
+
+
+def test_podar_cache_expulsa_entradas_incrementales(tmp_path):
+    directorio = str(tmp_path)
+    guardar_cache(directorio, 'preprocesado', {'x': np.zeros(2000)}, max_bytes=float('inf'))
+    png = tmp_path / 'grafico.png'
+    png.write_bytes(b'\x89PNG' + bytes(3000))
+    guardar_resultados_segmento(directorio, 'a' * 32, {'clave': {'b1e': {'index': 3}}})
+    guardar_caracteristica(directorio, 'b' * 32, 'mascara', np.ones(500, dtype=bool))
+    guardar_figuras(directorio, 'c' * 24, {'full': str(png)})
+
+    incrementales = entradas_incrementales(directorio)
+    assert len(incrementales) == 3
+    # Orden de acceso: figura, características, fronteras, y el preprocesado es el más reciente
+    ahora = time.time()
+    for k, ruta in enumerate(sorted((r for _, _, r in incrementales),
+                                    key=lambda r: ('figuras' not in r, 'caracteristicas' not in r))):
+        os.utime(ruta, (ahora - 300 + k, ahora - 300 + k))
+    tamanos = {r: t for _, t, r in entradas_incrementales(directorio)}
+    total = sum(tamanos.values()) + sum(e.stat().st_size for e in os.scandir(tmp_path / 'preprocesado'))
+
+    # Un archivo temporal antiguo (escritura interrumpida) se elimina; uno reciente se conserva
+    carpeta = os.path.dirname(next(r for r in tamanos if 'fronteras' in r))
+    antiguo, reciente = os.path.join(carpeta, '.antiguo'), os.path.join(carpeta, '.reciente')
+    for temporal in (antiguo, reciente):
+        open(temporal, 'w').close()
+    os.utime(antiguo, (ahora - EDAD_MAX_TEMPORAL - 60,) * 2)
+
+    podar_cache(directorio)
+    assert len(entradas_incrementales(directorio)) == 3
+    assert not os.path.exists(antiguo) and os.path.exists(reciente)
+
+    # Por encima del límite se expulsa lo usado menos recientemente: la figura primero
+    figura = next(r for r in tamanos if 'figuras' in r)
+    podar_cache(directorio, max_bytes=total - 1)
+    assert sorted(tamanos) == sorted([figura] + [r for _, _, r in entradas_incrementales(directorio)])
+    podar_cache(directorio, max_bytes=total - tamanos[figura] - 1)
+    assert [r for _, _, r in entradas_incrementales(directorio)] == \
+           [r for r in tamanos if 'fronteras' in r]
+    assert os.path.isdir(tmp_path / 'preprocesado')
+
+
+def test_escritura_interrumpida_no_deja_temporales(tmp_path, monkeypatch):
+    def interrumpir(*args, **kwargs):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(cache_fronteras.json, 'dump', interrumpir)
+    with pytest.raises(KeyboardInterrupt):
+        guardar_resultados_segmento(str(tmp_path), 'a' * 32, {})
+    assert [archivos for _, _, archivos in os.walk(tmp_path) if archivos] == []
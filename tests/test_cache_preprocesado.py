@@ -0,0 +1,116 @@
+# test_cache_preprocesado.py - cache en disco de los datos preprocesados del CDF
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+import OvationRebron23
+from funciones import cache_preprocesado
+from funciones.cache_preprocesado import clave_cache, cargar_cache, guardar_cache, podar_cache
+
+
+def _comparar(obtenido, esperado):
+    assert set(obtenido) == set(esperado)
+    for clave, valores in esperado.items():
+        np.testing.assert_array_equal(np.asarray(obtenido[clave]), np.asarray(valores), err_msg=clave)
+
+
+def test_acierto_igual_a_preprocesar(escribir_cdf, tmp_path, monkeypatch):
+    ruta = escribir_cdf(relleno=[3])
+    directorio = str(tmp_path / 'cache')
+    fresco = OvationRebron23.preprocesar_datos_dmsp(ruta)
+
+    primero = OvationRebron23.cargar_preprocesado(ruta, directorio_cache=directorio)
+    _comparar(primero, fresco)
+    # La segunda llamada no vuelve a leer el CDF
+    monkeypatch.setattr(OvationRebron23, 'preprocesar_datos_dmsp', None)
+    acierto = OvationRebron23.cargar_preprocesado(ruta, directorio_cache=directorio)
+    _comparar(acierto, fresco)
+    assert all(isinstance(v, np.memmap) for v in acierto.values() if np.ndim(v) > 0)
+
+
+def test_clave_depende_del_contenido_y_la_ventana(escribir_cdf):
+    a = escribir_cdf('a.cdf', semilla=0)
+    b = escribir_cdf('b.cdf', semilla=1)
+    copia = a.replace('a.cdf', 'copia.cdf')
+    shutil.copyfile(a, copia)
+
+    base = clave_cache(a, inicio=None, fin=None)
+    assert clave_cache(copia, inicio=None, fin=None) == base
+    assert clave_cache(b, inicio=None, fin=None) != base
+    assert clave_cache(a, inicio='2014-12-31T00:01:00', fin=None) != base
+    assert clave_cache(a, inicio=None, fin='2014-12-31T00:05:00') != base
+    assert (clave_cache(a, inicio='2014-12-31T00:01:00', fin='2014-12-31T00:05:00') !=
+            clave_cache(a, inicio='2014-12-31T00:01:00', fin='2014-12-31T00:06:00'))
+
+
+def test_fallo_al_guardar_no_deja_entrada(tmp_path, monkeypatch):
+    directorio = str(tmp_path)
+    arrays = {'a': np.arange(10.0), 'b': np.ones((4, 3))}
+    guardar = np.save
+
+    def fallar_en_b(ruta, valores, **kwargs):
+        if os.path.basename(ruta) == 'b.npy':
+            raise KeyboardInterrupt
+        guardar(ruta, valores, **kwargs)
+
+    monkeypatch.setattr(cache_preprocesado.np, 'save', fallar_en_b)
+    with pytest.raises(KeyboardInterrupt):
+        guardar_cache(directorio, 'clave', arrays)
+    monkeypatch.undo()
+
+    assert os.listdir(directorio) == []
+    assert cargar_cache(directorio, 'clave') is None
+    _comparar(guardar_cache(directorio, 'clave', arrays), arrays)
+
+
+def test_proceso_terminado_a_mitad_no_publica_la_entrada(tmp_path):
+    directorio = str(tmp_path)
+    # El proceso muere tras escribir el primer array, sin limpiar nada
+    codigo = (
+        "import os, numpy as np\n"
+        "from funciones import cache_preprocesado\n"
+        "guardar = np.save\n"
+        "def morir(ruta, valores, **kw):\n"
+        "    guardar(ruta, valores, **kw)\n"
+        "    os._exit(1)\n"
+        "cache_preprocesado.np.save = morir\n"
+        f"cache_preprocesado.guardar_cache({directorio!r}, 'clave', {{'a': np.arange(5.0), 'b': np.ones(3)}})\n"
+    )
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, '-c', codigo], cwd=raiz).returncode == 1
+
+    assert cargar_cache(directorio, 'clave') is None
+    temporales = os.listdir(directorio)
+    assert len(temporales) == 1 and temporales[0].startswith('.')
+
+    # Una carpeta temporal reciente puede ser de otro proceso: se conserva
+    podar_cache(directorio)
+    assert os.listdir(directorio) == temporales
+    antiguo = time.time() - cache_preprocesado.EDAD_MAX_TEMPORAL - 60
+    os.utime(os.path.join(directorio, temporales[0]), (antiguo, antiguo))
+    podar_cache(directorio)
+    assert os.listdir(directorio) == []
+
+
+def test_expulsion_lru(tmp_path):
+    directorio = str(tmp_path)
+    arrays = {'x': np.zeros(1000)}
+    for k, clave in enumerate(('a', 'b', 'c')):
+        guardar_cache(directorio, clave, arrays, max_bytes=float('inf'))
+        instante = time.time() - 100 + 10 * k
+        os.utime(os.path.join(directorio, clave, 'meta.json'), (instante, instante))
+    tamano = sum(e.stat().st_size for e in os.scandir(os.path.join(directorio, 'a')))
+
+    # Leer 'a' la convierte en la más reciente: se expulsa 'b'
+    assert cargar_cache(directorio, 'a') is not None
+    podar_cache(directorio, max_bytes=2 * tamano)
+    assert sorted(os.listdir(directorio)) == ['a', 'c']
+
+    # La entrada recién guardada nunca se expulsa
+    guardar_cache(directorio, 'd', arrays, max_bytes=tamano)
+    assert sorted(os.listdir(directorio)) == ['d']
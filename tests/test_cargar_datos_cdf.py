@@ -0,0 +1,80 @@
+# test_cargar_datos_cdf.py - carga vectorizada y por ventana UT del CDF frente a la carga registro a registro
+import cdflib
+import numpy as np
+
+from funciones.cargar_datos_cdf import cargar_datos_cdf
+from funciones.segment_utils import buscar_indices_tiempo
+
+
+def test_epoch_igual_a_la_conversion_por_registro(escribir_cdf):
+    ruta = escribir_cdf(relleno=[0, 7, 8, 599])
+    datos = cargar_datos_cdf(ruta)
+
+    # Conversión original: lista de instantes con año < 2030
+    crudo = cdflib.CDF(ruta).varget('Epoch')
+    esperado = [t for t in cdflib.cdfepoch.to_datetime(crudo)
+                if t.astype('datetime64[Y]').astype(int) + 1970 < 2030]
+    assert datos['tiempo_final'].dtype == np.dtype('datetime64[ns]')
+    assert datos['tiempo_final'].flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(datos['tiempo_final'], np.array(esperado, dtype='datetime64[ns]'))
+
+    # Las variables por registro se recortan con la misma máscara
+    validos = np.ones(600, dtype=bool)
+    validos[[0, 7, 8, 599]] = False
+    lat = cdflib.CDF(ruta).varget('SC_AACGM_LAT')
+    np.testing.assert_array_equal(datos['SC_AACGM_LAT'], lat[validos])
+    assert datos['ELE_DIFF_ENERGY_FLUX'].shape == (validos.sum(), 19)
+    assert datos['CHANNEL_ENERGIES'].shape == (19,)
+
+
+def test_buscar_indices_tiempo_igual_al_diccionario():
+    rng = np.random.default_rng(0)
+    tiempo = np.datetime64('2015-01-01', 'ns') + np.cumsum(rng.integers(1, 3, 500)) * np.timedelta64(1, 's')
+    diccionario = {t: i for i, t in enumerate(tiempo)}
+    consultas = np.concatenate((rng.choice(tiempo, 50),
+                                tiempo[:5] - np.timedelta64(1, 'ns'),
+                                [tiempo[-1] + np.timedelta64(1, 's')]))
+    esperado = [diccionario.get(t, -1) for t in consultas]
+    np.testing.assert_array_equal(buscar_indices_tiempo(tiempo, consultas), esperado)
+
+
+def test_ventana_ut_igual_a_recortar_la_carga_completa(escribir_cdf):
+    ruta = escribir_cdf(relleno=[100, 101])
+    completo = cargar_datos_cdf(ruta)
+    inicio, fin = '2014-12-31T00:01:30', '2014-12-31T00:05:00'
+    ventana = cargar_datos_cdf(ruta, inicio=inicio, fin=fin)
+
+    t = completo['tiempo_final']
+    dentro = (t >= np.datetime64(inicio, 'ns')) & (t <= np.datetime64(fin, 'ns'))
+    np.testing.assert_array_equal(ventana['tiempo_final'], t[dentro])
+    for clave in ('ELE_DIFF_ENERGY_FLUX', 'ION_DIFF_ENERGY_FLUX', 'ELE_TOTAL_ENERGY_FLUX',
+                  'SC_AACGM_LAT', 'SC_GEOCENTRIC_LAT'):
+        np.testing.assert_array_equal(ventana[clave], completo[clave][dentro])
+    np.testing.assert_array_equal(ventana['CHANNEL_ENERGIES'], completo['CHANNEL_ENERGIES'])
+
+
+def test_solo_se_leen_los_registros_y_variables_pedidos(escribir_cdf, monkeypatch):
+    ruta = escribir_cdf()
+    lecturas = []
+    varget = cdflib.CDF.varget
+
+    def registrar(self, variable=None, *args, **kwargs):
+        lecturas.append((variable, kwargs.get('startrec'), kwargs.get('endrec')))
+        return varget(self, variable, *args, **kwargs)
+
+    monkeypatch.setattr(cdflib.CDF, 'varget', registrar)
+    datos = cargar_datos_cdf(ruta, variables=('SC_AACGM_LAT',), inicio='2014-12-31T00:02:00',
+                             fin='2014-12-31T00:02:09')
+
+    assert set(datos) == {'tiempo_final', 'SC_AACGM_LAT', 'ELE_AVG_ENERGY'}
+    assert datos['ELE_AVG_ENERGY'] is None
+    assert len(datos['tiempo_final']) == len(datos['SC_AACGM_LAT']) == 10
+    assert ('SC_AACGM_LAT', 120, 129) in lecturas
+    assert {v for v, _, _ in lecturas} == {'Epoch', 'SC_AACGM_LAT'}
+
+
+def test_ventana_sin_registros(escribir_cdf):
+    datos = cargar_datos_cdf(escribir_cdf(), inicio='2015-06-01', fin='2015-06-02')
+    assert len(datos['tiempo_final']) == 0
+    assert len(datos['SC_AACGM_LAT']) == 0
+    assert datos['ELE_DIFF_ENERGY_FLUX'].shape[1:] == (19,)
@@ -0,0 +1,76 @@
+# test_deteccion_lotes.py - la detección sobre el lote reproduce la detección por segmento
+import numpy as np
+import pytest
+
+from funciones.boundary_detection import detect_all_boundaries
+from funciones.deteccion_lotes import precalcular_lote, detectar_fronteras_lote
+from funciones.fronteras.detect_b1e import flujo_log_b1e
+from funciones.fronteras.detect_b1i import flujo_log_b1i
+from funciones.fronteras.detect_b2i import flujo_suavizado_b2i, maximos_siguientes_b2i
+from funciones.fronteras.funciones_auxiliares.salto_b1 import medias_salto_b1
+from funciones.fronteras.funciones_auxiliares.ventanas import medias_ventana
+
+
+def lote_sintetico(segmento_sintetico, rng, longitudes):
+    """Lote con un segmento sintético por longitud (los segmentos difieren en nivel y ruido)"""
+    segmentos = [{clave: valores[:n] for clave, valores in segmento_sintetico(rng, max(n, 1)).items()}
+                 for n in longitudes]
+    for segmento in segmentos:
+        # Latitudes bajas en algunos segmentos: canales limpios de b1e/b1i solo en esos
+        segmento['lat'] = segmento['lat'] - rng.choice([0, 25])
+    offsets = np.concatenate(([0], np.cumsum(longitudes, dtype=np.int64)))
+    datos = {clave: np.concatenate([s[clave] for s in segmentos]) for clave in segmentos[0]}
+    lote = {'offsets': offsets, 'indices': np.arange(offsets[-1]), 'datos': datos,
+            'direcciones': ['desconocida'] * len(longitudes)}
+    return lote, segmentos
+
+
+LONGITUDES = [[300], [1, 2, 300, 7, 13, 60], [120, 0, 45, 250, 12, 36, 400], [80] * 9]
+
+
+@pytest.mark.parametrize('semilla', range(len(LONGITUDES)))
+def test_precalculos_iguales_a_los_del_segmento(semilla, energias, segmento_sintetico):
+    rng = np.random.default_rng(semilla)
+    lote, segmentos = lote_sintetico(segmento_sintetico, rng, LONGITUDES[semilla])
+    precalculos = precalcular_lote(lote, energias)
+
+    for segmento, precalculo in zip(segmentos, precalculos):
+        if len(segmento['time']) == 0:
+            continue
+        for nodo, flujo_log in (('b1e', flujo_log_b1e), ('b1i', flujo_log_b1i)):
+            log_flux = flujo_log(segmento, energias)
+            np.testing.assert_array_equal(precalculo[nodo]['log_flux'], log_flux)
+            for media, esperada in zip(precalculo[nodo]['medias'], medias_salto_b1(log_flux)):
+                np.testing.assert_array_equal(media, esperada)
+
+        partial_flux, smoothed_flux = flujo_suavizado_b2i(segmento, energias)
+        np.testing.assert_array_equal(precalculo['b2i']['partial_flux'], partial_flux)
+        np.testing.assert_array_equal(precalculo['b2i']['smoothed_flux'], smoothed_flux)
+        maximos, con_nan = maximos_siguientes_b2i(smoothed_flux)
+        # Solo se usan las ventanas [k, k+9] completas dentro del segmento
+        completas = max(len(maximos) - 9, 0)
+        np.testing.assert_array_equal(precalculo['b2i']['maximos'][:completas], maximos[:completas])
+        np.testing.assert_array_equal(precalculo['b2i']['con_nan'][:completas], con_nan[:completas])
+
+        for nodo, clave, lookahead in (('b5e', 'ele_energy_flux', 35), ('b5i', 'ion_energy_flux', 30)):
+            log_flux = np.log10(np.maximum(segmento[clave], 1e-10))
+            np.testing.assert_array_equal(precalculo[nodo]['log_flux'], log_flux)
+            np.testing.assert_array_equal(precalculo[nodo]['medias_12'], medias_ventana(log_flux, 12))
+            np.testing.assert_array_equal(precalculo[nodo]['medias_futuras'],
+                                          medias_ventana(log_flux, lookahead))
+
+
+@pytest.mark.parametrize('semilla', range(len(LONGITUDES)))
+def test_lote_igual_a_detect_all_boundaries(semilla, energias, segmento_sintetico):
+    rng = np.random.default_rng(100 + semilla)
+    lote, segmentos = lote_sintetico(segmento_sintetico, rng, LONGITUDES[semilla])
+    resultados = detectar_fronteras_lote(lote, energias)
+
+    assert len(resultados) == len(segmentos)
+    for segmento, resultado in zip(segmentos, resultados):
+        if len(segmento['time']) == 0:
+            assert resultado == {}
+            continue
+        esperado = detect_all_boundaries(segmento, energias)
+        assert {f: r['index'] for f, r in resultado.items()} == \
+               {f: r['index'] for f, r in esperado.items()}
@@ -0,0 +1,130 @@
+# test_deteccion_streaming.py - la detección en línea incremental reproduce la detección al cierre
+import numpy as np
+import pytest
+from scipy.ndimage import uniform_filter1d
+
+from funciones.deteccion_streaming import (DetectorStreaming, MediaMovil, SuavizadoIncremental,
+                                           anticipacion_fronteras, ejecutar_streaming)
+from funciones.fronteras.detect_b5_ei import detect_b5
+from funciones.fronteras.detect_b6 import detect_b6
+from funciones.fronteras.funciones_auxiliares.salto_b1 import buscar_saltos_b1
+from funciones.fronteras.funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+from funciones.fronteras.funciones_auxiliares.ventanas import medias_ventana
+
+
+def registros_pasada(energias, rng, n=1200, borde=20, marca=None):
+    """
+    Registros de una pasada sintética a 1 Hz: fondo, zona auroral entre un
+    salto de flujo (inicio) y una caída al casquete polar (fin), y su reflejo
+    hacia el ecuador. Con marca, el registro marca + borde tiene
+    fotoelectrones y carga (cambia los canales de b1e/b1i).
+    """
+    mitad = n // 2
+    aacgm = np.concatenate((np.full(borde, 35.0), np.linspace(41, 79, mitad),
+                            np.linspace(79, 41, n - mitad), np.full(borde, 35.0)))
+    total = len(aacgm)
+    x = np.minimum(np.arange(total), total - 1 - np.arange(total))
+    inicio, fin = rng.integers(60, 120), rng.integers(250, 450)
+    nivel = np.select([x < inicio, x < fin], [4.0, 7.5], -2.0) + np.cumsum(rng.normal(0, 0.03, total))
+    energia = np.log(np.where(x < fin, 3000 * np.exp(-x / 200), 100))
+    forma = -0.25 * (np.log(energias)[None, :] - energia[:, None]) ** 2 / np.log(10)
+    ele = 10 ** (nivel[:, None] + forma + rng.normal(0, 0.2, (total, 19)))
+    ion = 10 ** (nivel[:, None] - 1 + rng.normal(0, 0.3, (total, 19)))
+    picos = rng.random(total) < 0.01
+    ele[picos, rng.integers(0, 19, picos.sum())] *= 100
+    if marca is not None:
+        ele[borde + marca, energias > 68] *= 1e-4
+        ion[borde + marca, energias > 68] *= 1e-4
+    t = np.datetime64('2015-01-01T00:00:00', 'ns') + np.arange(total) * np.timedelta64(1, 's')
+    registros = []
+    for k in range(total):
+        registro = {'Epoch': t[k], 'SC_AACGM_LAT': aacgm[k], 'SC_GEOCENTRIC_LAT': aacgm[k] - 3,
+                    'ELE_DIFF_ENERGY_FLUX': ele[k], 'ION_DIFF_ENERGY_FLUX': ion[k]}
+        if k == 0:
+            registro['CHANNEL_ENERGIES'] = energias
+        registros.append(registro)
+    return registros
+
+
+def test_media_movil_por_partes_igual_a_medias_ventana():
+    rng = np.random.default_rng(0)
+    x = rng.normal(8, 3, 700)
+    for ancho in (3, 6, 12, 35):
+        media = MediaMovil(ancho, 1000)
+        fin = 0
+        while fin < len(x):
+            fin = min(fin + int(rng.integers(1, 40)), len(x))
+            medias = media.actualizar(x[:fin])
+        np.testing.assert_array_equal(medias, medias_ventana(x, ancho))
+
+
+def test_suavizado_incremental_igual_a_uniform_filter1d():
+    rng = np.random.default_rng(1)
+    x = rng.normal(500, 200, 300)
+    x[[40, 41, 150]] = np.nan
+    suavizado = SuavizadoIncremental(1000)
+    for valor in x:
+        suavizado.agregar(valor)
+    # El último valor necesita la muestra siguiente
+    np.testing.assert_allclose(suavizado.contenido(), uniform_filter1d(x, size=3)[:-1],
+                               rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize('semilla', range(4))
+def test_busqueda_por_tramos_igual_a_la_completa(semilla, segmento_sintetico):
+    rng = np.random.default_rng(semilla)
+    segmento = segmento_sintetico(rng, 400)
+    cortes = np.unique(np.concatenate(([0, 400], rng.integers(0, 400, 12))))
+    tramos = list(zip(cortes[:-1], cortes[1:]))
+
+    def primero(buscar):
+        for desde, hasta in tramos:
+            indice = buscar(desde, hasta)
+            if indice is not None:
+                return indice
+        return None
+
+    log_flux = segmento['flux_ele']
+    thresholds = [PAPER_THRESHOLDS['b1e']]
+    completo = buscar_saltos_b1(log_flux, thresholds)[0]
+    por_tramos = primero(lambda d, h: (lambda i: None if i < 0 else i)(
+        buscar_saltos_b1(log_flux, thresholds, desde=d, hasta=h)[0]))
+    assert (None if completo < 0 else completo) == por_tramos
+
+    for particula in ('electron', 'ion'):
+        completo = detect_b5(segmento, particula)['index']
+        assert primero(lambda d, h: detect_b5(segmento, particula, desde=d, hasta=h)['index']) == completo
+
+    b5e = int(rng.integers(0, 350))
+    completo = detect_b6(segmento, b5e)['index']
+    assert primero(lambda d, h: detect_b6(segmento, b5e, desde=d, hasta=h)['index']) == completo
+
+
+@pytest.mark.parametrize('semilla', range(6))
+def test_fronteras_en_linea_iguales_al_cierre(semilla, energias):
+    rng = np.random.default_rng(semilla)
+    # En las semillas impares un registro con fotoelectrones y carga antes del
+    # salto cambia los canales de b1e/b1i cuando ya se revisaron índices
+    marca = 30 if semilla % 2 else None
+    registros = registros_pasada(energias, rng, marca=marca)
+    detector = DetectorStreaming()
+    eventos = ejecutar_streaming(registros, detector, bloque=int(rng.integers(1, 20)))
+
+    en_linea = {e['frontera']: e for e in eventos
+                if e['evento'] == 'frontera' and e['segmento'] == 'seg1'
+                and e['frontera'] in detector.fronteras_linea}
+    cierre = [e for e in eventos if e['evento'] == 'fin_pasada']
+    assert len(cierre) == 1
+    assert detector.estadisticas['correcciones'] == 0
+
+    anticipacion = anticipacion_fronteras()
+    for frontera in detector.fronteras_linea:
+        assert en_linea[frontera]['index'] == cierre[0]['fronteras']['seg1'][frontera]
+        if frontera in ('b2e', 'b6'):
+            # Se emiten después de su frontera previa
+            assert en_linea[frontera]['latencia_s'] >= anticipacion[frontera]
+        else:
+            assert en_linea[frontera]['latencia_s'] == anticipacion[frontera]
+
+    # Cada índice se revisa una vez por frontera (más una revisión de b1 al cambiar los canales)
+    assert detector.estadisticas['indices_evaluados'] <= 3 * cierre[0]['muestras']
@@ -0,0 +1,58 @@
+# test_detect_b2i.py - filtros lineales de candidatos y "nose" de b2i frente al bucle original
+import numpy as np
+import pytest
+from scipy.ndimage import uniform_filter1d
+
+from funciones.fronteras.detect_b2i import detect_b2i
+
+
+def _b2i_bucle(segment, energy_channels):
+    """detect_b2i original: máximo de los próximos 10 s índice a índice y filtro "nose" cuadrático"""
+    energy_mask = (energy_channels >= 3000) & (energy_channels <= 30000)
+    partial_flux = np.sum(segment['ion_diff_flux'][:, energy_mask], axis=1)
+    if np.all(partial_flux <= 0) or np.all(np.isnan(partial_flux)):
+        return None
+    smoothed_flux = uniform_filter1d(np.log10(partial_flux + 1e-10), size=2)
+    n = len(smoothed_flux)
+
+    candidates = []
+    for i in range(2, n - 10):
+        current_val = smoothed_flux[i]
+        if current_val < 10.5:
+            continue
+        if current_val >= np.max(smoothed_flux[i+1:min(n, i+11)]):
+            candidates.append(i)
+
+    valid_candidates = []
+    for i, candidate in enumerate(candidates):
+        is_nose_event = any(candidates[j] > candidate and
+                            smoothed_flux[candidates[j]] > smoothed_flux[candidate]
+                            for j in range(i + 1, len(candidates)))
+        if not is_nose_event:
+            valid_candidates.append(candidate)
+    return min(valid_candidates) if valid_candidates else None
+
+
+@pytest.mark.parametrize('semilla', range(40))
+def test_detect_b2i_igual_al_bucle(semilla, energias, segmento_sintetico):
+    rng = np.random.default_rng(semilla)
+    n = int(rng.choice([3, 12, 13, 40, 400]))
+    segmento = segmento_sintetico(rng, n)
+    ion = segmento['ion_diff_flux'] * 10 ** rng.uniform(0, 5)
+    if semilla % 4 == 0:
+        ion[rng.random(ion.shape) < 0.01] = np.nan
+    if semilla % 4 == 1:
+        # Mesetas: candidatos con el mismo valor que el máximo siguiente
+        ion = np.repeat(ion[::5], 5, axis=0)[:n]
+    segmento['ion_diff_flux'] = ion
+
+    with np.errstate(invalid='ignore'):
+        esperado = _b2i_bucle(segmento, energias)
+    assert detect_b2i(segmento, energias)['index'] == esperado
+
+
+def test_flujo_nulo_o_sin_canales(energias, segmento_sintetico):
+    segmento = segmento_sintetico(np.random.default_rng(0), 50)
+    segmento['ion_diff_flux'] = np.zeros((50, 19))
+    assert detect_b2i(segmento, energias)['index'] is None
+    assert detect_b2i(segmento, energias / 1000)['index'] is None
@@ -0,0 +1,104 @@
+# test_detect_b4s.py - correlaciones y búsqueda vectorizadas de b4s frente al bucle original
+import warnings
+
+import numpy as np
+import pytest
+from scipy.stats import pearsonr, ConstantInputWarning
+
+from funciones.fronteras.detect_b4s import buscar_b4s, detect_b4s
+from funciones.fronteras.funciones_auxiliares.correlaciones import correlacion_promedio
+from funciones.fronteras.funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+
+
+def _safe_pearsonr(x, y):
+    """safe_pearsonr original"""
+    mask = ~(np.isnan(x) | np.isnan(y) | np.isinf(x) | np.isinf(y))
+    x_clean, y_clean = x[mask], y[mask]
+    if len(x_clean) < 2 or np.std(x_clean) < 1e-10 or np.std(y_clean) < 1e-10:
+        return 0.0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=ConstantInputWarning)
+        r_value, _ = pearsonr(x_clean, y_clean)
+    return r_value if not np.isnan(r_value) else 0.0
+
+
+def _correlaciones_bucle(spectra, energy_flux):
+    """Paso 1 original: <r> con los 5 espectros anteriores, índice a índice"""
+    n = len(spectra)
+    avg_correlations = np.full(n, np.nan)
+    for i in range(5, n):
+        correlations = [r for r in (_safe_pearsonr(spectra[i], spectra[i - j]) for j in range(1, 6))
+                        if r != 0.0]
+        if correlations:
+            avg_corr = np.mean(correlations)
+            if energy_flux[i] < 10.7:
+                avg_corr *= 0.5
+            avg_correlations[i] = avg_corr
+    return avg_correlations
+
+
+def _busqueda_bucle(avg_correlations, start_idx, min_corr=0.6, sum_threshold=4.0, n_sum=7):
+    """Paso 2 original: primera ventana de n_sum <r> con suma baja"""
+    n = len(avg_correlations)
+    if n < 12 or start_idx >= n - 12:
+        return None
+    for i in range(start_idx + n_sum - 1, n - n_sum + 1):
+        window = avg_correlations[i - n_sum + 1:i + 1]
+        if np.any(np.isnan(window)) or np.sum(window) >= sum_threshold:
+            continue
+        for j in range(i, i - n_sum, -1):
+            if not np.isnan(avg_correlations[j]) and avg_correlations[j] > min_corr:
+                return j
+    return None
+
+
+def _segmento_b4s(segmento_sintetico, rng, n):
+    """Segmento con espectros estructurados (correlados) y tramos sin estructura"""
+    segmento = segmento_sintetico(rng, n)
+    ruidosos = np.repeat(rng.random(n // 20 + 1) < 0.4, 20)[:n]
+    ele = segmento['ele_diff_flux']
+    ele[ruidosos] = 10 ** rng.normal(5, 2, (ruidosos.sum(), ele.shape[1]))
+    if rng.random() < 0.3:
+        ele[rng.integers(0, n, 3)] = 1.0  # espectros constantes
+    segmento['ele_energy_flux'] = rng.normal(10.7, 1, n)
+    return segmento
+
+
+@pytest.mark.parametrize('semilla', range(10))
+def test_correlacion_promedio_igual_al_bucle(semilla, segmento_sintetico):
+    rng = np.random.default_rng(semilla)
+    segmento = _segmento_b4s(segmento_sintetico, rng, 200)
+    esperado = _correlaciones_bucle(segmento['ele_diff_flux'], segmento['ele_energy_flux'])
+    obtenido = correlacion_promedio(segmento['ele_diff_flux'], segmento['ele_energy_flux'])
+    np.testing.assert_array_equal(np.isnan(obtenido), np.isnan(esperado))
+    np.testing.assert_allclose(obtenido, esperado, rtol=0, atol=1e-12)
+
+
+def test_buscar_b4s_igual_al_bucle():
+    encontrados = 0
+    for semilla in range(60):
+        rng = np.random.default_rng(semilla)
+        n = int(rng.choice([11, 12, 30, 200]))
+        avg = np.repeat(rng.uniform(-0.2, 1.0, n // 8 + 1), 8)[:n] + rng.normal(0, 0.1, n)
+        avg[rng.random(n) < 0.03] = np.nan
+        conjuntos = [dict(PAPER_THRESHOLDS['b4s'])]
+        for _ in range(5):
+            conjuntos.append({'min_corr': rng.uniform(0.3, 0.9), 'sum_threshold': rng.uniform(1, 6),
+                              'n_sum': int(rng.choice([3, 7, 10]))})
+        previos = rng.integers(-1, n, len(conjuntos))
+        obtenido = buscar_b4s(avg, conjuntos, previos)
+        esperado = [_busqueda_bucle(avg, max(p, 0) + 1, t['min_corr'], t['sum_threshold'], t['n_sum'])
+                    for t, p in zip(conjuntos, previos)]
+        assert [None if i < 0 else i for i in obtenido] == esperado
+        encontrados += sum(i is not None for i in esperado)
+    assert encontrados > 0
+
+
+@pytest.mark.parametrize('semilla', range(10))
+def test_detect_b4s_igual_al_bucle(semilla, segmento_sintetico):
+    rng = np.random.default_rng(semilla)
+    segmento = _segmento_b4s(segmento_sintetico, rng, 300)
+    b2e, b2i = [None if rng.random() < 0.3 else int(rng.integers(0, 100)) for _ in range(2)]
+    avg = _correlaciones_bucle(segmento['ele_diff_flux'], segmento['ele_energy_flux'])
+    inicio = max(b2e or 0, b2i or 0) + 1
+    assert detect_b4s(segmento, b2e, b2i)['index'] == _busqueda_bucle(avg, inicio)
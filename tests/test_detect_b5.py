@@ -0,0 +1,44 @@
+# test_detect_b5.py - búsqueda vectorizada de la caída b5e/b5i frente al bucle original
+import numpy as np
+import pytest
+
+from funciones.fronteras.detect_b5_ei import detect_b5
+
+
+def _b5_bucle(flux, lookahead, min_flux_threshold):
+    """Bucle original de detect_b5: (índice, magnitud de la caída) o None"""
+    log_flux = np.log10(np.maximum(flux, 1e-10))
+    n = len(log_flux)
+    window = 12
+    if n < window * 2 + lookahead:
+        return None
+    for i in range(window, n - window - lookahead):
+        prev_avg = np.mean(log_flux[i-window:i])
+        next_avg = np.mean(log_flux[i:i+window])
+        drop_magnitude = prev_avg - next_avg
+        if drop_magnitude >= np.log10(4.0):
+            if np.mean(log_flux[i:min(n, i+lookahead)]) < min_flux_threshold:
+                return i, drop_magnitude
+    return None
+
+
+@pytest.mark.parametrize('semilla', range(30))
+def test_detect_b5_igual_al_bucle(semilla, segmento_sintetico):
+    rng = np.random.default_rng(semilla)
+    n = int(rng.choice([58, 59, 60, 200, 600]))
+    segmento = segmento_sintetico(rng, n)
+    # Escalones de nivel alrededor de los umbrales (9.7 iones, 10.5 electrones)
+    for clave in ('ele_energy_flux', 'ion_energy_flux'):
+        nivel = np.repeat(rng.uniform(8.5, 11.5, n // 25 + 1), 25)[:n] + rng.normal(0, 0.2, n)
+        flujo = 10 ** nivel
+        flujo[rng.random(n) < 0.02] = rng.choice([0.0, -1.0])
+        segmento[clave] = flujo
+
+    for particula, clave, lookahead, minimo in (('electron', 'ele_energy_flux', 35, 10.5),
+                                                 ('ion', 'ion_energy_flux', 30, 9.7)):
+        esperado = _b5_bucle(segmento[clave], lookahead, minimo)
+        resultado = detect_b5(segmento, particula)
+        if esperado is None:
+            assert resultado['index'] is None
+        else:
+            assert (resultado['index'], resultado['drop_magnitude']) == esperado
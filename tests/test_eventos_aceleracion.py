@@ -0,0 +1,63 @@
+# test_eventos_aceleracion.py - clasificación matricial de eventos b3 frente al bucle por espectro
+import numpy as np
+import pytest
+
+from funciones.fronteras.detect_b3_ab import detect_b3
+from funciones.fronteras.funciones_auxiliares.eventos_aceleracion import eventos_aceleracion
+
+
+def _evento_bucle(spectrum):
+    """Clasificación original de un espectro (detect_b3 antes del cambio)"""
+    clean_spectrum = np.maximum(np.nan_to_num(spectrum, nan=0.0, posinf=0.0, neginf=0.0), 0.0)
+    if np.max(clean_spectrum) <= 1e-10:
+        return False
+    max_idx = np.argmax(clean_spectrum)
+    max_val = clean_spectrum[max_idx]
+    other_vals = np.delete(clean_spectrum, max_idx)
+    other_max = np.max(other_vals) if len(other_vals) > 0 else 0.0
+    if other_max > 0 and max_val / other_max >= 5.0:
+        return True
+    if max_idx < len(clean_spectrum) - 1:
+        next_val = clean_spectrum[max_idx + 1]
+        if next_val > 0 and max_val / next_val >= 10.0:
+            return True
+    return False
+
+
+def _espectros(rng, n, n_canales=19):
+    espectros = 10 ** rng.normal(5, 1, (n, n_canales))
+    picos = rng.random(n) < 0.3
+    espectros[picos, rng.integers(0, n_canales, picos.sum())] *= rng.choice([3, 5, 12, 1e3], picos.sum())
+    caidas = np.flatnonzero(rng.random(n) < 0.2)
+    for i in caidas:
+        k = rng.integers(0, n_canales)
+        espectros[i, k + 1:] /= rng.choice([2, 10, 100])
+    espectros[rng.random((n, n_canales)) < 0.03] = rng.choice([np.nan, np.inf, -np.inf, -1.0, 0.0])
+    espectros[rng.random(n) < 0.05] = 0.0
+    if n > 2:
+        espectros[1] = 1e-12  # sin datos significativos
+        espectros[2, :] = 0.0
+        espectros[2, 0] = 1.0  # un único canal no nulo
+    return espectros
+
+
+@pytest.mark.parametrize('n_canales', [1, 2, 19])
+def test_eventos_iguales_al_bucle(n_canales):
+    rng = np.random.default_rng(n_canales)
+    espectros = _espectros(rng, 2000, n_canales)
+    esperado = np.array([_evento_bucle(s) for s in espectros])
+    assert 0 < esperado.sum() < len(esperado) or n_canales == 1
+    np.testing.assert_array_equal(eventos_aceleracion(espectros), esperado)
+
+
+@pytest.mark.parametrize('semilla', range(6))
+def test_detect_b3_igual_al_bucle(semilla, energias, segmento_sintetico):
+    rng = np.random.default_rng(semilla)
+    segmento = segmento_sintetico(rng, 300)
+    # Pocos espectros con datos: a veces ningún evento
+    segmento['ele_diff_flux'] = np.where(rng.random((300, 1)) < 0.1, _espectros(rng, 300), 0.0)
+    eventos = [i for i, s in enumerate(segmento['ele_diff_flux']) if _evento_bucle(s)]
+
+    resultado = detect_b3(segmento, energias)
+    assert resultado['b3a']['index'] == (min(eventos) if eventos else None)
+    assert resultado['b3b']['index'] == (max(eventos) if eventos else None)
@@ -0,0 +1,115 @@
+# test_indice_orbitas.py - índice persistente de pasadas y sus consultas sobre un eje sintético
+import os
+
+import numpy as np
+import pytest
+
+from funciones.cargar_datos_cdf import cargar_datos_cdf
+from funciones.indice_orbitas import (cargar_indice_orbitas, construir_indice_orbitas,
+                                      consultar_pasadas, ruta_indice_orbitas)
+from funciones.segmentar_orbita import segmentar_orbita
+from funciones.segment_utils import split_cycle_segment
+
+
+def _eje(horas=30, paso=5):
+    """
+    Eje de 'horas' desde las 18:20 UT con un hueco de datos, a un registro
+    cada 'paso' s. La latitud geocéntrica alterna qué hemisferio alcanza el
+    máximo de cada pasada.
+    """
+    segundos = np.arange(0, horas * 3600, paso)
+    segundos = segundos[(segundos < 40000) | (segundos > 43000)]
+    tiempo = np.datetime64('2014-12-31T18:20:00', 'ns') + segundos * np.timedelta64(1, 's')
+    fase = 2 * np.pi * segundos / 6060.0
+    geo = 80 * np.sin(fase + 0.05) + 30 * np.sin(fase / 2)
+    return tiempo, 85 * np.sin(fase), geo * 85 / np.abs(geo).max(), (segundos / 3600.0 + 18.33) % 24
+
+
+@pytest.fixture(scope='module')
+def indice():
+    tiempo, aacgm, geo, mlt = _eje()
+    return construir_indice_orbitas(tiempo, aacgm, geo, mlt)
+
+
+def test_registros_cubren_los_ciclos_de_segmentar_orbita():
+    tiempo, aacgm, geo, mlt = _eje()
+    indice = construir_indice_orbitas(tiempo, aacgm, geo, mlt)
+    pares = segmentar_orbita(aacgm, tiempo)['pares']
+    assert len(pares) > 15
+    assert 0 < np.sum(indice['hemisferio'] == 'S') < len(pares)
+
+    for k, (i0, i1) in enumerate(pares):
+        # Mismas muestras que el ciclo que procesa el pipeline
+        ciclo = split_cycle_segment((int(i0), int(i1)), tiempo, aacgm, aacgm, geo)
+        muestras = np.sort(np.concatenate([ciclo['seg1_original']['indices'],
+                                           ciclo['seg2_original']['indices']]))
+        np.testing.assert_array_equal(muestras[[0, -1]], [indice['registro_inicio'][k],
+                                                          indice['registro_fin'][k]])
+        assert indice['t_inicio'][k] == tiempo[min(i0, i1)]
+        assert indice['t_fin'][k] == tiempo[max(i0, i1)]
+
+        r0, r1 = indice['registro_inicio'][k], indice['registro_fin'][k]
+        maximo = r0 + np.argmax(np.abs(geo[r0:r1 + 1]))
+        assert indice['indice_max'][k] == maximo
+        assert indice['hemisferio'][k] == ('N' if aacgm[maximo] >= 0 else 'S')
+        assert indice['ascendente'][k] == (abs(geo[r1]) > abs(geo[r0]))
+        assert indice['mlt_inicio'][k] == mlt[r0] and indice['mlt_fin'][k] == mlt[r1]
+
+
+def _horas(t):
+    dia = t.astype('datetime64[D]')
+    return (t - dia) / np.timedelta64(1, 'h')
+
+
+@pytest.mark.parametrize('hemisferio', [None, 'N', 's'])
+@pytest.mark.parametrize('ascendente', [None, True, False])
+@pytest.mark.parametrize('horas_ut', [None, (0, 6), (20, 26), (5.5, 5.6)])
+def test_consultar_pasadas_igual_al_filtro_por_pasada(indice, hemisferio, ascendente, horas_ut):
+    esperadas = []
+    for k in range(len(indice['t_inicio'])):
+        if hemisferio is not None and indice['hemisferio'][k] != hemisferio.upper():
+            continue
+        if ascendente is not None and bool(indice['ascendente'][k]) != ascendente:
+            continue
+        if horas_ut is not None:
+            h0 = _horas(indice['t_inicio'][k])
+            # El fin se mide desde el día del inicio (más de 24 h si cruza la medianoche)
+            h1 = (indice['t_fin'][k] - indice['t_inicio'][k].astype('datetime64[D]')) / np.timedelta64(1, 'h')
+            if not (h0 >= horas_ut[0] and h1 < horas_ut[1]):
+                continue
+        esperadas.append(k)
+
+    seleccion = consultar_pasadas(indice, hemisferio=hemisferio, horas_ut=horas_ut, ascendente=ascendente)
+    assert set(seleccion) == set(indice)
+    for campo, valores in seleccion.items():
+        np.testing.assert_array_equal(valores, indice[campo][esperadas], err_msg=campo)
+
+
+def test_consulta_por_ventana_absoluta(indice):
+    inicio, fin = '2015-01-01T02:00:00', '2015-01-01T09:00:00'
+    seleccion = consultar_pasadas(indice, inicio=inicio, fin=fin)
+    dentro = ((indice['t_inicio'] >= np.datetime64(inicio)) & (indice['t_fin'] <= np.datetime64(fin)))
+    assert 0 < dentro.sum() < len(dentro)
+    np.testing.assert_array_equal(seleccion['registro_inicio'], indice['registro_inicio'][dentro])
+    # Cruce de medianoche: pasadas que empiezan antes de las 24 UT y terminan después
+    cruzan = consultar_pasadas(indice, horas_ut=(23, 30))
+    assert np.any(cruzan['t_fin'].astype('datetime64[D]') > cruzan['t_inicio'].astype('datetime64[D]'))
+
+
+def test_indice_del_cdf_persistente(escribir_cdf, tmp_path, monkeypatch):
+    ruta = escribir_cdf(n=4 * 3600)
+    directorio = str(tmp_path / 'resultados')
+    indice = cargar_indice_orbitas(ruta, directorio)
+    assert os.path.isfile(ruta_indice_orbitas(ruta, directorio))
+
+    datos = cargar_datos_cdf(ruta)
+    esperado = construir_indice_orbitas(datos['tiempo_final'], datos['SC_AACGM_LAT'],
+                                        datos['SC_GEOCENTRIC_LAT'])
+    assert len(esperado['t_inicio']) >= 2
+
+    # La segunda carga lee el archivo del índice sin abrir el CDF
+    from funciones import indice_orbitas
+    monkeypatch.setattr(indice_orbitas, 'cargar_datos_cdf', None)
+    for cargado in (indice, cargar_indice_orbitas(ruta, directorio)):
+        for campo, valores in esperado.items():
+            np.testing.assert_array_equal(cargado[campo], valores, err_msg=campo)
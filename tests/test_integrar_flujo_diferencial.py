@@ -0,0 +1,61 @@
+# test_integrar_flujo_diferencial.py - integración por producto matricial frente al bucle por espectro
+import numpy as np
+import pytest
+
+from funciones.compute_energy_edges import compute_energy_edges
+from funciones.integrar_flujo_diferencial import (integrar_bandas, integrar_flujo_diferencial,
+                                                  calcular_flujos_integrados)
+
+
+def _integrar_bucle(diff_flux, delta, canal1, canal2):
+    """Integración original: un espectro por iteración"""
+    if np.all(np.isnan(diff_flux)):
+        return np.zeros(diff_flux.shape[0]), 0
+    flujos, negativos = [], 0
+    for elem in diff_flux:
+        elem = np.nan_to_num(elem, nan=0.0)
+        negativos += int(np.sum(elem < 0))
+        elem = np.maximum(elem, 0)
+        flujos.append(np.sum(elem[canal1:canal2] * np.nan_to_num(delta[canal1:canal2], nan=0.0)))
+    return np.maximum(np.nan_to_num(np.array(flujos), nan=1e-10), 1e-10), negativos
+
+
+def _espectros(rng, n, energias):
+    flujo = 10 ** rng.normal(6, 2, (n, len(energias)))
+    flujo[rng.random(flujo.shape) < 0.05] = np.nan
+    flujo[rng.random(flujo.shape) < 0.02] *= -1
+    flujo[rng.integers(0, n)] = 0
+    return flujo
+
+
+@pytest.mark.parametrize('banda', [(0, 6), (0, 7), (0, 19), (5, 12), (18, 19), (3, 3)])
+def test_banda_igual_al_bucle(banda, energias):
+    rng = np.random.default_rng(banda[0] * 31 + banda[1])
+    espectros = _espectros(rng, 400, energias)
+    delta = np.abs(np.diff(compute_energy_edges(energias)))
+    esperado, negativos = _integrar_bucle(espectros, delta, *banda)
+
+    np.testing.assert_allclose(integrar_flujo_diferencial(espectros, delta, *banda), esperado, rtol=1e-12)
+    flujos, contados = integrar_bandas(espectros, delta, [banda, (0, 19)])
+    np.testing.assert_allclose(flujos[:, 0], esperado, rtol=1e-12)
+    assert contados == negativos
+
+
+def test_flujos_del_pipeline_iguales_al_bucle(energias):
+    rng = np.random.default_rng(7)
+    ele, ion = _espectros(rng, 300, energias), _espectros(rng, 300, energias)
+    delta = np.abs(np.diff(compute_energy_edges(energias)))
+    flujos = calcular_flujos_integrados(ele, ion, delta, avisar=False)
+
+    for clave, clave_log, espectros, banda in (
+            ('flujos_iones_b2i', 'flujos_iones_b2i_log', ion, (0, 7)),
+            ('flujos_elec_totales', 'flujos_elec_log', ele, (0, 19)),
+            ('flujos_iones_totales', 'flujos_iones_log', ion, (0, 19))):
+        esperado, _ = _integrar_bucle(espectros, delta, *banda)
+        np.testing.assert_allclose(flujos[clave], esperado, rtol=1e-12)
+        np.testing.assert_allclose(flujos[clave_log], np.log10(esperado + 1e-10), rtol=1e-12)
+
+
+def test_espectros_todo_nan():
+    espectros = np.full((5, 19), np.nan)
+    np.testing.assert_array_equal(integrar_flujo_diferencial(espectros, np.ones(19), 0, 19), np.zeros(5))
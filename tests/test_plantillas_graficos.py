@@ -0,0 +1,60 @@
+# test_plantillas_graficos.py - la malla polar reutilizada frente a reconstruirla en cada ciclo
+import numpy as np
+import pytest
+
+from funciones.compute_energy_edges import compute_energy_edges
+from funciones.plantillas_graficos import PlantillaPolar
+
+
+def _spec(rng, n_time):
+    spec = 10 ** rng.normal(6, 1.5, (19, n_time))
+    spec[rng.random(spec.shape) < 0.05] = 0
+    return spec
+
+
+def _actualizar(panel, spec, energias, reconstruir=False):
+    if reconstruir:
+        # Fuerza el camino anterior: quitar la malla y crear otra
+        panel.forma = None
+    indice = spec.shape[1] // 3
+    panel.actualizar(spec, 'ciclo', None, {'b1e': {'index': indice}, 'b2e': None},
+                     compute_energy_edges(energias))
+    return panel.malla
+
+
+@pytest.mark.parametrize('semilla', range(3))
+def test_misma_forma_igual_a_reconstruir(semilla, energias):
+    rng = np.random.default_rng(semilla)
+    specs = [_spec(rng, 240) for _ in range(3)]
+    reutilizada, reconstruida = PlantillaPolar(), PlantillaPolar()
+    panel_a = reutilizada.espectrogramas[(0, 0)]
+    panel_b = reconstruida.espectrogramas[(0, 0)]
+
+    primera = _actualizar(panel_a, specs[0], energias)
+    _actualizar(panel_b, specs[0], energias)
+    for spec in specs[1:]:
+        assert _actualizar(panel_a, spec, energias) is primera
+        malla = _actualizar(panel_b, spec, energias, reconstruir=True)
+        assert malla is not primera
+
+        np.testing.assert_array_equal(np.asarray(panel_a.malla.get_array()),
+                                      np.asarray(malla.get_array()))
+        assert (panel_a.malla.norm.vmin, panel_a.malla.norm.vmax) == (malla.norm.vmin, malla.norm.vmax)
+        assert (panel_a.cbar.norm.vmin, panel_a.cbar.norm.vmax) == (malla.norm.vmin, malla.norm.vmax)
+        assert len(panel_a.ax.collections) == len(panel_b.ax.collections)
+
+        reutilizada.fig.canvas.draw()
+        reconstruida.fig.canvas.draw()
+        np.testing.assert_array_equal(np.asarray(reutilizada.fig.canvas.buffer_rgba()),
+                                      np.asarray(reconstruida.fig.canvas.buffer_rgba()))
+
+
+def test_cambio_de_forma_reconstruye_la_malla(energias):
+    rng = np.random.default_rng(5)
+    panel = PlantillaPolar().espectrogramas[(1, 1)]
+    primera = _actualizar(panel, _spec(rng, 200), energias)
+    segunda = _actualizar(panel, _spec(rng, 260), energias)
+    assert segunda is not primera
+    assert np.asarray(segunda.get_array()).shape == (19, 260)
+    assert primera not in panel.ax.collections
+    assert _actualizar(panel, _spec(rng, 260), energias) is segunda
@@ -0,0 +1,86 @@
+# test_plot_utils.py - espectrograma como imagen frente a LogNorm y al remuestreo canal a canal
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib.colors import LogNorm
+
+from funciones.compute_energy_edges import compute_energy_edges
+from funciones.plot_utils import FILAS_POR_CANAL, colores_espectrograma, filas_log_uniformes
+
+
+def _canal_bucle(energy_edges, centros):
+    """Canal de cada fila buscando el intervalo de bordes que la contiene"""
+    log_edges = np.log10(energy_edges)
+    canales = []
+    for c in centros:
+        for k in range(len(log_edges) - 1):
+            bajo, alto = sorted((log_edges[k], log_edges[k + 1]))
+            if bajo <= c < alto:
+                canales.append(k)
+                break
+    return np.array(canales)
+
+
+def _spec(rng, forma):
+    spec = 10 ** rng.normal(6, 2, forma)
+    spec[rng.random(forma) < 0.05] = 0
+    spec[rng.random(forma) < 0.05] *= -1
+    spec[rng.random(forma) < 0.05] = np.nan
+    return spec
+
+
+@pytest.mark.parametrize('descendente', [False, True])
+def test_filas_igual_al_bucle(energias, descendente):
+    bordes = compute_energy_edges(energias)
+    bordes = np.sort(bordes)[::-1] if descendente else np.sort(bordes)
+    canal, log_min, log_max = filas_log_uniformes(bordes)
+
+    assert (log_min, log_max) == (np.log10(bordes).min(), np.log10(bordes).max())
+    centros = log_min + (np.arange(len(canal)) + 0.5) * (log_max - log_min) / len(canal)
+    np.testing.assert_array_equal(canal, _canal_bucle(bordes, centros))
+    # Todos los canales aparecen, con al menos FILAS_POR_CANAL filas salvo por redondeo
+    assert np.bincount(canal, minlength=len(bordes) - 1).min() >= FILAS_POR_CANAL - 1
+
+
+def test_filas_descendentes_son_las_ascendentes_invertidas(energias):
+    bordes = np.sort(compute_energy_edges(energias))
+    ascendente, *limites = filas_log_uniformes(bordes)
+    descendente, *limites_desc = filas_log_uniformes(bordes[::-1])
+    np.testing.assert_array_equal(descendente, len(bordes) - 2 - ascendente)
+    assert limites == limites_desc
+
+
+@pytest.mark.parametrize('bordes', [[1.0], [10.0, -1.0, 100.0], [1.0, 10.0, 5.0], [[1.0, 2.0]]])
+def test_filas_bordes_invalidos(bordes):
+    with pytest.raises(ValueError):
+        filas_log_uniformes(bordes)
+
+
+@pytest.mark.parametrize('semilla', range(4))
+def test_colores_igual_a_lognorm(semilla):
+    rng = np.random.default_rng(semilla)
+    spec = _spec(rng, (19, 300))
+    rgba, norma = colores_espectrograma(spec)
+
+    referencia = LogNorm()
+    esperado = plt.get_cmap('viridis')(referencia(np.ma.masked_invalid(spec)), bytes=True)
+    validos = np.isfinite(spec) & (spec > 0)
+    assert (norma.vmin, norma.vmax) == (referencia.vmin, referencia.vmax)
+    # Mismo color salvo el redondeo del último byte
+    diferencia = np.abs(rgba[validos].astype(int) - esperado[validos].astype(int))
+    assert diferencia.max() <= 1
+
+    # No positivos y NaN: transparentes
+    assert (~validos).any()
+    np.testing.assert_array_equal(rgba[~validos], 0)
+    assert (rgba[validos, 3] == 255).all()
+
+
+def test_colores_valor_constante_y_sin_validos():
+    spec = np.full((3, 4), 5.0)
+    spec[0, 0] = np.nan
+    rgba, norma = colores_espectrograma(spec)
+    np.testing.assert_array_equal(rgba[1:], np.broadcast_to(plt.get_cmap('viridis')(0.0, bytes=True), (2, 4, 4)))
+    assert rgba[0, 0, 3] == 0
+    with pytest.raises(ValueError):
+        colores_espectrograma(np.array([[0.0, -1.0, np.nan]]))
@@ -0,0 +1,61 @@
+# test_preprocesar_datos.py - energía promedio de electrones del CDF o calculada, nunca mezcladas
+import numpy as np
+import pytest
+
+from funciones.cargar_datos_cdf import cargar_datos_cdf
+from funciones.energia_promedio import calcular_energia_promedio
+from funciones.preprocesar_datos import preprocesar_datos
+
+
+def _energia_bucle(diff_flux, energias):
+    """Cálculo original registro a registro"""
+    energia = np.zeros(len(diff_flux))
+    for i, flux in enumerate(diff_flux):
+        validos = flux > 0
+        if np.any(validos):
+            total = np.sum(flux[validos])
+            energia[i] = np.sum(flux[validos] * energias[validos]) / total if total > 0 else 0.0
+    return energia
+
+
+def test_energia_promedio_igual_al_bucle(energias):
+    rng = np.random.default_rng(0)
+    flujo = 10 ** rng.normal(6, 2, (300, 19))
+    flujo[rng.random(flujo.shape) < 0.1] = np.nan
+    flujo[rng.random(flujo.shape) < 0.1] *= -1
+    flujo[5] = 0
+    np.testing.assert_allclose(calcular_energia_promedio(flujo, energias),
+                               _energia_bucle(flujo, energias), rtol=1e-12)
+
+
+def test_energia_del_cdf_valida_en_todos_los_registros(escribir_cdf):
+    energia_cdf = np.linspace(100, 5000, 600)
+    datos = cargar_datos_cdf(escribir_cdf(ele_avg_energy=energia_cdf))
+    pre = preprocesar_datos(dict(datos), avisar=False)
+    # La variable se guarda como CDF_REAL4
+    np.testing.assert_array_equal(pre['ELE_AVG_ENERGY'], energia_cdf.astype(np.float32))
+
+
+@pytest.mark.parametrize('invalidos', [[0], [10, 11, 12], list(range(0, 600, 7))])
+def test_energia_del_cdf_con_registros_invalidos(escribir_cdf, invalidos, capsys):
+    energia_cdf = np.linspace(100, 5000, 600)
+    energia_cdf[invalidos] = -1e31  # fuera de VALIDMIN/VALIDMAX: NaN al cargar
+    datos = cargar_datos_cdf(escribir_cdf(ele_avg_energy=energia_cdf))
+    assert np.isnan(datos['ELE_AVG_ENERGY']).sum() == len(invalidos)
+
+    pre = preprocesar_datos(dict(datos))
+    # Se usa la energía calculada en todos los registros, no solo en los inválidos
+    esperada = calcular_energia_promedio(datos['ELE_DIFF_ENERGY_FLUX'], datos['CHANNEL_ENERGIES'])
+    np.testing.assert_array_equal(pre['ELE_AVG_ENERGY'], esperada)
+    assert f"inválido en {len(invalidos)} registros" in capsys.readouterr().out
+
+
+def test_energia_calculada_sin_variable_o_sin_usar_el_cdf(escribir_cdf):
+    datos = cargar_datos_cdf(escribir_cdf())
+    assert datos['ELE_AVG_ENERGY'] is None
+    esperada = calcular_energia_promedio(datos['ELE_DIFF_ENERGY_FLUX'], datos['CHANNEL_ENERGIES'])
+    np.testing.assert_array_equal(preprocesar_datos(dict(datos), avisar=False)['ELE_AVG_ENERGY'], esperada)
+
+    datos = cargar_datos_cdf(escribir_cdf('con_energia.cdf', ele_avg_energy=np.full(600, 300.0)))
+    pre = preprocesar_datos(dict(datos), avisar=False, energia_cdf=False)
+    np.testing.assert_array_equal(pre['ELE_AVG_ENERGY'], esperada)
@@ -0,0 +1,14 @@
+# test_procesar_ciclos.py - el procesamiento en paralelo reproduce el procesamiento secuencial
+import pytest
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_ciclos_en_paralelo_iguales_a_secuencial(escribir_cdf, ejecutar_pipeline, workers):
+    ruta = escribir_cdf(n=6 * 3600)
+    secuencial, infos = ejecutar_pipeline(ruta, 'secuencial', directorio_cache=None, render=False)
+    paralelo, infos_paralelo = ejecutar_pipeline(ruta, 'paralelo', directorio_cache=None,
+                                                 render=False, workers=workers)
+
+    assert len(infos) == secuencial['ciclos_procesados'] >= 3
+    assert paralelo['ciclos_procesados'] == secuencial['ciclos_procesados']
+    assert infos_paralelo == infos
@@ -0,0 +1,74 @@
+# test_render_diferido.py - modos sin gráficos y de render diferido frente al render en línea
+import glob
+import os
+import zipfile
+
+import numpy as np
+
+from funciones.render_diferido import (CLAVES_SEGMENTO, guardar_trabajo_render, renderizar_pendientes,
+                                       renderizar_ciclo, ruta_trabajo_render)
+from funciones.plantillas_graficos import rutas_graficos
+
+
+def _archivos(resultado):
+    carpeta = resultado['directorio_resultados']
+    return carpeta, sorted(os.path.relpath(p, carpeta) for p in glob.glob(os.path.join(carpeta, '*', '*')))
+
+
+def test_modos_de_render_detectan_lo_mismo(escribir_cdf, ejecutar_pipeline):
+    ruta = escribir_cdf(n=3 * 3600)
+    en_linea, infos = ejecutar_pipeline(ruta, 'en_linea', directorio_cache=None, render='inline')
+    solo_deteccion, infos_deteccion = ejecutar_pipeline(ruta, 'deteccion', directorio_cache=None,
+                                                        render=False)
+    diferido, infos_diferido = ejecutar_pipeline(ruta, 'diferido', directorio_cache=None,
+                                                 render='deferred')
+    assert len(infos) >= 2
+    assert infos_deteccion == infos
+    assert infos_diferido == infos
+
+    # Sin gráficos: solo los JSON
+    _, archivos = _archivos(solo_deteccion)
+    assert all(a.endswith('.json') for a in archivos)
+
+    # Diferido: JSON y trabajos de render, sin PNG hasta drenar la cola
+    carpeta, archivos = _archivos(diferido)
+    indices = sorted(int(n[len('info_'):-len('.json')]) for n in infos)
+    assert not any(a.endswith('.png') for a in archivos)
+    assert all(os.path.isfile(ruta_trabajo_render(carpeta, i)) for i in indices)
+
+    generados = renderizar_pendientes(carpeta)
+    assert sorted(generados) == indices
+    assert _archivos(diferido)[1] == _archivos(en_linea)[1]
+    # Un ciclo ya graficado no se vuelve a graficar
+    assert renderizar_pendientes(carpeta) == {}
+
+    # La resolución completa se genera desde el trabajo, que se elimina después
+    rutas = rutas_graficos(carpeta, indices[0], 'full')
+    assert renderizar_ciclo(carpeta, indices[0], nivel='full') == (rutas['full'], rutas['polar'])
+    assert all(os.path.isfile(r) for r in rutas.values())
+    assert not os.path.isfile(ruta_trabajo_render(carpeta, indices[0]))
+
+
+def test_trabajo_comprimido_sin_perdida(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 900
+    tiempo = np.datetime64('2015-01-01', 'ns') + np.arange(n) * np.timedelta64(1, 's')
+    segmentos = [{'time': tiempo, 'lat': np.linspace(50, 80, n), 'coords_aacgm': np.linspace(52, 82, n),
+                  'flux_ion': rng.normal(6, 1, n), 'flux_ele': rng.normal(8, 1, n)} for _ in range(2)]
+    specs = [10 ** rng.normal(6, 2, (19, n)).round(1) for _ in range(4)]
+    bordes = np.linspace(30, 30000, 20)
+    ruta = guardar_trabajo_render(str(tmp_path), 3, *segmentos, *specs, bordes)
+
+    with zipfile.ZipFile(ruta) as archivo:
+        assert all(i.compress_type == zipfile.ZIP_DEFLATED for i in archivo.infolist())
+    sin_comprimir = str(tmp_path / 'sin_comprimir.npz')
+    with np.load(ruta) as datos:
+        np.savez(sin_comprimir, **datos)
+        for nombre, spec in zip(('spec1_ion', 'spec2_ion', 'spec1_ele', 'spec2_ele'), specs):
+            np.testing.assert_array_equal(datos[nombre], spec)
+        np.testing.assert_array_equal(datos['energy_edges'], bordes)
+        for nombre, segmento in zip(('seg1', 'seg2'), segmentos):
+            for clave in CLAVES_SEGMENTO:
+                assert datos[f"{nombre}_{clave}"].dtype == segmento[clave].dtype
+                np.testing.assert_array_equal(datos[f"{nombre}_{clave}"], segmento[clave])
+    assert os.path.getsize(ruta) < os.path.getsize(sin_comprimir)
@@ -0,0 +1,121 @@
+# test_resumen_dia.py - reducción por intervalos del resumen del día frente al bucle por columna
+import os
+
+import numpy as np
+import pytest
+
+from funciones.compute_energy_edges import compute_energy_edges
+from funciones.plot_utils import fechas_mpl
+from funciones.resumen_dia import (fronteras_ciclos, graficar_resumen_dia, intervalos_tiempo,
+                                   reducir_espectrograma, reducir_min_max)
+
+
+def _columnas_bucle(tiempo_num, n_columnas):
+    """Muestras de cada columna, asignadas una a una"""
+    t0, t1 = tiempo_num[0], tiempo_num[-1]
+    muestras = [[] for _ in range(n_columnas)]
+    for i, t in enumerate(tiempo_num):
+        columna = min(int((t - t0) / (t1 - t0) * n_columnas), n_columnas - 1)
+        muestras[columna].append(i)
+    return muestras
+
+
+def _espectrograma_bucle(spec, muestras):
+    """Media geométrica de los valores positivos, canal a canal y columna a columna"""
+    reducido = np.full((spec.shape[1], len(muestras)), np.nan)
+    for columna, indices in enumerate(muestras):
+        for canal in range(spec.shape[1]):
+            valores = [spec[i, canal] for i in indices if np.isfinite(spec[i, canal]) and spec[i, canal] > 0]
+            if valores:
+                reducido[canal, columna] = 10 ** np.mean(np.log10(valores))
+    return reducido
+
+
+def _min_max_bucle(valores, muestras):
+    minimo = np.full(len(muestras), np.nan)
+    maximo = np.full(len(muestras), np.nan)
+    for columna, indices in enumerate(muestras):
+        finitos = [valores[i] for i in indices if np.isfinite(valores[i])]
+        if finitos:
+            minimo[columna], maximo[columna] = min(finitos), max(finitos)
+    return minimo, maximo
+
+
+def _datos(rng, n):
+    # Muestras a 1 s con huecos de datos
+    pasos = np.where(rng.random(n) < 0.005, rng.integers(60, 600, n), 1)
+    tiempo = np.datetime64('2015-01-01', 'ns') + np.cumsum(pasos) * np.timedelta64(1, 's')
+    spec = 10 ** rng.normal(6, 2, (n, 19))
+    spec[rng.random(spec.shape) < 0.1] = 0
+    spec[rng.random(spec.shape) < 0.05] = np.nan
+    spec[rng.random(spec.shape) < 0.05] *= -1
+    valores = rng.normal(5, 2, n)
+    valores[rng.random(n) < 0.1] = np.nan
+    valores[rng.random(n) < 0.01] = np.inf
+    return tiempo, spec, valores
+
+
+@pytest.mark.parametrize('semilla,n,n_columnas', [(0, 3000, 400), (1, 3000, 2999), (2, 500, 500),
+                                                  (3, 5000, 37)])
+def test_reduccion_igual_al_bucle(semilla, n, n_columnas):
+    rng = np.random.default_rng(semilla)
+    tiempo, spec, valores = _datos(rng, n)
+    tiempo_num = fechas_mpl(tiempo)
+    bordes, inicios, columnas = intervalos_tiempo(tiempo_num, n_columnas)
+    muestras = _columnas_bucle(tiempo_num, n_columnas)
+
+    assert len(bordes) == n_columnas + 1
+    assert (bordes[0], bordes[-1]) == (tiempo_num[0], tiempo_num[-1])
+    np.testing.assert_array_equal(columnas, [c for c, m in enumerate(muestras) if m])
+    np.testing.assert_array_equal(inicios, [m[0] for m in muestras if m])
+    # Los huecos dejan columnas vacías
+    assert len(columnas) < n_columnas or n == n_columnas
+
+    np.testing.assert_allclose(reducir_espectrograma(spec, inicios, columnas, n_columnas),
+                               _espectrograma_bucle(spec, muestras), rtol=1e-12, equal_nan=True)
+    for obtenido, esperado in zip(reducir_min_max(valores, inicios, columnas, n_columnas),
+                                  _min_max_bucle(valores, muestras)):
+        np.testing.assert_array_equal(obtenido, esperado)
+
+
+def test_eje_temporal_no_creciente():
+    with pytest.raises(ValueError):
+        intervalos_tiempo(np.array([3.0, 3.0]), 10)
+
+
+def test_fronteras_ciclos():
+    ciclos = [
+        {'boundaries': {'primera_mitad': {'b1e': {'index': 3, 'time': '2015-01-01T00:00:03'},
+                                          'b2e': None},
+                        'segunda_mitad': {'b1e': {'index': 9, 'time': '2015-01-01T00:10:00.500'},
+                                          'b6': {'index': None, 'time': None}}}},
+        None,
+        {'boundaries': {'primera_mitad': None, 'segunda_mitad': {'b6': {'time': '2015-01-01T01:00:00'}}}},
+    ]
+    tiempos = fronteras_ciclos(ciclos)
+    assert sorted(tiempos) == ['b1e', 'b6']
+    np.testing.assert_array_equal(tiempos['b1e'], np.array(['2015-01-01T00:00:03', '2015-01-01T00:10:00.500'],
+                                                           dtype='datetime64[ms]'))
+    np.testing.assert_array_equal(tiempos['b6'], np.array(['2015-01-01T01:00:00'], dtype='datetime64[ms]'))
+
+
+def test_grafico_resumen(tmp_path, energias, capsys):
+    rng = np.random.default_rng(4)
+    tiempo, spec, valores = _datos(rng, 4000)
+    lat = 80 * np.sin(np.linspace(0, 6 * np.pi, 4000))
+    lat[2500:2700] = np.nan
+    pares = np.array([[0, 650], [700, 1300], [2500, 2700]])
+    ciclos = [{'boundaries': {'primera_mitad': {'b1e': {'time': str(tiempo[100])}}}}]
+    bordes = compute_energy_edges(energias)
+    carpeta = str(tmp_path)
+
+    ruta = graficar_resumen_dia(tiempo, spec, np.zeros_like(spec), valores, valores, lat, pares,
+                                ciclos, bordes, carpeta, titulo='prueba', max_columnas=300)
+    assert ruta is not None and os.path.isfile(ruta) and ruta.startswith(carpeta)
+
+    assert graficar_resumen_dia(tiempo[:1], spec[:1], spec[:1], valores[:1], valores[:1], lat[:1],
+                                pares[:0], [], bordes, carpeta) is None
+    assert 'no hay datos suficientes' in capsys.readouterr().out
+    with pytest.raises(ValueError):
+        graficar_resumen_dia(tiempo, spec, spec, valores, valores, lat, pares, [], bordes, carpeta,
+                             max_columnas=0)
@@ -0,0 +1,91 @@
+# test_salto_b1.py - búsqueda vectorizada de b1e/b1i frente al bucle índice a índice
+import numpy as np
+import pytest
+
+from funciones.fronteras.detect_b1e import detect_b1e
+from funciones.fronteras.detect_b1i import detect_b1i
+from funciones.fronteras.funciones_auxiliares.salto_b1 import buscar_saltos_b1
+from funciones.fronteras.funciones_auxiliares.thresholds import PAPER_THRESHOLDS
+
+
+def _salto_bucle(log_flux, thresholds, desfase_siguiente):
+    """Algoritmo principal original (pasos 3-4 de b1e/b1i): un índice por iteración"""
+    n = len(log_flux)
+    if n < thresholds['background_window'] + 6:
+        return None
+    background = np.mean(log_flux[:thresholds['background_window']])
+    for i in range(3, n - 3):
+        prev_avg = np.mean(log_flux[i-3:i])
+        next_avg = np.mean(log_flux[i + desfase_siguiente:i + desfase_siguiente + 3])
+        if prev_avg <= 0:
+            continue
+        jump_ratio = next_avg / prev_avg
+        if log_flux[i] >= thresholds['very_high_flux']:
+            return i
+        required_jump = thresholds['min_jump']
+        if log_flux[i] >= thresholds['high_flux_thresh']:
+            required_jump = thresholds['high_flux_jump']
+        if (jump_ratio >= required_jump and
+                next_avg > background + 0.3 and
+                np.all(log_flux[i:i+3] > background)):
+            future_avg = np.mean(log_flux[i:min(i+6, n)])
+            if future_avg > background + 0.2:
+                return i
+    return None
+
+
+def _flujo_bucle(diff_flux, lat, energias, clean_min, clean_max):
+    """Pasos 1-2 originales: canales bajos, o limpios si hay fotoelectrones/carga"""
+    low_mask = (energias >= 32) & (energias <= 47)
+    high_mask = energias > 68
+    high_flux = np.mean(diff_flux[:, high_mask], axis=1)
+    if np.any((high_flux < 0.1 * np.sum(diff_flux[:, low_mask], axis=1)) & (lat < 60)):
+        clean_mask = (energias > clean_min) & (energias < clean_max)
+        if np.any(clean_mask):
+            low_mask = clean_mask
+    return np.log10(np.sum(diff_flux[:, low_mask], axis=1) + 1e-10)
+
+
+def _conjuntos(rng, frontera, k):
+    """Umbrales del paper y k variaciones aleatorias"""
+    base = PAPER_THRESHOLDS[frontera]
+    conjuntos = [dict(base)]
+    for _ in range(k):
+        conjunto = dict(base)
+        conjunto['min_jump'] = base['min_jump'] * rng.uniform(0.5, 1.5)
+        conjunto['high_flux_jump'] = base['high_flux_jump'] * rng.uniform(0.5, 1.5)
+        conjunto['high_flux_thresh'] = base['high_flux_thresh'] + rng.uniform(-3, 3)
+        conjunto['very_high_flux'] = conjunto['high_flux_thresh'] + rng.uniform(0, 3)
+        conjunto['background_window'] = int(rng.choice([3, 10, 30, 200]))
+        conjuntos.append(conjunto)
+    return conjuntos
+
+
+@pytest.mark.parametrize('desfase_siguiente', [0, 1])
+def test_buscar_saltos_igual_al_bucle(desfase_siguiente, segmento_sintetico):
+    encontrados = 0
+    for semilla in range(40):
+        rng = np.random.default_rng(semilla)
+        n = int(rng.choice([5, 7, 12, 16, 60, 400]))
+        log_flux = segmento_sintetico(rng, n)['flux_ele']
+        if semilla % 5 == 0:
+            log_flux = -np.abs(log_flux)  # promedios anteriores <= 0
+        conjuntos = _conjuntos(rng, 'b1e', 6)
+        esperado = [_salto_bucle(log_flux, t, desfase_siguiente) for t in conjuntos]
+        obtenido = buscar_saltos_b1(log_flux, conjuntos, desfase_siguiente)
+        assert [None if i < 0 else i for i in obtenido] == esperado
+        encontrados += sum(i is not None for i in esperado)
+    assert encontrados > 0
+
+
+@pytest.mark.parametrize('semilla', range(12))
+def test_detect_b1_igual_al_bucle(semilla, energias, segmento_sintetico):
+    rng = np.random.default_rng(semilla)
+    segmento = segmento_sintetico(rng, int(rng.choice([20, 300])))
+    # Latitudes bajas en la mitad de los casos: canales limpios
+    segmento['lat'] = segmento['lat'] - 25 * (semilla % 2)
+
+    log_ele = _flujo_bucle(segmento['ele_diff_flux'], segmento['lat'], energias, 100, 145)
+    assert detect_b1e(segmento, energias)['index'] == _salto_bucle(log_ele, PAPER_THRESHOLDS['b1e'], 0)
+    log_ion = _flujo_bucle(segmento['ion_diff_flux'], segmento['lat'], energias, 47, 68)
+    assert detect_b1i(segmento, energias)['index'] == _salto_bucle(log_ion, PAPER_THRESHOLDS['b1i'], 1)
@@ -0,0 +1,95 @@
+# test_segment_utils.py - segmentos como slices sobre los arrays globales frente a las copias originales
+import numpy as np
+import pytest
+
+from funciones.procesar_ciclos import prepare_segment_data, prepare_spectrograms
+from funciones.segment_utils import split_cycle_segment
+
+CLAVES = ('flux', 'time', 'coords_aacgm', 'coords_geo', 'indices')
+
+
+def _split_original(i0, i1, tiempo_final, flujos, sc_lat, sc_geo):
+    """split_cycle_segment original: copias coordenada a coordenada por diccionario de instantes"""
+    indice = {t: i for i, t in enumerate(tiempo_final)}
+    flux, times = flujos[i0:i1+1], tiempo_final[i0:i1+1]
+    idx = [max(0, min(indice[t], len(sc_lat) - 1)) for t in times]
+    coords_a = np.array([sc_lat[i] for i in idx])
+    coords_g = np.array([np.asarray(sc_geo, float)[i] for i in idx])
+    direccion_original = "ecuador-polo" if abs(coords_g[0]) < abs(coords_g[-1]) else "polo-ecuador"
+    max_idx = int(np.argmax(np.abs(coords_g)))
+
+    def build(start, end, reverse):
+        if start >= end:
+            return {clave: np.array([]) for clave in CLAVES}
+        segmento = {'flux': flux[start:end], 'time': times[start:end], 'coords_aacgm': coords_a[start:end],
+                    'coords_geo': coords_g[start:end],
+                    'indices': np.arange(i0 + start, i0 + end, dtype=np.int32)}
+        return {c: v[::-1] for c, v in segmento.items()} if reverse else segmento
+
+    polo = direccion_original == "polo-ecuador"
+    return {'seg1_original': build(0, max_idx, False), 'seg2_original': build(max_idx, len(flux), False),
+            'seg1_processing': build(0, max_idx, polo), 'seg2_processing': build(max_idx, len(flux), not polo),
+            'direccion_original': direccion_original}
+
+
+def _ejes(rng, n):
+    tiempo = np.datetime64('2015-01-01', 'ns') + np.cumsum(rng.integers(1, 3, n)) * np.timedelta64(1, 's')
+    fase = 2 * np.pi * np.arange(n) / rng.uniform(300, 900)
+    return tiempo, rng.normal(0, 1, n), 85 * np.sin(fase), 80 * np.sin(fase + 0.05)
+
+
+@pytest.mark.parametrize('semilla', range(20))
+def test_segmentos_iguales_a_las_copias(semilla):
+    rng = np.random.default_rng(semilla)
+    n = 1000
+    tiempo, flujos, sc_lat, sc_geo = _ejes(rng, n)
+    i0, i1 = sorted(rng.integers(0, n, 2))
+    if semilla == 0:
+        i0, i1 = 0, n - 1
+    esperado = _split_original(i0, i1, tiempo, flujos, sc_lat, sc_geo)
+
+    for par in ((int(i0), int(i1)), (tiempo[i0], tiempo[i1]), ((tiempo[i1], 0.0), (tiempo[i0], 0.0))):
+        obtenido = split_cycle_segment(par, tiempo, flujos, sc_lat, sc_geo)
+        assert obtenido['direccion_original'] == esperado['direccion_original']
+        for nombre in ('seg1_original', 'seg2_original', 'seg1_processing', 'seg2_processing'):
+            for clave in CLAVES:
+                np.testing.assert_array_equal(obtenido[nombre][clave], esperado[nombre][clave],
+                                              err_msg=f'{nombre} {clave}')
+            if len(obtenido[nombre]['indices']):
+                # Vistas sobre los arrays globales, también invertidas
+                for clave, global_ in (('flux', flujos), ('time', tiempo), ('coords_geo', sc_geo)):
+                    assert np.shares_memory(obtenido[nombre][clave], global_)
+                np.testing.assert_array_equal(np.arange(n)[obtenido[nombre]['slice']],
+                                              obtenido[nombre]['indices'])
+
+
+def test_coordenadas_mas_cortas_que_el_eje():
+    tiempo, flujos, sc_lat, sc_geo = _ejes(np.random.default_rng(0), 500)
+    esperado = _split_original(100, 499, tiempo, flujos, sc_lat[:400], sc_geo[:400])
+    obtenido = split_cycle_segment((100, 499), tiempo, flujos, sc_lat[:400], sc_geo[:400])
+    for nombre in ('seg1_processing', 'seg2_processing'):
+        for clave in CLAVES:
+            np.testing.assert_array_equal(obtenido[nombre][clave], esperado[nombre][clave])
+
+
+def test_datos_del_segmento_iguales_a_indexar(energias):
+    rng = np.random.default_rng(1)
+    tiempo, flujos, sc_lat, sc_geo = _ejes(rng, 600)
+    global_data = {clave: rng.normal(0, 1, 600) for clave in
+                   ('flux_ion', 'flux_ele', 'ion_energy_flux_b2i', 'ele_energy_flux', 'ion_energy_flux',
+                    'ele_avg_energy')}
+    global_data['ele_diff_flux'] = rng.normal(0, 1, (600, 19))
+    global_data['ion_diff_flux'] = rng.normal(0, 1, (600, 19))
+    global_data['ion_diff_flux'][rng.random((600, 19)) < 0.05] = np.nan
+
+    segmentos = split_cycle_segment((50, 550), tiempo, flujos, sc_lat, sc_geo)
+    for nombre in ('seg1_processing', 'seg2_processing'):
+        segmento = segmentos[nombre]
+        indices = segmento['indices']
+        datos = prepare_segment_data(segmento, nombre, global_data, energias)
+        for clave, valores in global_data.items():
+            np.testing.assert_array_equal(datos[clave], valores[indices], err_msg=clave)
+        spec_ion, spec_ele = prepare_spectrograms(segmento, global_data['ion_diff_flux'],
+                                                  global_data['ele_diff_flux'])
+        np.testing.assert_array_equal(spec_ion, np.nan_to_num(global_data['ion_diff_flux'][indices].T, nan=1e-10))
+        np.testing.assert_array_equal(spec_ele, global_data['ele_diff_flux'][indices].T)
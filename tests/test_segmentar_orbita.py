@@ -0,0 +1,116 @@
+# test_segmentar_orbita.py - segmentación vectorizada de la órbita frente a los bucles originales
+import numpy as np
+import pytest
+
+from funciones.agrupar_extremos import agrupar_extremos
+from funciones.detectar_extremos_latitud import detectar_extremos_latitud
+from funciones.segmentar_orbita import limpiar_mascara, segmentar_orbita
+from funciones.separar_por_latitud import separar_por_latitud
+
+
+def _limpiar_original(mask, min_consecutive=2):
+    cleaned_mask = mask.copy()
+    i, n = 0, len(mask)
+    while i < n:
+        if mask[i]:
+            j = i
+            while j < n and mask[j]:
+                j += 1
+            if j - i < min_consecutive:
+                cleaned_mask[i:j] = False
+            i = j
+        else:
+            i += 1
+    return cleaned_mask
+
+
+def _extremos_original(lats, tiempos):
+    if len(lats) < 2:
+        return []
+    extremos = [(tiempos[0], lats[0])]
+    for i in range(1, len(lats)):
+        lat_prev, lat_curr = lats[i-1], lats[i]
+        if (lat_prev * lat_curr <= 0) or (abs(lat_curr - lat_prev) > 5.0):
+            extremos.append((tiempos[i], lat_curr) if abs(lat_curr) < abs(lat_prev) else (tiempos[i-1], lat_prev))
+    extremos.append((tiempos[-1], lats[-1]))
+    filtrados = []
+    for extremo in extremos:
+        if not filtrados:
+            filtrados.append(extremo)
+            continue
+        t_prev, lat_prev = filtrados[-1]
+        if extremo[0] - t_prev > np.timedelta64(2, 's') or abs(extremo[1] - lat_prev) > 1.0:
+            filtrados.append(extremo)
+        elif abs(extremo[1]) > abs(lat_prev):
+            filtrados[-1] = extremo
+    return filtrados
+
+
+def _agrupar_original(extremos):
+    if len(extremos) < 2:
+        return []
+    ordenados = sorted(extremos, key=lambda x: x[0])
+    pares, i = [], 0
+    while i < len(ordenados) - 1:
+        if ordenados[i + 1][0] - ordenados[i][0] >= np.timedelta64(10, 's'):
+            pares.append([ordenados[i], ordenados[i + 1]])
+            i += 2
+        else:
+            i += 1
+    if len(ordenados) % 2 == 1 and len(ordenados) > 2 and pares:
+        pares[-1] = [pares[-1][0], ordenados[-1]]
+    return pares
+
+
+def _orbita(rng, n):
+    """Latitud AACGM de varias órbitas con ruido, huecos de datos y puntos aislados"""
+    tiempo = np.datetime64('2015-01-01', 'ns') + np.cumsum(rng.choice([1, 1, 1, 2, 300], n, p=[.5, .3, .19, .009, .001])) * np.timedelta64(1, 's')
+    segundos = (tiempo - tiempo[0]) / np.timedelta64(1, 's')
+    lat = 85 * np.sin(2 * np.pi * segundos / rng.uniform(500, 6060)) + rng.normal(0, rng.choice([0.01, 0.5, 3]), n)
+    aislados = rng.random(n) < 0.01
+    lat[aislados] = rng.choice([-60.0, 60.0, 0.0], aislados.sum())
+    return lat, tiempo
+
+
+@pytest.mark.parametrize('semilla', range(25))
+def test_segmentacion_igual_a_los_bucles(semilla):
+    rng = np.random.default_rng(semilla)
+    lat, tiempo = _orbita(rng, int(rng.choice([1, 3, 50, 3000, 20000])))
+
+    mascara = (((-80 < lat) & (lat < -40)) | ((40 < lat) & (lat < 80)))
+    limpia = _limpiar_original(mascara)
+    adjust_lat, adjust_t = lat[limpia].tolist(), tiempo[limpia]
+    extremos = _extremos_original(adjust_lat, adjust_t)
+    pares = _agrupar_original(extremos)
+
+    segmentacion = segmentar_orbita(lat, tiempo)
+    np.testing.assert_array_equal(segmentacion['mascara'], limpia)
+    transiciones = [i for i in range(len(limpia)) if limpia[i] != (limpia[i - 1] if i else False)]
+    np.testing.assert_array_equal(segmentacion['transiciones'], transiciones)
+    assert [(tiempo[i], lat[i]) for i in segmentacion['extremos']] == extremos
+    assert [[(tiempo[i], lat[i]), (tiempo[j], lat[j])] for i, j in segmentacion['pares']] == pares
+
+    # Interfaces por tuplas sobre el mismo código
+    separado = separar_por_latitud(lat, tiempo)
+    assert separado[0] == adjust_lat
+    np.testing.assert_array_equal(separado[1], adjust_t)
+    assert separado[4] == [(lat[i], tiempo[i]) for i in transiciones]
+    assert detectar_extremos_latitud(adjust_lat, adjust_t) == extremos
+    assert agrupar_extremos(extremos) == pares
+
+
+@pytest.mark.parametrize('min_consecutive', [1, 2, 3, 7])
+def test_limpiar_mascara_igual_al_bucle(min_consecutive):
+    rng = np.random.default_rng(min_consecutive)
+    for _ in range(20):
+        mask = rng.random(int(rng.integers(0, 200))) < rng.uniform(0.2, 0.9)
+        np.testing.assert_array_equal(limpiar_mascara(mask, min_consecutive),
+                                      _limpiar_original(mask, min_consecutive))
+
+
+def test_extremos_desordenados_y_casi_duplicados():
+    t = np.datetime64('2015-01-01T00:00:00', 'ns') + np.array([0, 5, 1, 30, 31, 60, 65]) * np.timedelta64(1, 's')
+    extremos = [(ti, lat) for ti, lat in zip(t, [50.0, -50.0, 49.5, 70.0, 69.5, -45.0, 55.0])]
+    assert agrupar_extremos(extremos) == _agrupar_original(extremos)
+    lats = [50.0, 50.5, -0.2, 0.3, 60.0, 61.0, 42.0]
+    assert detectar_extremos_latitud(lats, t) == _extremos_original(lats, t)
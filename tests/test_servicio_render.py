@@ -0,0 +1,127 @@
+# test_servicio_render.py - timeouts, procesos caídos, cola acotada y cierre del servicio de render
+import os
+import queue
+import signal
+import threading
+import time
+
+import pytest
+
+from funciones import servicio_render
+from funciones.servicio_render import ServicioRender
+
+
+def _renderizar(trabajo):
+    """Sustituto de renderizar_trabajo: el modo del trabajo decide qué ocurre"""
+    modo = trabajo.get('modo', 'ok')
+    if 'pid' in trabajo:
+        with open(trabajo['pid'], 'w') as f:
+            f.write(str(os.getpid()))
+    if modo == 'colgar':
+        time.sleep(60)
+    elif modo == 'morir':
+        os._exit(3)
+    elif modo == 'error':
+        raise RuntimeError('fallo de prueba')
+    elif modo == 'esperar':
+        while not os.path.exists(trabajo['barrera']):
+            time.sleep(0.01)
+    else:
+        time.sleep(trabajo.get('segundos', 0))
+    return {'full': f"ciclo_{trabajo['cycle_index']}.png"}
+
+
+@pytest.fixture(autouse=True)
+def _render_simulado(monkeypatch):
+    # Los procesos se crean con fork y heredan el sustituto
+    monkeypatch.setattr(servicio_render, 'renderizar_trabajo', _renderizar)
+    monkeypatch.setattr(servicio_render, 'INTERVALO_MONITOR', 0.05)
+
+
+def _esperar_archivo(ruta, limite=10):
+    inicio = time.perf_counter()
+    while not os.path.exists(ruta) or os.path.getsize(ruta) == 0:
+        assert time.perf_counter() - inicio < limite
+        time.sleep(0.01)
+    with open(ruta) as f:
+        return int(f.read())
+
+
+def test_timeout_cuenta_como_fallido_y_sigue(capsys):
+    with ServicioRender(workers=1, timeout=1) as servicio:
+        servicio.enviar({'cycle_index': 0, 'modo': 'colgar'})
+        servicio.enviar({'cycle_index': 1, 'modo': 'error'})
+        for ciclo in range(2, 5):
+            servicio.enviar({'cycle_index': ciclo})
+    estadisticas = servicio.estadisticas
+
+    assert estadisticas['fallidos'] == 2
+    assert estadisticas['errores'][0] == 'timeout (1 s)'
+    assert estadisticas['errores'][1] == 'RuntimeError: fallo de prueba'
+    assert estadisticas['renderizados'] == 3
+    assert servicio.rutas == {c: {'full': f'ciclo_{c}.png'} for c in range(2, 5)}
+    assert 'Error renderizando ciclo 0: timeout' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('forma', ['salida', 'kill'])
+def test_proceso_caido_se_reemplaza(forma, tmp_path):
+    ruta_pid = str(tmp_path / 'pid')
+    servicio = ServicioRender(workers=1, timeout=None)
+    original = set(servicio._procesos)
+    if forma == 'salida':
+        servicio.enviar({'cycle_index': 0, 'modo': 'morir', 'pid': ruta_pid})
+        _esperar_archivo(ruta_pid)
+    else:
+        servicio.enviar({'cycle_index': 0, 'modo': 'colgar', 'pid': ruta_pid})
+        os.kill(_esperar_archivo(ruta_pid), signal.SIGKILL)
+    ruta_reemplazo = str(tmp_path / 'pid_reemplazo')
+    servicio.enviar({'cycle_index': 1, 'pid': ruta_reemplazo})
+    for ciclo in range(2, 4):
+        servicio.enviar({'cycle_index': ciclo})
+    estadisticas = servicio.cerrar()
+
+    codigo = 3 if forma == 'salida' else -signal.SIGKILL
+    assert estadisticas['errores'] == {0: f'proceso de render terminado (código {codigo})'}
+    assert estadisticas['renderizados'] == 3
+    assert sorted(servicio.rutas) == [1, 2, 3]
+    # Los trabajos siguientes los grafica el proceso de reemplazo, que sale al cerrar
+    assert _esperar_archivo(ruta_reemplazo) not in original
+    assert servicio._procesos == {}
+
+
+def test_enviar_bloquea_con_la_cola_llena(tmp_path):
+    barrera = str(tmp_path / 'barrera')
+    servicio = ServicioRender(workers=1, max_pendientes=2, timeout=None)
+    # Un trabajo en el proceso, otro en el repartidor esperando proceso libre y dos en la cola
+    servicio.enviar({'cycle_index': 0, 'modo': 'esperar', 'barrera': barrera})
+    for ciclo in range(1, 4):
+        servicio.enviar({'cycle_index': ciclo}, timeout=5)
+    with pytest.raises(queue.Full):
+        servicio.enviar({'cycle_index': 4}, timeout=0.3)
+
+    hilo = threading.Thread(target=servicio.enviar, args=({'cycle_index': 4},))
+    hilo.start()
+    hilo.join(0.3)
+    assert hilo.is_alive()
+
+    open(barrera, 'w').close()
+    hilo.join(10)
+    assert not hilo.is_alive()
+    estadisticas = servicio.cerrar()
+    assert estadisticas['renderizados'] == 5
+    assert sorted(servicio.rutas) == list(range(5))
+
+
+def test_cerrar_vacia_la_cola():
+    servicio = ServicioRender(workers=2, max_pendientes=3, timeout=None)
+    for ciclo in range(12):
+        servicio.enviar({'cycle_index': ciclo, 'segundos': 0.05})
+    estadisticas = servicio.cerrar()
+
+    assert estadisticas['renderizados'] == 12
+    assert estadisticas['fallidos'] == 0
+    assert sorted(servicio.rutas) == list(range(12))
+    assert servicio._procesos == {} and servicio._activos == {}
+    assert servicio.cerrar() is estadisticas
+    with pytest.raises(ValueError):
+        servicio.enviar({'cycle_index': 12})
@@ -0,0 +1,47 @@
+# test_ventanas.py - medias móviles vectorizadas frente a np.mean por ventana
+import numpy as np
+import pytest
+
+from funciones.fronteras.funciones_auxiliares.ventanas import (sumas_ventana, medias_ventana,
+                                                               medias_ventana_truncada)
+
+
+def _referencia(x, ancho):
+    return np.array([np.mean(x[k:k + ancho]) for k in range(len(x) - ancho + 1)])
+
+
+@pytest.mark.parametrize('ancho', [1, 2, 3, 5, 7, 8, 9, 10, 12, 15, 16, 20, 30, 35, 63, 64, 100, 127, 128])
+def test_medias_ventana_identicas_a_np_mean(ancho):
+    # Hasta 128 (bloque de la suma por pares) el resultado es idéntico bit a bit
+    rng = np.random.default_rng(ancho)
+    for n in (ancho, ancho + 1, 3 * ancho + 5, 500):
+        x = rng.normal(8, 3, n) * 10 ** rng.uniform(-3, 3, n)
+        np.testing.assert_array_equal(medias_ventana(x, ancho), _referencia(x, ancho))
+
+
+@pytest.mark.parametrize('ancho', [129, 200, 1000])
+def test_medias_ventana_grandes_con_sumas_acumuladas(ancho):
+    rng = np.random.default_rng(ancho)
+    x = rng.normal(8, 3, 3000)
+    np.testing.assert_allclose(medias_ventana(x, ancho), _referencia(x, ancho), rtol=1e-12, atol=1e-12)
+
+
+def test_ventanas_sin_posiciones_validas():
+    x = np.arange(5, dtype=float)
+    assert len(sumas_ventana(x, 6)) == 0
+    assert len(sumas_ventana(x, 0)) == 0
+    assert len(medias_ventana(np.empty(0), 3)) == 0
+
+
+def test_medias_ventana_truncada():
+    rng = np.random.default_rng(1)
+    x = rng.normal(0, 1, 50)
+    for ancho in (1, 10, 49, 50, 80):
+        esperado = np.array([np.mean(x[k:min(k + ancho, len(x))]) for k in range(len(x))])
+        np.testing.assert_array_equal(medias_ventana_truncada(x, ancho), esperado)
+
+
+def test_nan_se_propaga_como_en_np_mean():
+    x = np.arange(40, dtype=float)
+    x[17] = np.nan
+    np.testing.assert_array_equal(medias_ventana(x, 10), _referencia(x, 10))